@@ -2,8 +2,14 @@ import pdfplumber
 import re
 import csv
 import json
+import sys
+from pathlib import Path
 import pandas as pd
 
+# Shared, memoized text normalization (apresentacao-investimentos/scripts/normalizacao.py)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "apresentacao-investimentos" / "scripts"))
+from normalizacao import ascii_upper, memoizar, resumo_cache  # noqa: E402
+
 pdf_path = "Bradesco_19112025_175210.pdf"
 csv_path = "extrato_bradesco_importacao.csv"
 json_path = "extrato_data.js"
@@ -15,8 +21,8 @@ date_re = re.compile(r'^(\d{2}/\d{2}/\d{4})')
 # Load Employee List
 try:
     df_employees = pd.read_excel(excel_path)
-    # Normalize to uppercase and strip
-    employee_names = set(df_employees['Nome'].astype(str).str.upper().str.strip())
+    # Normalize to uppercase, without accents and with collapsed spaces (same form as the descriptions)
+    employee_names = set(df_employees['Nome'].astype(str).map(ascii_upper))
     print(f"Loaded {len(employee_names)} employees.")
 except Exception as e:
     print(f"Error loading Excel: {e}")
@@ -55,6 +61,13 @@ empresa = "1 - MACLINEA MAQUINAS E EQUIPAMENTOS LTDA"
 
 ignore_terms = ["Total", "Saldos Invest"]
 
+# Only ignore connectors for splitting
+NAME_CONNECTORS = {'DA', 'DE', 'DO', 'DOS', 'DAS', 'E'}
+
+@memoizar("employee_name_parts")
+def employee_name_parts(emp):
+    return tuple(p for p in emp.split() if p not in NAME_CONNECTORS)
+
 def is_employee_match(description, employee_list):
     """
     Looser matching logic for employees.
@@ -62,11 +75,8 @@ def is_employee_match(description, employee_list):
     """
     desc_words = set(description.replace('-', ' ').split())
     
-    # Only ignore connectors for splitting
-    connectors = {'DA', 'DE', 'DO', 'DOS', 'DAS', 'E'}
-    
     for emp in employee_list:
-        emp_parts = [p for p in emp.split() if p not in connectors]
+        emp_parts = employee_name_parts(emp)
         
         if not emp_parts: continue
         
@@ -146,6 +156,8 @@ try:
         
         full_desc = f"{clean_prev} {clean_next}".strip()
         upper_desc = full_desc.upper()
+        # Employee names are compared without accents (same form as employee_names)
+        employee_desc = ascii_upper(full_desc)
 
         plano_contas = ""
         
@@ -163,13 +175,13 @@ try:
                 if name_match:
                     extracted_name = name_match.group(1).strip()
                     
-                    if is_employee_match(upper_desc, employee_names):
+                    if is_employee_match(employee_desc, employee_names):
                         plano_contas = ACC_SALARIO
                     else:
                         if len(extracted_name) > 3 and not any(char.isdigit() for char in extracted_name):
                              plano_contas = ACC_RESCISAO
                 else:
-                    if is_employee_match(upper_desc, employee_names):
+                    if is_employee_match(employee_desc, employee_names):
                         plano_contas = ACC_SALARIO
 
         # 3. Fallback
@@ -204,6 +216,7 @@ try:
         f.write(f"const extratoData = {json_content};")
 
     print(f"Generated {csv_path} and {json_path} with {len(transactions)} records.")
+    print(f"Normalization cache: {resumo_cache()}")
 
 except Exception as e:
     print(f"Error: {e}")
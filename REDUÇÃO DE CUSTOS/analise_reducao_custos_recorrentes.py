@@ -14,19 +14,39 @@ Regras do pedido (versão atual):
 
 Saídas:
   - imprime resumo no console
-  - gera Excel de apoio com abas de base e comparativos
+  - gera Excel de apoio com abas de base e comparativos, inclusive o cubo comparativo (todos os
+    meses do plano novo × bases em `JANELAS_BASE`, por categoria/código/pool) e a matriz de rateio
+    dos pools (pesos por pool, código e mês-alvo)
+  - com `--profile`: tempo/memória/linhas por etapa (leitura do Excel, regras, cubo, rateio, comparativo,
+    exportação, relatório) em apresentacao-investimentos/benchmarks/perfil_reducao_custos.json
 """
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+import argparse
 from datetime import datetime
 from pathlib import Path
-import re
-import unicodedata
+import sys
 
+import numpy as np
 import pandas as pd
 
+# Normalização de textos compartilhada com as análises em apresentacao-investimentos/scripts
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "apresentacao-investimentos" / "scripts"))
+from instrumentacao import adicionar_argumentos, finalizar, perfil_dos_argumentos  # noqa: E402
+from normalizacao import chave_busca, resumo_cache  # noqa: E402
+from regras_dre import AvaliacaoRegras, MotorRegras, RegraCategoria  # noqa: E402
+from cache_planilhas import CACHE_PLANILHAS_DIR, CachePlanilhas, ler_planilha  # noqa: E402
+from exportacao_excel import ABAS_PESADAS, FORMATOS_EXTERNOS, ConfigExportacao, renderizar_planilhas  # noqa: E402
+from rateio import MatrizRateio, PoolRateio, montar_matriz_rateio  # noqa: E402
+from comparativo_periodos import (  # noqa: E402
+    JanelaBase,
+    colunas_mes_dre_antigo,
+    colunas_mes_plano_novo,
+    cubo_comparativo,
+    matriz_mensal,
+)
+
 
 BASE_DIR = Path(__file__).resolve().parent
 
@@ -43,6 +63,19 @@ MES_JUL = 202507
 MESES_MEDIA_ANUAL = [202501, 202502, 202503, 202504, 202505, 202506, 202507, 202508, 202509]
 ROTULO_MEDIA_ANUAL = "Média anual (Jan–Set/2025)"
 
+# Mês comparado no relatório (coluna "Novembro" do plano novo); as colunas de mês do plano novo são deste ano
+MES_ALVO = 202511
+ANO_PLANO_NOVO = 2025
+
+# Bases do cubo comparativo (todos os meses do plano novo × estas janelas); o relatório usa "julho" e "media_anual"
+JANELAS_BASE: tuple[JanelaBase, ...] = (
+    JanelaBase("julho", "mes", (MES_JUL,)),
+    JanelaBase("media_anual", "media", tuple(MESES_MEDIA_ANUAL)),
+    JanelaBase("mediana_anual", "mediana", tuple(MESES_MEDIA_ANUAL)),
+    JanelaBase("ultimos_3", "ultimos", n=3),
+    JanelaBase("ano_anterior", "ano_anterior"),
+)
+
 CODIGOS_AGREGADORES_NOVO_PLANO = {
     "1",
     "1.1",
@@ -60,15 +93,8 @@ CODIGOS_AGREGADORES_NOVO_PLANO = {
 
 
 def _norm(txt: object) -> str:
-    """Normaliza texto (lower, sem acentos, espaços colapsados)."""
-    if txt is None:
-        return ""
-    s = str(txt)
-    s = unicodedata.normalize("NFKD", s)
-    s = "".join(ch for ch in s if not unicodedata.combining(ch))
-    s = s.lower()
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+    """Normaliza texto (lower, sem acentos, espaços colapsados); memoizado em `normalizacao.chave_busca`."""
+    return chave_busca(txt)
 
 
 def _split_conta(conta_raw: str) -> tuple[str, str]:
@@ -83,22 +109,23 @@ def _split_conta(conta_raw: str) -> tuple[str, str]:
     return "", s
 
 
-def carregar_dre_antigo() -> pd.DataFrame:
-    df = pd.read_excel(ARQ_ANTIGO, sheet_name=ABA_ANTIGO, header=[0, 1])
+def carregar_dre_antigo(cache: CachePlanilhas | None = None) -> pd.DataFrame:
+    df = ler_planilha(ARQ_ANTIGO, ABA_ANTIGO, header=[0, 1], cache=cache)
 
     # As duas primeiras colunas são o bloco "Anomes" (Descrição / Conta)
     col_grupo = df.columns[0]
     col_conta = df.columns[1]
 
-    # Seleciona apenas colunas de R$ dos meses necessários
+    # Todas as colunas de R$ por mês (o cubo comparativo usa qualquer mês); as das bases do relatório são obrigatórias
+    meses_col = colunas_mes_dre_antigo(df.columns)
     meses_necessarios = sorted(set(MESES_MEDIA_ANUAL + [MES_JUL]))
-    cols_valor = [(m, "R$") for m in meses_necessarios]
-    missing = [c for c in cols_valor if c not in df.columns]
+    missing = [(m, "R$") for m in meses_necessarios if m not in meses_col.values()]
     if missing:
         raise ValueError(f"Colunas de mês não encontradas no DRE antigo: {missing}")
+    cols_valor = sorted(meses_col, key=meses_col.__getitem__)
 
     out = df[[col_grupo, col_conta] + cols_valor].copy()
-    out.columns = ["grupo_raw", "conta_raw"] + [f"v_{m}" for m, _ in cols_valor]
+    out.columns = ["grupo_raw", "conta_raw"] + [f"v_{meses_col[c]}" for c in cols_valor]
 
     out["grupo_raw"] = out["grupo_raw"].astype(str).str.strip()
     out["conta_raw"] = out["conta_raw"].astype(str).str.strip()
@@ -136,21 +163,8 @@ def dre_antigo_long(df_antigo: pd.DataFrame) -> pd.DataFrame:
     return df_long
 
 
-def carregar_plano_novo() -> pd.DataFrame:
-    df = pd.read_excel(ARQ_NOVO, sheet_name=ABA_NOVO)
-    col_codigo = df.columns[1]
-    col_desc = df.columns[2]
-    col_nov = df.columns[4]
-
-    out = df[[col_codigo, col_desc, col_nov]].copy()
-    out.columns = ["codigo", "desc", "valor_nov"]
-    out["codigo"] = out["codigo"].astype(str).str.strip()
-    out["desc"] = out["desc"].astype(str).str.strip()
-    out["desc_norm"] = out["desc"].map(_norm)
-    out["valor_nov"] = pd.to_numeric(out["valor_nov"], errors="coerce").fillna(0.0)
-    out["gasto_nov"] = -out["valor_nov"]
-    # Evita "-0,00" na apresentação
-    out["gasto_nov"] = out["gasto_nov"].where(out["gasto_nov"].abs() > 1e-9, 0.0)
+def carregar_plano_novo(cache: CachePlanilhas | None = None) -> pd.DataFrame:
+    out = carregar_plano_novo_completo(cache)
 
     # Remove linhas agregadoras óbvias (totais do relatório) para evitar dupla contagem
     out = out[~out["codigo"].isin(CODIGOS_AGREGADORES_NOVO_PLANO)].copy()
@@ -158,12 +172,12 @@ def carregar_plano_novo() -> pd.DataFrame:
     return out
 
 
-def carregar_plano_novo_completo() -> pd.DataFrame:
+def carregar_plano_novo_completo(cache: CachePlanilhas | None = None) -> pd.DataFrame:
     """Carrega o plano novo mantendo também linhas agregadoras (1.3, 1.4, etc) para formatação do relatório."""
-    df = pd.read_excel(ARQ_NOVO, sheet_name=ABA_NOVO)
+    df = ler_planilha(ARQ_NOVO, ABA_NOVO, cache=cache)
     col_codigo = df.columns[1]
     col_desc = df.columns[2]
-    col_nov = df.columns[4]
+    col_nov = _coluna_mes_plano_novo(df, MES_ALVO)
 
     out = df[[col_codigo, col_desc, col_nov]].copy()
     out.columns = ["codigo", "desc", "valor_nov"]
@@ -177,37 +191,96 @@ def carregar_plano_novo_completo() -> pd.DataFrame:
     return out
 
 
-def calcular_base_old(
-    df_old_long: pd.DataFrame,
-    old_group_contains: tuple[str, ...] = (),
-    old_conta_contains: tuple[str, ...] = (),
-    old_conta_exclude_contains: tuple[str, ...] = (),
-    meses_media: list[int] | None = None,
-    mes_referencia: int | None = MES_JUL,
-) -> tuple[float, float]:
-    """
-    Retorna (base_mes_referencia, base_media) do DRE antigo para uma regra de seleção.
+def _coluna_mes_plano_novo(df: pd.DataFrame, mes: int) -> object:
+    por_mes = {m: c for c, m in colunas_mes_plano_novo(df.columns, ANO_PLANO_NOVO).items()}
+    if mes not in por_mes:
+        raise ValueError(f"Coluna do mês {mes} não encontrada no plano novo: {list(df.columns)}")
+    return por_mes[mes]
 
-    - `mes_referencia`: normalmente Julho/2025 (202507), usado como âncora opcional.
-    - `meses_media`: lista de meses para calcular a média. Se None, usa `MESES_MEDIA_ANUAL`.
-    """
-    regra_tmp = RegraCategoria(
-        categoria="__tmp__",
-        old_group_contains=old_group_contains,
-        old_conta_contains=old_conta_contains,
-        old_conta_exclude_contains=old_conta_exclude_contains,
-    )
-    mask_old = aplicar_regra_old(df_old_long, regra_tmp)
-    old_mes = (
-        df_old_long.loc[mask_old, ["mes", "gasto"]]
-        .groupby("mes", as_index=False)["gasto"]
-        .sum()
-        .set_index("mes")["gasto"]
-    )
-    meses_media = meses_media or MESES_MEDIA_ANUAL
-    base_ref = float(old_mes.get(mes_referencia, 0.0)) if mes_referencia is not None else 0.0
-    base_media = float(old_mes.reindex(meses_media, fill_value=0.0).mean())
-    return base_ref, base_media
+
+def plano_novo_long(cache: CachePlanilhas | None = None) -> pd.DataFrame:
+    """Plano novo (todas as linhas) em formato longo: linha da planilha, código, mês e gasto de cada coluna de mês."""
+    df = ler_planilha(ARQ_NOVO, ABA_NOVO, cache=cache)
+    meses_col = colunas_mes_plano_novo(df.columns, ANO_PLANO_NOVO)
+
+    out = df[[df.columns[1]] + list(meses_col)].copy()
+    out.columns = ["codigo"] + [meses_col[c] for c in meses_col]
+    out["codigo"] = out["codigo"].astype(str).str.strip()
+    out["linha"] = out.index
+    df_long = out.melt(id_vars=["linha", "codigo"], var_name="mes", value_name="valor")
+    df_long["mes"] = df_long["mes"].astype(int)
+    df_long["valor"] = pd.to_numeric(df_long["valor"], errors="coerce").fillna(0.0)
+    df_long["gasto"] = -df_long["valor"]
+    df_long["gasto"] = df_long["gasto"].where(df_long["gasto"].abs() > 1e-9, 0.0)
+    return df_long
+
+
+# Bases do DRE antigo por código do plano novo; `categoria` é a observação mostrada no relatório.
+# Quando não houver histórico equivalente no DRE antigo, a base é assumida 0 (conservador) e marcada na observação.
+REGRAS_BASE_POR_CODIGO: tuple[tuple[str, RegraCategoria], ...] = (
+    # FUNCIONÁRIOS (itens que conseguimos mapear no DRE antigo por descrição)
+    ("1.3.01", RegraCategoria("DRE antigo: PESSOAL / FGTS", old_group_contains=("pessoal",), old_conta_contains=("fgts",))),
+    # Salários no DRE antigo também carrega adicionais que o plano novo não separa em linha própria (insalubridade etc).
+    (
+        "1.3.03",
+        RegraCategoria(
+            "DRE antigo: PESSOAL / Salários + adicionais",
+            old_group_contains=("pessoal",),
+            old_conta_contains=("salarios", "horas extras", "adicional noturno", "adicional insalubridade"),
+        ),
+    ),
+    ("1.3.09", RegraCategoria("DRE antigo: PESSOAL / 13º Salário", old_group_contains=("pessoal",), old_conta_contains=("13",))),
+    ("1.3.02", RegraCategoria("DRE antigo: PESSOAL / INSS (inclui Lei 12.546/2011)", old_group_contains=("pessoal",), old_conta_contains=("inss",))),
+    ("1.3.15", RegraCategoria("DRE antigo: PESSOAL / Férias", old_group_contains=("pessoal",), old_conta_contains=("ferias",))),
+    ("1.3.17", RegraCategoria("DRE antigo: PESSOAL / Pró-Labore", old_group_contains=("pessoal",), old_conta_contains=("pro-labore", "pro labore"))),
+    ("1.3.10", RegraCategoria("DRE antigo: PESSOAL / Vale Transporte", old_group_contains=("pessoal",), old_conta_contains=("vale transporte",))),
+    ("1.3.13", RegraCategoria("DRE antigo: PESSOAL / PAT (alimentação)", old_group_contains=("pessoal",), old_conta_contains=("pat",))),
+    ("1.3.19", RegraCategoria("DRE antigo: PESSOAL / Assistência Médica e Social", old_group_contains=("pessoal",), old_conta_contains=("assistencia medica",))),
+    ("1.3.14", RegraCategoria("DRE antigo: COMISSÕES", old_group_contains=("comiss",), old_conta_contains=("comiss",))),
+    # DESPESAS / UTILIDADES
+    ("1.4.10", RegraCategoria("DRE antigo: Aluguéis e Condomínios", old_conta_contains=("alugu",))),
+    ("1.4.12", RegraCategoria("DRE antigo: Telefone", old_conta_contains=("telefone",))),
+    ("1.4.13", RegraCategoria("DRE antigo: Água", old_conta_contains=("agua",))),
+    ("1.4.14", RegraCategoria("DRE antigo: Energia Elétrica", old_conta_contains=("energia eletrica",))),
+    ("1.4.06", RegraCategoria("DRE antigo: Segurança", old_conta_contains=("seguranca",))),
+    # Despesas administrativas (bucket aproximado)
+    (
+        "1.4.11",
+        RegraCategoria(
+            "DRE antigo: Utilidades/Material de consumo/Indedutíveis (sem indenizações)",
+            old_group_contains=("utilizadades e servicos", "material de consumo", "despesas indedutiveis"),
+            old_conta_exclude_contains=("manuten", "repar", "segur", "indeniza"),
+        ),
+    ),
+    # Viagens e fretes (DRE antigo tem conta 'Fretes e Combustíveis' e 'Viagens e Estadias')
+    ("1.4.03", RegraCategoria("DRE antigo: Fretes e Combustíveis", old_conta_contains=("fretes e combustiveis",))),
+    ("1.4.18", RegraCategoria("DRE antigo: Viagens e Estadias", old_conta_contains=("viagens e estadias",))),
+    # Consultoria/Jurídico/Contabilidade (no DRE antigo está no grupo CONSULTORIAS...)
+    ("1.4.22", RegraCategoria("DRE antigo: Consultorias/Auditorias/Honorários", old_group_contains=("consultorias",))),
+)
+
+# Pools: uma base no DRE antigo rateada entre vários códigos do plano novo (pesos em `rateio.PoolRateio`);
+# os pesos são o gasto de cada código em Novembro (divisão igual se o pool não teve gasto)
+REGRAS_POOL: tuple[tuple[PoolRateio, RegraCategoria], ...] = (
+    # seguros: no novo plano aparece em 1.3.05 e 1.4.15; no DRE antigo está consolidado em SEGUROS OPERACIONAL
+    (
+        PoolRateio(("1.3.05", "1.4.15"), peso="mes", mes_peso=MES_ALVO),
+        RegraCategoria("DRE antigo: Seguros (rateio por peso em Nov/2025)", old_group_contains=("seguros",)),
+    ),
+    # financeiro: 1.4.02 + (opcional) 2.2.02/2.2.03
+    (
+        PoolRateio(("1.4.02", "2.2.02", "2.2.03"), peso="mes", mes_peso=MES_ALVO),
+        RegraCategoria(
+            "DRE antigo: Financeiro (rateio por peso em Nov/2025)",
+            old_group_contains=("juros s/financiamentos", "gestao financeira passiva"),
+        ),
+    ),
+    # manutenções: novo plano 1.5.01/1.5.02/1.5.03; DRE antigo tem 'Manutenção e Reparos' em mais de um grupo
+    (
+        PoolRateio(("1.5.01", "1.5.02", "1.5.03"), peso="mes", mes_peso=MES_ALVO),
+        RegraCategoria("DRE antigo: Manutenções (rateio por peso em Nov/2025)", old_conta_contains=("manuten", "repar")),
+    ),
+)
 
 
 def _codigo_nivel2(codigo: str) -> str:
@@ -235,97 +308,57 @@ def _descricao_categoria_por_codigo(df_plano_full: pd.DataFrame) -> dict[str, st
     return out
 
 
-@dataclass(frozen=True)
-class RegraCategoria:
-    categoria: str
-    old_group_contains: tuple[str, ...] = ()
-    old_conta_contains: tuple[str, ...] = ()
-    old_conta_exclude_contains: tuple[str, ...] = ()
-    new_code_prefixes: tuple[str, ...] = ()
-    new_codes: tuple[str, ...] = ()
-    new_desc_contains: tuple[str, ...] = ()
-    new_desc_exclude_contains: tuple[str, ...] = ()
-    observacao: str = ""
-
-
-def _mask_contains(series: pd.Series, termos: tuple[str, ...]) -> pd.Series:
-    if not termos:
-        return pd.Series([True] * len(series), index=series.index)
-    mask = pd.Series([False] * len(series), index=series.index)
-    for t in termos:
-        mask = mask | series.str.contains(re.escape(_norm(t)), na=False)
-    return mask
-
-
-def _mask_excludes(series: pd.Series, termos: tuple[str, ...]) -> pd.Series:
-    if not termos:
-        return pd.Series([True] * len(series), index=series.index)
-    mask = pd.Series([True] * len(series), index=series.index)
-    for t in termos:
-        mask = mask & ~series.str.contains(re.escape(_norm(t)), na=False)
-    return mask
-
-
-def aplicar_regra_old(df_old_long: pd.DataFrame, regra: RegraCategoria) -> pd.Series:
-    # Evita dupla contagem: não considerar a linha "Total" do grupo.
-    mask_not_total = df_old_long["conta_raw"].map(_norm) != "total"
-
-    mask_group = _mask_contains(df_old_long["grupo_norm"], regra.old_group_contains)
-    mask_conta = _mask_contains(df_old_long["conta_desc_norm"], regra.old_conta_contains)
-    mask_excl = _mask_excludes(df_old_long["conta_desc_norm"], regra.old_conta_exclude_contains)
-
-    return mask_not_total & mask_group & mask_conta & mask_excl
-
-
-def aplicar_regra_new(df_new: pd.DataFrame, regra: RegraCategoria) -> pd.Series:
-    mask = pd.Series([True] * len(df_new), index=df_new.index)
-
-    if regra.new_code_prefixes:
-        mask_prefix = pd.Series([False] * len(df_new), index=df_new.index)
-        for pref in regra.new_code_prefixes:
-            pref = str(pref).strip()
-            if not pref:
-                continue
-            mask_prefix = mask_prefix | df_new["codigo"].astype(str).str.startswith(pref)
-        mask = mask & mask_prefix
-
-    if regra.new_codes:
-        mask_codes = pd.Series([False] * len(df_new), index=df_new.index)
-        for code in regra.new_codes:
-            code = str(code).strip()
-            mask_codes = mask_codes | (df_new["codigo"] == code)
-        mask = mask & mask_codes
-
-    if regra.new_desc_contains:
-        mask = mask & _mask_contains(df_new["desc_norm"], regra.new_desc_contains)
+def fatos_comparativo(
+    av: AvaliacaoRegras,
+    n_categorias: int,
+    df_old_long: pd.DataFrame,
+    df_novo: pd.DataFrame,
+    df_plano_long: pd.DataFrame,
+) -> pd.DataFrame:
+    """
+    Fatos (nivel, entidade, mes, gasto) dos dois layouts para o cubo comparativo:
+    - categoria: regras de categoria — DRE antigo pela regra, plano novo pelas linhas que a regra seleciona
+    - codigo: bases por código (DRE antigo, `REGRAS_BASE_POR_CODIGO`) e linhas folha do plano novo
+    - pool: bases dos pools rateados (DRE antigo, `REGRAS_POOL`)
+    """
+    entidades = (
+        [("categoria", r.categoria) for r in av.regras[:n_categorias]]
+        + [("codigo", cod) for cod, _ in REGRAS_BASE_POR_CODIGO]
+        + [("pool", r.categoria) for _, r in REGRAS_POOL]
+    )
+    nivel = np.array([e[0] for e in entidades], dtype=object)
+    entidade = np.array([e[1] for e in entidades], dtype=object)
+
+    antigo = pd.DataFrame(
+        {
+            "nivel": nivel[av.old.regras],
+            "entidade": entidade[av.old.regras],
+            "mes": df_old_long["mes"].to_numpy()[av.old.linhas],
+            "gasto": df_old_long["gasto"].to_numpy()[av.old.linhas],
+        }
+    )
 
-    if regra.new_desc_exclude_contains:
-        mask = mask & _mask_excludes(df_new["desc_norm"], regra.new_desc_exclude_contains)
+    # Plano novo por categoria: posição em df_novo -> linha da planilha -> gasto de cada mês
+    cat = av.new.regras < n_categorias
+    pares = pd.DataFrame({"regra": av.new.regras[cat], "linha": df_novo.index.to_numpy()[av.new.linhas[cat]]})
+    pares = pares.merge(df_plano_long[["linha", "mes", "gasto"]], on="linha", how="inner")
+    novo_cat = pd.DataFrame(
+        {"nivel": "categoria", "entidade": entidade[pares["regra"].to_numpy()], "mes": pares["mes"], "gasto": pares["gasto"]}
+    )
 
-    return mask
+    folhas = df_plano_long[df_plano_long["linha"].isin(df_novo.index)]
+    novo_cod = pd.DataFrame({"nivel": "codigo", "entidade": folhas["codigo"], "mes": folhas["mes"], "gasto": folhas["gasto"]})
+    return pd.concat([antigo, novo_cat, novo_cod], ignore_index=True)
 
 
-def sumarizar_categoria(
-    df_old_long: pd.DataFrame,
-    df_new: pd.DataFrame,
-    regra: RegraCategoria,
-) -> dict[str, object]:
-    mask_old = aplicar_regra_old(df_old_long, regra)
-    mask_new = aplicar_regra_new(df_new, regra)
-
-    # Antigo: total por mês e média anual
-    old_mes = (
-        df_old_long.loc[mask_old, ["mes", "gasto"]]
-        .groupby("mes", as_index=False)["gasto"]
-        .sum()
-        .set_index("mes")["gasto"]
-    )
-    base_jul = float(old_mes.get(MES_JUL, 0.0))
-    base_avg = float(old_mes.reindex(MESES_MEDIA_ANUAL, fill_value=0.0).mean())
+def _cubo_em(cubo: pd.DataFrame, nivel: str, mes_alvo: int, janela: str) -> pd.DataFrame:
+    """Fatia (entidade -> base, valor_alvo) do cubo para um nível, mês-alvo e janela."""
+    m = (cubo["nivel"] == nivel) & (cubo["mes_alvo"] == mes_alvo) & (cubo["janela"] == janela)
+    return cubo.loc[m].set_index("entidade")
 
-    # Novo: Novembro
-    nov = float(df_new.loc[mask_new, "gasto_nov"].sum())
 
+def sumarizar_categoria(regra: RegraCategoria, base_jul: float, base_avg: float, nov: float) -> dict[str, object]:
+    """Linha do consolidado por categoria (bases e Novembro já tirados do cubo comparativo)."""
     # Reduções (positivo = reduziu custo)
     red_vs_jul = base_jul - nov
     red_vs_avg = base_avg - nov
@@ -346,6 +379,42 @@ def sumarizar_categoria(
     }
 
 
+def ratear_pools_no_cubo(cubo: pd.DataFrame, rateio: MatrizRateio) -> pd.DataFrame:
+    """Base dos códigos dos pools = Σ base do pool × peso do código, em todos os meses-alvo e janelas de uma vez."""
+    janelas = list(dict.fromkeys(cubo["janela"]))
+    pools = cubo[cubo["nivel"] == "pool"]
+    bases_pool = pools.pivot(index="entidade", columns=["mes_alvo", "janela"], values="base").reindex(
+        index=rateio.pools, columns=pd.MultiIndex.from_product([rateio.meses_alvo, janelas])
+    )
+    alocado = rateio.ratear(bases_pool.to_numpy(dtype=np.float64).reshape(len(rateio.pools), len(rateio.meses_alvo), len(janelas)))
+    n_cod, n_mes = len(rateio.codigos), len(rateio.meses_alvo)
+    aloc = pd.DataFrame(
+        {
+            "entidade": np.repeat(np.array(rateio.codigos, dtype=object), n_mes * len(janelas)),
+            "mes_alvo": np.tile(np.repeat(rateio.meses_alvo, len(janelas)), n_cod),
+            "janela": np.tile(np.array(janelas, dtype=object), n_cod * n_mes),
+            "base": alocado.reshape(-1),
+        }
+    )
+    # meses da base só dependem do mês-alvo e da janela
+    aloc = aloc.merge(pools.drop_duplicates(["mes_alvo", "janela"])[["mes_alvo", "janela", "meses_base"]], on=["mes_alvo", "janela"])
+
+    chave = ["entidade", "mes_alvo", "janela"]
+    cod = cubo[cubo["nivel"] == "codigo"].reset_index().merge(aloc, on=chave, suffixes=("", "_pool"))
+    out = cubo.copy()
+    idx = cod["index"].to_numpy()
+    out.loc[idx, "base"] = cod["base_pool"].to_numpy()
+    out.loc[idx, "meses_base"] = cod["meses_base_pool"].to_numpy()
+    out.loc[idx, "diferenca"] = out.loc[idx, "base"] - out.loc[idx, "valor_alvo"]
+    base = out.loc[idx, "base"]
+    out.loc[idx, "pct"] = (out.loc[idx, "diferenca"] / base).where(base.abs() > 1e-9)
+    return out
+
+
+def _rotulo_mes(mes: int) -> str:
+    return f"{mes % 100:02d}/{mes // 100}"
+
+
 def fmt_brl(v: float) -> str:
     return f"R$ {v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
@@ -377,13 +446,33 @@ def _md_table(df: pd.DataFrame, cols: list[str]) -> str:
 
 
 def main() -> None:
-    df_antigo = carregar_dre_antigo()
-    df_old_long = dre_antigo_long(df_antigo)
-
-    df_novo = carregar_plano_novo()
-    df_plano_full = carregar_plano_novo_completo()
-    df_plano_leaf = df_plano_full[~df_plano_full["codigo"].isin(CODIGOS_AGREGADORES_NOVO_PLANO)].copy()
-    desc_categorias = _descricao_categoria_por_codigo(df_plano_full)
+    parser = argparse.ArgumentParser(description="Redução de custos recorrentes: média anual (DRE antigo) vs Novembro (plano novo)")
+    parser.add_argument(
+        "--sem-cache",
+        action="store_true",
+        help=f"Não usa o cache das planilhas ({CACHE_PLANILHAS_DIR})",
+    )
+    parser.add_argument(
+        "--bases-externas",
+        choices=FORMATOS_EXTERNOS,
+        default=None,
+        help=f"Grava as abas {', '.join(ABAS_PESADAS)} em arquivos ao lado do Excel (a aba fica com a referência)",
+    )
+    adicionar_argumentos(parser, BASE_DIR.parent / "apresentacao-investimentos" / "benchmarks" / "perfil_reducao_custos.json")
+    args = parser.parse_args()
+    perfil = perfil_dos_argumentos(args)
+    cache = None if args.sem_cache else CachePlanilhas()
+
+    with perfil.etapa("leitura_excel") as et:
+        df_antigo = carregar_dre_antigo(cache)
+        df_old_long = dre_antigo_long(df_antigo)
+
+        df_novo = carregar_plano_novo(cache)
+        df_plano_full = carregar_plano_novo_completo(cache)
+        df_plano_long = plano_novo_long(cache)
+        df_plano_leaf = df_plano_full[~df_plano_full["codigo"].isin(CODIGOS_AGREGADORES_NOVO_PLANO)].copy()
+        desc_categorias = _descricao_categoria_por_codigo(df_plano_full)
+        et.linhas = len(df_antigo) + len(df_plano_full)
 
     # Regras (mapeamento) — ajuste conforme necessidade.
     regras: list[RegraCategoria] = [
@@ -476,11 +565,51 @@ def main() -> None:
         ),
     ]
 
-    linhas = [sumarizar_categoria(df_old_long, df_novo, r) for r in regras]
-    df_out = pd.DataFrame(linhas)
-
-    # Ordena por maior redução vs média (mais positivo primeiro)
-    df_out = df_out.sort_values("reducao_vs_media", ascending=False)
+    with perfil.etapa("regras_categoria", len(df_old_long) + len(df_novo)):
+        # Regras de categoria, bases por código e pools numa única avaliação (um groupby por regra × mês)
+        regras_base = [r for _, r in REGRAS_BASE_POR_CODIGO]
+        regras_pool = [r for _, r in REGRAS_POOL]
+        av = MotorRegras(df_old_long, df_novo).avaliar(regras + regras_base + regras_pool)
+
+    with perfil.etapa("cubo_comparativo") as et:
+        # Todos os meses do plano novo × JANELAS_BASE, para categorias, códigos e pools, num único pivot
+        fatos = fatos_comparativo(av, len(regras), df_old_long, df_novo, df_plano_long)
+        matriz = matriz_mensal(fatos, ["nivel", "entidade"])
+        codigos_base = {cod for cod, _ in REGRAS_BASE_POR_CODIGO}
+        nivel_idx = matriz.index.get_level_values("nivel")
+        com_base = pd.Series(
+            (nivel_idx != "codigo") | matriz.index.get_level_values("entidade").isin(codigos_base),
+            index=matriz.index,
+        )
+        meses_alvo = sorted(int(m) for m in df_plano_long["mes"].unique())
+        # bases só com meses do DRE antigo; pools não têm fatos no plano novo (sem valor no alvo)
+        meses_base = sorted(int(m) for m in df_old_long["mes"].unique())
+        com_alvo = pd.Series(nivel_idx != "pool", index=matriz.index)
+        cubo = cubo_comparativo(matriz, meses_alvo, list(JANELAS_BASE), com_base, meses_base, com_alvo)
+        et.linhas = len(fatos)
+
+        cat_jul = _cubo_em(cubo, "categoria", MES_ALVO, "julho")
+        cat_avg = _cubo_em(cubo, "categoria", MES_ALVO, "media_anual")
+        linhas = [
+            sumarizar_categoria(
+                r,
+                float(cat_jul["base"].get(r.categoria, 0.0)),
+                float(cat_avg["base"].get(r.categoria, 0.0)),
+                float(cat_avg["valor_alvo"].get(r.categoria, 0.0)),
+            )
+            for r in regras
+        ]
+        df_out = pd.DataFrame(linhas)
+
+        # Ordena por maior redução vs média (mais positivo primeiro)
+        df_out = df_out.sort_values("reducao_vs_media", ascending=False)
+
+    with perfil.etapa("rateio_pools") as et:
+        # Pesos de todos os pools × meses-alvo numa matriz esparsa; as bases dos pools vão para os códigos num único produto
+        gasto_codigo = matriz.xs("codigo", level="nivel")
+        rateio = montar_matriz_rateio({r.categoria: pool for pool, r in REGRAS_POOL}, gasto_codigo, meses_alvo)
+        cubo = ratear_pools_no_cubo(cubo, rateio)
+        et.linhas = len(rateio.peso)
 
     print("\n" + "=" * 88)
     print("ANÁLISE DE REDUÇÃO DE CUSTOS RECORRENTES (Média anual vs Novembro)")
@@ -535,170 +664,95 @@ def main() -> None:
     # ---------------------------------------------------------------------
 
     # Códigos de interesse para custos recorrentes + contexto (não recorrente)
-    prefixos_interesse = ("1.3.", "1.4.", "1.5.", "2.2.")
-    df_plano_focus = df_plano_leaf[
-        df_plano_leaf["codigo"].astype(str).str.startswith(prefixos_interesse)
-    ].copy()
-
-    # Mapeamento DRE antigo -> CÓDIGOS do plano novo (por regra)
-    # OBS: quando não houver histórico equivalente no DRE antigo, a base será assumida 0 (conservador) e marcada na observação.
-    base_por_codigo: dict[str, tuple[float | None, float | None, str]] = {}
-
-    # FUNCIONÁRIOS (itens que conseguimos mapear no DRE antigo por descrição)
-    base_por_codigo["1.3.01"] = (*calcular_base_old(df_old_long, old_group_contains=("pessoal",), old_conta_contains=("fgts",)), "DRE antigo: PESSOAL / FGTS")
-    # Salários no DRE antigo também carrega adicionais que o plano novo não separa em linha própria (insalubridade etc).
-    base_por_codigo["1.3.03"] = (
-        *calcular_base_old(
-            df_old_long,
-            old_group_contains=("pessoal",),
-            old_conta_contains=("salarios", "horas extras", "adicional noturno", "adicional insalubridade"),
-        ),
-        "DRE antigo: PESSOAL / Salários + adicionais",
-    )
-    base_por_codigo["1.3.09"] = (*calcular_base_old(df_old_long, old_group_contains=("pessoal",), old_conta_contains=("13",)), "DRE antigo: PESSOAL / 13º Salário")
-    base_por_codigo["1.3.02"] = (*calcular_base_old(df_old_long, old_group_contains=("pessoal",), old_conta_contains=("inss",)), "DRE antigo: PESSOAL / INSS (inclui Lei 12.546/2011)")
-    base_por_codigo["1.3.15"] = (*calcular_base_old(df_old_long, old_group_contains=("pessoal",), old_conta_contains=("ferias",)), "DRE antigo: PESSOAL / Férias")
-    base_por_codigo["1.3.17"] = (*calcular_base_old(df_old_long, old_group_contains=("pessoal",), old_conta_contains=("pro-labore", "pro labore")), "DRE antigo: PESSOAL / Pró-Labore")
-    base_por_codigo["1.3.10"] = (*calcular_base_old(df_old_long, old_group_contains=("pessoal",), old_conta_contains=("vale transporte",)), "DRE antigo: PESSOAL / Vale Transporte")
-    base_por_codigo["1.3.13"] = (*calcular_base_old(df_old_long, old_group_contains=("pessoal",), old_conta_contains=("pat",)), "DRE antigo: PESSOAL / PAT (alimentação)")
-    base_por_codigo["1.3.19"] = (*calcular_base_old(df_old_long, old_group_contains=("pessoal",), old_conta_contains=("assistencia medica",)), "DRE antigo: PESSOAL / Assistência Médica e Social")
-    base_por_codigo["1.3.14"] = (*calcular_base_old(df_old_long, old_group_contains=("comiss",), old_conta_contains=("comiss",)), "DRE antigo: COMISSÕES")
-
-    # DESPESAS / UTILIDADES
-    base_por_codigo["1.4.10"] = (*calcular_base_old(df_old_long, old_conta_contains=("alugu",)), "DRE antigo: Aluguéis e Condomínios")
-    base_por_codigo["1.4.12"] = (*calcular_base_old(df_old_long, old_conta_contains=("telefone",)), "DRE antigo: Telefone")
-    base_por_codigo["1.4.13"] = (*calcular_base_old(df_old_long, old_conta_contains=("agua",)), "DRE antigo: Água")
-    base_por_codigo["1.4.14"] = (*calcular_base_old(df_old_long, old_conta_contains=("energia eletrica",)), "DRE antigo: Energia Elétrica")
-    base_por_codigo["1.4.06"] = (*calcular_base_old(df_old_long, old_conta_contains=("seguranca",)), "DRE antigo: Segurança")
-
-    # Despesas administrativas (bucket aproximado)
-    base_por_codigo["1.4.11"] = (
-        *calcular_base_old(
-            df_old_long,
-            old_group_contains=("utilizadades e servicos", "material de consumo", "despesas indedutiveis"),
-            old_conta_exclude_contains=("manuten", "repar", "segur", "indeniza"),
-        ),
-        "DRE antigo: Utilidades/Material de consumo/Indedutíveis (sem indenizações)",
-    )
-
-    # Viagens e fretes (DRE antigo tem conta 'Fretes e Combustíveis' e 'Viagens e Estadias')
-    base_por_codigo["1.4.03"] = (*calcular_base_old(df_old_long, old_conta_contains=("fretes e combustiveis",)), "DRE antigo: Fretes e Combustíveis")
-    base_por_codigo["1.4.18"] = (*calcular_base_old(df_old_long, old_conta_contains=("viagens e estadias",)), "DRE antigo: Viagens e Estadias")
-
-    # Consultoria/Jurídico/Contabilidade (no DRE antigo está no grupo CONSULTORIAS...)
-    base_por_codigo["1.4.22"] = (*calcular_base_old(df_old_long, old_group_contains=("consultorias",)), "DRE antigo: Consultorias/Auditorias/Honorários")
-
-    # Pool: seguros (no novo plano aparece em 1.3.05 e 1.4.15; no DRE antigo está consolidado em SEGUROS OPERACIONAL)
-    seguros_codes = ["1.3.05", "1.4.15"]
-    seg_jul, seg_avg = calcular_base_old(df_old_long, old_group_contains=("seguros",))
-    seg_nov_total = float(df_plano_focus[df_plano_focus["codigo"].isin(seguros_codes)]["gasto_nov"].sum())
-    if seg_nov_total <= 0:
-        pesos = {c: 1 / len(seguros_codes) for c in seguros_codes}
-    else:
-        pesos = {
-            c: float(df_plano_focus.loc[df_plano_focus["codigo"] == c, "gasto_nov"].sum()) / seg_nov_total
-            for c in seguros_codes
+    with perfil.etapa("comparativo_plano") as et:
+        prefixos_interesse = ("1.3.", "1.4.", "1.5.", "2.2.")
+        df_plano_focus = df_plano_leaf[
+            df_plano_leaf["codigo"].astype(str).str.startswith(prefixos_interesse)
+        ].copy()
+
+        # Mapeamento DRE antigo -> CÓDIGOS do plano novo (regras em REGRAS_BASE_POR_CODIGO / REGRAS_POOL)
+        obs_por_codigo = {cod: regra.categoria for cod, regra in REGRAS_BASE_POR_CODIGO}
+        obs_por_codigo.update({c: regra.categoria for pool, regra in REGRAS_POOL for c in pool.codigos})
+        cod_jul = _cubo_em(cubo, "codigo", MES_ALVO, "julho")["base"]
+        cod_avg = _cubo_em(cubo, "codigo", MES_ALVO, "media_anual")["base"]
+        base_por_codigo: dict[str, tuple[float | None, float | None, str]] = {}
+        for cod, obs in obs_por_codigo.items():
+            if cod in cod_avg.index:
+                base_por_codigo[cod] = (float(cod_jul[cod]), float(cod_avg[cod]), obs)
+            else:
+                # código mapeado sem linha no plano novo: base sem o valor do mês (não aparece no detalhamento)
+                base_por_codigo[cod] = (None, None, obs)
+
+        # Tipos (recorrente vs não recorrente) — usado para totais e para leitura
+        tipo_nao_rec = {
+            "1.3.01.1",  # FGTS Rescisão
+            "1.3.03.1",  # Salários Rescisão
+            "1.3.09",    # 13º
+            "1.3.18",    # Ações trabalhistas
         }
-    for c in seguros_codes:
-        base_por_codigo[c] = (seg_jul * pesos[c], seg_avg * pesos[c], "DRE antigo: Seguros (rateio por peso em Nov/2025)")
-
-    # Pool: financeiro (1.4.02 + (opcional) 2.2.02/2.2.03)
-    fin_codes = ["1.4.02", "2.2.02", "2.2.03"]
-    fin_jul, fin_avg = calcular_base_old(df_old_long, old_group_contains=("juros s/financiamentos", "gestao financeira passiva"))
-    fin_nov_total = float(df_plano_focus[df_plano_focus["codigo"].isin(fin_codes)]["gasto_nov"].sum())
-    if fin_nov_total <= 0:
-        pesos = {c: 1 / len(fin_codes) for c in fin_codes}
-    else:
-        pesos = {
-            c: float(df_plano_focus.loc[df_plano_focus["codigo"] == c, "gasto_nov"].sum()) / fin_nov_total
-            for c in fin_codes
+        tipo_fora_escopo = {
+            "2.2.01",  # Empréstimos/Parcelas (amortização de principal) — não é despesa recorrente
         }
-    for c in fin_codes:
-        base_por_codigo[c] = (fin_jul * pesos[c], fin_avg * pesos[c], "DRE antigo: Financeiro (rateio por peso em Nov/2025)")
-
-    # Pool: manutenções (novo plano 1.5.01/1.5.02/1.5.03; DRE antigo tem 'Manutenção e Reparos' em mais de um grupo)
-    man_codes = ["1.5.01", "1.5.02", "1.5.03"]
-    man_jul, man_avg = calcular_base_old(df_old_long, old_conta_contains=("manuten", "repar"))
-    man_nov_total = float(df_plano_focus[df_plano_focus["codigo"].isin(man_codes)]["gasto_nov"].sum())
-    if man_nov_total <= 0:
-        pesos = {c: 1 / len(man_codes) for c in man_codes}
-    else:
-        pesos = {
-            c: float(df_plano_focus.loc[df_plano_focus["codigo"] == c, "gasto_nov"].sum()) / man_nov_total
-            for c in man_codes
-        }
-    for c in man_codes:
-        base_por_codigo[c] = (man_jul * pesos[c], man_avg * pesos[c], "DRE antigo: Manutenções (rateio por peso em Nov/2025)")
-
-    # Tipos (recorrente vs não recorrente) — usado para totais e para leitura
-    tipo_nao_rec = {
-        "1.3.01.1",  # FGTS Rescisão
-        "1.3.03.1",  # Salários Rescisão
-        "1.3.09",    # 13º
-        "1.3.18",    # Ações trabalhistas
-    }
-    tipo_fora_escopo = {
-        "2.2.01",  # Empréstimos/Parcelas (amortização de principal) — não é despesa recorrente
-    }
 
-    # Mantém no detalhamento: linhas com valor em Novembro OU com base mapeada (para mostrar redução)
-    codigos_mapeados = set(base_por_codigo.keys())
-    df_plano_focus["_tem_base"] = df_plano_focus["codigo"].isin(codigos_mapeados)
-    df_plano_focus = df_plano_focus[(df_plano_focus["gasto_nov"].abs() > 0) | (df_plano_focus["_tem_base"])].copy()
-    df_plano_focus = df_plano_focus.drop(columns=["_tem_base"])
-
-    # Calcula colunas de comparação
-    def _get_base(cod: str) -> tuple[float | None, float | None, str]:
-        return base_por_codigo.get(str(cod).strip(), (None, None, "Sem mapeamento no DRE antigo"))
-
-    bases = df_plano_focus["codigo"].map(_get_base)
-    df_plano_focus["base_julho"] = [b[0] for b in bases]
-    df_plano_focus["base_media_fev_jul"] = [b[1] for b in bases]
-    df_plano_focus["base_obs"] = [b[2] for b in bases]
-    def _tipo_item(c: object) -> str:
-        c = str(c).strip()
-        if c in tipo_fora_escopo:
-            return "Fora do escopo"
-        if c in tipo_nao_rec:
-            return "Não recorrente"
-        return "Recorrente"
-
-    df_plano_focus["tipo"] = df_plano_focus["codigo"].apply(_tipo_item)
-
-    # Normaliza bases para float (None -> NaN)
-    df_plano_focus["base_julho"] = pd.to_numeric(df_plano_focus["base_julho"], errors="coerce")
-    df_plano_focus["base_media_fev_jul"] = pd.to_numeric(df_plano_focus["base_media_fev_jul"], errors="coerce")
-
-    df_plano_focus["reducao_vs_julho"] = df_plano_focus["base_julho"] - df_plano_focus["gasto_nov"]
-    df_plano_focus["reducao_vs_media"] = df_plano_focus["base_media_fev_jul"] - df_plano_focus["gasto_nov"]
-    df_plano_focus["pct_vs_media"] = df_plano_focus.apply(
-        lambda r: (r["reducao_vs_media"] / r["base_media_fev_jul"])
-        if (r["base_media_fev_jul"] is not None and abs(r["base_media_fev_jul"]) > 1e-9 and r["reducao_vs_media"] is not None)
-        else None,
-        axis=1,
-    )
+        # Mantém no detalhamento: linhas com valor em Novembro OU com base mapeada (para mostrar redução)
+        codigos_mapeados = set(base_por_codigo.keys())
+        df_plano_focus["_tem_base"] = df_plano_focus["codigo"].isin(codigos_mapeados)
+        df_plano_focus = df_plano_focus[(df_plano_focus["gasto_nov"].abs() > 0) | (df_plano_focus["_tem_base"])].copy()
+        df_plano_focus = df_plano_focus.drop(columns=["_tem_base"])
+
+        # Calcula colunas de comparação
+        def _get_base(cod: str) -> tuple[float | None, float | None, str]:
+            return base_por_codigo.get(str(cod).strip(), (None, None, "Sem mapeamento no DRE antigo"))
+
+        bases = df_plano_focus["codigo"].map(_get_base)
+        df_plano_focus["base_julho"] = [b[0] for b in bases]
+        df_plano_focus["base_media_fev_jul"] = [b[1] for b in bases]
+        df_plano_focus["base_obs"] = [b[2] for b in bases]
+        def _tipo_item(c: object) -> str:
+            c = str(c).strip()
+            if c in tipo_fora_escopo:
+                return "Fora do escopo"
+            if c in tipo_nao_rec:
+                return "Não recorrente"
+            return "Recorrente"
+
+        df_plano_focus["tipo"] = df_plano_focus["codigo"].apply(_tipo_item)
+
+        # Normaliza bases para float (None -> NaN)
+        df_plano_focus["base_julho"] = pd.to_numeric(df_plano_focus["base_julho"], errors="coerce")
+        df_plano_focus["base_media_fev_jul"] = pd.to_numeric(df_plano_focus["base_media_fev_jul"], errors="coerce")
+
+        df_plano_focus["reducao_vs_julho"] = df_plano_focus["base_julho"] - df_plano_focus["gasto_nov"]
+        df_plano_focus["reducao_vs_media"] = df_plano_focus["base_media_fev_jul"] - df_plano_focus["gasto_nov"]
+        df_plano_focus["pct_vs_media"] = df_plano_focus.apply(
+            lambda r: (r["reducao_vs_media"] / r["base_media_fev_jul"])
+            if (r["base_media_fev_jul"] is not None and abs(r["base_media_fev_jul"]) > 1e-9 and r["reducao_vs_media"] is not None)
+            else None,
+            axis=1,
+        )
 
-    # Ordenação por código (string mesmo já fica bem legível nesse plano)
-    df_plano_focus = df_plano_focus.sort_values("codigo")
-
-    # Resumo por categoria (2 níveis) — NO FINAL do relatório
-    # Importante: compara apenas itens com base mapeada, para manter "média anual vs novembro" consistente.
-    df_rec = df_plano_focus[
-        (df_plano_focus["tipo"] == "Recorrente") & (df_plano_focus["base_media_fev_jul"].notna())
-    ].copy()
-    df_rec["cat2"] = df_rec["codigo"].map(_codigo_nivel2)
-    resumo = df_rec.groupby("cat2", as_index=False).agg(
-        base_julho=("base_julho", "sum"),
-        base_media_fev_jul=("base_media_fev_jul", "sum"),
-        novembro=("gasto_nov", "sum"),
-    )
-    resumo["reducao_vs_media"] = resumo["base_media_fev_jul"] - resumo["novembro"]
-    resumo["pct_vs_media"] = resumo.apply(
-        lambda r: (r["reducao_vs_media"] / r["base_media_fev_jul"]) if abs(r["base_media_fev_jul"]) > 1e-9 else None,
-        axis=1,
-    )
-    resumo["categoria"] = resumo["cat2"].apply(lambda c: desc_categorias.get(c, c))
-    resumo = resumo.sort_values("cat2")
+        # Ordenação por código (string mesmo já fica bem legível nesse plano)
+        df_plano_focus = df_plano_focus.sort_values("codigo")
+
+        # Resumo por categoria (2 níveis) — NO FINAL do relatório
+        # Importante: compara apenas itens com base mapeada, para manter "média anual vs novembro" consistente.
+        df_rec = df_plano_focus[
+            (df_plano_focus["tipo"] == "Recorrente") & (df_plano_focus["base_media_fev_jul"].notna())
+        ].copy()
+        df_rec["cat2"] = df_rec["codigo"].map(_codigo_nivel2)
+        resumo = df_rec.groupby("cat2", as_index=False).agg(
+            base_julho=("base_julho", "sum"),
+            base_media_fev_jul=("base_media_fev_jul", "sum"),
+            novembro=("gasto_nov", "sum"),
+        )
+        resumo["reducao_vs_media"] = resumo["base_media_fev_jul"] - resumo["novembro"]
+        resumo["pct_vs_media"] = resumo.apply(
+            lambda r: (r["reducao_vs_media"] / r["base_media_fev_jul"]) if abs(r["base_media_fev_jul"]) > 1e-9 else None,
+            axis=1,
+        )
+        resumo["categoria"] = resumo["cat2"].apply(lambda c: desc_categorias.get(c, c))
+        resumo = resumo.sort_values("cat2")
+        et.linhas = len(df_plano_focus)
 
     # ---------------------------------------------------------------------
     # Exporta Excel final (inclui o comparativo no formato do plano de contas)
@@ -706,127 +760,170 @@ def main() -> None:
     out_xlsx = BASE_DIR / "SAIDA_ANALISE_REDUCAO_CUSTOS_RECORRENTES.xlsx"
     df_map = pd.DataFrame([r.__dict__ for r in regras])
 
-    def _exportar_excel(path: Path) -> None:
-        with pd.ExcelWriter(path, engine="openpyxl") as writer:
-            df_antigo.to_excel(writer, sheet_name="dre_antigo_base", index=False)
-            df_old_long.to_excel(writer, sheet_name="dre_antigo_long", index=False)
-
-            df_plano_full.to_excel(writer, sheet_name="plano_novo_full", index=False)
-            df_novo.to_excel(writer, sheet_name="plano_novo_nov", index=False)
-
-            df_out.to_excel(writer, sheet_name="comparativo", index=False)
-            df_plano_focus.to_excel(writer, sheet_name="comparativo_plano", index=False)
-            resumo.to_excel(writer, sheet_name="resumo_plano", index=False)
-
-            df_map.to_excel(writer, sheet_name="mapeamento_regras", index=False)
-
-    try:
-        _exportar_excel(out_xlsx)
-        print(f"\nArquivo gerado: {out_xlsx}")
-    except PermissionError:
-        # Geralmente acontece quando o arquivo está aberto no Excel.
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        out_xlsx_alt = BASE_DIR / f"SAIDA_ANALISE_REDUCAO_CUSTOS_RECORRENTES_{ts}.xlsx"
-        _exportar_excel(out_xlsx_alt)
-        print(f"\nArquivo gerado (alternativo, arquivo original estava aberto): {out_xlsx_alt}")
-
-    md_lines: list[str] = []
-    md_lines.append("### Análise de redução de custos recorrentes — Novembro/2025")
-    md_lines.append("")
-    md_lines.append("#### Objetivo")
-    md_lines.append(
-        "Comparar os **planos de contas** em **Novembro/2025** contra a **média anual** (base histórica do DRE antigo)."
-    )
-    md_lines.append(f"- **{ROTULO_MEDIA_ANUAL}** vs **Novembro/2025**")
-    md_lines.append("")
-    md_lines.append("#### Dados utilizados")
-    md_lines.append(f"- **DRE antigo**: `{ARQ_ANTIGO.name}` (aba `{ABA_ANTIGO}`)")
-    md_lines.append(f"- **Novo plano**: `{ARQ_NOVO.name}` (aba `{ABA_NOVO}`)")
-    md_lines.append(f"- **Média anual**: média mensal calculada com base em {MESES_MEDIA_ANUAL} (meses disponíveis no DRE antigo).")
-    md_lines.append("- **Gap**: não há dados de **Outubro/2025** no conjunto recebido.")
-    md_lines.append("")
-    md_lines.append("#### Metodologia (Python)")
-    md_lines.append(
-        "- **Sinal**: despesas vêm negativas nas planilhas; convertemos para **gasto positivo** (gasto = -valor)."
-    )
-    md_lines.append(
-        "- **Mapeamento**: categorias do DRE antigo foram alinhadas ao novo plano via regras por **grupo/conta** e **código**."
-    )
-    md_lines.append(
-        "- **Recorrência (pessoal)**: separamos **não recorrentes** (13º, rescisões/indenizações, ações trabalhistas) para não distorcer o indicador."
-    )
-    md_lines.append("")
-    # Consolidado do plano (somente recorrente; apenas itens com base mapeada)
-    total_media_anual = float(df_rec["base_media_fev_jul"].sum())
-    total_nov_mapeado = float(df_rec["gasto_nov"].sum())
-    total_diff = total_media_anual - total_nov_mapeado
-    pct_total = None if abs(total_media_anual) < 1e-9 else total_diff / total_media_anual
-
-    md_lines.append("#### Resultado consolidado (plano de contas; recorrente; itens com base mapeada)")
-    md_lines.append(f"- **{ROTULO_MEDIA_ANUAL}**: {fmt_brl(total_media_anual)}")
-    md_lines.append(f"- **Novembro/2025**: {fmt_brl(total_nov_mapeado)}")
-    md_lines.append(f"- **Diferença (Média − Novembro)**: {fmt_brl(total_diff)} ({fmt_pct(pct_total)})")
-    md_lines.append("")
-    md_lines.append("#### Detalhamento no formato do plano de contas (Nov/Dez) — contas analisadas")
-    md_lines.append(
-        "Tabela organizada pelos **códigos/descrições** do plano de contas (Nov/Dez), com base histórica do DRE antigo quando há mapeamento."
-    )
-    md_lines.append("")
-
-    df_det = df_plano_focus.copy()
-    df_det[ROTULO_MEDIA_ANUAL] = df_det["base_media_fev_jul"].map(fmt_brl_opt)
-    df_det["Novembro"] = df_det["gasto_nov"].map(fmt_brl)
-    df_det["Diferença (Média − Novembro)"] = df_det["reducao_vs_media"].map(fmt_brl_opt)
-    df_det["% vs Média"] = df_det["pct_vs_media"].map(fmt_pct)
-
-    cols_det = ["codigo", "desc", "tipo", ROTULO_MEDIA_ANUAL, "Novembro", "Diferença (Média − Novembro)", "% vs Média"]
-    md_lines.append(_md_table(df_det[cols_det], cols_det))
-    md_lines.append("")
-
-    # Contexto não recorrente (filtrado do detalhamento)
-    df_det_nao = df_det[df_det["tipo"] == "Não recorrente"].copy()
-    if not df_det_nao.empty:
-        md_lines.append("#### Itens não recorrentes (contexto)")
+    abas_excel = [
+        ("dre_antigo_base", df_antigo),
+        ("dre_antigo_long", df_old_long),
+        ("plano_novo_full", df_plano_full),
+        ("plano_novo_nov", df_novo),
+        ("comparativo", df_out),
+        ("comparativo_plano", df_plano_focus),
+        ("resumo_plano", resumo),
+        ("mapeamento_regras", df_map),
+        ("cubo_comparativo", cubo),
+        ("rateio_pools", rateio.tabela()),
+    ]
+
+    with perfil.etapa("exportar_excel") as et:
+        # renderiza uma vez; a nova tentativa só muda o nome do arquivo publicado
+        exportacao = renderizar_planilhas(
+            abas_excel,
+            BASE_DIR,
+            ConfigExportacao(formato_externo=args.bases_externas),
+            nome_base=out_xlsx.stem,
+        )
+        et.linhas = exportacao.linhas
+        try:
+            try:
+                gerados = exportacao.publicar(out_xlsx)
+                print(f"\nArquivo gerado: {out_xlsx}")
+            except PermissionError:
+                # Geralmente acontece quando o arquivo está aberto no Excel.
+                ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+                out_xlsx_alt = BASE_DIR / f"SAIDA_ANALISE_REDUCAO_CUSTOS_RECORRENTES_{ts}.xlsx"
+                gerados = exportacao.publicar(out_xlsx_alt)
+                print(f"\nArquivo gerado (alternativo, arquivo original estava aberto): {out_xlsx_alt}")
+            for extra in gerados[1:]:
+                print(f"Arquivo gerado: {extra}")
+        finally:
+            exportacao.descartar()
+
+    with perfil.etapa("relatorio_md") as et:
+        md_lines: list[str] = []
+        md_lines.append("### Análise de redução de custos recorrentes — Novembro/2025")
+        md_lines.append("")
+        md_lines.append("#### Objetivo")
         md_lines.append(
-            "Esses valores aparecem no plano em Novembro e **não devem** ser usados como indicador de custo recorrente."
+            "Comparar os **planos de contas** em **Novembro/2025** contra a **média anual** (base histórica do DRE antigo)."
         )
-        md_lines.append(_md_table(df_det_nao[cols_det], cols_det))
+        md_lines.append(f"- **{ROTULO_MEDIA_ANUAL}** vs **Novembro/2025**")
+        md_lines.append("")
+        md_lines.append("#### Dados utilizados")
+        md_lines.append(f"- **DRE antigo**: `{ARQ_ANTIGO.name}` (aba `{ABA_ANTIGO}`)")
+        md_lines.append(f"- **Novo plano**: `{ARQ_NOVO.name}` (aba `{ABA_NOVO}`)")
+        md_lines.append(f"- **Média anual**: média mensal calculada com base em {MESES_MEDIA_ANUAL} (meses disponíveis no DRE antigo).")
+        md_lines.append("- **Gap**: não há dados de **Outubro/2025** no conjunto recebido.")
+        md_lines.append("")
+        md_lines.append("#### Metodologia (Python)")
+        md_lines.append(
+            "- **Sinal**: despesas vêm negativas nas planilhas; convertemos para **gasto positivo** (gasto = -valor)."
+        )
+        md_lines.append(
+            "- **Mapeamento**: categorias do DRE antigo foram alinhadas ao novo plano via regras por **grupo/conta** e **código**."
+        )
+        md_lines.append(
+            "- **Recorrência (pessoal)**: separamos **não recorrentes** (13º, rescisões/indenizações, ações trabalhistas) para não distorcer o indicador."
+        )
+        md_lines.append("")
+        # Consolidado do plano (somente recorrente; apenas itens com base mapeada)
+        total_media_anual = float(df_rec["base_media_fev_jul"].sum())
+        total_nov_mapeado = float(df_rec["gasto_nov"].sum())
+        total_diff = total_media_anual - total_nov_mapeado
+        pct_total = None if abs(total_media_anual) < 1e-9 else total_diff / total_media_anual
+
+        md_lines.append("#### Resultado consolidado (plano de contas; recorrente; itens com base mapeada)")
+        md_lines.append(f"- **{ROTULO_MEDIA_ANUAL}**: {fmt_brl(total_media_anual)}")
+        md_lines.append(f"- **Novembro/2025**: {fmt_brl(total_nov_mapeado)}")
+        md_lines.append(f"- **Diferença (Média − Novembro)**: {fmt_brl(total_diff)} ({fmt_pct(pct_total)})")
         md_lines.append("")
 
-    # Fora do escopo (ex.: amortização de principal)
-    df_det_fora = df_det[df_det["tipo"] == "Fora do escopo"].copy()
-    if not df_det_fora.empty:
-        md_lines.append("#### Itens fora do escopo (não são custo recorrente)")
+        # Mesmos itens em todos os meses do plano novo e bases do cubo comparativo
+        md_lines.append("#### Outros meses e bases (mesmos itens; cubo comparativo)")
         md_lines.append(
-            "Itens como **amortização de principal** (empréstimos/parcelas) não representam despesa recorrente e foram excluídos do consolidado."
+            "Totais dos itens do consolidado acima para cada mês do plano novo contra cada base; o cubo completo (por categoria/código) está na aba `cubo_comparativo` do Excel."
+        )
+        md_lines.append("")
+        cubo_rec = cubo[(cubo["nivel"] == "codigo") & cubo["entidade"].isin(set(df_rec["codigo"]))]
+        tot = cubo_rec.groupby(["mes_alvo", "janela"], sort=False).agg(
+            base=("base", lambda b: b.sum(min_count=1)),
+            valor_alvo=("valor_alvo", "sum"),
+        ).reset_index()
+        tot["diferenca"] = tot["base"] - tot["valor_alvo"]
+        tot["pct"] = (tot["diferenca"] / tot["base"]).where(tot["base"].abs() > 1e-9)
+        df_tot = pd.DataFrame(
+            {
+                "Mês": tot["mes_alvo"].map(_rotulo_mes),
+                "Base": tot["janela"],
+                "Base (R$)": tot["base"].map(fmt_brl_opt),
+                "Mês (R$)": tot["valor_alvo"].map(fmt_brl),
+                "Diferença (Base − Mês)": tot["diferenca"].map(fmt_brl_opt),
+                "% vs Base": tot["pct"].map(fmt_pct),
+            }
+        )
+        md_lines.append(_md_table(df_tot, list(df_tot.columns)))
+        md_lines.append("")
+        md_lines.append("#### Detalhamento no formato do plano de contas (Nov/Dez) — contas analisadas")
+        md_lines.append(
+            "Tabela organizada pelos **códigos/descrições** do plano de contas (Nov/Dez), com base histórica do DRE antigo quando há mapeamento."
         )
-        md_lines.append(_md_table(df_det_fora[cols_det], cols_det))
         md_lines.append("")
 
-    md_lines.append("#### Observações")
-    md_lines.append(
-        "- Algumas linhas podem estar **zeradas** em Novembro por **competência/lançamento** (ex.: consultorias). Recomenda-se validar com o financeiro."
-    )
-    md_lines.append(
-        "- O mapeamento completo e as regras estão no Excel de saída (aba `mapeamento_regras`)."
-    )
-    md_lines.append(
-        "- **Empréstimos/Parcelas (2.2.01)** foi tratado como **fora do escopo** (amortização de principal), não entra como custo recorrente."
-    )
+        df_det = df_plano_focus.copy()
+        df_det[ROTULO_MEDIA_ANUAL] = df_det["base_media_fev_jul"].map(fmt_brl_opt)
+        df_det["Novembro"] = df_det["gasto_nov"].map(fmt_brl)
+        df_det["Diferença (Média − Novembro)"] = df_det["reducao_vs_media"].map(fmt_brl_opt)
+        df_det["% vs Média"] = df_det["pct_vs_media"].map(fmt_pct)
+
+        cols_det = ["codigo", "desc", "tipo", ROTULO_MEDIA_ANUAL, "Novembro", "Diferença (Média − Novembro)", "% vs Média"]
+        md_lines.append(_md_table(df_det[cols_det], cols_det))
+        md_lines.append("")
 
-    # Categorias NO FINAL (pedido)
-    md_lines.append("")
-    md_lines.append("#### Resumo por categoria do plano de contas (no final)")
-    df_res = resumo.copy()
-    df_res[ROTULO_MEDIA_ANUAL] = df_res["base_media_fev_jul"].map(fmt_brl_opt)
-    df_res["Novembro"] = df_res["novembro"].map(fmt_brl_opt)
-    df_res["Diferença (Média − Novembro)"] = df_res["reducao_vs_media"].map(fmt_brl_opt)
-    df_res["% vs Média"] = df_res["pct_vs_media"].map(fmt_pct)
-    cols_res = ["cat2", "categoria", ROTULO_MEDIA_ANUAL, "Novembro", "Diferença (Média − Novembro)", "% vs Média"]
-    md_lines.append(_md_table(df_res[cols_res], cols_res))
-
-    out_md.write_text("\n".join(md_lines), encoding="utf-8")
+        # Contexto não recorrente (filtrado do detalhamento)
+        df_det_nao = df_det[df_det["tipo"] == "Não recorrente"].copy()
+        if not df_det_nao.empty:
+            md_lines.append("#### Itens não recorrentes (contexto)")
+            md_lines.append(
+                "Esses valores aparecem no plano em Novembro e **não devem** ser usados como indicador de custo recorrente."
+            )
+            md_lines.append(_md_table(df_det_nao[cols_det], cols_det))
+            md_lines.append("")
+
+        # Fora do escopo (ex.: amortização de principal)
+        df_det_fora = df_det[df_det["tipo"] == "Fora do escopo"].copy()
+        if not df_det_fora.empty:
+            md_lines.append("#### Itens fora do escopo (não são custo recorrente)")
+            md_lines.append(
+                "Itens como **amortização de principal** (empréstimos/parcelas) não representam despesa recorrente e foram excluídos do consolidado."
+            )
+            md_lines.append(_md_table(df_det_fora[cols_det], cols_det))
+            md_lines.append("")
+
+        md_lines.append("#### Observações")
+        md_lines.append(
+            "- Algumas linhas podem estar **zeradas** em Novembro por **competência/lançamento** (ex.: consultorias). Recomenda-se validar com o financeiro."
+        )
+        md_lines.append(
+            "- O mapeamento completo e as regras estão no Excel de saída (aba `mapeamento_regras`)."
+        )
+        md_lines.append(
+            "- **Empréstimos/Parcelas (2.2.01)** foi tratado como **fora do escopo** (amortização de principal), não entra como custo recorrente."
+        )
+
+        # Categorias NO FINAL (pedido)
+        md_lines.append("")
+        md_lines.append("#### Resumo por categoria do plano de contas (no final)")
+        df_res = resumo.copy()
+        df_res[ROTULO_MEDIA_ANUAL] = df_res["base_media_fev_jul"].map(fmt_brl_opt)
+        df_res["Novembro"] = df_res["novembro"].map(fmt_brl_opt)
+        df_res["Diferença (Média − Novembro)"] = df_res["reducao_vs_media"].map(fmt_brl_opt)
+        df_res["% vs Média"] = df_res["pct_vs_media"].map(fmt_pct)
+        cols_res = ["cat2", "categoria", ROTULO_MEDIA_ANUAL, "Novembro", "Diferença (Média − Novembro)", "% vs Média"]
+        md_lines.append(_md_table(df_res[cols_res], cols_res))
+
+        out_md.write_text("\n".join(md_lines), encoding="utf-8")
+        et.linhas = len(md_lines)
     print(f"Relatório gerado: {out_md}")
+    print(f"Cache de normalizacao: {resumo_cache()}")
+    finalizar(perfil, args, "analise_reducao_custos_recorrentes")
 
 
 if __name__ == "__main__":
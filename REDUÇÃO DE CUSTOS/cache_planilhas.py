@@ -0,0 +1,175 @@
+"""
+Cache das planilhas de REDUÇÃO DE CUSTOS (DRE antigo, plano novo e as inspeções).
+
+Cada leitura (arquivo, aba, cabeçalho, nrows) passa pelo openpyxl uma vez; o DataFrame resultante
+é gravado com `cache_parse.CacheParse` — uma coluna por `.npy` (textos como códigos num vocabulário)
+e o esquema (rótulos das colunas, dtypes) no `meta.json`. As leituras seguintes abrem as colunas
+com `mmap_mode="r"`. A chave é o hash do conteúdo do arquivo, com tamanho/mtime como atalho, então
+editar a planilha invalida o cache e um `touch` não.
+
+Dentro do mesmo processo a mesma leitura é servida da memória (cópia rasa do DataFrame).
+
+DataFrames que o formato não representa (colunas com datas misturadas a textos, rótulos que não
+são texto/número, índice que não é 0..n-1) são lidos normalmente e não vão para o disco.
+
+    cache = CachePlanilhas()
+    df = ler_planilha(ARQ_ANTIGO, "Export", header=[0, 1], cache=cache)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+from pathlib import Path
+import sys
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "apresentacao-investimentos" / "scripts"))
+from cache_parse import CacheParse  # noqa: E402
+
+# ao lado do cache de parse dos CSVs (apresentacao-investimentos/.cache já fica fora do git)
+CACHE_PLANILHAS_DIR = Path(__file__).resolve().parents[1] / "apresentacao-investimentos" / ".cache" / "planilhas"
+
+# Mudanças na codificação das colunas exigem incrementar
+VERSAO_PLANILHAS = 1
+
+_SEM_TEXTO = -1
+
+
+class _NaoCacheavel(Exception):
+    pass
+
+
+def _rotulo_json(x: Any) -> Any:
+    if isinstance(x, np.generic):
+        x = x.item()
+    if isinstance(x, (str, int, float, bool)) or x is None:
+        return x
+    raise _NaoCacheavel(f"rótulo de coluna {x!r}")
+
+
+def _tipo_leitura(aba: str, header: int | list[int] | None, nrows: int | None) -> str:
+    spec = json.dumps([VERSAO_PLANILHAS, aba, header, nrows], ensure_ascii=False)
+    return "planilha-" + hashlib.blake2b(spec.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _codificar(df: pd.DataFrame) -> tuple[list[str], dict[str, np.ndarray], dict[str, Any]]:
+    """(vocabulário, colunas .npy, esquema) do DataFrame; `_NaoCacheavel` se o formato não representa."""
+    if not df.index.equals(pd.RangeIndex(len(df))):
+        raise _NaoCacheavel("índice")
+    vocab: dict[str, int] = {}
+    colunas: dict[str, np.ndarray] = {}
+    tipos: list[str] = []
+    for i in range(df.shape[1]):
+        s = df.iloc[:, i]
+        nome = f"c{i}"
+        if s.dtype.kind in "biufcmM":
+            colunas[nome] = s.to_numpy()
+            tipos.append("valor")
+            continue
+        valores = s.to_numpy(dtype=object)
+        # textos puros viram códigos; números/bools misturados vão pelo JSON do valor
+        so_texto = all(isinstance(v, str) or (isinstance(v, float) and math.isnan(v)) or v is None for v in valores)
+        codigos = np.empty(len(valores), dtype=np.int32)
+        for j, v in enumerate(valores):
+            if v is None or (isinstance(v, float) and math.isnan(v)):
+                codigos[j] = _SEM_TEXTO
+                continue
+            if not so_texto:
+                if isinstance(v, np.generic):
+                    v = v.item()
+                if not isinstance(v, (str, int, float, bool)):
+                    raise _NaoCacheavel(f"valor {type(v).__name__} na coluna {i}")
+                v = json.dumps(v, ensure_ascii=False)
+            codigos[j] = vocab.setdefault(v, len(vocab))
+        colunas[nome] = codigos
+        tipos.append("texto" if so_texto else "json")
+
+    multi = isinstance(df.columns, pd.MultiIndex)
+    rotulos = [[_rotulo_json(x) for x in c] if multi else _rotulo_json(c) for c in df.columns]
+    esquema = {
+        "rotulos": rotulos,
+        "multi": multi,
+        "nomes": [_rotulo_json(n) for n in df.columns.names],
+        "tipos": tipos,
+        "dtypes": [str(dt) for dt in df.dtypes],
+        "linhas": len(df),
+    }
+    return list(vocab), colunas, esquema
+
+
+def _decodificar(textos: list[str], colunas: dict[str, np.ndarray], esquema: dict[str, Any]) -> pd.DataFrame:
+    vocab = np.array(textos + [np.nan], dtype=object)  # código -1 cai no NaN do fim
+    dados: dict[int, Any] = {}
+    for i, (tipo, dtype) in enumerate(zip(esquema["tipos"], esquema["dtypes"])):
+        arr = colunas[f"c{i}"]
+        if tipo == "valor":
+            dados[i] = pd.Series(arr, dtype=dtype, copy=False)
+        elif tipo == "texto":
+            dados[i] = pd.Series(vocab[arr], dtype=dtype)
+        else:
+            # o vocabulário é compartilhado com as colunas de texto: decodifica só os códigos desta
+            valores = np.full(len(textos) + 1, np.nan, dtype=object)
+            for c in np.unique(arr[arr != _SEM_TEXTO]).tolist():
+                valores[c] = json.loads(textos[c])
+            dados[i] = pd.Series(valores[arr], dtype=dtype)
+    df = pd.DataFrame(dados, index=pd.RangeIndex(esquema["linhas"]))
+    if esquema["multi"]:
+        df.columns = pd.MultiIndex.from_tuples([tuple(r) for r in esquema["rotulos"]], names=esquema["nomes"])
+    else:
+        df.columns = pd.Index(esquema["rotulos"], name=esquema["nomes"][0])
+    return df
+
+
+class CachePlanilhas:
+    def __init__(self, pasta: Path = CACHE_PLANILHAS_DIR) -> None:
+        self.disco = CacheParse(pasta)
+        self._memoria: dict[tuple[str, str], pd.DataFrame] = {}
+        self._abas: dict[str, list[str]] = {}
+
+    def ler(self, path: Path, aba: str, header: int | list[int] | None = 0, nrows: int | None = None) -> pd.DataFrame:
+        tipo = _tipo_leitura(aba, header, nrows)
+        chave = (str(Path(path).resolve()), tipo)
+        df = self._memoria.get(chave)
+        if df is None:
+            salvo = self.disco.carregar_com_extra(path, tipo)
+            if salvo is not None:
+                df = _decodificar(*salvo)
+            else:
+                df = pd.read_excel(path, sheet_name=aba, header=header, nrows=nrows)
+                try:
+                    self.disco.salvar(path, tipo, *_codificar(df))
+                except _NaoCacheavel:
+                    pass
+            self._memoria[chave] = df
+        return df.copy(deep=False)
+
+    def abas(self, path: Path) -> list[str]:
+        chave = str(Path(path).resolve())
+        if chave not in self._abas:
+            salvo = self.disco.carregar(path, f"abas-v{VERSAO_PLANILHAS}")
+            if salvo is not None:
+                nomes = list(salvo[0])
+            else:
+                with pd.ExcelFile(path) as xls:
+                    nomes = [str(n) for n in xls.sheet_names]
+                self.disco.salvar(path, f"abas-v{VERSAO_PLANILHAS}", nomes, {})
+            self._abas[chave] = nomes
+        return list(self._abas[chave])
+
+
+def ler_planilha(
+    path: Path,
+    aba: str,
+    header: int | list[int] | None = 0,
+    nrows: int | None = None,
+    cache: CachePlanilhas | None = None,
+) -> pd.DataFrame:
+    """`pd.read_excel(path, sheet_name=aba, header=header, nrows=nrows)`, pelo cache quando houver."""
+    if cache is None:
+        return pd.read_excel(path, sheet_name=aba, header=header, nrows=nrows)
+    return cache.ler(path, aba, header=header, nrows=nrows)
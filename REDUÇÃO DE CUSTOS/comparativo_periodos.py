@@ -0,0 +1,172 @@
+"""
+Comparativo N meses-alvo × M janelas de base entre o DRE antigo e o plano de contas novo.
+
+O relatório comparava um mês fixo (Novembro, `df.columns[4]` do plano novo) contra duas bases
+fixas (Julho e a média de `MESES_MEDIA_ANUAL`). Aqui:
+
+1. as colunas de mês dos dois layouts são reconhecidas pelo cabeçalho — (YYYYMM, "R$") no DRE
+   antigo, nome do mês ("Novembro") no plano novo — e viram uma tabela longa de fatos
+   (chaves da linha do comparativo, mês, gasto)
+2. um único `pivot_table` soma os fatos numa matriz entidade × mês
+3. cada janela de base (`JanelaBase`) escolhe, para cada mês-alvo, as colunas da matriz que entram
+   na base; a redução é uma operação por coluna sobre todas as entidades de uma vez
+4. o resultado é o cubo longo (entidade, mês-alvo, janela) → base, valor no alvo, diferença e %,
+   de onde saem as tabelas do Markdown e do Excel
+
+Janelas:
+- `mes`: um mês fixo (`meses=(202507,)`)
+- `media` / `mediana`: meses fixos; sem `meses`, todos os meses de base antes do alvo
+- `ultimos`: os `n` últimos meses de base antes do alvo (pula o gap de Outubro)
+- `ano_anterior`: o mesmo mês do ano anterior (sem o mês na base: base indefinida)
+
+Uma janela não mistura os layouts: a base só usa os meses do DRE antigo (`meses_base` de
+`cubo_comparativo`) e o alvo é o mês do plano novo. Sem isso, "últimos 3" de Dezembro pegaria
+Novembro do plano novo, que vale 0 para quem só tem fatos no DRE antigo (os pools).
+Entidades sem fatos no plano novo (os pools) ficam sem valor no alvo, diferença e %.
+
+Meses fixos ausentes da matriz contam como 0 (sem lançamento), como a base anterior fazia.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "apresentacao-investimentos" / "scripts"))
+from normalizacao import chave_busca  # noqa: E402
+
+MESES_PT = (
+    "janeiro",
+    "fevereiro",
+    "marco",
+    "abril",
+    "maio",
+    "junho",
+    "julho",
+    "agosto",
+    "setembro",
+    "outubro",
+    "novembro",
+    "dezembro",
+)
+TIPOS_JANELA = ("mes", "media", "mediana", "ultimos", "ano_anterior")
+
+
+@dataclass(frozen=True)
+class JanelaBase:
+    nome: str
+    tipo: str
+    meses: tuple[int, ...] = ()
+    n: int = 3
+
+    def meses_base(self, alvo: int, disponiveis: list[int]) -> tuple[int, ...] | None:
+        """Meses da base para o mês-alvo; None = base indefinida (ex.: sem o mesmo mês do ano anterior)."""
+        anteriores = [m for m in disponiveis if m < alvo]
+        if self.tipo == "mes":
+            if not self.meses:
+                raise RuntimeError(f"Janela {self.nome!r} do tipo 'mes' precisa do mês em `meses`")
+            return self.meses[:1]
+        if self.tipo in ("media", "mediana"):
+            return self.meses or (tuple(anteriores) or None)
+        if self.tipo == "ultimos":
+            return tuple(anteriores[-self.n :]) or None
+        if self.tipo == "ano_anterior":
+            m = alvo - 100
+            return (m,) if m in disponiveis else None
+        raise RuntimeError(f"Janela de base desconhecida: {self.tipo} (use {', '.join(TIPOS_JANELA)})")
+
+
+def colunas_mes_dre_antigo(colunas: pd.Index) -> dict[object, int]:
+    """Coluna -> YYYYMM para as colunas (mês, "R$") do DRE antigo (cabeçalho de dois níveis)."""
+    out: dict[object, int] = {}
+    for c in colunas:
+        if isinstance(c, tuple) and len(c) == 2 and str(c[1]).strip() == "R$":
+            try:
+                mes = int(c[0])
+            except (TypeError, ValueError):
+                continue  # "Total"
+            if 190001 <= mes <= 999912 and 1 <= mes % 100 <= 12:
+                out[c] = mes
+    return out
+
+
+def colunas_mes_plano_novo(colunas: pd.Index, ano: int) -> dict[object, int]:
+    """Coluna -> YYYYMM para as colunas com nome de mês do plano novo ("Novembro", "Dezembro")."""
+    out: dict[object, int] = {}
+    for c in colunas:
+        nome = chave_busca(c)
+        if nome in MESES_PT:
+            out[c] = ano * 100 + MESES_PT.index(nome) + 1
+    return out
+
+
+def matriz_mensal(fatos: pd.DataFrame, chaves: list[str]) -> pd.DataFrame:
+    """Gasto por entidade (`chaves`) × mês, num único pivot sobre os fatos (colunas `chaves`, mes, gasto)."""
+    m = fatos.pivot_table(index=chaves, columns="mes", values="gasto", aggfunc="sum", fill_value=0.0, sort=True)
+    return m.sort_index(axis=1)
+
+
+def cubo_comparativo(
+    matriz: pd.DataFrame,
+    meses_alvo: list[int],
+    janelas: list[JanelaBase],
+    com_base: pd.Series | None = None,
+    meses_base: list[int] | None = None,
+    com_alvo: pd.Series | None = None,
+) -> pd.DataFrame:
+    """
+    Uma linha por entidade × mês-alvo × janela: base, valor no alvo, diferença (base − alvo; positivo =
+    reduziu custo) e % sobre a base. `com_base` (bool por entidade, no índice da matriz) marca quem
+    tem histórico mapeado; as demais ficam com base indefinida. `meses_base` são os meses que podem
+    entrar numa janela (None = todas as colunas da matriz). `com_alvo` marca quem tem fatos no layout
+    do alvo; as demais ficam sem valor no alvo, diferença e %.
+    """
+    meses = [int(m) for m in matriz.columns]
+    disponiveis = sorted(int(m) for m in meses_base) if meses_base is not None else meses
+    valores = matriz.to_numpy(dtype=np.float64)
+    coluna = {m: i for i, m in enumerate(meses)}
+    sem_base = None if com_base is None else ~com_base.reindex(matriz.index, fill_value=False).to_numpy(dtype=bool)
+    sem_alvo = None if com_alvo is None else ~com_alvo.reindex(matriz.index, fill_value=False).to_numpy(dtype=bool)
+    n = len(matriz)
+    zeros = np.zeros(n)
+
+    def _coluna(m: int) -> np.ndarray:
+        return valores[:, coluna[m]] if m in coluna else zeros
+
+    partes: list[pd.DataFrame] = []
+    for alvo in meses_alvo:
+        valor_alvo = _coluna(alvo)
+        if sem_alvo is not None:
+            valor_alvo = np.where(sem_alvo, np.nan, valor_alvo)
+        for janela in janelas:
+            sel = janela.meses_base(alvo, disponiveis)
+            if sel is None:
+                base = np.full(n, np.nan)
+            else:
+                # linhas contíguas: a soma de cada entidade segue a mesma ordem de uma Series do mês
+                bloco = np.ascontiguousarray(np.column_stack([_coluna(m) for m in sel]))
+                if janela.tipo == "mediana":
+                    base = np.median(bloco, axis=1)
+                elif janela.tipo == "mes" or janela.tipo == "ano_anterior":
+                    base = bloco[:, 0].copy()
+                else:
+                    base = bloco.mean(axis=1)
+            if sem_base is not None:
+                base[sem_base] = np.nan
+            diferenca = base - valor_alvo
+            with np.errstate(divide="ignore", invalid="ignore"):
+                pct = np.where(np.abs(base) > 1e-9, diferenca / base, np.nan)
+            parte = matriz.index.to_frame(index=False)
+            parte["mes_alvo"] = alvo
+            parte["janela"] = janela.nome
+            parte["meses_base"] = "" if sel is None else ",".join(str(m) for m in sel)
+            parte["base"] = base
+            parte["valor_alvo"] = valor_alvo
+            parte["diferenca"] = diferenca
+            parte["pct"] = pct
+            partes.append(parte)
+    return pd.concat(partes, ignore_index=True)
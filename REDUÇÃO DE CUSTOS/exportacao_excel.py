@@ -0,0 +1,261 @@
+"""
+Exportação do Excel de apoio da análise de redução de custos em streaming.
+
+`pd.ExcelWriter(engine="openpyxl")` monta a pasta de trabalho inteira em memória antes de gravar, e
+a nova tentativa (arquivo aberto no Excel) refazia tudo. Aqui:
+
+1. a pasta de trabalho é `write_only`: as linhas vão direto para o arquivo temporário da aba
+2. cada aba é dividida em blocos de `linhas_por_bloco`; uma pool de threads prepara os próximos
+   `blocos_adiante` blocos (valores Python, nulos -> célula vazia) enquanto o bloco atual é gravado
+   — a memória fica limitada à janela de blocos, não ao tamanho do DRE
+3. abas pesadas (base e long do DRE antigo) podem sair como arquivos ao lado do Excel (CSV `;` ou
+   Parquet); a aba fica com a referência ao arquivo
+4. tudo é renderizado uma vez em arquivos temporários na pasta de destino; `publicar` só renomeia,
+   então a nova tentativa com outro nome reaproveita o que já foi gerado. Os arquivos externos vão
+   primeiro e o Excel por último; se um passo falha, o que já foi movido volta para os temporários
+
+    exp = renderizar_planilhas([("comparativo", df_out), ...], BASE_DIR)
+    try:
+        exp.publicar(out_xlsx)
+    except PermissionError:
+        exp.publicar(out_xlsx_alt)
+    finally:
+        exp.descartar()
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import csv
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+import os
+from pathlib import Path
+import shutil
+import tempfile
+from typing import Iterator
+from xml.sax.saxutils import escape
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+ABAS_PESADAS = ("dre_antigo_base", "dre_antigo_long")
+_NATIVOS = (str, int, float, bool, datetime, date, timedelta)
+FORMATOS_EXTERNOS = ("csv", "parquet")
+
+
+@dataclass
+class ConfigExportacao:
+    linhas_por_bloco: int = 5000
+    threads: int = 2
+    blocos_adiante: int = 4
+    # None = todas as abas no Excel; "csv"/"parquet" = `abas_pesadas` em arquivos separados
+    formato_externo: str | None = None
+    abas_pesadas: tuple[str, ...] = ABAS_PESADAS
+
+
+def _linhas_do_bloco(df: pd.DataFrame, ini: int, fim: int) -> list[tuple]:
+    """Linhas [ini, fim) como tuplas de valores Python (como o `to_excel` do pandas grava)."""
+    colunas = []
+    for i in range(df.shape[1]):
+        s = df.iloc[ini:fim, i]
+        v = s.to_numpy(dtype=object, copy=True)
+        nulos = pd.isna(v)
+        if s.dtype.kind == "f":
+            arr = s.to_numpy(dtype=np.float64)
+            infinito = np.isinf(arr)
+            if infinito.any():
+                v[infinito] = np.where(arr[infinito] > 0, "inf", "-inf")
+        if nulos.any():
+            v[nulos] = None
+        if s.dtype.kind == "O":
+            # o que não é célula nativa (tuplas, listas...) vai como texto, igual ao `to_excel`
+            for j, x in enumerate(v):
+                if x is not None and not isinstance(x, _NATIVOS):
+                    v[j] = x.item() if isinstance(x, np.generic) else str(x)
+        colunas.append(v)
+    return list(zip(*colunas))
+
+
+def _blocos(df: pd.DataFrame, cfg: ConfigExportacao, pool: ThreadPoolExecutor) -> Iterator[list[tuple]]:
+    """Blocos de linhas na ordem, com até `blocos_adiante` sendo preparados em paralelo."""
+    n = max(cfg.linhas_por_bloco, 1)
+    pendentes: deque = deque()
+    for ini in range(0, len(df), n):
+        pendentes.append(pool.submit(_linhas_do_bloco, df, ini, min(ini + n, len(df))))
+        if len(pendentes) >= max(cfg.blocos_adiante, 1):
+            yield pendentes.popleft().result()
+    while pendentes:
+        yield pendentes.popleft().result()
+
+
+def _cabecalho(ws, colunas: pd.Index) -> list:
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+
+    # mesmo estilo do cabeçalho do `to_excel`
+    fina = Side(style="thin")
+    out = []
+    for c in colunas:
+        cell = WriteOnlyCell(ws, value=c.item() if isinstance(c, np.generic) else c)
+        cell.font = Font(bold=True)
+        cell.border = Border(left=fina, right=fina, top=fina, bottom=fina)
+        cell.alignment = Alignment(horizontal="center", vertical="top")
+        out.append(cell)
+    return out
+
+
+def _gravar_csv(path: Path, df: pd.DataFrame, cfg: ConfigExportacao, pool: ThreadPoolExecutor) -> None:
+    with path.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f, delimiter=";")
+        w.writerow([str(c) for c in df.columns])
+        for bloco in _blocos(df, cfg, pool):
+            w.writerows(bloco)
+
+
+def _gravar_parquet(path: Path, df: pd.DataFrame, cfg: ConfigExportacao) -> None:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Exportação em Parquet requer pyarrow (pip install pyarrow); use --bases-externas csv") from e
+
+    n = max(cfg.linhas_por_bloco, 1)
+    esquema = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False)
+    with pq.ParquetWriter(path, esquema) as w:
+        for ini in range(0, len(df), n):
+            w.write_table(pa.Table.from_pandas(df.iloc[ini : ini + n], schema=esquema, preserve_index=False))
+
+
+def _modo_arquivo_novo() -> int:
+    """Permissão que um `open` comum daria (0o666 sem a umask); os `mkstemp` nascem 0o600."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+@dataclass
+class ExportacaoRenderizada:
+    """Excel (e arquivos externos) já gravados em temporários, prontos para `publicar`."""
+
+    xlsx: Path
+    nome_base: str
+    externos: dict[str, tuple[Path, str]] = field(default_factory=dict)  # aba -> (temporário, extensão)
+    planilhas: dict[str, int] = field(default_factory=dict)  # aba externa -> posição da aba de referência (1..n)
+    linhas: int = 0
+
+    def nome_externo(self, aba: str, ext: str, base: str | None = None) -> str:
+        return f"{base or self.nome_base}.{aba}.{ext}"
+
+    def _xlsx_para(self, base: str) -> Path:
+        """
+        Excel com as referências às abas externas apontando para `base`. Com o mesmo nome da
+        renderização é o próprio temporário; senão, uma cópia em que só as abas de referência são
+        reescritas (as demais entradas do zip são copiadas como estão).
+        """
+        if base == self.nome_base or not self.externos:
+            return self.xlsx
+        trocas = {
+            f"xl/worksheets/sheet{self.planilhas[aba]}.xml": (
+                f"<t>{escape(self.nome_externo(aba, ext))}</t>".encode(),
+                f"<t>{escape(self.nome_externo(aba, ext, base))}</t>".encode(),
+            )
+            for aba, (_, ext) in self.externos.items()
+        }
+        fd, tmp = tempfile.mkstemp(prefix=f".{base}.", suffix=".xlsx", dir=self.xlsx.parent)
+        os.close(fd)
+        try:
+            with zipfile.ZipFile(self.xlsx) as z_in, zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as z_out:
+                for info in z_in.infolist():
+                    if info.filename in trocas:
+                        antigo, novo = trocas[info.filename]
+                        z_out.writestr(info, z_in.read(info).replace(antigo, novo))
+                        continue
+                    with z_in.open(info) as origem, z_out.open(info, "w") as copia:
+                        shutil.copyfileobj(origem, copia, 1 << 20)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return Path(tmp)
+
+    def publicar(self, destino: Path) -> list[Path]:
+        """
+        Move os temporários para `destino`: primeiro os arquivos externos, com nomes derivados do
+        destino (`<destino>.<aba>.<ext>`), depois o Excel, com a permissão de um arquivo criado
+        normalmente (não a 0o600 do `mkstemp`). Se algum passo falha (`PermissionError`
+        com o arquivo aberto), os externos já movidos voltam para os temporários e a exceção segue,
+        então a nova tentativa com outro destino parte do mesmo estado.
+        """
+        xlsx = self._xlsx_para(destino.stem)
+        modo = _modo_arquivo_novo()
+        movidos: list[tuple[Path, Path]] = []
+        try:
+            for aba, (tmp, ext) in self.externos.items():
+                alvo = destino.with_name(self.nome_externo(aba, ext, destino.stem))
+                os.chmod(tmp, modo)
+                os.replace(tmp, alvo)
+                movidos.append((tmp, alvo))
+            os.chmod(xlsx, modo)
+            os.replace(xlsx, destino)
+        except BaseException:
+            for tmp, alvo in reversed(movidos):
+                os.replace(alvo, tmp)
+            if xlsx != self.xlsx:
+                xlsx.unlink(missing_ok=True)
+            raise
+        self.externos.clear()
+        self.xlsx.unlink(missing_ok=True)
+        return [destino, *(alvo for _, alvo in movidos)]
+
+    def descartar(self) -> None:
+        """Remove o que não foi publicado."""
+        for p in [self.xlsx, *(tmp for tmp, _ in self.externos.values())]:
+            p.unlink(missing_ok=True)
+
+
+def renderizar_planilhas(
+    abas: list[tuple[str, pd.DataFrame]],
+    pasta: Path,
+    cfg: ConfigExportacao | None = None,
+    nome_base: str = "SAIDA",
+) -> ExportacaoRenderizada:
+    """Grava `abas` (nome, DataFrame, sem índice) num Excel temporário em `pasta`."""
+    from openpyxl import Workbook
+
+    cfg = cfg if cfg is not None else ConfigExportacao()
+    if cfg.formato_externo is not None and cfg.formato_externo not in FORMATOS_EXTERNOS:
+        raise RuntimeError(f"Formato externo desconhecido: {cfg.formato_externo} (use {', '.join(FORMATOS_EXTERNOS)})")
+
+    fd, tmp = tempfile.mkstemp(prefix=f".{nome_base}.", suffix=".xlsx", dir=pasta)
+    os.close(fd)
+    exp = ExportacaoRenderizada(xlsx=Path(tmp), nome_base=nome_base)
+    try:
+        wb = Workbook(write_only=True)
+        with ThreadPoolExecutor(max_workers=max(cfg.threads, 1)) as pool:
+            for nome, df in abas:
+                ws = wb.create_sheet(nome)
+                exp.linhas += len(df)
+                if cfg.formato_externo and nome in cfg.abas_pesadas:
+                    ext = cfg.formato_externo
+                    exp.planilhas[nome] = len(wb.worksheets)
+                    fd, tmp_ext = tempfile.mkstemp(prefix=f".{nome_base}.{nome}.", suffix=f".{ext}", dir=pasta)
+                    os.close(fd)
+                    exp.externos[nome] = (Path(tmp_ext), ext)
+                    if ext == "csv":
+                        _gravar_csv(Path(tmp_ext), df, cfg, pool)
+                    else:
+                        _gravar_parquet(Path(tmp_ext), df, cfg)
+                    ws.append(_cabecalho(ws, pd.Index(["arquivo", "linhas"])))
+                    ws.append([exp.nome_externo(nome, ext), len(df)])
+                    continue
+                ws.append(_cabecalho(ws, df.columns))
+                for bloco in _blocos(df, cfg, pool):
+                    for linha in bloco:
+                        ws.append(linha)
+        wb.save(exp.xlsx)
+    except BaseException:
+        exp.descartar()
+        raise
+    return exp
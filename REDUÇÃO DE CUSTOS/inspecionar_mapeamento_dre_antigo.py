@@ -7,7 +7,7 @@ from __future__ import annotations
 
 from pathlib import Path
 
-import pandas as pd
+from cache_planilhas import CachePlanilhas, ler_planilha
 
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -18,7 +18,7 @@ MESES = [202502, 202503, 202504, 202505, 202506, 202507]
 
 
 def main() -> None:
-    df = pd.read_excel(ARQ_ANTIGO, sheet_name=ABA_ANTIGO, header=[0, 1])
+    df = ler_planilha(ARQ_ANTIGO, ABA_ANTIGO, header=[0, 1], cache=CachePlanilhas())
     col_grp = df.columns[0]
     col_conta = df.columns[1]
 
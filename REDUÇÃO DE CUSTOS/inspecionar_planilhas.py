@@ -9,20 +9,21 @@ from __future__ import annotations
 
 from pathlib import Path
 
-import pandas as pd
+from cache_planilhas import CachePlanilhas
 
 
 BASE_DIR = Path(__file__).resolve().parent
 
 
-def _preview_sheet(path: Path, sheet_name: str, nrows: int = 12) -> None:
-    df = pd.read_excel(path, sheet_name=sheet_name, nrows=nrows)
+def _preview_sheet(cache: CachePlanilhas, path: Path, sheet_name: str, nrows: int = 12) -> None:
+    df = cache.ler(path, sheet_name, nrows=nrows)
     print(f"\n--- Aba: {sheet_name} | preview shape: {df.shape} ---")
     print("Colunas:", list(df.columns))
     print(df.head(5).to_string(index=False))
 
 
 def main() -> None:
+    cache = CachePlanilhas()
     arquivos = [
         "ANALISE_REDUCAO_CUSTOS.xlsx",
         "ANALISE_REDUCAO_CUSTOS_FINAL.xlsx",
@@ -38,10 +39,10 @@ def main() -> None:
         print("=" * 90)
 
         try:
-            xls = pd.ExcelFile(path)
-            print("Abas:", xls.sheet_names)
-            for sheet in xls.sheet_names[:10]:
-                _preview_sheet(path, sheet)
+            abas = cache.abas(path)
+            print("Abas:", abas)
+            for sheet in abas[:10]:
+                _preview_sheet(cache, path, sheet)
         except Exception as e:
             print("ERRO:", e)
 
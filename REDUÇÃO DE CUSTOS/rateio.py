@@ -0,0 +1,152 @@
+"""
+Rateio de pools do DRE antigo entre vários códigos do plano de contas novo.
+
+Um pool é uma base do DRE antigo (uma `RegraCategoria`) que no plano novo se espalha por vários
+códigos (seguros em 1.3.05 e 1.4.15, manutenções em 1.5.01..03). Cada pool repetia o mesmo bloco:
+somar Novembro dos códigos, tirar os pesos, dividir igual se não houve gasto e atribuir as bases
+código a código. Aqui:
+
+1. `PoolRateio` declara os códigos, a base de ponderação (gasto no mês-alvo, num mês fixo ou
+   divisão igual) e o que fazer quando o pool não tem gasto na base (divisão igual ou base indefinida)
+2. `montar_matriz_rateio` calcula os pesos de todos os pools e meses-alvo de uma vez: uma matriz
+   esparsa (mês-alvo, pool, código) → peso em coordenadas, com os totais por pool num `bincount`
+3. `MatrizRateio.ratear` aplica a matriz às bases dos pools (pool × mês-alvo × janela) num único
+   produto esparso; códigos que recebem de mais de um pool somam as parcelas
+4. `MatrizRateio.tabela` é a matriz em formato longo, para auditoria (aba `rateio_pools` do Excel)
+
+    rateio = montar_matriz_rateio({"Seguros": PoolRateio(("1.3.05", "1.4.15"))}, gasto_codigo, [202511, 202512])
+    bases_codigo = rateio.ratear(bases_pool)  # (pool, mês-alvo, janela) -> (código, mês-alvo, janela)
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+BASES_PESO = ("mes_alvo", "mes", "igual")
+FALLBACKS = ("igual", "indefinida")
+
+
+@dataclass(frozen=True)
+class PoolRateio:
+    codigos: tuple[str, ...]
+    # "mes_alvo": gasto de cada código no próprio mês-alvo; "mes": gasto em `mes_peso`; "igual": 1/n
+    peso: str = "mes_alvo"
+    mes_peso: int | None = None
+    # pool sem gasto (total <= 0) na base de ponderação: "igual" = 1/n; "indefinida" = base NaN
+    fallback: str = "igual"
+
+    def mes_da_base(self, alvo: int) -> int | None:
+        """Mês cujo gasto pondera o rateio para o mês-alvo (None = divisão igual)."""
+        if self.peso == "mes_alvo":
+            return alvo
+        if self.peso == "mes":
+            if self.mes_peso is None:
+                raise RuntimeError(f"Pool {self.codigos} com peso 'mes' precisa de `mes_peso`")
+            return self.mes_peso
+        if self.peso == "igual":
+            return None
+        raise RuntimeError(f"Base de ponderação desconhecida: {self.peso} (use {', '.join(BASES_PESO)})")
+
+
+@dataclass
+class MatrizRateio:
+    """Pesos em coordenadas: no mês-alvo `meses_alvo[mes[k]]`, o pool `pool[k]` dá `peso[k]` ao código `codigo[k]`."""
+
+    pools: list[str]
+    codigos: list[str]
+    meses_alvo: list[int]
+    pool: np.ndarray
+    codigo: np.ndarray
+    mes: np.ndarray
+    mes_peso: np.ndarray  # YYYYMM da base de ponderação; 0 = divisão igual
+    gasto_peso: np.ndarray
+    peso: np.ndarray
+    fallback: np.ndarray
+
+    def ratear(self, bases: np.ndarray) -> np.ndarray:
+        """Bases (pool × mês-alvo × k) -> (código × mês-alvo × k); NaN no pool (base indefinida) passa adiante."""
+        n_pools, n_meses = len(self.pools), len(self.meses_alvo)
+        if bases.shape[:2] != (n_pools, n_meses):
+            raise ValueError(f"Bases com forma {bases.shape}; esperado ({n_pools}, {n_meses}, k)")
+        parcelas = self.peso[:, None] * bases[self.pool, self.mes]
+        out = np.zeros((len(self.codigos) * n_meses, bases.shape[2]))
+        np.add.at(out, self.codigo * n_meses + self.mes, parcelas)
+        return out.reshape(len(self.codigos), n_meses, bases.shape[2])
+
+    def tabela(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "pool": np.array(self.pools, dtype=object)[self.pool],
+                "codigo": np.array(self.codigos, dtype=object)[self.codigo],
+                "mes_alvo": np.array(self.meses_alvo, dtype=np.int64)[self.mes],
+                "mes_peso": pd.Series(self.mes_peso, dtype="Int64").where(self.mes_peso > 0),
+                "gasto_peso": self.gasto_peso,
+                "peso": self.peso,
+                "fallback": self.fallback,
+            }
+        )
+
+
+def montar_matriz_rateio(
+    pools: dict[str, PoolRateio],
+    gasto_codigo: pd.DataFrame,
+    meses_alvo: list[int],
+) -> MatrizRateio:
+    """
+    Pesos de todos os pools (nome -> definição) em todos os meses-alvo. `gasto_codigo` é o gasto por
+    código (índice) × mês (colunas YYYYMM); códigos ou meses ausentes contam como 0 (sem lançamento).
+    """
+    for nome, p in pools.items():
+        if not p.codigos:
+            raise ValueError(f"Pool {nome!r} sem códigos")
+        if p.fallback not in FALLBACKS:
+            raise RuntimeError(f"Fallback desconhecido: {p.fallback} (use {', '.join(FALLBACKS)})")
+
+    nomes = list(pools)
+    definicoes = list(pools.values())
+    codigos = list(dict.fromkeys(str(c).strip() for p in definicoes for c in p.codigos))
+    idx_codigo = {c: i for i, c in enumerate(codigos)}
+
+    # uma entrada (pool, código) por mês-alvo, na ordem dos códigos de cada pool
+    tamanhos = np.array([len(p.codigos) for p in definicoes], dtype=np.int64)
+    pool_e = np.repeat(np.arange(len(definicoes)), tamanhos)
+    codigo_e = np.array([idx_codigo[str(c).strip()] for p in definicoes for c in p.codigos], dtype=np.int64)
+    n_meses = len(meses_alvo)
+    pool = np.tile(pool_e, n_meses)
+    codigo = np.tile(codigo_e, n_meses)
+    mes = np.repeat(np.arange(n_meses), len(pool_e))
+
+    meses_peso = np.array([[p.mes_da_base(a) or 0 for a in meses_alvo] for p in definicoes], dtype=np.int64)
+    mes_peso = meses_peso.reshape(len(definicoes), n_meses)[pool, mes]
+
+    colunas = [int(m) for m in gasto_codigo.columns]
+    gasto = gasto_codigo.reindex(index=codigos, fill_value=0.0).to_numpy(dtype=np.float64)
+    gasto = np.hstack([gasto, np.zeros((len(codigos), 1))])  # coluna extra: mês sem dado
+    pos = {m: i for i, m in enumerate(colunas)}
+    col = np.array([pos.get(int(m), len(colunas)) for m in mes_peso], dtype=np.int64)
+    gasto_peso = np.where(mes_peso > 0, gasto[codigo, col], 1.0)
+
+    grupo = pool * n_meses + mes
+    total = np.bincount(grupo, weights=gasto_peso, minlength=len(definicoes) * n_meses)[grupo]
+    fallback = total <= 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        peso = np.where(fallback, 0.0, gasto_peso / total)
+    igual = np.array([p.fallback == "igual" for p in definicoes], dtype=bool)[pool]
+    peso[fallback & igual] = 1 / tamanhos[pool][fallback & igual]
+    peso[fallback & ~igual] = np.nan
+
+    return MatrizRateio(
+        pools=nomes,
+        codigos=codigos,
+        meses_alvo=[int(m) for m in meses_alvo],
+        pool=pool,
+        codigo=codigo,
+        mes=mes,
+        mes_peso=mes_peso,
+        gasto_peso=gasto_peso,
+        peso=peso,
+        fallback=fallback,
+    )
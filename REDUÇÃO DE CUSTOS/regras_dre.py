@@ -0,0 +1,217 @@
+"""
+Motor de regras do mapeamento DRE antigo → plano de contas novo.
+
+Uma `RegraCategoria` seleciona linhas do DRE antigo por trechos do grupo/conta e linhas do plano
+novo por código/descrição. Avaliar regra a regra refazia a normalização da conta e um
+`str.contains` por termo sobre o DRE inteiro (contas × meses) a cada chamada. Aqui:
+
+1. cada texto distinto (grupo, conta, descrição, código) é guardado uma vez (`pd.factorize`)
+2. cada termo vira uma entrada do índice invertido termo → textos distintos que o contêm,
+   calculada na primeira regra que o usa e reaproveitada pelas demais
+3. todas as regras são avaliadas juntas sobre as combinações distintas de textos (matriz densa
+   pequena combinação × regra) e expandidas para as linhas numa matriz esparsa linha × regra
+4. as bases por regra e mês saem de um único groupby sobre os pares (linha, regra)
+
+    motor = MotorRegras(df_old_long, df_novo)
+    av = motor.avaliar(regras)
+    base_jul, base_media = av.base_old(k, MESES_MEDIA_ANUAL, MES_JUL)
+    novembro = av.total_new(k)
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "apresentacao-investimentos" / "scripts"))
+from normalizacao import chave_busca  # noqa: E402
+
+
+@dataclass(frozen=True)
+class RegraCategoria:
+    categoria: str
+    old_group_contains: tuple[str, ...] = ()
+    old_conta_contains: tuple[str, ...] = ()
+    old_conta_exclude_contains: tuple[str, ...] = ()
+    new_code_prefixes: tuple[str, ...] = ()
+    new_codes: tuple[str, ...] = ()
+    new_desc_contains: tuple[str, ...] = ()
+    new_desc_exclude_contains: tuple[str, ...] = ()
+    observacao: str = ""
+
+
+class _Coluna:
+    """Textos distintos de uma coluna e o índice invertido termo → textos que o contêm."""
+
+    def __init__(self, serie: pd.Series) -> None:
+        codigos, distintos = pd.factorize(serie.astype(str), sort=False)
+        self.codigos = codigos.astype(np.int64)
+        self.textos = [str(x) for x in distintos]
+        self._contem: dict[str, np.ndarray] = {}
+        self._prefixo: dict[str, np.ndarray] = {}
+        self._igual: dict[str, np.ndarray] = {}
+
+    def _cache(self, cache: dict[str, np.ndarray], chave: str, teste) -> np.ndarray:
+        m = cache.get(chave)
+        if m is None:
+            m = cache[chave] = np.fromiter((teste(s) for s in self.textos), dtype=bool, count=len(self.textos))
+        return m
+
+    def contem(self, termo: str) -> np.ndarray:
+        t = chave_busca(termo)
+        return self._cache(self._contem, t, lambda s: t in s)
+
+    def comeca(self, prefixo: str) -> np.ndarray:
+        return self._cache(self._prefixo, prefixo, lambda s: s.startswith(prefixo))
+
+    def igual(self, valor: str) -> np.ndarray:
+        return self._cache(self._igual, valor, lambda s: s == valor)
+
+    def algum(self, termos: tuple[str, ...], teste) -> np.ndarray:
+        """OU dos testes dos termos sobre os textos distintos (sem termos: todos)."""
+        m = np.zeros(len(self.textos), dtype=bool) if termos else np.ones(len(self.textos), dtype=bool)
+        for termo in termos:
+            m |= teste(termo)
+        return m
+
+
+@dataclass
+class Pertinencia:
+    """Matriz esparsa linha × regra em coordenadas: a linha `linhas[k]` pertence à regra `regras[k]`."""
+
+    linhas: np.ndarray
+    regras: np.ndarray
+    n_linhas: int
+    n_regras: int
+
+    def linhas_da_regra(self, k: int) -> np.ndarray:
+        return self.linhas[self.regras == k]
+
+    def mascara(self, k: int) -> np.ndarray:
+        m = np.zeros(self.n_linhas, dtype=bool)
+        m[self.linhas_da_regra(k)] = True
+        return m
+
+    def contagem(self) -> np.ndarray:
+        return np.bincount(self.regras, minlength=self.n_regras)
+
+
+def _expandir(combo: np.ndarray, pert_combo: np.ndarray, n_regras: int) -> Pertinencia:
+    """De (combinação × regra) para (linha × regra): cada combinação leva todas as suas linhas."""
+    n = len(combo)
+    ci, ri = np.nonzero(pert_combo)
+    ordem = np.argsort(combo, kind="stable")
+    tamanho = np.bincount(combo, minlength=pert_combo.shape[0])
+    inicio = np.concatenate([[0], np.cumsum(tamanho)[:-1]])
+    qtd = tamanho[ci]
+    total = int(qtd.sum())
+    desloc = np.arange(total) - np.repeat(np.cumsum(qtd) - qtd, qtd)
+    linhas = ordem[np.repeat(inicio[ci], qtd) + desloc]
+    regras = np.repeat(ri, qtd)
+    # por regra e, dentro dela, na ordem original das linhas (mesma ordem de soma de um filtro por máscara)
+    o = np.lexsort((linhas, regras))
+    return Pertinencia(linhas=linhas[o], regras=regras[o].astype(np.int64), n_linhas=n, n_regras=n_regras)
+
+
+def _combinacoes(*colunas: _Coluna) -> tuple[np.ndarray, list[np.ndarray]]:
+    """Id da combinação distinta por linha e, para cada coluna, o código do texto em cada combinação."""
+    chave = np.zeros(len(colunas[0].codigos), dtype=np.int64)
+    for c in colunas:
+        chave = chave * max(len(c.textos), 1) + c.codigos
+    distintas, combo = np.unique(chave, return_inverse=True)
+    partes: list[np.ndarray] = []
+    resto = distintas
+    for c in reversed(colunas):
+        base = max(len(c.textos), 1)
+        partes.append(resto % base)
+        resto = resto // base
+    return combo.reshape(-1), partes[::-1]
+
+
+@dataclass
+class AvaliacaoRegras:
+    regras: list[RegraCategoria]
+    old: Pertinencia
+    new: Pertinencia
+    # soma do gasto do DRE antigo por regra (linhas) e mês (colunas)
+    gasto_old_mes: pd.DataFrame
+    gasto_new: pd.Series
+
+    def old_mes(self, k: int) -> pd.Series:
+        return self.gasto_old_mes.loc[k]
+
+    def base_old(self, k: int, meses_media: list[int], mes_referencia: int | None) -> tuple[float, float]:
+        """(base do mês de referência, média dos `meses_media`) do DRE antigo para a regra `k`."""
+        old_mes = self.old_mes(k)
+        base_ref = float(old_mes.get(mes_referencia, 0.0)) if mes_referencia is not None else 0.0
+        base_media = float(old_mes.reindex(meses_media, fill_value=0.0).mean())
+        return base_ref, base_media
+
+    def total_new(self, k: int) -> float:
+        return float(self.gasto_new.iloc[self.new.linhas_da_regra(k)].sum())
+
+
+class MotorRegras:
+    def __init__(self, df_old_long: pd.DataFrame, df_new: pd.DataFrame) -> None:
+        self.df_old_long = df_old_long
+        self.df_new = df_new
+        self._grupo = _Coluna(df_old_long["grupo_norm"])
+        self._conta = _Coluna(df_old_long["conta_desc_norm"])
+        self._conta_raw = _Coluna(df_old_long["conta_raw"])
+        self._old_combo, (self._oc_grupo, self._oc_conta, self._oc_raw) = _combinacoes(self._grupo, self._conta, self._conta_raw)
+        # linha "Total" do grupo não entra (dupla contagem)
+        self._nao_total = np.array([chave_busca(s) != "total" for s in self._conta_raw.textos], dtype=bool)
+
+        self._codigo = _Coluna(df_new["codigo"].astype(str))
+        self._desc = _Coluna(df_new["desc_norm"])
+        self._new_combo, (self._nc_codigo, self._nc_desc) = _combinacoes(self._codigo, self._desc)
+
+    def pertinencia_old(self, regras: list[RegraCategoria]) -> Pertinencia:
+        g, c, r = self._oc_grupo, self._oc_conta, self._oc_raw
+        m = np.empty((len(g), len(regras)), dtype=bool)
+        for k, regra in enumerate(regras):
+            grupo = self._grupo.algum(regra.old_group_contains, self._grupo.contem)
+            conta = self._conta.algum(regra.old_conta_contains, self._conta.contem)
+            excl = self._conta.algum(regra.old_conta_exclude_contains, self._conta.contem) & bool(regra.old_conta_exclude_contains)
+            m[:, k] = self._nao_total[r] & grupo[g] & conta[c] & ~excl[c]
+        return _expandir(self._old_combo, m, len(regras))
+
+    def pertinencia_new(self, regras: list[RegraCategoria]) -> Pertinencia:
+        cod, desc = self._nc_codigo, self._nc_desc
+        m = np.ones((len(cod), len(regras)), dtype=bool)
+        for k, regra in enumerate(regras):
+            prefixos = tuple(p for p in (str(p).strip() for p in regra.new_code_prefixes) if p)
+            if regra.new_code_prefixes:
+                m[:, k] &= self._codigo.algum(prefixos, self._codigo.comeca)[cod]
+            if regra.new_codes:
+                m[:, k] &= self._codigo.algum(tuple(str(x).strip() for x in regra.new_codes), self._codigo.igual)[cod]
+            if regra.new_desc_contains:
+                m[:, k] &= self._desc.algum(regra.new_desc_contains, self._desc.contem)[desc]
+            if regra.new_desc_exclude_contains:
+                m[:, k] &= ~self._desc.algum(regra.new_desc_exclude_contains, self._desc.contem)[desc]
+        return _expandir(self._new_combo, m, len(regras))
+
+    def avaliar(self, regras: list[RegraCategoria]) -> AvaliacaoRegras:
+        """Todas as regras de uma vez, nos dois planos; bases do DRE antigo num único groupby (regra, mês)."""
+        old = self.pertinencia_old(regras)
+        new = self.pertinencia_new(regras)
+        pares = pd.DataFrame(
+            {
+                "regra": old.regras,
+                "mes": self.df_old_long["mes"].to_numpy()[old.linhas],
+                "gasto": self.df_old_long["gasto"].to_numpy()[old.linhas],
+            }
+        )
+        gasto_old_mes = pares.groupby(["regra", "mes"])["gasto"].sum().unstack(fill_value=0.0)
+        gasto_old_mes = gasto_old_mes.reindex(range(len(regras)), fill_value=0.0)
+        return AvaliacaoRegras(
+            regras=list(regras),
+            old=old,
+            new=new,
+            gasto_old_mes=gasto_old_mes,
+            gasto_new=self.df_new["gasto_nov"].reset_index(drop=True),
+        )
@@ -2,37 +2,66 @@
 Análise de recorrência (recorrente vs não recorrente) a partir de:
 - Movimentos financeiros (extrato consolidado)
 - Base complementar de contas a pagar (para sinalizar recorrência e projeção)
+- Contas a receber pendentes (previsão de caixa)
 
 Gera um relatório Markdown com:
 - Visão geral (entradas/saídas)
 - Recorrentes (fixos e variáveis) + projeção mensal
+- Previsão de caixa por banco (faixas de saldo por cenários, `previsao_caixa.py`)
+- Conciliação das baixas do contas a pagar com os movimentos (`conciliacao.py`)
 - Não recorrentes / extraordinários
 - Alertas de valores fora do padrão e dados faltantes
 """
 
 from __future__ import annotations
 
+import argparse
 import csv
-import math
-import io
-import difflib
+import itertools
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from cache_parse import CacheParse
+from conciliacao import conciliar_baixas, escrever_csv_conciliacao
+from cubo_contas import DIMENSOES_ABERTO, CuboEsparso
+from estado_recorrencia import TOP_POR_GRUPO, EstadoRecorrencia, ItemTop, chaves_movimentos
+from indice_nomes import IndiceNomes
+from instrumentacao import Perfil, adicionar_argumentos, finalizar, perfil_dos_argumentos
+from quantis import TopK
+from leitor_csv import ler_linhas_csv, ler_lotes_csv
+from normalizacao import ascii_upper, colapsar_espacos, memoizar, resumo_cache
+from pacotes_dashboard import escrever_pacotes, gerar_pacotes
+from outliers_robustos import bases_historicas, detectar_outliers, escrever_csv_outliers, outliers_do_estado
+from palavras_chave import AutomatoPalavras
+from periodicidade import periodicidade_do_estado
+from previsao_caixa import ConfigPrevisao, carregar_saldos_iniciais, escrever_csv_previsao, simular_caixa
+from quase_duplicidades import detectar_quase_duplicidades, escrever_csv_quase_duplicidades
 
 ROOT = Path(__file__).resolve().parents[1]
 MOVIMENTOS_CSV = ROOT / "public" / "dados" / "movimentos.csv"
 CONTAS_PAGAR_CSV = ROOT / "public" / "dados" / "contasPagar_cons.csv"
+CONTAS_RECEBER_CSV = ROOT.parent / "CONTAS A RECEBER" / "Contas a receber2.csv"
 OUT_MD = ROOT / "ANALISE_RECORRENCIA.md"
 OUT_CLASSIFICACAO_CSV = ROOT / "public" / "dados" / "movimentos_classificados.csv"
 OUT_PESSOAS_MD = ROOT / "ANALISE_PESSOAS_RESCISOES.md"
 OUT_PESSOAS_CSV = ROOT / "public" / "dados" / "pessoas_rescisao_fgts.csv"
+OUT_PACOTES_DIR = ROOT / "public" / "dados" / "pacotes"
+OUT_QUASE_DUPLICIDADES_CSV = ROOT / "public" / "dados" / "quase_duplicidades.csv"
+OUT_OUTLIERS_CSV = ROOT / "public" / "dados" / "outliers.csv"
+OUT_PREVISAO_CAIXA_CSV = ROOT / "public" / "dados" / "previsao_caixa.csv"
+OUT_CONCILIACAO_CSV = ROOT / "public" / "dados" / "conciliacao.csv"
+CACHE_PARSE_DIR = ROOT / ".cache" / "parse"
 
 # Categorias especiais (IDs) para separar fluxo de caixa de custo operacional
 CAT_TRANSFERENCIA_INTERNA = 6
 CAT_IMPLANTACAO_SALDO = 5
 EXCLUIR_CATEGORIAS_CUSTO = {CAT_TRANSFERENCIA_INTERNA, CAT_IMPLANTACAO_SALDO}
+# Categorias de RH com pessoa física: FGTS Rescisão, Salários Rescisão e Ações Trabalhistas
+CATEGORIAS_PESSOA = (87, 88, 94)
 
 # Heurística de extraordinário (tende a não se repetir em regime normal)
 EXTRA_KEYWORDS = [
@@ -90,16 +119,13 @@ GENERIC_TOKENS = {
     "COLETIVO",
 }
 
-
-def _try_read_text(path: Path, encodings: List[str]) -> str:
-    data = path.read_bytes()
-    last_err: Optional[Exception] = None
-    for enc in encodings:
-        try:
-            return data.decode(enc)
-        except Exception as e:
-            last_err = e
-    raise RuntimeError(f"Falha ao ler {path} com encodings {encodings}: {last_err}")
+# Autômatos (Aho-Corasick): uma varredura por texto, qualquer que seja o número de palavras-chave
+PALAVRAS_EXTRA = AutomatoPalavras({"extra": EXTRA_KEYWORDS}, ignorar_caixa=True, nome="palavras_extra")
+PALAVRAS_PESSOA = AutomatoPalavras(
+    {"generico": GENERIC_TOKENS, "pj": PJ_TOKENS},
+    palavra_inteira=("generico", "pj"),
+    nome="palavras_pessoa",
+)
 
 
 def br_to_float(s: str) -> float:
@@ -116,6 +142,11 @@ def br_to_float(s: str) -> float:
         return 0.0
 
 
+def br_to_cents(s: str) -> int:
+    """Converte número pt-BR '1.234,56' -> 123456 (centavos); vazios -> 0"""
+    return int(round(br_to_float(s) * 100))
+
+
 def parse_date_ddmmyyyy(s: str) -> Optional[datetime]:
     s = (s or "").strip()
     if not s:
@@ -132,14 +163,11 @@ def month_key(dt: datetime) -> str:
 
 
 def normalize_text(s: str) -> str:
-    if s is None:
-        return ""
-    s = str(s).strip()
-    # Remove duplicidades de espaços e padroniza
-    s = " ".join(s.split())
-    return s
+    # Remove duplicidades de espaços e padroniza (memoizado em `normalizacao`)
+    return colapsar_espacos(s)
 
 
+@memoizar()
 def strip_codigo_prefixo(s: str) -> str:
     """
     Remove prefixos tipo '9090 - FORNECEDOR' -> 'FORNECEDOR'
@@ -155,6 +183,28 @@ def strip_codigo_prefixo(s: str) -> str:
     return s
 
 
+@memoizar()
+def _categoria_id(raw: str) -> int:
+    raw = normalize_text(raw)
+    if not raw:
+        return 0
+    # "87 - FGTS Rescisao"
+    try:
+        return int(raw.split(" ", 1)[0])
+    except Exception:
+        return 0
+
+
+@memoizar()
+def _categoria_nome(raw: str) -> str:
+    raw = normalize_text(raw)
+    if not raw:
+        return "Sem Categoria"
+    if " - " in raw:
+        return raw.split(" - ", 1)[1].strip()
+    return raw
+
+
 @dataclass(frozen=True)
 class Movimento:
     id: str
@@ -171,23 +221,11 @@ class Movimento:
 
     @property
     def categoria_id(self) -> int:
-        raw = normalize_text(self.categoria_raw)
-        if not raw:
-            return 0
-        # "87 - FGTS Rescisao"
-        try:
-            return int(raw.split(" ", 1)[0])
-        except Exception:
-            return 0
+        return _categoria_id(self.categoria_raw)
 
     @property
     def categoria_nome(self) -> str:
-        raw = normalize_text(self.categoria_raw)
-        if not raw:
-            return "Sem Categoria"
-        if " - " in raw:
-            return raw.split(" - ", 1)[1].strip()
-        return raw
+        return _categoria_nome(self.categoria_raw)
 
     @property
     def fornecedor(self) -> str:
@@ -229,22 +267,16 @@ class ContaPagar:
 
     @property
     def categoria_id(self) -> int:
-        raw = normalize_text(self.categoria_raw)
-        if not raw:
-            return 0
-        try:
-            return int(raw.split(" ", 1)[0])
-        except Exception:
-            return 0
+        return _categoria_id(self.categoria_raw)
 
     @property
     def categoria_nome(self) -> str:
-        raw = normalize_text(self.categoria_raw)
-        if not raw:
-            return "Sem Categoria"
-        if " - " in raw:
-            return raw.split(" - ", 1)[1].strip()
-        return raw
+        return _categoria_nome(self.categoria_raw)
+
+    @property
+    def entidade(self) -> str:
+        """Entidade pela mesma regra da recorrência dos movimentos (`entidade_chave_recorrencia`)."""
+        return _entidade_chave(self.fornecedor, self.titulo, self.categoria_id)
 
     @property
     def mes_vencimento(self) -> str:
@@ -253,62 +285,333 @@ class ContaPagar:
         return month_key(self.vencimento)
 
 
-def ler_movimentos(path: Path) -> List[Movimento]:
-    text = _try_read_text(path, ["utf-8-sig", "cp1252", "latin-1"])
-    # csv.reader lida melhor com campos vazios
-    rows: List[List[str]] = []
-    for line in text.splitlines():
-        if not line.strip():
-            continue
-        rows.append(line.split(";"))
+@dataclass(frozen=True)
+class ContaReceber:
+    documento: str
+    pagador: str
+    emissao: Optional[datetime]
+    vencimento: Optional[datetime]
+    valor: float
+    status: str
 
-    movimentos: List[Movimento] = []
-    for parts in rows:
-        # Esperado: 11 ou 12 colunas
-        if len(parts) < 11:
-            continue
-        _id = normalize_text(parts[0])
-        dt = parse_date_ddmmyyyy(parts[1])
-        if not _id or dt is None:
-            continue
-        tipo = normalize_text(parts[3])
-        credito = br_to_float(parts[4])
-        debito = br_to_float(parts[5])
-        banco = normalize_text(parts[6])
-        documento = normalize_text(parts[7])
-        parcela = normalize_text(parts[8])
-        categoria = normalize_text(parts[9])
-        historico = normalize_text(parts[10])
-        fornecedor = normalize_text(parts[11]) if len(parts) >= 12 else ""
-
-        movimentos.append(
-            Movimento(
-                id=_id,
-                data=dt,
-                tipo=tipo,
-                credito=credito,
-                debito=debito,
-                banco=banco,
-                documento=documento,
-                parcela=parcela,
-                categoria_raw=categoria,
-                historico=historico,
-                fornecedor_raw=fornecedor,
+
+@memoizar()
+def _entidade_chave(fornecedor: str, historico: str, categoria_id: int) -> str:
+    """Mesma regra de `entidade_chave_recorrencia`, a partir dos campos já normalizados."""
+    if fornecedor:
+        return fornecedor
+    # Folha/salários: tratar como bloco
+    if categoria_id == 24:
+        return "Folha (Salários)"
+    return normalize_text(historico) or "Sem descrição"
+
+
+def _to_datetime(d: np.datetime64) -> datetime:
+    return datetime.combine(d.astype("datetime64[D]").item(), datetime.min.time())
+
+
+def _fmt_data_br(d: np.datetime64) -> str:
+    iso = str(d.astype("datetime64[D]"))
+    return f"{iso[8:10]}/{iso[5:7]}/{iso[0:4]}"
+
+
+class _Internador:
+    """Atribui um código inteiro a cada texto distinto (ordem de primeira ocorrência)."""
+
+    def __init__(self, textos: Optional[List[str]] = None) -> None:
+        self.textos: List[str] = textos if textos is not None else []
+        self.codigos: Dict[str, int] = {t: i for i, t in enumerate(self.textos)}
+
+    def codigo(self, s: str) -> int:
+        c = self.codigos.get(s)
+        if c is None:
+            c = len(self.textos)
+            self.codigos[s] = c
+            self.textos.append(s)
+        return c
+
+    def derivar(self, codes: np.ndarray, fn) -> np.ndarray:
+        """Aplica `fn` uma vez por texto distinto de `codes` e devolve os códigos do resultado."""
+        uniq, inv = np.unique(codes, return_inverse=True)
+        mapped = np.array([self.codigo(fn(self.textos[c])) for c in uniq], dtype=np.int32)
+        return mapped[inv.reshape(-1)] if len(uniq) else np.zeros(0, dtype=np.int32)
+
+
+class MovimentoTable:
+    """
+    Movimentos em formato colunar (arrays NumPy), ordenados por data.
+
+    Cada coluna é parseada uma única vez:
+    - valores em centavos (int64), datas em datetime64[D] e mês em datetime64[M]
+    - textos internados: as colunas guardam códigos int32 que indexam `textos`
+    - colunas derivadas (categoria_id, categoria_nome, fornecedor, entidade) calculadas
+      uma vez por texto distinto, não por linha/acesso; `pessoa` idem, só nas categorias de RH e na primeira consulta
+
+    `movimento(i)` materializa a linha como `Movimento` quando o relatório precisa do objeto.
+    """
+
+    COLUNAS_TEXTO = ("tipo", "banco", "documento", "parcela", "categoria_raw", "historico", "fornecedor_raw")
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        data: np.ndarray,
+        credito: np.ndarray,
+        debito: np.ndarray,
+        textos: List[str],
+        colunas: Dict[str, np.ndarray],
+    ) -> None:
+        self.ids = ids
+        self.data = data
+        self.credito = credito
+        self.debito = debito
+        self.textos = textos
+        self.tipo = colunas["tipo"]
+        self.banco = colunas["banco"]
+        self.documento = colunas["documento"]
+        self.parcela = colunas["parcela"]
+        self.categoria_raw = colunas["categoria_raw"]
+        self.historico = colunas["historico"]
+        self.fornecedor_raw = colunas["fornecedor_raw"]
+        # textos vindos do parse; os derivados entram depois no mesmo vocabulário
+        self._n_textos_parse = len(textos)
+        self._pessoa: Optional[np.ndarray] = None
+        self._derivar_colunas()
+
+    def _derivar_colunas(self) -> None:
+        # Textos derivados entram no mesmo vocabulário da tabela
+        intern = self._intern = _Internador(self.textos)
+
+        uniq, inv = np.unique(self.categoria_raw, return_inverse=True)
+        ids_cat = np.array([_categoria_id(self.textos[c]) for c in uniq], dtype=np.int32)
+        self.categoria_id = ids_cat[inv.reshape(-1)] if len(uniq) else np.zeros(0, dtype=np.int32)
+        self.categoria_nome = intern.derivar(self.categoria_raw, _categoria_nome)
+        self.fornecedor = intern.derivar(self.fornecedor_raw, strip_codigo_prefixo)
+
+        # entidade depende de (fornecedor, histórico, categoria_id): calcula por combinação distinta
+        self.entidade = self._por_combinacao(self.fornecedor, self.historico, _entidade_chave)
+        self.mes = self.data.astype("datetime64[M]")
+
+    def _por_combinacao(
+        self,
+        a: np.ndarray,
+        b: np.ndarray,
+        fn: Callable[[str, str, int], str],
+        categoria_id: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Aplica `fn(texto_a, texto_b, categoria_id)` uma vez por combinação distinta e devolve os códigos do resultado."""
+        if categoria_id is None:
+            categoria_id = self.categoria_id
+        if not len(a):
+            return np.zeros(0, dtype=np.int32)
+        # combinações distintas com chaves int64 empacotadas: (a, b) e depois + categoria_id
+        pares, inv_ab = np.unique(_chave_par(a, b), return_inverse=True)
+        combos = (inv_ab.reshape(-1).astype(np.int64) << 32) | categoria_id.astype(np.uint32).astype(np.int64)
+        uniq_c, inv_c = np.unique(combos, return_inverse=True)
+        ab = pares[uniq_c >> 32]
+        cats = (uniq_c & 0xFFFFFFFF).astype(np.uint32).view(np.int32)
+        codigos = np.array(
+            [
+                self._intern.codigo(fn(self.textos[x], self.textos[y], c))
+                for x, y, c in zip((ab >> 32).tolist(), (ab & 0xFFFFFFFF).tolist(), cats.tolist())
+            ],
+            dtype=np.int32,
+        )
+        return codigos[inv_c.reshape(-1)]
+
+    @property
+    def pessoa(self) -> np.ndarray:
+        """
+        Pessoa física de cada linha (`extrair_pessoa`) como código em `textos`; "" quando não há.
+        Só as linhas de `CATEGORIAS_PESSOA` são consultadas (as demais ficam com ""), uma vez por
+        (fornecedor_raw, histórico, categoria_id) distinto, na primeira consulta.
+        """
+        if self._pessoa is None:
+            pessoa = np.full(len(self.ids), self._intern.codigo(""), dtype=np.int32)
+            linhas = np.flatnonzero(np.isin(self.categoria_id, CATEGORIAS_PESSOA))
+            pessoa[linhas] = self._por_combinacao(
+                self.fornecedor_raw[linhas],
+                self.historico[linhas],
+                lambda f, h, c: extrair_pessoa(f, h, c) or "",
+                self.categoria_id[linhas],
             )
+            self._pessoa = pessoa
+        return self._pessoa
+
+    @classmethod
+    def from_lotes(cls, lotes: Iterable[List[List[str]]]) -> "MovimentoTable":
+        """
+        Monta a tabela a partir de lotes de linhas já separadas em colunas (layout do extrato consolidado).
+        Cada lote vira arrays NumPy na hora, então só o lote corrente fica em listas Python.
+        """
+        intern = _Internador()
+        pedacos: Dict[str, List[np.ndarray]] = {c: [] for c in ("ids", "data", "credito", "debito", *cls.COLUNAS_TEXTO)}
+
+        for lote in lotes:
+            ids: List[str] = []
+            datas: List[datetime] = []
+            creditos: List[int] = []
+            debitos: List[int] = []
+            cols: Dict[str, List[int]] = {c: [] for c in cls.COLUNAS_TEXTO}
+            for parts in lote:
+                # Esperado: 11 ou 12 colunas
+                if len(parts) < 11:
+                    continue
+                _id = normalize_text(parts[0])
+                dt = parse_date_ddmmyyyy(parts[1])
+                if not _id or dt is None:
+                    continue
+                ids.append(_id)
+                datas.append(dt)
+                creditos.append(br_to_cents(parts[4]))
+                debitos.append(br_to_cents(parts[5]))
+                cols["tipo"].append(intern.codigo(normalize_text(parts[3])))
+                cols["banco"].append(intern.codigo(normalize_text(parts[6])))
+                cols["documento"].append(intern.codigo(normalize_text(parts[7])))
+                cols["parcela"].append(intern.codigo(normalize_text(parts[8])))
+                cols["categoria_raw"].append(intern.codigo(normalize_text(parts[9])))
+                cols["historico"].append(intern.codigo(normalize_text(parts[10])))
+                cols["fornecedor_raw"].append(intern.codigo(normalize_text(parts[11]) if len(parts) >= 12 else ""))
+
+            pedacos["ids"].append(np.array(ids, dtype=str))
+            pedacos["data"].append(np.array(datas, dtype="datetime64[D]"))
+            pedacos["credito"].append(np.array(creditos, dtype=np.int64))
+            pedacos["debito"].append(np.array(debitos, dtype=np.int64))
+            for c, v in cols.items():
+                pedacos[c].append(np.array(v, dtype=np.int32))
+
+        def juntar(c: str, dtype: Any) -> np.ndarray:
+            return np.concatenate(pedacos[c]) if pedacos[c] else np.zeros(0, dtype=dtype)
+
+        data = juntar("data", "datetime64[D]")
+        # Ordenação estável por data (mesma ordem do antigo `movimentos.sort(key=data)`)
+        ordem = np.argsort(data, kind="stable")
+        return cls(
+            ids=juntar("ids", str)[ordem],
+            data=data[ordem],
+            credito=juntar("credito", np.int64)[ordem],
+            debito=juntar("debito", np.int64)[ordem],
+            textos=intern.textos,
+            colunas={c: juntar(c, np.int32)[ordem] for c in cls.COLUNAS_TEXTO},
+        )
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[List[str]]) -> "MovimentoTable":
+        return cls.from_lotes([list(rows)])
+
+    @classmethod
+    def from_colunas(cls, textos: List[str], colunas: Dict[str, np.ndarray]) -> "MovimentoTable":
+        """Monta a tabela a partir de `colunas_parseadas()` (ex.: colunas mapeadas do cache de parse)."""
+        return cls(
+            ids=colunas["ids"],
+            data=colunas["data"],
+            credito=colunas["credito"],
+            debito=colunas["debito"],
+            textos=list(textos),
+            colunas={c: colunas[c] for c in cls.COLUNAS_TEXTO},
         )
 
-    movimentos.sort(key=lambda m: m.data)
-    return movimentos
+    def colunas_parseadas(self) -> Tuple[List[str], Dict[str, np.ndarray]]:
+        """Vocabulário e colunas do parse (sem as derivadas, que são recalculadas ao montar a tabela)."""
+        colunas = {"ids": self.ids, "data": self.data, "credito": self.credito, "debito": self.debito}
+        colunas.update({c: getattr(self, c) for c in self.COLUNAS_TEXTO})
+        return self.textos[: self._n_textos_parse], colunas
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def is_saida(self) -> np.ndarray:
+        return self.debito > 0
+
+    @property
+    def is_entrada(self) -> np.ndarray:
+        return self.credito > 0
+
+    def texto(self, coluna: np.ndarray, i: int) -> str:
+        return self.textos[int(coluna[i])]
+
+    def mes_str(self, i: int) -> str:
+        return str(self.mes[i])
+
+    def movimento(self, i: int) -> Movimento:
+        return Movimento(
+            id=str(self.ids[i]),
+            data=_to_datetime(self.data[i]),
+            tipo=self.texto(self.tipo, i),
+            credito=int(self.credito[i]) / 100,
+            debito=int(self.debito[i]) / 100,
+            banco=self.texto(self.banco, i),
+            documento=self.texto(self.documento, i),
+            parcela=self.texto(self.parcela, i),
+            categoria_raw=self.texto(self.categoria_raw, i),
+            historico=self.texto(self.historico, i),
+            fornecedor_raw=self.texto(self.fornecedor_raw, i),
+        )
+
+    def __iter__(self) -> Iterator[Movimento]:
+        for i in range(len(self)):
+            yield self.movimento(i)
+
+
+def ler_movimentos(path: Path, cache: Optional[CacheParse] = None) -> MovimentoTable:
+    if cache is not None:
+        salvo = cache.carregar(path, "movimentos")
+        if salvo is not None:
+            return MovimentoTable.from_colunas(*salvo)
+    t = MovimentoTable.from_lotes(ler_lotes_csv(path, delimiter=";"))
+    if cache is not None:
+        cache.salvar(path, "movimentos", *t.colunas_parseadas())
+    return t
+
+
+CONTAS_COLUNAS_TEXTO = ("codigo", "titulo", "fornecedor_raw", "status", "banco", "flag", "categoria_raw", "observacao", "origem")
+CONTAS_COLUNAS_DATA = ("emissao", "vencimento", "data_baixa")
+
+
+def _contas_para_colunas(contas: List[ContaPagar]) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    intern = _Internador()
+    colunas: Dict[str, np.ndarray] = {}
+    for c in CONTAS_COLUNAS_TEXTO:
+        colunas[c] = np.array([intern.codigo(getattr(x, c)) for x in contas], dtype=np.int32)
+    for c in CONTAS_COLUNAS_DATA:
+        colunas[c] = np.array([getattr(x, c) or "NaT" for x in contas], dtype="datetime64[D]")
+    colunas["valor"] = np.array([x.valor for x in contas], dtype=np.float64)
+    colunas["saldo_aberto"] = np.array([x.saldo_aberto for x in contas], dtype=np.float64)
+    return intern.textos, colunas
+
+
+def _contas_de_colunas(textos: List[str], colunas: Dict[str, np.ndarray]) -> List[ContaPagar]:
+    txt = {c: [textos[i] for i in colunas[c].tolist()] for c in CONTAS_COLUNAS_TEXTO}
+    datas = {c: [None if np.isnat(d) else _to_datetime(d) for d in colunas[c]] for c in CONTAS_COLUNAS_DATA}
+    valores = colunas["valor"].tolist()
+    saldos = colunas["saldo_aberto"].tolist()
+    return [
+        ContaPagar(
+            **{c: txt[c][i] for c in CONTAS_COLUNAS_TEXTO},
+            **{c: datas[c][i] for c in CONTAS_COLUNAS_DATA},
+            valor=valores[i],
+            saldo_aberto=saldos[i],
+        )
+        for i in range(len(valores))
+    ]
+
+
+def ler_contas_pagar(path: Path, cache: Optional[CacheParse] = None) -> List[ContaPagar]:
+    if cache is not None:
+        salvo = cache.carregar(path, "contas")
+        if salvo is not None:
+            return _contas_de_colunas(*salvo)
+    contas = _ler_contas_pagar_csv(path)
+    if cache is not None:
+        cache.salvar(path, "contas", *_contas_para_colunas(contas))
+    return contas
 
 
-def ler_contas_pagar(path: Path) -> List[ContaPagar]:
-    text = _try_read_text(path, ["utf-8-sig", "cp1252", "latin-1"])
-    # Usar csv.reader para respeitar aspas e quebras de linha em campos
+def _ler_contas_pagar_csv(path: Path) -> List[ContaPagar]:
+    # O leitor em streaming usa csv.reader: respeita aspas e quebras de linha em campos
     contas: List[ContaPagar] = []
-    reader = csv.reader(io.StringIO(text), delimiter=";", quotechar='"')
-    for parts in reader:
-        if not parts:
-            continue
+    for parts in ler_linhas_csv(path, delimiter=";"):
         # Heurística de colunas: em geral >= 15
         if len(parts) < 12:
             continue
@@ -351,20 +654,30 @@ def ler_contas_pagar(path: Path) -> List[ContaPagar]:
     return contas
 
 
-def quantile(sorted_vals: List[float], q: float) -> float:
-    if not sorted_vals:
-        return 0.0
-    if q <= 0:
-        return sorted_vals[0]
-    if q >= 1:
-        return sorted_vals[-1]
-    pos = (len(sorted_vals) - 1) * q
-    lo = int(math.floor(pos))
-    hi = int(math.ceil(pos))
-    if lo == hi:
-        return sorted_vals[lo]
-    frac = pos - lo
-    return sorted_vals[lo] * (1 - frac) + sorted_vals[hi] * frac
+def ler_contas_receber(path: Path) -> List[ContaReceber]:
+    """
+    Títulos a receber (`Nº Documento;Nome Pagador;Codigo pagador;Emissão;Vencimento;Valor Doc.;CHAVE;situação`).
+    Linhas sem vencimento ou sem valor (cabeçalho, totais, `#N/D`) são ignoradas.
+    """
+    titulos: List[ContaReceber] = []
+    for parts in ler_linhas_csv(path, delimiter=";"):
+        if len(parts) < 6:
+            continue
+        venc = parse_date_ddmmyyyy(parts[4])
+        valor = br_to_float(parts[5])
+        if venc is None or valor <= 0:
+            continue
+        titulos.append(
+            ContaReceber(
+                documento=normalize_text(parts[0]),
+                pagador=normalize_text(parts[1]),
+                emissao=parse_date_ddmmyyyy(parts[3]),
+                vencimento=venc,
+                valor=valor,
+                status=normalize_text(parts[7]) if len(parts) > 7 else "",
+            )
+        )
+    return titulos
 
 
 def money(v: float) -> str:
@@ -396,45 +709,20 @@ def entidade_chave_recorrencia(m: Movimento) -> str:
     Normaliza a entidade usada para recorrência.
     Objetivo: reduzir ruído (ex.: salários por pessoa) e focar em custo recorrente.
     """
-    if m.fornecedor:
-        return m.fornecedor
-    h = normalize_text(m.historico)
-    # Folha/salários: tratar como bloco
-    if m.categoria_id == 24:
-        return "Folha (Salários)"
-    return h or "Sem descrição"
-
-
-def categoria_breakdown_por_mes(itens: Iterable[Movimento]) -> Dict[str, float]:
-    out: Dict[str, float] = {}
-    for m in itens:
-        out[m.mes] = out.get(m.mes, 0.0) + m.debito
-    return dict(sorted(out.items()))
+    return _entidade_chave(m.fornecedor, m.historico, m.categoria_id)
 
 
 def is_extraordinario(cat: str, ent: str, desc: str = "") -> bool:
-    c = (cat or "").lower()
-    e = (ent or "").lower()
-    d = (desc or "").lower()
-    return any(k in c for k in EXTRA_KEYWORDS) or any(k in e for k in EXTRA_KEYWORDS) or any(k in d for k in EXTRA_KEYWORDS)
+    # cada campo é verificado separadamente (uma palavra-chave não pode "atravessar" dois campos)
+    return any(PALAVRAS_EXTRA.familias(t or "") for t in (cat, ent, desc))
 
 
 def _norm_ascii_upper(s: str) -> str:
-    s = (s or "").strip()
-    if not s:
-        return ""
-    # remove acentos via NFD
-    try:
-        import unicodedata
-
-        s = unicodedata.normalize("NFD", s)
-        s = "".join(ch for ch in s if unicodedata.category(ch) != "Mn")
-    except Exception:
-        pass
-    s = " ".join(s.split())
-    return s.upper()
+    # sem acentos (NFD), espaços colapsados e maiúsculas; memoizado em `normalizacao`
+    return ascii_upper(s)
 
 
+@memoizar()
 def is_nome_pessoa(nome: str) -> bool:
     """
     Heurística simples para diferenciar pessoa física de pessoa jurídica.
@@ -449,11 +737,8 @@ def is_nome_pessoa(nome: str) -> bool:
     # precisa ter pelo menos 2 palavras (nome + sobrenome)
     if len(n.split()) < 2:
         return False
-    # se tem tokens típicos de PJ, tratamos como não-pessoa
-    tokens = set(n.replace(".", " ").replace("/", " ").split())
-    if tokens.intersection(GENERIC_TOKENS):
-        return False
-    if tokens.intersection(PJ_TOKENS):
+    # se tem tokens típicos de PJ (ou genéricos), tratamos como não-pessoa
+    if PALAVRAS_PESSOA.familias(n.replace(".", " ").replace("/", " ")):
         return False
     # evita genéricos
     if n in {"MACLINEA MAQUINAS E EQUIPAMENTOS LTDA", "MACLINEA"}:
@@ -461,6 +746,7 @@ def is_nome_pessoa(nome: str) -> bool:
     return True
 
 
+@memoizar()
 def canonicalizar_pessoa(nome: str) -> str:
     """
     Normaliza para chave de agrupamento (mantém maiúsculas e remove excesso de espaços).
@@ -491,12 +777,18 @@ def extrair_pessoa_do_movimento(m: Movimento) -> Optional[str]:
     - Fornecedor (quando é pessoa física)
     - Histórico padronizado (Pagto/Salário/FGTS Nome)
     """
+    return extrair_pessoa(m.fornecedor_raw, m.historico, m.categoria_id)
+
+
+@memoizar()
+def extrair_pessoa(fornecedor_raw: str, historico: str, categoria_id: int) -> Optional[str]:
+    """Mesma regra de `extrair_pessoa_do_movimento`, a partir dos campos do movimento."""
     # 1) fornecedor
-    forn = strip_codigo_prefixo(m.fornecedor_raw)
+    forn = strip_codigo_prefixo(fornecedor_raw)
     if forn and is_nome_pessoa(forn):
         return canonicalizar_pessoa(forn)
 
-    h = normalize_text(m.historico)
+    h = normalize_text(historico)
     if not h:
         return None
 
@@ -526,14 +818,14 @@ def extrair_pessoa_do_movimento(m: Movimento) -> Optional[str]:
         return cand if is_nome_pessoa(cand) else None
 
     # 3) fallback: se categoria é rescisão e o texto parece pessoa
-    if m.categoria_id in (87, 88, 94):
+    if categoria_id in CATEGORIAS_PESSOA:
         cand = canonicalizar_pessoa(h)
         return cand if is_nome_pessoa(cand) else None
 
     return None
 
 
-def analisar_pessoas_rescisoes(movs: List[Movimento]) -> Dict[str, Any]:
+def analisar_pessoas_rescisoes(movs: MovimentoTable) -> Dict[str, Any]:
     """
     Junta por pessoa os pagamentos ligados a:
     - Salários Rescisão (88)
@@ -551,40 +843,40 @@ def analisar_pessoas_rescisoes(movs: List[Movimento]) -> Dict[str, Any]:
     # Estrutura por pessoa
     people: Dict[str, Dict[str, Any]] = {}
 
-    # Base de pessoas detectadas em Salários Rescisão (para reconciliar nomes incompletos em FGTS)
-    base_salarios: List[str] = []
-    for m in movs:
-        if not m.is_saida or m.categoria_id != SAL_RES:
-            continue
-        p = extrair_pessoa_do_movimento(m)
-        if p and is_nome_pessoa(p):
-            base_salarios.append(p)
-    base_salarios = sorted(set(base_salarios))
+    t = movs
+    saidas = t.is_saida
+    # pessoa por linha: extraída uma vez por combinação distinta e guardada na tabela
+    pessoa_col = t.pessoa
 
-    def match_por_token(token: str) -> Optional[str]:
-        """
-        Quando o FGTS vem apenas com um primeiro nome/apelido,
-        tentamos casar com algum token de pessoas já vistas em rescisões.
-        """
-        t = _norm_ascii_upper(token)
-        if not t or any(ch.isdigit() for ch in t):
-            return None
-        best = None
-        best_score = 0.0
-        second = 0.0
-        for nome in base_salarios:
-            tokens = [_norm_ascii_upper(x) for x in nome.split() if x]
-            score_nome = max((difflib.SequenceMatcher(None, t, tk).ratio() for tk in tokens), default=0.0)
-            if score_nome > best_score:
-                second = best_score
-                best_score = score_nome
-                best = nome
-            elif score_nome > second:
-                second = score_nome
-        # thresholds: precisa ser bem próximo e não ambíguo
-        if best and best_score >= 0.86 and (best_score - second) >= 0.05:
-            return best
-        return None
+    # Base de pessoas detectadas em Salários Rescisão (para reconciliar nomes incompletos em FGTS)
+    cods = np.unique(pessoa_col[saidas & (t.categoria_id == SAL_RES)]).tolist()
+    base_salarios = sorted({t.textos[c] for c in cods if t.textos[c] and is_nome_pessoa(t.textos[c])})
+
+    # Quando o FGTS vem apenas com um primeiro nome/apelido, tentamos casar com algum
+    # token de pessoas já vistas em rescisões (índice montado uma vez por análise).
+    indice_salarios = IndiceNomes(base_salarios, normalizar=_norm_ascii_upper, limiar=0.86, margem=0.05)
+
+    # FGTS Rescisão sem pessoa na extração: fallback por histórico distinto
+    fgts_por_historico: Dict[int, Optional[str]] = {}
+
+    def pessoa_fgts_generico(h_cod: int) -> Optional[str]:
+        if h_cod in fgts_por_historico:
+            return fgts_por_historico[h_cod]
+        pessoa: Optional[str] = None
+        # tenta um último fallback: "FGTS Rescisão Valdonir" (sem prefixo FGTS)
+        # ou textos como "FGTS Rescisão Valdonir" que passaram por normalização.
+        h = normalize_text(t.textos[h_cod])
+        hup = _norm_ascii_upper(h)
+        if hup.startswith("FGTS RESCISAO ") or hup.startswith("FGTS RESCISÃO "):
+            cand = h.split(" ", 2)[2] if len(h.split()) >= 3 else ""
+            cand = canonicalizar_pessoa(cand)
+            if cand and is_nome_pessoa(cand):
+                pessoa = cand
+            elif cand and len(cand.split()) == 1:
+                # tenta casar pelo token com base de rescisões
+                pessoa = indice_salarios.casar(cand) or None
+        fgts_por_historico[h_cod] = pessoa
+        return pessoa
 
     def ensure(p: str) -> Dict[str, Any]:
         if p not in people:
@@ -605,59 +897,40 @@ def analisar_pessoas_rescisoes(movs: List[Movimento]) -> Dict[str, Any]:
             }
         return people[p]
 
-    for m in movs:
-        if not m.is_saida:
-            continue
-        if m.categoria_id not in (SAL_RES, FGTS_RES, ACOES):
-            continue
+    for i in np.flatnonzero(saidas & np.isin(t.categoria_id, [SAL_RES, FGTS_RES, ACOES])):
+        categoria_id = int(t.categoria_id[i])
+        debito = int(t.debito[i]) / 100
 
-        pessoa = extrair_pessoa_do_movimento(m)
-
-        if m.categoria_id == FGTS_RES and pessoa is None:
-            # tenta um último fallback: "FGTS Rescisão Valdonir" (sem prefixo FGTS)
-            # ou textos como "FGTS Rescisão Valdonir" que passaram por normalização.
-            h = normalize_text(m.historico)
-            hup = _norm_ascii_upper(h)
-            if hup.startswith("FGTS RESCISAO ") or hup.startswith("FGTS RESCISÃO "):
-                cand = h.split(" ", 2)[2] if len(h.split()) >= 3 else ""
-                cand = canonicalizar_pessoa(cand)
-                if cand and is_nome_pessoa(cand):
-                    pessoa = cand
-                elif cand and len(cand.split()) == 1:
-                    # tenta casar pelo token com base de rescisões
-                    m2 = match_por_token(cand)
-                    if m2:
-                        pessoa = m2
-                    else:
-                        fgts_sem_pessoa += m.debito
-                        continue
-                else:
-                    fgts_sem_pessoa += m.debito
-                    continue
-            else:
-                fgts_sem_pessoa += m.debito
+        pessoa = t.textos[pessoa_col[i]] or None
+
+        if categoria_id == FGTS_RES and pessoa is None:
+            pessoa = pessoa_fgts_generico(int(t.historico[i]))
+            if pessoa is None:
+                fgts_sem_pessoa += debito
                 continue
 
         if pessoa is None:
             # Sem pessoa: ignoramos para a correlação pessoa-a-pessoa
             continue
 
+        data_br = _fmt_data_br(t.data[i])
+        mov_id = str(t.ids[i])
         rec = ensure(pessoa)
-        if m.categoria_id == SAL_RES:
-            rec["salarios_rescisao_total"] += m.debito
+        if categoria_id == SAL_RES:
+            rec["salarios_rescisao_total"] += debito
             rec["salarios_rescisao_count"] += 1
-            rec["salarios_rescisao_datas"].append(m.data.strftime("%d/%m/%Y"))
-            rec["salarios_rescisao_ids"].append(m.id)
-        elif m.categoria_id == FGTS_RES:
-            rec["fgts_rescisao_total"] += m.debito
+            rec["salarios_rescisao_datas"].append(data_br)
+            rec["salarios_rescisao_ids"].append(mov_id)
+        elif categoria_id == FGTS_RES:
+            rec["fgts_rescisao_total"] += debito
             rec["fgts_rescisao_count"] += 1
-            rec["fgts_rescisao_datas"].append(m.data.strftime("%d/%m/%Y"))
-            rec["fgts_rescisao_ids"].append(m.id)
-        elif m.categoria_id == ACOES:
-            rec["acoes_trabalhistas_total"] += m.debito
+            rec["fgts_rescisao_datas"].append(data_br)
+            rec["fgts_rescisao_ids"].append(mov_id)
+        elif categoria_id == ACOES:
+            rec["acoes_trabalhistas_total"] += debito
             rec["acoes_trabalhistas_count"] += 1
-            rec["acoes_trabalhistas_datas"].append(m.data.strftime("%d/%m/%Y"))
-            rec["acoes_trabalhistas_ids"].append(m.id)
+            rec["acoes_trabalhistas_datas"].append(data_br)
+            rec["acoes_trabalhistas_ids"].append(mov_id)
 
     # Lista final
     pessoas = list(people.values())
@@ -681,15 +954,80 @@ def analisar_pessoas_rescisoes(movs: List[Movimento]) -> Dict[str, Any]:
     }
 
 
-def escrever_classificacao_movimentos(movs: List[Movimento], mov_ins: Dict[str, Any], out_path: Path) -> None:
+@dataclass
+class ClassificacaoMovimentos:
+    """
+    Classificação por movimento, em arrays (uma posição por linha da tabela):
+    - fluxo: índice em `CLASSES_FLUXO`
+    - recorrencia: índice em `CLASSES_RECORRENCIA` (vazio fora de custo_operacional)
+    - extraordinario: bool (heurística `is_extraordinario` sobre categoria, entidade e histórico)
+    """
+
+    CLASSES_FLUXO = ("entrada", "transferencia_interna", "implantacao_saldo", "custo_operacional", "outro")
+    CLASSES_RECORRENCIA = ("", "recorrente_forte", "recorrente_frequente", "nao_recorrente")
+    CUSTO_OPERACIONAL = 3
+
+    fluxo: np.ndarray
+    recorrencia: np.ndarray
+    extraordinario: np.ndarray
+
+
+def classificar_movimentos(movs: MovimentoTable, mov_ins: Dict[str, Any]) -> ClassificacaoMovimentos:
+    t = movs
+    rf = {(s["categoria"], s["entidade"]) for s in mov_ins.get("recorrentes_fortes", [])}
+    rfreq = {(s["categoria"], s["entidade"]) for s in mov_ins.get("recorrentes_frequentes", [])}
+
+    entrada = t.is_entrada
+    saida = t.is_saida
+    classe_fluxo = np.select(
+        [
+            entrada,
+            saida & (t.categoria_id == CAT_TRANSFERENCIA_INTERNA),
+            saida & (t.categoria_id == CAT_IMPLANTACAO_SALDO),
+            saida,
+        ],
+        [0, 1, 2, ClassificacaoMovimentos.CUSTO_OPERACIONAL],
+        default=4,
+    ).astype(np.int8)
+
+    # Classe de recorrência depende só de (categoria, entidade): uma vez por par distinto
+    classe_rec = np.zeros(len(t), dtype=np.int8)
+    custo = np.flatnonzero(classe_fluxo == ClassificacaoMovimentos.CUSTO_OPERACIONAL)
+    if len(custo):
+        pares, inv = np.unique(_chave_par(t.categoria_nome[custo], t.entidade[custo]), return_inverse=True)
+        por_par = np.array(
+            [
+                1 if key in rf else 2 if key in rfreq else 3
+                for key in ((t.textos[p >> 32], t.textos[p & 0xFFFFFFFF]) for p in pares.tolist())
+            ],
+            dtype=np.int8,
+        )
+        classe_rec[custo] = por_par[inv.reshape(-1)]
+
+    # "Extraordinário" verifica cada campo separadamente: uma vez por texto distinto de cada coluna
+    extra = np.zeros(len(t), dtype=bool)
+    for col in (t.categoria_nome, t.entidade, t.historico):
+        uniq, inv = np.unique(col, return_inverse=True)
+        por_texto = np.array([bool(PALAVRAS_EXTRA.familias(t.textos[c])) for c in uniq.tolist()], dtype=bool)
+        if len(uniq):
+            extra |= por_texto[inv.reshape(-1)]
+    return ClassificacaoMovimentos(fluxo=classe_fluxo, recorrencia=classe_rec, extraordinario=extra)
+
+
+def escrever_classificacao_movimentos(
+    movs: MovimentoTable,
+    mov_ins: Dict[str, Any],
+    out_path: Path,
+    classes: Optional[ClassificacaoMovimentos] = None,
+) -> None:
     """
     Gera um CSV auxiliar (sem alterar o original) com classificação por movimento:
     - classe_fluxo: entrada | custo_operacional | transferencia_interna | implantacao_saldo
     - classe_recorrencia: recorrente_forte | recorrente_frequente | nao_recorrente (apenas para custo_operacional)
     - extraordinario: sim/não (heurística)
     """
-    rf = {(s["categoria"], s["entidade"]) for s in mov_ins.get("recorrentes_fortes", [])}
-    rfreq = {(s["categoria"], s["entidade"]) for s in mov_ins.get("recorrentes_frequentes", [])}
+    t = movs
+    c = classes if classes is not None else classificar_movimentos(t, mov_ins)
 
     with out_path.open("w", newline="", encoding="utf-8") as f:
         w = csv.writer(f, delimiter=";")
@@ -712,231 +1050,442 @@ def escrever_classificacao_movimentos(movs: List[Movimento], mov_ins: Dict[str,
             ]
         )
 
-        for m in movs:
-            cat = m.categoria_nome
-            ent = entidade_chave_recorrencia(m)
-            key = (cat, ent)
-
-            if m.is_entrada:
-                classe_fluxo = "entrada"
-                classe_rec = ""
-            elif m.is_saida and m.categoria_id == CAT_TRANSFERENCIA_INTERNA:
-                classe_fluxo = "transferencia_interna"
-                classe_rec = ""
-            elif m.is_saida and m.categoria_id == CAT_IMPLANTACAO_SALDO:
-                classe_fluxo = "implantacao_saldo"
-                classe_rec = ""
-            elif m.is_saida:
-                classe_fluxo = "custo_operacional"
-                if key in rf:
-                    classe_rec = "recorrente_forte"
-                elif key in rfreq:
-                    classe_rec = "recorrente_frequente"
-                else:
-                    classe_rec = "nao_recorrente"
-            else:
-                classe_fluxo = "outro"
-                classe_rec = ""
-
-            extra = "sim" if is_extraordinario(cat, ent, m.historico) else "nao"
-
+        for i in range(len(t)):
             w.writerow(
                 [
-                    m.id,
-                    m.data.strftime("%d/%m/%Y"),
-                    m.mes,
-                    m.tipo,
-                    m.banco,
-                    m.categoria_id,
-                    cat,
-                    ent,
-                    m.historico,
-                    f"{m.credito:.2f}",
-                    f"{m.debito:.2f}",
-                    classe_fluxo,
-                    classe_rec,
-                    extra,
+                    t.ids[i],
+                    _fmt_data_br(t.data[i]),
+                    t.mes_str(i),
+                    t.texto(t.tipo, i),
+                    t.texto(t.banco, i),
+                    int(t.categoria_id[i]),
+                    t.texto(t.categoria_nome, i),
+                    t.texto(t.entidade, i),
+                    t.texto(t.historico, i),
+                    f"{int(t.credito[i]) / 100:.2f}",
+                    f"{int(t.debito[i]) / 100:.2f}",
+                    c.CLASSES_FLUXO[c.fluxo[i]],
+                    c.CLASSES_RECORRENCIA[c.recorrencia[i]],
+                    "sim" if c.extraordinario[i] else "nao",
                 ]
             )
 
 
-def classify_recorrencia_movimentos(movs: List[Movimento]) -> Dict[str, Any]:
+def _chave_par(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Empacota dois códigos não negativos (int32) numa chave int64 (agrupamento 1D, bem mais rápido que axis=0)."""
+    return (a.astype(np.int64) << 32) | b.astype(np.int64)
+
+
+def _grupos_por_ordem(chaves: np.ndarray) -> Tuple[np.ndarray, int]:
     """
-    Classifica recorrência em movimentos (saídas), por fornecedor+categoria,
-    e separa claramente itens extraordinários típicos (rescisões, ações, implantação, etc.).
+    Rotula cada linha de `chaves` (1D, ou 2D com uma chave composta por linha) com um id de grupo.
+    Os ids seguem a ordem de primeira ocorrência — a mesma ordem de inserção de um dict montado linha a linha.
+    Retorna (grupo_por_linha, quantidade_de_grupos).
     """
-    entradas = [m for m in movs if m.is_entrada]
-    saidas = [m for m in movs if m.is_saida]
-    # Separações importantes:
-    # - transferências internas e implantação de saldo não são "custo operacional"
-    saidas_transfer = [m for m in saidas if m.categoria_id == CAT_TRANSFERENCIA_INTERNA]
-    entradas_transfer = [m for m in entradas if m.categoria_id == CAT_TRANSFERENCIA_INTERNA]
-    saidas_implant = [m for m in saidas if m.categoria_id == CAT_IMPLANTACAO_SALDO]
-    # Custos operacionais (o que de fato "consome" caixa)
-    saidas_operacionais = [m for m in saidas if m.categoria_id not in EXCLUIR_CATEGORIAS_CUSTO]
-    meses = sorted({m.mes for m in movs})
-    periodo = {"inicio": movs[0].data, "fim": movs[-1].data, "meses": meses}
-
-    # Agrupamento por chave (fornecedor ou histórico quando não há fornecedor)
-    groups: Dict[Tuple[str, str], List[Movimento]] = {}
-    for m in saidas_operacionais:
-        entidade = entidade_chave_recorrencia(m)
-        chave = (m.categoria_nome, entidade)
-        groups.setdefault(chave, []).append(m)
-
-    # Estatísticas por grupo
-    stats = []
-    for (cat, ent), itens in groups.items():
-        total = sum(x.debito for x in itens)
-        cnt = len(itens)
-        meses_g = sorted({x.mes for x in itens})
-        dias = sorted({x.data.strftime("%Y-%m-%d") for x in itens})
-        valores = sorted([x.debito for x in itens])
-        med = quantile(valores, 0.5)
-        p90 = quantile(valores, 0.9)
-        stats.append(
-            {
-                "categoria": cat,
-                "entidade": ent,
-                "total": total,
-                "count": cnt,
-                "meses": meses_g,
-                "dias_distintos": len(dias),
-                "mediana": med,
-                "p90": p90,
-                "top": sorted(itens, key=lambda x: x.debito, reverse=True)[:3],
-            }
+    if len(chaves) == 0:
+        return np.zeros(0, dtype=np.int64), 0
+    n = len(chaves)
+    if chaves.ndim == 1 and chaves.dtype.kind in "iu" and chaves.min() >= 0 and chaves.max() < 4 * n + 1024:
+        # códigos densos (ex.: textos internados): primeira ocorrência por bincount, sem ordenar as linhas
+        first = np.full(int(chaves.max()) + 1, n, dtype=np.int64)
+        first[chaves[::-1]] = np.arange(n - 1, -1, -1)
+        presentes = np.flatnonzero(first < n)
+        ordem = presentes[np.argsort(first[presentes], kind="stable")]
+        rank = np.full(len(first), -1, dtype=np.int64)
+        rank[ordem] = np.arange(len(ordem))
+        return rank[chaves], len(ordem)
+    axis = 0 if chaves.ndim == 2 else None
+    _, first, inv = np.unique(chaves, return_index=True, return_inverse=True, axis=axis)
+    ordem = np.argsort(first, kind="stable")
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[ordem] = np.arange(len(first))
+    return rank[inv.reshape(-1)], len(first)
+
+
+def _distintos_por_grupo(grupo: np.ndarray, valores: np.ndarray, n_grupos: int) -> List[np.ndarray]:
+    """Valores distintos (ordenados) de cada grupo."""
+    if len(grupo) == 0:
+        return [np.zeros(0, dtype=valores.dtype) for _ in range(n_grupos)]
+    if valores.min() < 0:
+        pares = np.unique(np.stack([grupo, valores.astype(np.int64)]).T, axis=0)
+        g, v = pares[:, 0], pares[:, 1]
+    else:
+        pares = np.unique(_chave_par(grupo, valores))
+        g, v = pares >> 32, pares & 0xFFFFFFFF
+    cortes = np.searchsorted(g, np.arange(1, n_grupos))
+    return [x.astype(valores.dtype) for x in np.split(v, cortes)]
+
+
+def _somas_por_grupo(
+    grupo: np.ndarray, chaves: np.ndarray, valores: np.ndarray, n_grupos: int
+) -> List[Tuple[List[int], List[int]]]:
+    """Por grupo: chaves distintas (ordenadas, não negativas) e a soma de `valores` de cada uma."""
+    if len(grupo) == 0:
+        return [([], []) for _ in range(n_grupos)]
+    pares, inv = np.unique(_chave_par(grupo, chaves), return_inverse=True)
+    somas = np.bincount(inv.reshape(-1), weights=valores, minlength=len(pares)).round().astype(np.int64)
+    cortes = np.searchsorted(pares >> 32, np.arange(1, n_grupos))
+    return [
+        (c.tolist(), v.tolist())
+        for c, v in zip(np.split(pares & 0xFFFFFFFF, cortes), np.split(somas, cortes))
+    ]
+
+
+def _top_por_grupo(grupo: np.ndarray, linhas: np.ndarray, valores: np.ndarray, n_grupos: int, k: int) -> List[np.ndarray]:
+    """Até `k` linhas de maior valor por grupo (empates mantêm a ordem original, como um sort estável)."""
+    ordem = np.lexsort((linhas, -valores, grupo))
+    g_ord = grupo[ordem]
+    inicio = np.searchsorted(g_ord, np.arange(n_grupos))
+    fim = np.searchsorted(g_ord, np.arange(n_grupos), side="right")
+    l_ord = linhas[ordem]
+    return [l_ord[a : min(b, a + k)] for a, b in zip(inicio, fim)]
+
+
+def _linhas_por_grupo(grupo: np.ndarray, linhas: np.ndarray, n_grupos: int) -> List[np.ndarray]:
+    """Linhas de cada grupo, na ordem original."""
+    ordem = np.argsort(grupo, kind="stable")
+    cortes = np.searchsorted(grupo[ordem], np.arange(1, n_grupos))
+    return np.split(linhas[ordem], cortes)
+
+
+def _top_linhas(linhas: np.ndarray, valores: np.ndarray, k: int) -> np.ndarray:
+    """Linhas com os `k` maiores valores (ordem decrescente; empates pela ordem original)."""
+    if len(linhas) > k:
+        corte = np.partition(valores, len(valores) - k)[len(valores) - k]
+        sel = valores >= corte
+        linhas, valores = linhas[sel], valores[sel]
+    return linhas[np.lexsort((linhas, -valores))][:k]
+
+
+def _fmt_mes(m: np.datetime64) -> str:
+    return str(m.astype("datetime64[M]"))
+
+
+def ingerir_movimentos(estado: EstadoRecorrencia, t: MovimentoTable, linhas: np.ndarray) -> int:
+    """
+    Incorpora ao estado as saídas `linhas` ainda não vistas (pela chave de `chaves_movimentos`).
+    Os parciais por grupo são calculados de forma vetorizada e só os grupos tocados são atualizados.
+    Retorna quantos movimentos novos entraram.
+    """
+    ids = t.ids[linhas]
+    chaves = chaves_movimentos(
+        ids.tolist(),
+        t.data[linhas].astype(str).tolist(),
+        [t.texto(t.banco, i) for i in linhas.tolist()],
+        t.debito[linhas].tolist(),
+    )
+    if estado.movimentos:
+        novos = estado.novos(chaves)
+        linhas, chaves = linhas[novos], chaves[novos]
+    if len(linhas) == 0:
+        return 0
+    deb = t.debito[linhas]
+    g, n_grupos = _grupos_por_ordem(_chave_par(t.categoria_nome[linhas], t.entidade[linhas]))
+    primeira = np.full(n_grupos, -1, dtype=np.int64)
+    primeira[g[::-1]] = linhas[::-1]
+
+    totais = np.bincount(g, weights=deb, minlength=n_grupos)
+    contagens = np.bincount(g, minlength=n_grupos)
+    meses_por_grupo = _distintos_por_grupo(g, t.mes[linhas].astype(np.int64), n_grupos)
+    dias_por_grupo = _somas_por_grupo(g, t.data[linhas].astype(np.int64), deb, n_grupos)
+    valores_por_grupo = _linhas_por_grupo(g, deb, n_grupos)
+    tops = _top_por_grupo(g, linhas, deb, n_grupos, TOP_POR_GRUPO)
+
+    for k in range(n_grupos):
+        i0 = primeira[k]
+        estado.acumular(
+            categoria=t.texto(t.categoria_nome, i0),
+            entidade=t.texto(t.entidade, i0),
+            count=int(contagens[k]),
+            total_cents=int(round(totais[k])),
+            meses=[_fmt_mes(np.datetime64(int(m), "M")) for m in meses_por_grupo[k]],
+            dias={str(np.datetime64(d, "D")): v for d, v in zip(*dias_por_grupo[k])},
+            valores_cents=valores_por_grupo[k].tolist(),
+            top=[
+                ItemTop(id=str(t.ids[i]), data=str(t.data[i]), debito_cents=int(t.debito[i]), historico=t.texto(t.historico, i))
+                for i in tops[k]
+            ],
         )
+    estado.registrar(chaves)
+    return len(linhas)
 
-    # Heurística de recorrência:
-    # - Recorrente forte: aparece em >=2 meses e >=2 ocorrências
-    # - Recorrente frequente: >=4 ocorrências no período
-    # - Variável: recorrente, mas valores com alta dispersão (p90/mediana >= 2.5)
-    recorrentes_fortes = []
-    recorrentes_frequentes = []
-    nao_recorrentes = []
-
-    def is_extraordinario(cat: str, ent: str) -> bool:
-        c = cat.lower()
-        e = ent.lower()
-        # Itens tipicamente extraordinários no contexto de reorganização
-        keywords = [
-            "rescis",
-            "aç",
-            "acao",
-            "rj",
-            "implant",
-            "encontro contas",
-            "quit",
-            "acordo",
-        ]
-        return any(k in c for k in keywords) or any(k in e for k in keywords)
-
-    for s in stats:
-        meses_cnt = len(s["meses"])
-        cnt = s["count"]
-        if is_extraordinario(s["categoria"], s["entidade"]):
-            nao_recorrentes.append(s)
-            continue
-        if meses_cnt >= 2 and cnt >= 2:
-            recorrentes_fortes.append(s)
-        elif cnt >= 4:
-            recorrentes_frequentes.append(s)
-        else:
-            nao_recorrentes.append(s)
-
-    # Ordena por impacto
-    recorrentes_fortes.sort(key=lambda x: x["total"], reverse=True)
-    recorrentes_frequentes.sort(key=lambda x: x["total"], reverse=True)
-    nao_recorrentes.sort(key=lambda x: x["total"], reverse=True)
-
-    # Outliers (valores absurdos) por grupo: acima de 3x mediana e acima de R$ 20k
-    outliers = []
-    for s in stats:
-        med = s["mediana"] or 0.0
-        if med <= 0:
-            continue
-        for m in s["top"]:
-            if m.debito >= 20000 and m.debito >= 3 * med:
-                outliers.append(
-                    {
-                        "categoria": s["categoria"],
-                        "entidade": s["entidade"],
-                        "valor": m.debito,
-                        "data": m.data.strftime("%d/%m/%Y"),
-                        "descricao": m.historico,
-                    }
-                )
-    outliers.sort(key=lambda x: x["valor"], reverse=True)
-
-    # Resumo por categoria (custos operacionais)
-    cat_map: Dict[str, List[Movimento]] = {}
-    for m in saidas_operacionais:
-        cat_map.setdefault(m.categoria_nome, []).append(m)
-    categorias_operacionais = []
-    for cat, itens in cat_map.items():
-        total = sum(x.debito for x in itens)
-        meses_cat = sorted({x.mes for x in itens})
-        categorias_operacionais.append(
-            {
-                "categoria": cat,
-                "total": total,
-                "count": len(itens),
-                "meses": meses_cat,
-                "por_mes": categoria_breakdown_por_mes(itens),
-                "top": sorted(itens, key=lambda x: x.debito, reverse=True)[:5],
-            }
-        )
-    categorias_operacionais.sort(key=lambda x: x["total"], reverse=True)
-
-    # Top movimentos (para inspeção manual)
-    top_saidas_oper = [mov_to_dict(m, "debito") for m in sorted(saidas_operacionais, key=lambda x: x.debito, reverse=True)[:40]]
-    top_entradas = [mov_to_dict(m, "credito") for m in sorted(entradas, key=lambda x: x.credito, reverse=True)[:20]]
-    top_transfer = [mov_to_dict(m, "debito") for m in sorted(saidas_transfer, key=lambda x: x.debito, reverse=True)[:15]]
-
-    # Possíveis duplicidades (mesma data + categoria + entidade + valor)
-    dup_map: Dict[Tuple[str, str, str, float], List[Movimento]] = {}
-    for m in saidas_operacionais:
-        ent = entidade_chave_recorrencia(m)
-        k = (m.data.strftime("%Y-%m-%d"), m.categoria_nome, ent, round(m.debito, 2))
-        dup_map.setdefault(k, []).append(m)
-    duplicidades = []
-    for (dia, cat, ent, val), itens in dup_map.items():
-        if len(itens) < 2:
-            continue
-        # só sinaliza se valor relevante (evitar ruído de tarifas pequenas)
-        if val < 1000:
-            continue
-        duplicidades.append(
-            {
-                "dia": dia,
-                "categoria": cat,
-                "entidade": ent,
-                "valor": val,
-                "qtd": len(itens),
-                "ids": [x.id for x in itens],
-            }
-        )
-    duplicidades.sort(key=lambda x: x["valor"] * x["qtd"], reverse=True)
 
-    return {
-        "periodo": periodo,
-        "saidas_total": sum(m.debito for m in saidas),
-        "entradas_total": sum(m.credito for m in entradas),
-        "saidas_operacionais_total": sum(m.debito for m in saidas_operacionais),
-        "transferencias_debito_total": sum(m.debito for m in saidas_transfer),
-        "transferencias_credito_total": sum(m.credito for m in entradas_transfer),
-        "implantacao_total": sum(m.debito for m in saidas_implant),
-        "recorrentes_fortes": recorrentes_fortes,
-        "recorrentes_frequentes": recorrentes_frequentes,
-        "nao_recorrentes": nao_recorrentes,
-        "outliers": outliers,
-        "categorias_operacionais": categorias_operacionais,
-        "top_saidas_operacionais": top_saidas_oper,
-        "top_entradas": top_entradas,
-        "top_transferencias": top_transfer,
-        "duplicidades": duplicidades,
-    }
+class AgregadorRecorrencia:
+    """
+    Agregação fundida de `classify_recorrencia_movimentos`.
+
+    Cada tabela passa uma única vez: as máscaras (entradas, saídas, transferências, implantação,
+    operacionais) e os recortes das saídas operacionais são calculados uma vez e alimentam ao mesmo
+    tempo os totais, o estado de recorrência, o resumo por categoria, as duplicidades e os tops
+    (heaps limitados, sem ordenar tudo).
+
+    As chaves guardadas são textos (não os códigos da tabela), então agregadores de arquivos
+    diferentes podem ser combinados com `mesclar` — e o objeto é serializável com pickle,
+    para rodar em processos separados.
+    """
+
+    TOP_SAIDAS = 40
+    TOP_ENTRADAS = 20
+    TOP_TRANSFERENCIAS = 15
+    TOP_POR_CATEGORIA = 5
+    # duplicidades só são sinalizadas a partir de R$ 1.000 (evitar ruído de tarifas pequenas)
+    DUPLICIDADE_MIN_CENTS = 100_000
+
+    def __init__(self, estado: Optional[EstadoRecorrencia] = None) -> None:
+        self.estado = estado if estado is not None else EstadoRecorrencia()
+        self.inicio: Optional[np.datetime64] = None
+        self.fim: Optional[np.datetime64] = None
+        self.meses: Set[str] = set()
+        self.saidas_cents = 0
+        self.entradas_cents = 0
+        self.operacionais_cents = 0
+        self.transferencias_debito_cents = 0
+        self.transferencias_credito_cents = 0
+        self.implantacao_cents = 0
+        # categoria -> {"count", "total_cents", "por_mes": {mes: centavos}, "top": TopK[Movimento]}
+        self.categorias: Dict[str, Dict[str, Any]] = {}
+        self.top_saidas: TopK[Dict[str, Any]] = TopK(self.TOP_SAIDAS)
+        self.top_entradas: TopK[Dict[str, Any]] = TopK(self.TOP_ENTRADAS)
+        self.top_transferencias: TopK[Dict[str, Any]] = TopK(self.TOP_TRANSFERENCIAS)
+        # (empresa, dia ISO, categoria, entidade, valor em centavos) -> ids; empresa "" até o consolidado
+        self.duplicidades: Dict[Tuple[str, str, str, str, int], List[str]] = {}
+
+    def adicionar(self, t: MovimentoTable) -> int:
+        """Incorpora a tabela; retorna quantos movimentos novos entraram no estado de recorrência."""
+        if len(t) == 0:
+            return 0
+        inicio, fim = t.data.min(), t.data.max()
+        self.inicio = inicio if self.inicio is None else min(self.inicio, inicio)
+        self.fim = fim if self.fim is None else max(self.fim, fim)
+        self.meses.update(_fmt_mes(m) for m in np.unique(t.mes))
+
+        entradas = t.is_entrada
+        saidas = t.is_saida
+        # Separações importantes:
+        # - transferências internas e implantação de saldo não são "custo operacional"
+        transfer = t.categoria_id == CAT_TRANSFERENCIA_INTERNA
+        implant = t.categoria_id == CAT_IMPLANTACAO_SALDO
+        saidas_transfer = saidas & transfer
+        # Custos operacionais (o que de fato "consome" caixa)
+        oper = np.flatnonzero(saidas & ~np.isin(t.categoria_id, list(EXCLUIR_CATEGORIAS_CUSTO)))
+        deb_oper = t.debito[oper]
+        cat_oper = t.categoria_nome[oper]
+
+        self.saidas_cents += int(t.debito[saidas].sum())
+        self.entradas_cents += int(t.credito[entradas].sum())
+        self.operacionais_cents += int(deb_oper.sum())
+        self.transferencias_debito_cents += int(t.debito[saidas_transfer].sum())
+        self.transferencias_credito_cents += int(t.credito[entradas & transfer].sum())
+        self.implantacao_cents += int(t.debito[saidas & implant].sum())
+
+        # Agrupamento por chave (fornecedor ou histórico quando não há fornecedor)
+        novos = ingerir_movimentos(self.estado, t, oper)
+
+        # Resumo por categoria (custos operacionais)
+        gc, n_cats = _grupos_por_ordem(cat_oper)
+        if n_cats:
+            primeira = np.full(n_cats, -1, dtype=np.int64)
+            primeira[gc[::-1]] = oper[::-1]
+            totais = np.bincount(gc, weights=deb_oper, minlength=n_cats)
+            contagens = np.bincount(gc, minlength=n_cats)
+            tops = _top_por_grupo(gc, oper, deb_oper, n_cats, self.TOP_POR_CATEGORIA)
+            mes_oper = t.mes[oper].astype(np.int64)
+            pares, inv = np.unique(_chave_par(gc, mes_oper), return_inverse=True)
+            somas_mes = np.bincount(inv.reshape(-1), weights=deb_oper, minlength=len(pares))
+            por_mes: List[List[Tuple[str, int]]] = [[] for _ in range(n_cats)]
+            for chave, soma in zip(pares.tolist(), somas_mes.tolist()):
+                por_mes[chave >> 32].append((_fmt_mes(np.datetime64(chave & 0xFFFFFFFF, "M")), int(round(soma))))
+            for k in range(n_cats):
+                nome = t.texto(t.categoria_nome, primeira[k])
+                c = self.categorias.get(nome)
+                if c is None:
+                    c = self.categorias[nome] = {"count": 0, "total_cents": 0, "por_mes": {}, "top": TopK(self.TOP_POR_CATEGORIA)}
+                c["count"] += int(contagens[k])
+                c["total_cents"] += int(round(totais[k]))
+                for mes, v in por_mes[k]:
+                    c["por_mes"][mes] = c["por_mes"].get(mes, 0) + v
+                for i in tops[k]:
+                    c["top"].oferecer(int(t.debito[i]), t.movimento(i))
+
+        # Top movimentos (para inspeção manual)
+        idx_entradas = np.flatnonzero(entradas)
+        idx_transfer = np.flatnonzero(saidas_transfer)
+        for i in _top_linhas(oper, deb_oper, self.TOP_SAIDAS):
+            self.top_saidas.oferecer(int(t.debito[i]), mov_to_dict(t.movimento(i), "debito"))
+        for i in _top_linhas(idx_entradas, t.credito[idx_entradas], self.TOP_ENTRADAS):
+            self.top_entradas.oferecer(int(t.credito[i]), mov_to_dict(t.movimento(i), "credito"))
+        for i in _top_linhas(idx_transfer, t.debito[idx_transfer], self.TOP_TRANSFERENCIAS):
+            self.top_transferencias.oferecer(int(t.debito[i]), mov_to_dict(t.movimento(i), "debito"))
+
+        # Possíveis duplicidades (mesma data + categoria + entidade + valor), só valores relevantes
+        rel = deb_oper >= self.DUPLICIDADE_MIN_CENTS
+        linhas_rel = oper[rel]
+        if len(linhas_rel):
+            textos = np.array(t.textos, dtype=object)
+            chaves_dup = zip(
+                itertools.repeat(""),
+                np.datetime_as_string(t.data[linhas_rel]).tolist(),
+                textos[cat_oper[rel]].tolist(),
+                textos[t.entidade[linhas_rel]].tolist(),
+                deb_oper[rel].tolist(),
+            )
+            dup = self.duplicidades
+            for chave, _id in zip(chaves_dup, t.ids[linhas_rel].tolist()):
+                ids = dup.get(chave)
+                if ids is None:
+                    dup[chave] = [_id]
+                else:
+                    ids.append(_id)
+        return novos
+
+    def mesclar(self, outro: "AgregadorRecorrencia", empresa: Optional[str] = None) -> None:
+        """
+        Combina com o agregador de outro arquivo/período (o estado de `outro` entra via `EstadoRecorrencia.mesclar`).
+        Com `empresa` (consolidado de várias empresas), as duplicidades de `outro` ficam marcadas com a empresa:
+        pagamentos iguais de empresas diferentes não viram duplicidade.
+        """
+        if outro.inicio is not None:
+            self.inicio = outro.inicio if self.inicio is None else min(self.inicio, outro.inicio)
+            self.fim = outro.fim if self.fim is None else max(self.fim, outro.fim)
+        self.meses.update(outro.meses)
+        self.saidas_cents += outro.saidas_cents
+        self.entradas_cents += outro.entradas_cents
+        self.operacionais_cents += outro.operacionais_cents
+        self.transferencias_debito_cents += outro.transferencias_debito_cents
+        self.transferencias_credito_cents += outro.transferencias_credito_cents
+        self.implantacao_cents += outro.implantacao_cents
+        self.estado.mesclar(outro.estado)
+        for nome, oc in outro.categorias.items():
+            c = self.categorias.get(nome)
+            if c is None:
+                c = self.categorias[nome] = {"count": 0, "total_cents": 0, "por_mes": {}, "top": TopK(self.TOP_POR_CATEGORIA)}
+            c["count"] += oc["count"]
+            c["total_cents"] += oc["total_cents"]
+            for mes, v in oc["por_mes"].items():
+                c["por_mes"][mes] = c["por_mes"].get(mes, 0) + v
+            c["top"].mesclar(oc["top"])
+        self.top_saidas.mesclar(outro.top_saidas)
+        self.top_entradas.mesclar(outro.top_entradas)
+        self.top_transferencias.mesclar(outro.top_transferencias)
+        for chave, ids in outro.duplicidades.items():
+            if empresa is not None and not chave[0]:
+                chave = (empresa, *chave[1:])
+            self.duplicidades.setdefault(chave, []).extend(ids)
+
+    def resultado(self) -> Dict[str, Any]:
+        """Dict no formato consumido pelo relatório (`merge_insights`) e pela classificação em CSV."""
+        # Estatísticas por grupo
+        stats = self.estado.estatisticas()
+
+        # Cadência de cada grupo pela série de datas (semanal/quinzenal/mensal/irregular)
+        periodicidade = periodicidade_do_estado(self.estado, self.fim) if self.fim is not None else []
+        com_cadencia = {
+            (p["categoria"], p["entidade"])
+            for p in periodicidade
+            if p["cadencia"] != "irregular" and p["situacao"] != "encerrado"
+        }
+
+        # Heurística de recorrência:
+        # - Recorrente forte: aparece em >=2 meses e >=2 ocorrências
+        # - Recorrente frequente: >=4 ocorrências no período, ou cadência regular detectada
+        # - Variável: recorrente, mas valores com alta dispersão (p90/mediana >= 2.5)
+        recorrentes_fortes = []
+        recorrentes_frequentes = []
+        nao_recorrentes = []
+
+        for s in stats:
+            meses_cnt = len(s["meses"])
+            cnt = s["count"]
+            if is_extraordinario(s["categoria"], s["entidade"]):
+                nao_recorrentes.append(s)
+                continue
+            if meses_cnt >= 2 and cnt >= 2:
+                recorrentes_fortes.append(s)
+            elif cnt >= 4 or (s["categoria"], s["entidade"]) in com_cadencia:
+                recorrentes_frequentes.append(s)
+            else:
+                nao_recorrentes.append(s)
+
+        # Ordena por impacto
+        recorrentes_fortes.sort(key=lambda x: x["total"], reverse=True)
+        recorrentes_frequentes.sort(key=lambda x: x["total"], reverse=True)
+        nao_recorrentes.sort(key=lambda x: x["total"], reverse=True)
+
+        # Outliers: sem a tabela, só os maiores de cada grupo contra o histórico do grupo;
+        # `classify_recorrencia_movimentos` substitui pela versão completa (todos os débitos)
+        outliers = outliers_do_estado(self.estado)
+
+        periodicidade.sort(key=lambda p: p["total"], reverse=True)
+        nao_encontrados = [p for p in periodicidade if p["situacao"] == "atrasado"]
+        nao_encontrados.sort(key=lambda p: p["valor_esperado"] * p["ciclos_perdidos"], reverse=True)
+
+        categorias_operacionais = []
+        for nome, c in self.categorias.items():
+            por_mes = {mes: v / 100 for mes, v in sorted(c["por_mes"].items())}
+            categorias_operacionais.append(
+                {
+                    "categoria": nome,
+                    "total": c["total_cents"] / 100,
+                    "count": c["count"],
+                    "meses": list(por_mes.keys()),
+                    "por_mes": por_mes,
+                    "top": c["top"].itens(),
+                }
+            )
+        categorias_operacionais.sort(key=lambda x: x["total"], reverse=True)
+
+        duplicidades = []
+        for (empresa, dia, cat, ent, val_cents), ids in self.duplicidades.items():
+            if len(ids) < 2:
+                continue
+            duplicidades.append(
+                {"empresa": empresa, "dia": dia, "categoria": cat, "entidade": ent, "valor": val_cents / 100, "qtd": len(ids), "ids": ids}
+            )
+        duplicidades.sort(key=lambda x: x["valor"] * x["qtd"], reverse=True)
+
+        return {
+            "periodo": {
+                "inicio": _to_datetime(self.inicio) if self.inicio is not None else None,
+                "fim": _to_datetime(self.fim) if self.fim is not None else None,
+                "meses": sorted(self.meses),
+            },
+            "saidas_total": self.saidas_cents / 100,
+            "entradas_total": self.entradas_cents / 100,
+            "saidas_operacionais_total": self.operacionais_cents / 100,
+            "transferencias_debito_total": self.transferencias_debito_cents / 100,
+            "transferencias_credito_total": self.transferencias_credito_cents / 100,
+            "implantacao_total": self.implantacao_cents / 100,
+            "recorrentes_fortes": recorrentes_fortes,
+            "recorrentes_frequentes": recorrentes_frequentes,
+            "nao_recorrentes": nao_recorrentes,
+            "outliers": outliers,
+            "periodicidade": periodicidade,
+            "pagamentos_nao_encontrados": nao_encontrados,
+            "categorias_operacionais": categorias_operacionais,
+            "top_saidas_operacionais": self.top_saidas.itens(),
+            "top_entradas": self.top_entradas.itens(),
+            "top_transferencias": self.top_transferencias.itens(),
+            "duplicidades": duplicidades,
+        }
+
+
+def classify_recorrencia_movimentos(movs: MovimentoTable, estado: Optional[EstadoRecorrencia] = None) -> Dict[str, Any]:
+    """
+    Classifica recorrência em movimentos (saídas), por fornecedor+categoria,
+    e separa claramente itens extraordinários típicos (rescisões, ações, implantação, etc.).
+
+    Com `estado` (persistido entre execuções), só os movimentos novos são incorporados e
+    a recorrência é derivada de todo o histórico acumulado; sem ele, de `movs` apenas.
+    Todo o cálculo é feito numa passada pelo `AgregadorRecorrencia`.
+    """
+    # base histórica dos outliers antes de o lote entrar no estado (escore fora da amostra)
+    historico = bases_historicas(estado) if estado is not None else None
+    agregador = AgregadorRecorrencia(estado)
+    agregador.adicionar(movs)
+    res = agregador.resultado()
+    oper = np.flatnonzero(movs.is_saida & ~np.isin(movs.categoria_id, list(EXCLUIR_CATEGORIAS_CUSTO)))
+    res["outliers"] = detectar_outliers(movs, oper, historico)
+    return res
 
 
 def classify_recorrencia_contas(contas: List[ContaPagar]) -> Dict[str, Any]:
@@ -948,25 +1497,16 @@ def classify_recorrencia_contas(contas: List[ContaPagar]) -> Dict[str, Any]:
     # Considera apenas títulos não cancelados (e com valor relevante)
     valid = [c for c in contas if c.status.lower() != "cancelada" and (c.valor or c.saldo_aberto)]
 
-    # Projeção por mês (saldo aberto)
-    proj: Dict[str, float] = {}
-    aberto_por_mes_categoria: Dict[str, Dict[str, float]] = {}
-    aberto_por_mes_entidade: Dict[str, Dict[str, float]] = {}
-    aberto_categoria_total: Dict[str, float] = {}
-    aberto_entidade_total: Dict[str, float] = {}
-    for c in valid:
-        if c.saldo_aberto <= 0:
-            continue
-        mk = c.mes_vencimento
-        proj[mk] = proj.get(mk, 0.0) + c.saldo_aberto
-        cat = c.categoria_nome
-        ent = c.fornecedor or c.titulo or "Sem identificação"
-        aberto_por_mes_categoria.setdefault(mk, {})
-        aberto_por_mes_categoria[mk][cat] = aberto_por_mes_categoria[mk].get(cat, 0.0) + c.saldo_aberto
-        aberto_por_mes_entidade.setdefault(mk, {})
-        aberto_por_mes_entidade[mk][ent] = aberto_por_mes_entidade[mk].get(ent, 0.0) + c.saldo_aberto
-        aberto_categoria_total[cat] = aberto_categoria_total.get(cat, 0.0) + c.saldo_aberto
-        aberto_entidade_total[ent] = aberto_entidade_total.get(ent, 0.0) + c.saldo_aberto
+    # Saldo aberto num cubo esparso (mês × categoria × entidade × banco × status): projeção, recortes
+    # do relatório e pacote do dashboard saem dele
+    cubo = CuboEsparso.construir(
+        DIMENSOES_ABERTO,
+        (
+            ((c.mes_vencimento, c.categoria_nome, c.fornecedor or c.titulo or "Sem identificação", c.banco, c.status), round(c.saldo_aberto * 100))
+            for c in valid
+            if c.saldo_aberto > 0
+        ),
+    )
 
     # Recorrência por fornecedor+categoria (baseado em meses de vencimento)
     groups: Dict[Tuple[str, str], List[ContaPagar]] = {}
@@ -1034,14 +1574,11 @@ def classify_recorrencia_contas(contas: List[ContaPagar]) -> Dict[str, Any]:
     alertas.sort(key=lambda x: abs(x["valor"]), reverse=True)
 
     return {
-        "projecao_aberto_por_mes": dict(sorted(proj.items())),
-        "aberto_por_mes_categoria": {k: dict(sorted(v.items(), key=lambda x: x[1], reverse=True)) for k, v in sorted(aberto_por_mes_categoria.items())},
-        "aberto_por_mes_entidade": {k: dict(sorted(v.items(), key=lambda x: x[1], reverse=True)) for k, v in sorted(aberto_por_mes_entidade.items())},
-        "aberto_categoria_total": dict(sorted(aberto_categoria_total.items(), key=lambda x: x[1], reverse=True)),
-        "aberto_entidade_total": dict(sorted(aberto_entidade_total.items(), key=lambda x: x[1], reverse=True)),
+        "projecao_aberto_por_mes": dict(sorted(cubo.rollup("mes").items())),
+        "cubo_aberto": cubo,
         "recorrentes": recorrentes,
         "alertas": alertas,
-        "total_aberto": sum(c.saldo_aberto for c in valid if c.saldo_aberto > 0),
+        "total_aberto": cubo.total,
     }
 
 
@@ -1098,10 +1635,29 @@ def merge_insights(mov_ins: Dict[str, Any], contas_ins: Dict[str, Any]) -> str:
         out = []
         for o in lines_in[:limit]:
             out.append(
-                f"- **{o['categoria']}** — {o['entidade']}: {money(o['valor'])} em {o['data']} (\"{o['descricao']}\")"
+                f"- **{o['categoria']}** — {o['entidade']}: {money(o['valor'])} em {o['data']} — {o['explicacao']} (\"{o['descricao']}\")"
             )
         return "\n".join(out) if out else "- (sem outliers relevantes com a heurística atual)"
 
+    def top_cadencias(itens: List[Dict[str, Any]], limit: int = 15) -> str:
+        lines = []
+        for p in [p for p in itens if p["cadencia"] != "irregular"][:limit]:
+            lines.append(
+                f"- **{p['categoria']}** — {p['entidade']}: {p['cadencia']} (~{p['periodo_dias']:.0f} dias; {p['eventos']} pagamentos; "
+                f"{p['confianca']:.0%} dos intervalos) — próximo ~{p['proximo']}, {money(p['valor_esperado'])}"
+            )
+        return "\n".join(lines) if lines else "- (nenhuma cadência regular com o histórico disponível)"
+
+    def top_nao_encontrados(itens: List[Dict[str, Any]], limit: int = 12) -> str:
+        lines = []
+        for p in itens[:limit]:
+            ciclos = "ciclo" if p["ciclos_perdidos"] == 1 else "ciclos"
+            lines.append(
+                f"- **{p['categoria']}** — {p['entidade']}: {p['cadencia']}, esperado em {p['proximo']} ({money(p['valor_esperado'])}); "
+                f"{p['ciclos_perdidos']} {ciclos} sem pagamento (último em {p['ultimo']})"
+            )
+        return "\n".join(lines) if lines else "- (nenhum pagamento periódico em atraso)"
+
     def top_categorias_operacionais(cats: List[Dict[str, Any]], limit: int = 18) -> str:
         lines = []
         for c in cats[:limit]:
@@ -1126,11 +1682,25 @@ def merge_insights(mov_ins: Dict[str, Any], contas_ins: Dict[str, Any]) -> str:
             except Exception:
                 dd = d["dia"]
             ids = ", ".join(d["ids"][:6]) + ("..." if len(d["ids"]) > 6 else "")
+            empresa = f"[{d['empresa']}] " if d.get("empresa") else ""
             lines.append(
-                f"- {dd} — **{d['categoria']}** — {d['entidade']}: {money(d['valor'])} × {d['qtd']} (ids: {ids})"
+                f"- {dd} — {empresa}**{d['categoria']}** — {d['entidade']}: {money(d['valor'])} × {d['qtd']} (ids: {ids})"
             )
         return "\n".join(lines) if lines else "- (nenhuma duplicidade relevante detectada com a heurística atual)"
 
+    def top_quase_duplicidades(grupos: List[Dict[str, Any]], limit: int = 15) -> str:
+        lines = []
+        for g in grupos[:limit]:
+            datas = sorted({datetime.strptime(x, "%Y-%m-%d").strftime("%d/%m/%Y") for x in g["datas"]})
+            bancos = ", ".join(sorted(set(g["bancos"])))
+            valores = " / ".join(money(v) for v in g["valores"][:6]) + (" ..." if g["qtd"] > 6 else "")
+            ids = ", ".join(g["ids"][:6]) + ("..." if g["qtd"] > 6 else "")
+            lines.append(
+                f"- {' a '.join([datas[0], datas[-1]] if len(datas) > 1 else datas)} — **{g['categorias'][0]}** — "
+                f"{g['entidades'][0]}: {valores} (confiança {g['confianca']:.0%}; {bancos}; ids: {ids})"
+            )
+        return "\n".join(lines) if lines else "- (nenhum grupo acima da confiança mínima)"
+
     def top_dict(d: Dict[str, float], limit: int = 12) -> str:
         if not d:
             return "- (sem dados)"
@@ -1198,6 +1768,19 @@ def merge_insights(mov_ins: Dict[str, Any], contas_ins: Dict[str, Any]) -> str:
     md.append("\n---\n")
     md.append("## Possíveis duplicidades (mesmo dia/valor/categoria)\n")
     md.append(top_duplicidades(mov_ins.get("duplicidades", []), limit=15))
+    if "quase_duplicidades" in mov_ins:
+        md.append("\n\n### Quase-duplicidades (datas próximas, valor parecido, mesmo favorecido)\n")
+        md.append(top_quase_duplicidades(mov_ins["quase_duplicidades"], limit=15))
+        md.append(
+            "\n\n> Só pagamentos (sem créditos, transferências internas e implantação de saldo), agrupados por janela "
+            "de datas, tolerância de valor e favorecido parecido; lista completa em `public/dados/quase_duplicidades.csv`.\n"
+        )
+        descartados = mov_ins.get("quase_duplicidades_resumo", {}).get("vizinhos_descartados", 0)
+        if descartados:
+            md.append(
+                f"\n> Atenção: {descartados} comparações ficaram de fora por excederem o limite de vizinhos por "
+                "lançamento na janela de datas; pode haver quase-duplicidades não avaliadas.\n"
+            )
 
     md.append("\n---\n")
     md.append("## O que é recorrente (com base no comportamento observado)\n")
@@ -1208,6 +1791,15 @@ def merge_insights(mov_ins: Dict[str, Any], contas_ins: Dict[str, Any]) -> str:
     md.append(
         "\n\n> Itens marcados como **(variável)** indicam grande dispersão de valores — normalmente compras/serviços sob demanda.\n"
     )
+    md.append("\n### Cadência detectada (intervalos entre pagamentos)\n")
+    md.append(top_cadencias(mov_ins.get("periodicidade", [])))
+    md.append("\n\n### Pagamentos periódicos esperados e não encontrados\n")
+    md.append(top_nao_encontrados(mov_ins.get("pagamentos_nao_encontrados", [])))
+    md.append(
+        "\n\n> Pagamentos em datas até 3 dias uma da outra contam como um só; a cadência vence quando cobre ao menos 60% dos intervalos, "
+        "com ao menos 4 pagamentos, 3 intervalos na faixa e 3 períodos de histórico (cadência também conta para a regra de recorrente frequente). "
+        "Um ciclo conta como perdido depois de meio período sem pagamento após a data prevista.\n"
+    )
 
     md.append("\n---\n")
     md.append("## O que é não recorrente / extraordinário (tende a distorcer o mês)\n")
@@ -1220,15 +1812,86 @@ def merge_insights(mov_ins: Dict[str, Any], contas_ins: Dict[str, Any]) -> str:
     md.append("\n---\n")
     md.append("## Alertas de valores fora do padrão (movimentos)\n")
     md.append(top_outliers(mov_ins.get("outliers", []), limit=12))
+    md.append(
+        "\n\n> Escore robusto = (ln valor − ln mediana) / (1,4826 × MAD) do fornecedor, ou da categoria quando o fornecedor tem poucos "
+        "pagamentos; a partir de 3,5 e R$ 20 mil. Tabela completa em `public/dados/outliers.csv`.\n"
+    )
 
     md.append("\n---\n")
     md.append("## Projeção e recorrência baseada em compromissos (base complementar)\n")
     md.append(f"- **Total em aberto (compromissos não cancelados):** {money(contas_ins.get('total_aberto', 0.0))}\n")
     if proj_mes:
         md.append(f"- **Projeção de aberto no mês {proj_mes}:** {money(proj_val)}\n")
-        aberto_mes_cat = contas_ins.get("aberto_por_mes_categoria", {}).get(proj_mes, {})
+        cubo = contas_ins.get("cubo_aberto")
+        aberto_mes_cat = cubo.slice(mes=proj_mes).rollup("categoria") if cubo is not None else {}
         md.append("\n### Top categorias do mês projetado (em aberto)\n")
         md.append(top_dict(aberto_mes_cat, limit=12))
+    prev = contas_ins.get("previsao_caixa")
+    if prev is not None:
+        md.append(f"\n### Previsão de caixa ({prev.cenarios} cenários, {len(prev.datas)} dias a partir de {prev.datas[0].strftime('%d/%m/%Y')})\n")
+        comp = prev.componentes
+        origem = prev.parametros.get("saldo_inicial_origem", {})
+        md.append(
+            f"- **Saldo inicial (todos os bancos):** {money(comp['saldo_inicial'])} — "
+            + "; ".join(f"{b}: {o}" for b, o in origem.items())
+        )
+        md.append(f"- **Contas a pagar no horizonte:** {money(comp['pagar_agendado'])} | **Contas a receber pendentes:** {money(comp['receber_pendente'])}")
+        md.append(f"- **Recorrentes projetados (média):** {money(comp['recorrentes_esperado'])} | **Vendas novas projetadas (média):** {money(comp.get('vendas_esperado', 0.0))}")
+        md.append(
+            f"- **Recorrentes com título agendado no contas a pagar:** {prev.parametros['grupos_recorrentes_com_agendado']} de "
+            f"{prev.parametros['grupos_recorrentes']} grupos ({money(comp['recorrentes_agendado'])} já agendados, descontados)"
+        )
+        for aviso in prev.avisos:
+            md.append(f"- **Atenção:** {aviso}")
+        md.append(
+            f"- **Menor saldo no período (p5 / mediana / p95):** {money(prev.minimo_total[0])} / "
+            f"{money(prev.minimo_total[2])} / {money(prev.minimo_total[4])}"
+        )
+        if prev.prob_negativo is not None:
+            md.append("\n**Saldo total por semana (p5 / mediana / p95; chance de saldo negativo):**\n")
+        else:
+            md.append("\n**Saldo total por semana (p5 / mediana / p95):**\n")
+        semanas = list(range(0, len(prev.datas), 7))
+        if semanas[-1] != len(prev.datas) - 1:
+            semanas.append(len(prev.datas) - 1)
+        for k in semanas:
+            md.append(
+                f"- **{prev.datas[k].strftime('%d/%m/%Y')}:** {money(prev.faixa(5)[k])} / {money(prev.faixa(50)[k])} / "
+                f"{money(prev.faixa(95)[k])}" + (f" ({prev.prob_negativo[k]:.0%})" if prev.prob_negativo is not None else "")
+            )
+        md.append(
+            "\n> Monte-Carlo com atrasos de pagamento/recebimento, inadimplência e dispersão p90/mediana dos recorrentes. "
+            "Faixas diárias por banco em `public/dados/previsao_caixa.csv`.\n"
+        )
+    conc = contas_ins.get("conciliacao")
+    if conc is not None:
+        r = conc["resumo"]
+        md.append("\n### Conciliação: baixas do contas a pagar × movimentos\n")
+        md.append(
+            f"- **Baixas no período dos movimentos:** {r['titulos_no_periodo']} | **conciliadas:** {r['titulos_conciliados_no_periodo']} "
+            f"({money(r['valor_conciliado'])}; {r['lotes']} pagamentos em lote; "
+            f"{r['titulos_conciliados_fora_periodo']} baixas fora do período conciliadas na borda da janela)"
+        )
+        md.append(f"- **Baixas sem movimento correspondente:** {r['titulos_sem_movimento']} ({money(r['valor_sem_movimento'])})")
+        md.append(
+            f"- **Saídas para fornecedores do contas a pagar sem título baixado:** {r['movimentos_sem_titulo']} "
+            f"({money(r['valor_movimentos_sem_titulo'])})"
+        )
+        md.append(f"- **Baixas fora do período dos movimentos (não conferidas):** {r['titulos_fora_periodo']} ({money(r['valor_fora_periodo'])})")
+        if conc["titulos_sem_movimento"]:
+            md.append("\n**Maiores baixas sem movimento:**\n")
+            for x in conc["titulos_sem_movimento"][:8]:
+                md.append(f"- **{x['data_baixa']} | {x['fornecedor'] or '(sem fornecedor)'}:** {money(x['valor'])} (título {x['titulo']}, {x['status']})")
+        if conc["movimentos_sem_titulo"]:
+            md.append("\n**Maiores saídas sem título:**\n")
+            for x in conc["movimentos_sem_titulo"][:8]:
+                md.append(f"- **{x['data']} | {x['fornecedor']}:** {money(x['valor'])} ({x['banco']})")
+        md.append(
+            f"\n> Mesmo valor em centavos e mesmo fornecedor a até {r['janela_fornecedor_dias']} dias da baixa, ou só o mesmo valor a até "
+            f"{r['janela_dias']} dias confirmado pelo nome no histórico e pelo banco; "
+            "lotes = títulos do mesmo fornecedor (ou banco) e dia somados num único pagamento. "
+            "Pares e sobras em `public/dados/conciliacao.csv`.\n"
+        )
     md.append("\n### Itens recorrentes detectados na base complementar (múltiplos meses)\n")
     md.append(top_contas_recorrentes(contas_ins.get("recorrentes", []), limit=12))
     md.append("\n\n### Alertas na base complementar (dados faltantes / ajustes / valores altos)\n")
@@ -1335,34 +1998,185 @@ def escrever_csv_pessoas(pes_ins: Dict[str, Any], out_path: Path) -> None:
             )
 
 
+@dataclass
+class SaidasAnalise:
+    """Arquivos gerados por `executar_analise` (padrão: os de `public/dados` e os relatórios na raiz)."""
+
+    md: Path = OUT_MD
+    classificacao_csv: Path = OUT_CLASSIFICACAO_CSV
+    pessoas_md: Path = OUT_PESSOAS_MD
+    pessoas_csv: Path = OUT_PESSOAS_CSV
+    pacotes_dir: Path = OUT_PACOTES_DIR
+    quase_duplicidades_csv: Path = OUT_QUASE_DUPLICIDADES_CSV
+    outliers_csv: Path = OUT_OUTLIERS_CSV
+    previsao_caixa_csv: Path = OUT_PREVISAO_CAIXA_CSV
+    conciliacao_csv: Path = OUT_CONCILIACAO_CSV
+
+    @classmethod
+    def na_pasta(cls, pasta: Path) -> "SaidasAnalise":
+        """Mesmos nomes de arquivo, todos em `pasta` (benchmark, testes manuais)."""
+        padrao = cls()
+        return cls(**{k: pasta / v.name for k, v in padrao.__dict__.items()})
+
+
+def executar_analise(
+    perfil: Perfil,
+    movimentos_csv: Path = MOVIMENTOS_CSV,
+    contas_csv: Path = CONTAS_PAGAR_CSV,
+    contas_receber_csv: Optional[Path] = CONTAS_RECEBER_CSV,
+    saidas: Optional[SaidasAnalise] = None,
+    cache: Optional[CacheParse] = None,
+    estado_path: Optional[Path] = None,
+    reconstruir_estado: bool = False,
+    saldos_iniciais: Optional[Dict[str, float]] = None,
+) -> Dict[str, Any]:
+    """
+    Todas as etapas do `main`, cada uma num `perfil.etapa` (a lista de etapas do `--profile` e do
+    benchmark sai daqui). Devolve as tabelas e os resultados usados no resumo do console.
+    """
+    saidas = saidas if saidas is not None else SaidasAnalise()
+    with perfil.etapa("ler_movimentos") as et:
+        movs = ler_movimentos(movimentos_csv, cache)
+        et.linhas = len(movs)
+    with perfil.etapa("ler_contas_pagar") as et:
+        contas = ler_contas_pagar(contas_csv, cache)
+        et.linhas = len(contas)
+
+    estado: Optional[EstadoRecorrencia] = None
+    movimentos_antes = 0
+    if estado_path:
+        with perfil.etapa("carregar_estado"):
+            estado = EstadoRecorrencia() if reconstruir_estado else EstadoRecorrencia.carregar(estado_path)
+        movimentos_antes = estado.movimentos
+
+    with perfil.etapa("classify_recorrencia_movimentos", len(movs)):
+        mov_ins = classify_recorrencia_movimentos(movs, estado)
+    if estado is not None:
+        with perfil.etapa("salvar_estado", len(estado)):
+            estado.salvar(estado_path)
+    with perfil.etapa("classify_recorrencia_contas", len(contas)):
+        contas_ins = classify_recorrencia_contas(contas)
+    with perfil.etapa("analisar_pessoas_rescisoes", len(movs)):
+        pes_ins = analisar_pessoas_rescisoes(movs)
+    with perfil.etapa("detectar_quase_duplicidades", len(movs)):
+        mov_ins["quase_duplicidades"], mov_ins["quase_duplicidades_resumo"] = detectar_quase_duplicidades(movs)
+
+    with perfil.etapa("previsao_caixa") as et:
+        receber = ler_contas_receber(contas_receber_csv) if contas_receber_csv and contas_receber_csv.exists() else []
+        cfg_prev = ConfigPrevisao(saldos_iniciais=saldos_iniciais)
+        contas_ins["previsao_caixa"] = simular_caixa(
+            movs, contas, receber, mov_ins["recorrentes_fortes"] + mov_ins["recorrentes_frequentes"], cfg_prev
+        )
+        et.linhas = len(movs) + len(contas) + len(receber)
+
+    with perfil.etapa("conciliacao", len(movs) + len(contas)):
+        contas_ins["conciliacao"] = conciliar_baixas(movs, contas)
+
+    with perfil.etapa("merge_insights"):
+        md = merge_insights(mov_ins, contas_ins)
+        saidas.md.write_text(md, encoding="utf-8")
+    with perfil.etapa("classificacao_movimentos", len(movs)):
+        classes = classificar_movimentos(movs, mov_ins)
+        escrever_classificacao_movimentos(movs, mov_ins, saidas.classificacao_csv, classes)
+    with perfil.etapa("relatorios_pessoas", len(pes_ins["pessoas"])):
+        saidas.pessoas_md.write_text(gerar_md_pessoas_rescisoes(pes_ins), encoding="utf-8")
+        escrever_csv_pessoas(pes_ins, saidas.pessoas_csv)
+    with perfil.etapa("pacotes_dashboard"):
+        manifesto = escrever_pacotes(gerar_pacotes(movs, mov_ins, pes_ins, classes, contas_ins["cubo_aberto"]), saidas.pacotes_dir)
+    with perfil.etapa("csv_alertas", len(mov_ins["quase_duplicidades"]) + len(mov_ins["outliers"])):
+        escrever_csv_quase_duplicidades(mov_ins["quase_duplicidades"], saidas.quase_duplicidades_csv)
+        escrever_csv_outliers(mov_ins["outliers"], saidas.outliers_csv)
+        escrever_csv_previsao(contas_ins["previsao_caixa"], saidas.previsao_caixa_csv)
+        escrever_csv_conciliacao(contas_ins["conciliacao"], saidas.conciliacao_csv)
+
+    return {
+        "movs": movs,
+        "contas": contas,
+        "mov_ins": mov_ins,
+        "contas_ins": contas_ins,
+        "pes_ins": pes_ins,
+        "manifesto": manifesto,
+        "estado": estado,
+        "movimentos_antes": movimentos_antes,
+    }
+
+
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Análise de recorrência (movimentos + contas a pagar)")
+    parser.add_argument(
+        "--estado",
+        type=Path,
+        default=None,
+        help="JSON com o estado de recorrência por grupo; incorpora só movimentos novos e classifica sobre todo o histórico",
+    )
+    parser.add_argument(
+        "--reconstruir-estado",
+        action="store_true",
+        help="Ignora o estado salvo em --estado e reconstrói a partir dos movimentos atuais",
+    )
+    parser.add_argument(
+        "--sem-cache",
+        action="store_true",
+        help=f"Não usa o cache de parse dos CSVs ({CACHE_PARSE_DIR})",
+    )
+    parser.add_argument(
+        "--saldos-iniciais",
+        type=Path,
+        default=None,
+        help="JSON {banco: saldo em R$} com o saldo real de cada banco no início da previsão de caixa",
+    )
+    adicionar_argumentos(parser, ROOT / "benchmarks" / "perfil_analise_recorrencia.json")
+    args = parser.parse_args()
+    perfil = perfil_dos_argumentos(args)
+
     if not MOVIMENTOS_CSV.exists():
         raise SystemExit(f"Arquivo não encontrado: {MOVIMENTOS_CSV}")
     if not CONTAS_PAGAR_CSV.exists():
         raise SystemExit(f"Arquivo não encontrado: {CONTAS_PAGAR_CSV}")
 
-    movs = ler_movimentos(MOVIMENTOS_CSV)
-    contas = ler_contas_pagar(CONTAS_PAGAR_CSV)
-
-    mov_ins = classify_recorrencia_movimentos(movs)
-    contas_ins = classify_recorrencia_contas(contas)
-    pes_ins = analisar_pessoas_rescisoes(movs)
-
-    md = merge_insights(mov_ins, contas_ins)
-    OUT_MD.write_text(md, encoding="utf-8")
-    escrever_classificacao_movimentos(movs, mov_ins, OUT_CLASSIFICACAO_CSV)
-    OUT_PESSOAS_MD.write_text(gerar_md_pessoas_rescisoes(pes_ins), encoding="utf-8")
-    escrever_csv_pessoas(pes_ins, OUT_PESSOAS_CSV)
+    cache = None if args.sem_cache else CacheParse(CACHE_PARSE_DIR)
+    r = executar_analise(
+        perfil,
+        cache=cache,
+        estado_path=args.estado,
+        reconstruir_estado=args.reconstruir_estado,
+        saldos_iniciais=carregar_saldos_iniciais(args.saldos_iniciais) if args.saldos_iniciais else None,
+    )
+    movs, contas, mov_ins, contas_ins, estado = r["movs"], r["contas"], r["mov_ins"], r["contas_ins"], r["estado"]
+    manifesto = r["manifesto"]
 
     # Evita caracteres fora do codepage do console Windows
     print("OK: Relatorio gerado:", OUT_MD)
     print("   - Classificacao CSV:", OUT_CLASSIFICACAO_CSV)
     print("   - Pessoas (MD):", OUT_PESSOAS_MD)
     print("   - Pessoas (CSV):", OUT_PESSOAS_CSV)
+    print("   - Pacotes do dashboard:", manifesto)
+    print("   - Outliers:", len(mov_ins["outliers"]), "em", OUT_OUTLIERS_CSV)
+    print("   - Quase-duplicidades:", len(mov_ins["quase_duplicidades"]), "grupos em", OUT_QUASE_DUPLICIDADES_CSV)
+    if mov_ins["quase_duplicidades_resumo"]["vizinhos_descartados"]:
+        print(
+            "   - AVISO: quase-duplicidades com",
+            mov_ins["quase_duplicidades_resumo"]["vizinhos_descartados"],
+            "comparações acima do limite de vizinhos (não avaliadas)",
+        )
+    prev = contas_ins["previsao_caixa"]
+    print(
+        "   - Previsao de caixa:", prev.cenarios, "cenarios x", len(prev.datas), "dias em", OUT_PREVISAO_CAIXA_CSV,
+        f"(P(saldo < 0) no fim: {prev.prob_negativo[-1]:.0%})" if prev.prob_negativo is not None else "(saldo inicial sem ancora)",
+    )
+    conc = contas_ins["conciliacao"]["resumo"]
+    print(
+        "   - Conciliacao:", conc["titulos_conciliados_no_periodo"], "de", conc["titulos_no_periodo"], "baixas no periodo;",
+        conc["titulos_sem_movimento"], "sem movimento,", conc["movimentos_sem_titulo"], "movimentos sem titulo em", OUT_CONCILIACAO_CSV,
+    )
     print("   - Movimentos:", len(movs))
     print("   - Base complementar (contas):", len(contas))
     print("   - Saidas (movimentos):", money(mov_ins["saidas_total"]))
     print("   - Total em aberto:", money(contas_ins["total_aberto"]))
+    print("   - Cache de normalizacao:", resumo_cache())
+    if estado is not None:
+        print("   - Estado de recorrencia:", args.estado, f"({len(estado)} grupos; {estado.movimentos - r['movimentos_antes']} movimentos novos)")
+    finalizar(perfil, args, "analise_recorrencia")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,195 @@
+"""
+Análise de recorrência em lote: várias empresas (ex.: Maclinea, Usifix) e vários períodos (exportações mensais).
+
+Entrada: um manifesto JSON com as exportações, por exemplo:
+
+    {
+      "entradas": [
+        {"empresa": "Maclinea", "periodo": "2025-10", "movimentos": "maclinea/movimentos_2025-10.csv",
+         "contas": "maclinea/contasPagar_2025-10.csv"},
+        {"empresa": "Maclinea", "periodo": "2025-11", "movimentos": "maclinea/movimentos_2025-11.csv"},
+        {"empresa": "Usifix", "periodo": "2025-11", "movimentos": "usifix/movimentos_2025-11.csv"}
+      ]
+    }
+
+Caminhos relativos são resolvidos a partir da pasta do manifesto; `contas` é opcional.
+
+Cada arquivo é lido e agregado num processo separado (`AgregadorRecorrencia` é serializável);
+os parciais são mesclados por empresa (em ordem de período) e depois no consolidado, e cada um
+gera seu `ANALISE_RECORRENCIA.md` em `<saida>/<empresa>/` e `<saida>/CONSOLIDADO/`. No consolidado as
+duplicidades continuam agrupadas por empresa (pagamentos iguais de empresas diferentes não contam).
+
+Contas a pagar são fotografias da carteira: entre períodos da mesma empresa, vale o título
+(código) da exportação mais recente.
+
+Os movimentos de períodos diferentes não são deduplicados entre si: exportações sobrepostas
+são avisadas no console, e nesse caso o ideal é usar o modo incremental (`--estado`) do script principal.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from analise_recorrencia import (
+    CACHE_PARSE_DIR,
+    ROOT,
+    AgregadorRecorrencia,
+    ContaPagar,
+    classify_recorrencia_contas,
+    ler_contas_pagar,
+    ler_movimentos,
+    merge_insights,
+    money,
+)
+from cache_parse import CacheParse
+
+NOME_CONSOLIDADO = "CONSOLIDADO"
+
+
+@dataclass
+class EntradaLote:
+    empresa: str
+    periodo: str
+    movimentos: Path
+    contas: Optional[Path] = None
+
+
+@dataclass
+class ParcialLote:
+    """Resultado de um arquivo do manifesto (o que volta do processo filho)."""
+
+    entrada: EntradaLote
+    agregador: AgregadorRecorrencia
+    contas: List[ContaPagar]
+    movimentos: int
+    segundos: float
+
+
+def ler_manifesto(path: Path) -> List[EntradaLote]:
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    base = path.resolve().parent
+    entradas: List[EntradaLote] = []
+    for i, d in enumerate(payload.get("entradas", [])):
+        try:
+            empresa = str(d["empresa"]).strip()
+            periodo = str(d["periodo"]).strip()
+            movimentos = base / d["movimentos"]
+        except KeyError as e:
+            raise SystemExit(f"Manifesto {path}: entrada {i} sem o campo {e}")
+        contas = base / d["contas"] if d.get("contas") else None
+        for arq in (movimentos, contas):
+            if arq is not None and not arq.exists():
+                raise SystemExit(f"Arquivo não encontrado: {arq}")
+        entradas.append(EntradaLote(empresa=empresa, periodo=periodo, movimentos=movimentos, contas=contas))
+    if not entradas:
+        raise SystemExit(f"Manifesto sem entradas: {path}")
+    return entradas
+
+
+def processar_entrada(entrada: EntradaLote, pasta_cache: Optional[Path] = None) -> ParcialLote:
+    """Lê e agrega um arquivo (roda no processo filho)."""
+    t0 = time.perf_counter()
+    cache = CacheParse(pasta_cache) if pasta_cache else None
+    movs = ler_movimentos(entrada.movimentos, cache)
+    agregador = AgregadorRecorrencia()
+    agregador.adicionar(movs)
+    contas = ler_contas_pagar(entrada.contas, cache) if entrada.contas else []
+    return ParcialLote(
+        entrada=entrada,
+        agregador=agregador,
+        contas=contas,
+        movimentos=len(movs),
+        segundos=time.perf_counter() - t0,
+    )
+
+
+def _pasta_empresa(empresa: str) -> str:
+    return re.sub(r"[^\w\-]+", "_", empresa).strip("_") or "empresa"
+
+
+def mesclar_empresa(parciais: List[ParcialLote]) -> Tuple[AgregadorRecorrencia, List[ContaPagar]]:
+    """Mescla os períodos de uma empresa em ordem cronológica (os parciais não são alterados)."""
+    agregador = AgregadorRecorrencia()
+    contas_por_codigo: Dict[str, ContaPagar] = {}
+    sem_codigo: List[ContaPagar] = []
+    for p in sorted(parciais, key=lambda x: x.entrada.periodo):
+        repetidos = agregador.estado.repetidos(p.agregador.estado)
+        if repetidos:
+            print(
+                f"   ! {p.entrada.empresa} {p.entrada.periodo}: {repetidos} movimentos ja vistos em outro periodo "
+                "(exportacoes sobrepostas sao somadas em dobro)"
+            )
+        agregador.mesclar(p.agregador)
+        for c in p.contas:
+            if c.codigo:
+                contas_por_codigo[c.codigo] = c
+            else:
+                sem_codigo.append(c)
+    return agregador, [*contas_por_codigo.values(), *sem_codigo]
+
+
+def escrever_relatorio(pasta: Path, agregador: AgregadorRecorrencia, contas: List[ContaPagar]) -> Dict[str, float]:
+    mov_ins = agregador.resultado()
+    contas_ins = classify_recorrencia_contas(contas)
+    pasta.mkdir(parents=True, exist_ok=True)
+    (pasta / "ANALISE_RECORRENCIA.md").write_text(merge_insights(mov_ins, contas_ins), encoding="utf-8")
+    return {"saidas": mov_ins["saidas_total"], "aberto": contas_ins["total_aberto"]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Análise de recorrência em lote (várias empresas/períodos)")
+    parser.add_argument("manifesto", type=Path, help="JSON com as entradas (empresa, periodo, movimentos[, contas])")
+    parser.add_argument("--saida", type=Path, default=ROOT / "relatorios_lote", help="Pasta dos relatórios")
+    parser.add_argument(
+        "--processos",
+        type=int,
+        default=None,
+        help="Quantidade de processos (padrão: todos os núcleos)",
+    )
+    parser.add_argument("--sem-cache", action="store_true", help=f"Não usa o cache de parse dos CSVs ({CACHE_PARSE_DIR})")
+    args = parser.parse_args()
+
+    if not args.manifesto.exists():
+        raise SystemExit(f"Arquivo não encontrado: {args.manifesto}")
+    entradas = ler_manifesto(args.manifesto)
+    processos = max(1, min(args.processos or os.cpu_count() or 1, len(entradas)))
+
+    t0 = time.perf_counter()
+    processar = partial(processar_entrada, pasta_cache=None if args.sem_cache else CACHE_PARSE_DIR)
+    if processos == 1:
+        parciais = [processar(e) for e in entradas]
+    else:
+        with ProcessPoolExecutor(max_workers=processos) as pool:
+            parciais = list(pool.map(processar, entradas))
+    por_empresa: Dict[str, List[ParcialLote]] = {}
+    for p in parciais:
+        por_empresa.setdefault(p.entrada.empresa, []).append(p)
+        print(f"   - {p.entrada.empresa} {p.entrada.periodo}: {p.movimentos} movimentos ({p.segundos:.1f}s)")
+
+    consolidado = AgregadorRecorrencia()
+    contas_consolidadas: List[ContaPagar] = []
+    for empresa, parciais_empresa in por_empresa.items():
+        agregador, contas = mesclar_empresa(parciais_empresa)
+        totais = escrever_relatorio(args.saida / _pasta_empresa(empresa), agregador, contas)
+        print(f"OK: {empresa}: saidas {money(totais['saidas'])}; em aberto {money(totais['aberto'])}")
+        # duplicidades do consolidado só dentro de cada empresa
+        consolidado.mesclar(agregador, empresa=empresa)
+        contas_consolidadas.extend(contas)
+
+    totais = escrever_relatorio(args.saida / NOME_CONSOLIDADO, consolidado, contas_consolidadas)
+    print(f"OK: Consolidado ({len(por_empresa)} empresas): saidas {money(totais['saidas'])}; em aberto {money(totais['aberto'])}")
+    print(f"   - Relatorios em: {args.saida}")
+    print(f"   - {len(entradas)} arquivos em {processos} processos ({time.perf_counter() - t0:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
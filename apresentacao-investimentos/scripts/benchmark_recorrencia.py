@@ -0,0 +1,241 @@
+"""
+Benchmark das análises de recorrência e de pessoas/rescisões sobre dados sintéticos.
+
+Para cada tamanho pedido, gera (ou reaproveita) os CSVs com `dados_sinteticos` e roda
+`analise_recorrencia.executar_analise` (o mesmo pipeline do `main`, saídas numa pasta temporária).
+As etapas medidas são as etapas de primeiro nível do `instrumentacao.Perfil` que o pipeline
+registra: uma etapa nova no script aparece aqui sem mudar o benchmark.
+
+- tempo: melhor de `--repeticoes` execuções (caches de normalização limpos antes de cada uma), com o
+  perfil sem memória
+- memória: pico do `tracemalloc` por etapa (perfil com memória), numa execução separada (o
+  tracemalloc deixa tudo mais lento, então não contamina os tempos); `--sem-memoria` pula essa execução
+
+Resultados em `<saida>/<rotulo>.json` e `<saida>/<rotulo>.md`; `--comparar anterior.json` acrescenta
+ao Markdown o tempo da execução anterior e a razão entre as duas.
+
+Uso:
+    python scripts/benchmark_recorrencia.py --linhas 10000 100000 1000000 --rotulo antes
+    python scripts/benchmark_recorrencia.py --linhas 10000 100000 1000000 --rotulo depois --comparar benchmarks/antes.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import hashlib
+import json
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from analise_recorrencia import ROOT, SaidasAnalise, executar_analise
+from dados_sinteticos import ConfigSintetica, gerar, ler_mix
+from instrumentacao import MB, Perfil
+from normalizacao import limpar_caches
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+BENCH_DIR = ROOT / "benchmarks"
+DADOS_DIR = ROOT / ".cache" / "bench"
+
+def _pasta_dados(cfg: ConfigSintetica) -> Path:
+    chave = hashlib.blake2b(json.dumps(cfg.to_json(), sort_keys=True).encode("utf-8"), digest_size=8).hexdigest()
+    return DADOS_DIR / f"{cfg.movimentos}-{chave}"
+
+
+def preparar_dados(cfg: ConfigSintetica) -> Tuple[Path, Path, float]:
+    """CSVs sintéticos da configuração (gerados uma vez e reaproveitados); devolve também o tempo de geração."""
+    pasta = _pasta_dados(cfg)
+    movimentos, contas = pasta / "movimentos.csv", pasta / "contasPagar_cons.csv"
+    if movimentos.exists() and contas.exists():
+        return movimentos, contas, 0.0
+    t0 = time.perf_counter()
+    tmp = pasta.with_name(pasta.name + ".tmp")
+    gerar(tmp, cfg)
+    tmp.rename(pasta)
+    return movimentos, contas, time.perf_counter() - t0
+
+
+def _executar(movimentos: Path, contas: Path, medir_memoria: bool) -> Dict[str, Dict[str, Any]]:
+    """Uma execução do pipeline; etapa de primeiro nível -> segundos, linhas e (com memória) pico em MB."""
+    limpar_caches()
+    gc.collect()
+    perfil = Perfil(memoria=medir_memoria)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            executar_analise(perfil, movimentos, contas, contas_receber_csv=None, saidas=SaidasAnalise.na_pasta(Path(tmp)))
+    finally:
+        perfil.encerrar()
+    out: Dict[str, Dict[str, Any]] = {}
+    for e in perfil.etapas:
+        if e.nivel == 0:
+            out[e.nome] = {"segundos": e.segundos, "linhas": e.linhas}
+            if medir_memoria:
+                out[e.nome]["pico_mb"] = e.pico_bytes / MB
+    return out
+
+
+def medir(cfg: ConfigSintetica, repeticoes: int, medir_memoria: bool) -> Dict[str, Any]:
+    movimentos, contas, seg_geracao = preparar_dados(cfg)
+    # ordem e linhas das etapas vêm da primeira execução
+    execucoes = [_executar(movimentos, contas, medir_memoria=False) for _ in range(max(1, repeticoes))]
+    memoria = _executar(movimentos, contas, medir_memoria=True) if medir_memoria else {}
+
+    etapas = []
+    for nome, r in execucoes[0].items():
+        tempos = [x[nome]["segundos"] for x in execucoes if nome in x]
+        melhor = min(tempos)
+        etapas.append(
+            {
+                "etapa": nome,
+                "segundos": melhor,
+                "mediana_segundos": float(np.median(tempos)),
+                "linhas_por_segundo": r["linhas"] / melhor if r["linhas"] and melhor > 0 else None,
+                "pico_mb": memoria.get(nome, {}).get("pico_mb"),
+            }
+        )
+    return {
+        "linhas": cfg.movimentos,
+        "contas": cfg.contas,
+        "config": cfg.to_json(),
+        "geracao_segundos": seg_geracao,
+        "total_segundos": sum(e["segundos"] for e in etapas),
+        "etapas": etapas,
+    }
+
+
+def _rss_max_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KiB; macOS em bytes
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+
+
+def _fmt_seg(v: Optional[float]) -> str:
+    if v is None:
+        return "-"
+    return f"{v * 1000:.1f} ms" if v < 1 else f"{v:.2f} s"
+
+
+def gerar_md(resultado: Dict[str, Any], anterior: Optional[Dict[str, Any]] = None) -> str:
+    linhas = [
+        f"# Benchmark: {resultado['rotulo']}",
+        "",
+        f"- Data: {resultado['data']}",
+        f"- Python {resultado['ambiente']['python']} / numpy {resultado['ambiente']['numpy']} ({resultado['ambiente']['plataforma']})",
+        f"- Repetições: {resultado['repeticoes']} (tempo = melhor execução)",
+    ]
+    if resultado.get("rss_max_mb") is not None:
+        linhas.append(f"- RSS máximo do processo: {resultado['rss_max_mb']:.0f} MB")
+    if anterior:
+        linhas.append(f"- Comparado com: {anterior['rotulo']} ({anterior['data']})")
+
+    ant_por_linhas = {r["linhas"]: {e["etapa"]: e for e in r["etapas"]} for r in (anterior or {}).get("resultados", [])}
+    for r in resultado["resultados"]:
+        ant = ant_por_linhas.get(r["linhas"], {})
+        linhas += ["", f"## {r['linhas']} movimentos / {r['contas']} contas", ""]
+        cab = "| Etapa | Tempo | Linhas/s | Pico (MB) |"
+        sep = "|---|---:|---:|---:|"
+        if ant:
+            cab += " Anterior | Razão |"
+            sep += "---:|---:|"
+        linhas += [cab, sep]
+        for e in r["etapas"] + [{"etapa": "**total**", "segundos": r["total_segundos"]}]:
+            lps = e.get("linhas_por_segundo")
+            pico = e.get("pico_mb")
+            row = f"| {e['etapa']} | {_fmt_seg(e['segundos'])} | {f'{lps:,.0f}' if lps else '-'} | {f'{pico:.1f}' if pico is not None else '-'} |"
+            if ant:
+                if e["etapa"] == "**total**":
+                    seg_ant = sum(x["segundos"] for x in ant.values())
+                else:
+                    seg_ant = ant.get(e["etapa"], {}).get("segundos")
+                razao = f"{seg_ant / e['segundos']:.2f}x" if seg_ant and e["segundos"] else "-"
+                row += f" {_fmt_seg(seg_ant)} | {razao} |"
+            linhas.append(row)
+    linhas.append("")
+    if anterior:
+        linhas.append("Razão = tempo anterior / tempo atual (acima de 1 = mais rápido agora).")
+        linhas.append("")
+    return "\n".join(linhas)
+
+
+def main() -> None:
+    padrao = ConfigSintetica()
+    parser = argparse.ArgumentParser(description="Benchmark das análises de recorrência/pessoas com dados sintéticos")
+    parser.add_argument("--linhas", type=int, nargs="+", default=[10_000, 100_000], help="Tamanhos (linhas de movimentos)")
+    parser.add_argument(
+        "--contas-por-movimento",
+        type=float,
+        default=0.1,
+        help="Linhas de contas a pagar por linha de movimentos (padrão: 0.1)",
+    )
+    parser.add_argument("--entidades", type=int, default=padrao.entidades, help="Fornecedores/clientes distintos")
+    parser.add_argument("--pessoas", type=int, default=padrao.pessoas, help="Funcionários distintos")
+    parser.add_argument("--ruido-nomes", type=float, default=padrao.ruido_nomes, help="Probabilidade de nome com ruído (0-1)")
+    parser.add_argument("--mix", action="append", default=[], metavar="CATEGORIA=PESO", help="Peso de categoria (pode repetir)")
+    parser.add_argument("--semente", type=int, default=padrao.semente)
+    parser.add_argument("--repeticoes", type=int, default=1, help="Execuções por tamanho (vale a melhor)")
+    parser.add_argument("--sem-memoria", action="store_true", help="Não mede o pico de memória (tracemalloc)")
+    parser.add_argument("--rotulo", default=None, help="Nome da execução (padrão: data/hora)")
+    parser.add_argument("--saida", type=Path, default=BENCH_DIR, help="Pasta dos resultados (JSON/MD)")
+    parser.add_argument("--comparar", type=Path, default=None, help="JSON de uma execução anterior")
+    args = parser.parse_args()
+
+    anterior = None
+    if args.comparar:
+        if not args.comparar.exists():
+            raise SystemExit(f"Arquivo não encontrado: {args.comparar}")
+        anterior = json.loads(args.comparar.read_text(encoding="utf-8"))
+
+    mix = ler_mix(args.mix)
+    agora = datetime.now()
+    rotulo = args.rotulo or agora.strftime("%Y%m%d-%H%M%S")
+    resultados = []
+    for n in args.linhas:
+        cfg = ConfigSintetica(
+            movimentos=n,
+            contas=max(1, int(n * args.contas_por_movimento)),
+            entidades=args.entidades,
+            pessoas=args.pessoas,
+            ruido_nomes=args.ruido_nomes,
+            semente=args.semente,
+            mix_categorias=mix,
+        )
+        r = medir(cfg, args.repeticoes, medir_memoria=not args.sem_memoria)
+        resultados.append(r)
+        print(f"   - {n} movimentos: {_fmt_seg(r['total_segundos'])}")
+
+    resultado = {
+        "rotulo": rotulo,
+        "data": agora.isoformat(timespec="seconds"),
+        "ambiente": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "plataforma": platform.platform(),
+        },
+        "repeticoes": args.repeticoes,
+        "rss_max_mb": _rss_max_mb(),
+        "resultados": resultados,
+    }
+    args.saida.mkdir(parents=True, exist_ok=True)
+    out_json = args.saida / f"{rotulo}.json"
+    out_md = args.saida / f"{rotulo}.md"
+    out_json.write_text(json.dumps(resultado, ensure_ascii=False, indent=2), encoding="utf-8")
+    out_md.write_text(gerar_md(resultado, anterior), encoding="utf-8")
+    print("OK: Benchmark:", out_md)
+    print("   - JSON:", out_json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Cache binário do parse dos CSVs (movimentos, contas a pagar).
+
+Cada arquivo parseado vira uma pasta em `.cache/parse/` com uma coluna por `.npy` e o vocabulário
+de textos em JSON; nas execuções seguintes as colunas são abertas com `mmap_mode="r"`, sem
+decodificar nem parsear o CSV de novo.
+
+A chave é o conteúdo: hash BLAKE2b do arquivo (+ tipo e `VERSAO_CACHE`). Tamanho e mtime servem
+de atalho — enquanto não mudam, o hash guardado no índice é reaproveitado sem reler o arquivo;
+se mudam, o arquivo é rehasheado (um `touch` sem alteração continua acertando o cache).
+
+Mudanças no parser (colunas, conversões) exigem incrementar `VERSAO_CACHE`.
+
+`salvar(..., extra=...)` guarda um dicionário JSON junto da entrada (ex.: esquema das colunas de
+um DataFrame, em `REDUÇÃO DE CUSTOS/cache_planilhas.py`), devolvido por `carregar_com_extra`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+VERSAO_CACHE = 1
+TAMANHO_BLOCO_HASH = 1 << 20
+
+Colunas = Dict[str, np.ndarray]
+
+
+def hash_arquivo(path: Path) -> str:
+    h = hashlib.blake2b(digest_size=20)
+    with path.open("rb") as f:
+        while True:
+            bloco = f.read(TAMANHO_BLOCO_HASH)
+            if not bloco:
+                break
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _escrever_json(path: Path, payload: Any) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(path)
+
+
+class CacheParse:
+    def __init__(self, pasta: Path) -> None:
+        self.pasta = pasta
+        self._indice_path = pasta / "indice.json"
+
+    def _ler_indice(self) -> Dict[str, Dict[str, Any]]:
+        if not self._indice_path.exists():
+            return {}
+        try:
+            return json.loads(self._indice_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            # índice corrompido (ex.: escrita interrompida): só perde o atalho por tamanho/mtime
+            return {}
+
+    def _chave(self, path: Path, tipo: str) -> Tuple[str, Dict[str, Dict[str, Any]], Dict[str, Any]]:
+        """(nome da entrada, índice, registro do arquivo no índice)."""
+        st = path.stat()
+        indice = self._ler_indice()
+        reg = indice.get(str(path.resolve()), {})
+        if reg.get("tamanho") == st.st_size and reg.get("mtime_ns") == st.st_mtime_ns and reg.get("hash"):
+            h = reg["hash"]
+        else:
+            h = hash_arquivo(path)
+            reg = {"tamanho": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": h, "entradas": reg.get("entradas", {})}
+            indice[str(path.resolve())] = reg
+            self.pasta.mkdir(parents=True, exist_ok=True)
+            _escrever_json(self._indice_path, indice)
+        return f"{tipo}-{h}-v{VERSAO_CACHE}", indice, reg
+
+    def carregar(self, path: Path, tipo: str) -> Optional[Tuple[List[str], Colunas]]:
+        """(textos, colunas) do parse salvo para o conteúdo atual de `path`, ou None."""
+        salvo = self.carregar_com_extra(path, tipo)
+        return None if salvo is None else salvo[:2]
+
+    def carregar_com_extra(self, path: Path, tipo: str) -> Optional[Tuple[List[str], Colunas, Dict[str, Any]]]:
+        """Como `carregar`, mais o `extra` passado em `salvar` ({} se não houve)."""
+        nome, _, _ = self._chave(path, tipo)
+        entrada = self.pasta / nome
+        meta_path = entrada / "meta.json"
+        if not meta_path.exists():
+            return None
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        textos = json.loads((entrada / "textos.json").read_text(encoding="utf-8"))
+        colunas = {c: np.load(entrada / f"{c}.npy", mmap_mode="r") for c in meta["colunas"]}
+        return textos, colunas, meta.get("extra", {})
+
+    def salvar(
+        self,
+        path: Path,
+        tipo: str,
+        textos: List[str],
+        colunas: Colunas,
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        nome, indice, reg = self._chave(path, tipo)
+        entrada = self.pasta / nome
+        if (entrada / "meta.json").exists():
+            return
+        # grava numa pasta temporária e renomeia: leitores (ou outro processo do lote) nunca veem meia entrada
+        tmp = self.pasta / f"{nome}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        for c, arr in colunas.items():
+            np.save(tmp / f"{c}.npy", np.ascontiguousarray(arr), allow_pickle=False)
+        (tmp / "textos.json").write_text(json.dumps(textos, ensure_ascii=False), encoding="utf-8")
+        meta = {"origem": str(path), "tipo": tipo, "linhas": len(next(iter(colunas.values()), [])), "colunas": list(colunas)}
+        if extra:
+            meta["extra"] = extra
+        (tmp / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        try:
+            tmp.rename(entrada)
+        except OSError:
+            # outro processo gravou a mesma entrada antes
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+
+        # a entrada anterior deste arquivo/tipo (conteúdo antigo) não serve mais
+        antiga = reg.get("entradas", {}).get(tipo)
+        if antiga and antiga != nome:
+            shutil.rmtree(self.pasta / antiga, ignore_errors=True)
+        reg.setdefault("entradas", {})[tipo] = nome
+        indice[str(path.resolve())] = reg
+        _escrever_json(self._indice_path, indice)
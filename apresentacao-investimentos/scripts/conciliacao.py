@@ -0,0 +1,460 @@
+"""
+Conciliação das baixas do contas a pagar com os movimentos bancários que as pagaram.
+
+Cada título liquidado (valor pago = valor − saldo em aberto, data da baixa) é procurado entre as
+saídas dos movimentos:
+
+1. hash join pelo valor em centavos: os movimentos ficam ordenados por (chave, dia) e cada título
+   acha com dois `searchsorted` a faixa de mesma chave dentro da janela de datas da baixa. Só os pares
+   dessa faixa são pontuados (no máximo `max_candidatos` por título, os de data mais próxima), então o
+   custo acompanha o número de pares candidatos, não títulos × movimentos. Primeiro a chave é
+   fornecedor normalizado + valor (janela `janela_fornecedor_dias`), depois só o valor (`janela_dias`)
+   para os que sobraram: PIX e boleto costumam trazer o favorecido escrito de outro jeito
+2. confiança do par = proximidade da data + similaridade do fornecedor do título com o favorecido do
+   movimento (fornecedor + histórico, a mesma `SimilaridadeEntidades` das quase-duplicidades) + mesmo
+   banco; os pares acima de `confianca_minima` são atribuídos do mais confiável para o menos, cada
+   título e cada movimento uma vez só (1:1)
+3. pagamentos em lote (N:1): os títulos que sobraram são somados por (fornecedor, data da baixa) e
+   depois por (banco, data da baixa) e a soma passa pelo mesmo join contra os movimentos que sobraram
+
+Sobras dos dois lados: títulos baixados dentro do período dos movimentos sem movimento correspondente
+(baixa sem saída no banco, ou paga por outro valor) e saídas para fornecedores que aparecem no contas a
+pagar sem título baixado correspondente. Baixas fora do período dos movimentos só são contadas.
+
+Uso avulso:
+    python scripts/conciliacao.py --janela-dias 5 --saida /tmp/conciliacao.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from normalizacao import chave_busca
+from quase_duplicidades import SimilaridadeEntidades
+
+if TYPE_CHECKING:
+    from analise_recorrencia import ContaPagar, MovimentoTable
+
+# implantação de saldo e transferência interna não pagam títulos
+CATEGORIAS_NAO_OPERACIONAIS = (5, 6)
+# dias cabem em 20 bits (até o ano 4840): chave do join = chave << 20 | dia; chaves até 2^43 (R$ 87 bi em centavos)
+BITS_DIA = 20
+
+
+@dataclass
+class ConfigConciliacao:
+    janela_dias: int = 3
+    # janela do join por fornecedor + valor (as duas chaves batendo já são evidência forte)
+    janela_fornecedor_dias: int = 10
+    confianca_minima: float = 0.7
+    # pesos da confiança (somam 1 com a base)
+    base: float = 0.35
+    peso_data: float = 0.25
+    peso_fornecedor: float = 0.3
+    peso_banco: float = 0.1
+    # títulos somados num pagamento em lote
+    lote_minimo: int = 2
+    # candidatos por título no join só por valor (os de data mais próxima)
+    max_candidatos: int = 20
+
+
+def pares_por_valor(
+    chaves_a: np.ndarray,
+    dias_a: np.ndarray,
+    chaves_b: np.ndarray,
+    dias_b: np.ndarray,
+    janela: int,
+    limite: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pares (i, j) com `chaves_a[i] == chaves_b[j]` e `|dias_a[i] − dias_b[j]| <= janela`. Chaves
+    inteiras não negativas (centavos, ou um código denso de fornecedor + centavos); `dias` em dias
+    desde 1970. Com `limite`, cada `i` fica com no máximo `limite` candidatos, os de data mais
+    próxima da sua (valores muito repetidos não viram uma explosão de pares).
+    """
+    vazio = np.zeros(0, dtype=np.int64)
+    if not len(chaves_a) or not len(chaves_b):
+        return vazio, vazio
+    chave_b = (chaves_b.astype(np.int64) << BITS_DIA) | dias_b.astype(np.int64)
+    ordem = np.argsort(chave_b, kind="stable")
+    chave_b = chave_b[ordem]
+    base = chaves_a.astype(np.int64) << BITS_DIA
+    lo = np.searchsorted(chave_b, base + (dias_a - janela), side="left")
+    hi = np.searchsorted(chave_b, base + (dias_a + janela), side="right")
+    if limite is not None:
+        # faixa de `limite` posições em volta do dia do título, dentro de [lo, hi)
+        meio = np.searchsorted(chave_b, base + dias_a, side="left")
+        ini = np.clip(meio - limite // 2, lo, hi)
+        fim = np.minimum(hi, ini + limite)
+        lo, hi = np.maximum(lo, fim - limite), fim
+    n = hi - lo
+    total = int(n.sum())
+    if not total:
+        return vazio, vazio
+    i = np.repeat(np.arange(len(chaves_a)), n)
+    # posição dentro da faixa de cada título + início da faixa
+    desloc = np.arange(total) - np.repeat(np.cumsum(n) - n, n)
+    j = ordem[np.repeat(lo, n) + desloc]
+    return i, j
+
+
+@dataclass
+class _Titulos:
+    contas: List["ContaPagar"]
+    centavos: np.ndarray
+    dias: np.ndarray
+    texto: np.ndarray  # posição na lista de textos da similaridade
+    banco: List[str]
+
+
+def _titulos_baixados(contas: Sequence["ContaPagar"]) -> _Titulos:
+    sel: List["ContaPagar"] = []
+    centavos: List[int] = []
+    for c in contas:
+        if c.data_baixa is None or "cancel" in chave_busca(c.status):
+            continue
+        # parcela paga: o que saiu do saldo (títulos pendentes trazem a previsão na coluna da baixa)
+        pago = int(round((c.valor - max(c.saldo_aberto, 0.0)) * 100))
+        if pago <= 0:
+            continue
+        sel.append(c)
+        centavos.append(pago)
+    dias = np.array([c.data_baixa.date() for c in sel], dtype="datetime64[D]").astype(np.int64)
+    return _Titulos(
+        contas=sel,
+        centavos=np.array(centavos, dtype=np.int64),
+        dias=dias,
+        texto=np.zeros(len(sel), dtype=np.int64),
+        banco=[c.banco for c in sel],
+    )
+
+
+def _atribuir(
+    conf: np.ndarray,
+    dist: np.ndarray,
+    a: np.ndarray,
+    b: np.ndarray,
+) -> List[Tuple[int, int, float, int]]:
+    """Guloso: do par mais confiável (e mais próximo) para o menos, cada `a` e cada `b` uma vez."""
+    usados_a: set = set()
+    usados_b: set = set()
+    out: List[Tuple[int, int, float, int]] = []
+    for k in np.lexsort((b, a, dist, -conf)).tolist():
+        ia, ib = int(a[k]), int(b[k])
+        if ia in usados_a or ib in usados_b:
+            continue
+        usados_a.add(ia)
+        usados_b.add(ib)
+        out.append((ia, ib, float(conf[k]), int(dist[k])))
+    return out
+
+
+def conciliar_baixas(
+    t: "MovimentoTable",
+    contas: Sequence["ContaPagar"],
+    cfg: Optional[ConfigConciliacao] = None,
+) -> Dict[str, Any]:
+    """
+    Pares título(s) → movimento, títulos sem movimento e movimentos sem título, com um resumo.
+    Valores em reais.
+    """
+    cfg = cfg if cfg is not None else ConfigConciliacao()
+    tit = _titulos_baixados(contas)
+
+    linhas = np.flatnonzero((t.debito > 0) & ~np.isin(t.categoria_id, CATEGORIAS_NAO_OPERACIONAIS))
+    m_cents = t.debito[linhas].astype(np.int64)
+    m_dias = t.data[linhas].astype("datetime64[D]").astype(np.int64)
+    m_banco = t.banco[linhas]
+    if len(t):
+        todos_dias = t.data.astype("datetime64[D]").astype(np.int64)
+        periodo = (int(todos_dias.min()), int(todos_dias.max()))
+    else:
+        periodo = (0, -1)
+
+    # chave de fornecedor: nome normalizado, igual dos dois lados (todos os fornecedores do contas a pagar)
+    id_forn: Dict[str, int] = {}
+    for c in contas:
+        k = chave_busca(c.fornecedor)
+        if k:
+            id_forn.setdefault(k, len(id_forn))
+    t_forn = np.array([id_forn.get(chave_busca(c.fornecedor), -1) for c in tit.contas], dtype=np.int64)
+    cods_forn, inv = np.unique(t.fornecedor[linhas], return_inverse=True)
+    m_forn = np.array([id_forn.get(chave_busca(t.textos[c]), -1) for c in cods_forn.tolist()], dtype=np.int64)[inv.reshape(-1)]
+
+    # textos da similaridade: fornecedores dos títulos + favorecidos distintos dos movimentos
+    nomes = sorted({c.fornecedor for c in tit.contas})
+    pos_nome = {n: k for k, n in enumerate(nomes)}
+    tit.texto = np.array([pos_nome[c.fornecedor] for c in tit.contas], dtype=np.int64)
+    pares_txt, m_txt = np.unique(
+        (t.fornecedor[linhas].astype(np.int64) << 32) | t.historico[linhas].astype(np.int64), return_inverse=True
+    )
+    m_txt = m_txt.reshape(-1) + len(nomes)
+    similaridade = SimilaridadeEntidades(nomes + [f"{t.textos[c >> 32]} {t.textos[c & 0xFFFFFFFF]}" for c in pares_txt.tolist()])
+    n_textos = len(nomes) + len(pares_txt)
+    cod_banco = {t.textos[c]: c for c in np.unique(t.banco).tolist()}
+
+    def pontuar(
+        chaves: np.ndarray,
+        m_chaves: np.ndarray,
+        dias: np.ndarray,
+        textos: np.ndarray,
+        bancos: List[str],
+        livres: np.ndarray,
+        janela: int,
+    ) -> List[Tuple[int, int, float, int]]:
+        """Pares (lado A, posição em `linhas`, confiança, distância) atribuídos contra os movimentos `livres`."""
+        a, jb = pares_por_valor(chaves, dias, m_chaves[livres], m_dias[livres], janela, cfg.max_candidatos)
+        if not len(a):
+            return []
+        b = livres[jb]
+        dist = np.abs(dias[a] - m_dias[b])
+        # similaridade uma vez por par de textos distintos; lado A sem texto (lote por banco) = 0
+        par = np.where(textos[a] >= 0, textos[a] * n_textos + m_txt[b], -1)
+        unicos, inv = np.unique(par, return_inverse=True)
+        sim = np.array([similaridade(p // n_textos, p % n_textos) if p >= 0 else 0.0 for p in unicos.tolist()])[inv.reshape(-1)]
+        banco_a = np.array([cod_banco.get(x, -1) for x in bancos], dtype=np.int64)
+        mesmo_banco = banco_a[a] == m_banco[b]
+        conf = (
+            cfg.base
+            + cfg.peso_data * (1 - dist / (janela + 1))
+            + cfg.peso_fornecedor * sim
+            + cfg.peso_banco * mesmo_banco
+        )
+        ok = conf >= cfg.confianca_minima - 1e-9
+        return _atribuir(conf[ok], dist[ok], a[ok], b[ok])
+
+    datas_fmt: Dict[int, str] = {}
+
+    def data_br(dia: int) -> str:
+        txt = datas_fmt.get(dia)
+        if txt is None:
+            txt = datas_fmt[dia] = np.datetime64(dia, "D").item().strftime("%d/%m/%Y")
+        return txt
+
+    pares: List[Dict[str, Any]] = []
+
+    def registrar(tipo: str, ts: List[int], mb: int, conf: float, dist: int) -> None:
+        i = int(linhas[mb])
+        cs = [tit.contas[k] for k in ts]
+        pares.append(
+            {
+                "tipo": tipo,
+                "titulos": [c.codigo for c in cs],
+                "fornecedores": sorted({c.fornecedor for c in cs}),
+                "valor": int(m_cents[mb]) / 100,
+                "data_baixa": data_br(int(tit.dias[ts[0]])),
+                "id": str(t.ids[i]),
+                "data": data_br(int(m_dias[mb])),
+                "banco": t.texto(t.banco, i),
+                "fornecedor_movimento": t.texto(t.fornecedor, i),
+                "historico": t.texto(t.historico, i),
+                "dias": dist,
+                "confianca": round(conf, 3),
+            }
+        )
+
+    livre_t = np.ones(len(tit.contas), dtype=bool)
+    livre_m = np.ones(len(linhas), dtype=bool)
+
+    # 1a) um título, um movimento: mesmo fornecedor normalizado + valor (código denso do par)
+    com_forn_t = np.flatnonzero(t_forn >= 0)
+    com_forn_m = np.flatnonzero(m_forn >= 0)
+    _, chave_fv = np.unique(
+        np.concatenate([(t_forn[com_forn_t] << 42) | tit.centavos[com_forn_t], (m_forn[com_forn_m] << 42) | m_cents[com_forn_m]]),
+        return_inverse=True,
+    )
+    chave_fv = chave_fv.reshape(-1)
+    m_chave_fv = np.full(len(linhas), -1, dtype=np.int64)
+    m_chave_fv[com_forn_m] = chave_fv[len(com_forn_t) :]
+    atribuidos = pontuar(
+        chave_fv[: len(com_forn_t)],
+        m_chave_fv,
+        tit.dias[com_forn_t],
+        tit.texto[com_forn_t],
+        [tit.banco[k] for k in com_forn_t.tolist()],
+        com_forn_m,
+        cfg.janela_fornecedor_dias,
+    )
+    for a, b, conf, dist in atribuidos:
+        a = int(com_forn_t[a])
+        livre_t[a] = livre_m[b] = False
+        registrar("1:1", [a], b, conf, dist)
+
+    # 1b) os que sobraram só pelo valor (favorecido escrito de outro jeito, PIX, boleto)
+    resto = np.flatnonzero(livre_t)
+    atribuidos = pontuar(
+        tit.centavos[resto],
+        m_cents,
+        tit.dias[resto],
+        tit.texto[resto],
+        [tit.banco[k] for k in resto.tolist()],
+        np.flatnonzero(livre_m),
+        cfg.janela_dias,
+    )
+    for a, b, conf, dist in atribuidos:
+        a = int(resto[a])
+        livre_t[a] = livre_m[b] = False
+        registrar("1:1", [a], b, conf, dist)
+
+    # 2) lotes: títulos que sobraram somados por (fornecedor, baixa) e depois por (banco, baixa)
+    for por, chave in (
+        ("fornecedor", lambda k: (int(t_forn[k]), int(tit.dias[k])) if t_forn[k] >= 0 else None),
+        ("banco", lambda k: (tit.banco[k], int(tit.dias[k])) if tit.banco[k] else None),
+    ):
+        grupos: Dict[Tuple[Any, int], List[int]] = {}
+        for k in np.flatnonzero(livre_t).tolist():
+            ch = chave(k)
+            if ch is not None:
+                grupos.setdefault(ch, []).append(k)
+        lotes = [ks for ks in grupos.values() if len(ks) >= cfg.lote_minimo]
+        if not lotes:
+            continue
+        soma = np.array([int(tit.centavos[ks].sum()) for ks in lotes], dtype=np.int64)
+        dias = np.array([int(tit.dias[ks[0]]) for ks in lotes], dtype=np.int64)
+        # lote do mesmo fornecedor compara o nome; lote por banco junta fornecedores diferentes
+        textos = np.array([int(tit.texto[ks[0]]) if por == "fornecedor" else -1 for ks in lotes], dtype=np.int64)
+        bancos = [tit.banco[ks[0]] for ks in lotes]
+        for a, b, conf, dist in pontuar(soma, m_cents, dias, textos, bancos, np.flatnonzero(livre_m), cfg.janela_dias):
+            livre_t[lotes[a]] = False
+            livre_m[b] = False
+            registrar(f"lote {len(lotes[a])}:1 ({por})", lotes[a], b, conf, dist)
+
+    # 3) sobras
+    no_periodo = (tit.dias >= periodo[0]) & (tit.dias <= periodo[1])
+    sem_movimento = [
+        {
+            "titulo": tit.contas[k].codigo,
+            "fornecedor": tit.contas[k].fornecedor,
+            "valor": int(tit.centavos[k]) / 100,
+            "data_baixa": data_br(int(tit.dias[k])),
+            "banco": tit.banco[k],
+            "status": tit.contas[k].status,
+        }
+        for k in np.flatnonzero(livre_t & no_periodo).tolist()
+    ]
+    fora = livre_t & ~no_periodo
+    # movimentos sem título: só os de fornecedores que o contas a pagar conhece (o resto nunca teria título)
+    sobra_m = livre_m & (m_forn >= 0)
+    outros_cents = int(m_cents[livre_m & (m_forn < 0)].sum())
+    sem_titulo: List[Dict[str, Any]] = []
+    for b in np.flatnonzero(sobra_m).tolist():
+        i = int(linhas[b])
+        sem_titulo.append(
+            {
+                "id": str(t.ids[i]),
+                "data": data_br(int(m_dias[b])),
+                "banco": t.texto(t.banco, i),
+                "fornecedor": t.texto(t.fornecedor, i),
+                "historico": t.texto(t.historico, i),
+                "valor": int(m_cents[b]) / 100,
+            }
+        )
+    sem_movimento.sort(key=lambda x: (-x["valor"], x["titulo"]))
+    sem_titulo.sort(key=lambda x: (-x["valor"], x["id"]))
+    pares.sort(key=lambda p: (-p["valor"], p["id"]))
+
+    conciliados = sum(len(p["titulos"]) for p in pares)
+    # a janela de datas passa da borda do período: títulos com baixa fora dele também podem ter par;
+    # o resumo do período conta só os de dentro (conciliados_no_periodo + sem_movimento = no_periodo)
+    conc_no_periodo = int((~livre_t & no_periodo).sum())
+    return {
+        "pares": pares,
+        "titulos_sem_movimento": sem_movimento,
+        "movimentos_sem_titulo": sem_titulo,
+        "resumo": {
+            "titulos_baixados": len(tit.contas),
+            "titulos_no_periodo": int(no_periodo.sum()),
+            "titulos_conciliados": conciliados,
+            "titulos_conciliados_no_periodo": conc_no_periodo,
+            "titulos_conciliados_fora_periodo": conciliados - conc_no_periodo,
+            "valor_conciliado": sum(p["valor"] for p in pares),
+            "lotes": sum(1 for p in pares if p["tipo"] != "1:1"),
+            "titulos_sem_movimento": len(sem_movimento),
+            "valor_sem_movimento": sum(x["valor"] for x in sem_movimento),
+            "titulos_fora_periodo": int(fora.sum()),
+            "valor_fora_periodo": int(tit.centavos[fora].sum()) / 100,
+            "movimentos_sem_titulo": len(sem_titulo),
+            "valor_movimentos_sem_titulo": sum(x["valor"] for x in sem_titulo),
+            "valor_outros_movimentos": outros_cents / 100,
+            "janela_dias": cfg.janela_dias,
+            "janela_fornecedor_dias": cfg.janela_fornecedor_dias,
+        },
+    }
+
+
+def escrever_csv_conciliacao(conc: Dict[str, Any], out_path: Path) -> None:
+    """Uma linha por título conciliado (com o movimento), por título sem movimento e por movimento sem título."""
+    with out_path.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f, delimiter=";")
+        w.writerow(["situacao", "titulo", "fornecedor", "data_baixa", "id", "data", "banco", "descricao", "valor", "dias", "confianca"])
+        for p in conc["pares"]:
+            for cod in p["titulos"]:
+                w.writerow(
+                    [
+                        p["tipo"],
+                        cod,
+                        " / ".join(p["fornecedores"]),
+                        p["data_baixa"],
+                        p["id"],
+                        p["data"],
+                        p["banco"],
+                        p["historico"],
+                        f"{p['valor']:.2f}",
+                        p["dias"],
+                        f"{p['confianca']:.3f}",
+                    ]
+                )
+        for x in conc["titulos_sem_movimento"]:
+            w.writerow(["titulo sem movimento", x["titulo"], x["fornecedor"], x["data_baixa"], "", "", x["banco"], x["status"], f"{x['valor']:.2f}", "", ""])
+        for x in conc["movimentos_sem_titulo"]:
+            w.writerow(["movimento sem titulo", "", x["fornecedor"], "", x["id"], x["data"], x["banco"], x["historico"], f"{x['valor']:.2f}", "", ""])
+
+
+def main() -> None:
+    import time
+
+    from analise_recorrencia import CONTAS_PAGAR_CSV, MOVIMENTOS_CSV, ler_contas_pagar, ler_movimentos, money
+
+    padrao = ConfigConciliacao()
+    parser = argparse.ArgumentParser(description="Conciliação das baixas do contas a pagar com os movimentos")
+    parser.add_argument("--movimentos", type=Path, default=MOVIMENTOS_CSV)
+    parser.add_argument("--contas-pagar", type=Path, default=CONTAS_PAGAR_CSV)
+    parser.add_argument("--janela-dias", type=int, default=padrao.janela_dias, help="Janela do join só por valor")
+    parser.add_argument("--janela-fornecedor-dias", type=int, default=padrao.janela_fornecedor_dias, help="Janela do join por fornecedor + valor")
+    parser.add_argument("--confianca-minima", type=float, default=padrao.confianca_minima)
+    parser.add_argument("--saida", type=Path, default=None, help="CSV com pares e sobras")
+    args = parser.parse_args()
+
+    for p in (args.movimentos, args.contas_pagar):
+        if not p.exists():
+            raise SystemExit(f"Arquivo não encontrado: {p}")
+    movs = ler_movimentos(args.movimentos)
+    contas = ler_contas_pagar(args.contas_pagar)
+    cfg = ConfigConciliacao(
+        janela_dias=args.janela_dias,
+        janela_fornecedor_dias=args.janela_fornecedor_dias,
+        confianca_minima=args.confianca_minima,
+    )
+    t0 = time.perf_counter()
+    conc = conciliar_baixas(movs, contas, cfg)
+    dt = time.perf_counter() - t0
+    r = conc["resumo"]
+    print(f"OK: {r['titulos_conciliados_no_periodo']} de {r['titulos_no_periodo']} titulos baixados no periodo conciliados em {dt:.2f}s")
+    print("   - Valor conciliado:", money(r["valor_conciliado"]), f"({r['lotes']} pagamentos em lote)")
+    print("   - Titulos sem movimento:", r["titulos_sem_movimento"], money(r["valor_sem_movimento"]))
+    print("   - Movimentos sem titulo (fornecedores do contas a pagar):", r["movimentos_sem_titulo"], money(r["valor_movimentos_sem_titulo"]))
+    print("   - Baixas fora do periodo conciliadas (janela na borda):", r["titulos_conciliados_fora_periodo"])
+    print("   - Baixas fora do periodo dos movimentos sem par (nao conferidas):", r["titulos_fora_periodo"])
+    if args.saida:
+        escrever_csv_conciliacao(conc, args.saida)
+        print("   - CSV:", args.saida)
+
+
+if __name__ == "__main__":
+    main()
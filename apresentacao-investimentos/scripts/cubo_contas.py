@@ -0,0 +1,173 @@
+"""
+Cubo esparso para os saldos em aberto das contas a pagar.
+
+Só as células com saldo existem (mês de vencimento × categoria × entidade × banco × status): cada
+célula guarda os códigos das dimensões, o saldo em centavos e a quantidade de títulos. Cada dimensão
+tem um índice invertido (código -> células), então um recorte custa o tamanho da menor lista
+envolvida, não o do cubo, e os totais saem de um `bincount` sobre as células do recorte:
+
+    cubo.rollup("mes")                                  # {mes: saldo}
+    cubo.slice(mes="2026-01").rollup("categoria")       # drill-down de um mês
+    cubo.slice(categoria="Impostos", status=["Aberta", "Parcial"]).total
+    cubo.detalhar("mes", "entidade")                    # {mes: {entidade: saldo}}
+
+Recortes são cubos também (compartilham os rótulos), então dá para recortar de novo.
+Valores devolvidos em reais; totais ordenados do maior para o menor (empates pela primeira aparição).
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+DIMENSOES_ABERTO = ("mes", "categoria", "entidade", "banco", "status")
+
+Filtro = Union[str, Iterable[str]]
+
+
+class CuboEsparso:
+    """Células com valor (códigos por dimensão, centavos, quantidade) + rótulos de cada dimensão."""
+
+    def __init__(
+        self,
+        dimensoes: Sequence[str],
+        rotulos: Dict[str, List[str]],
+        codigos: np.ndarray,
+        valores_cents: np.ndarray,
+        quantidades: np.ndarray,
+    ) -> None:
+        self.dimensoes = tuple(dimensoes)
+        self.rotulos = rotulos
+        self.codigos = codigos
+        self.valores_cents = valores_cents
+        self.quantidades = quantidades
+        self._pos = {d: i for i, d in enumerate(self.dimensoes)}
+        self._codigo_de: Optional[Dict[str, Dict[str, int]]] = None
+        self._indices: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    @classmethod
+    def construir(cls, dimensoes: Sequence[str], registros: Iterable[Tuple[Sequence[str], int]]) -> "CuboEsparso":
+        """`registros`: (rótulos na ordem de `dimensoes`, valor em centavos); rótulos iguais somam na mesma célula."""
+        codigo_de: Dict[str, Dict[str, int]] = {d: {} for d in dimensoes}
+        mapas = [codigo_de[d] for d in dimensoes]
+        celulas: Dict[Tuple[int, ...], List[int]] = {}
+        for chave, valor in registros:
+            cod = tuple(m.setdefault(r, len(m)) for m, r in zip(mapas, chave))
+            cel = celulas.get(cod)
+            if cel is None:
+                celulas[cod] = [int(valor), 1]
+            else:
+                cel[0] += int(valor)
+                cel[1] += 1
+        n = len(celulas)
+        codigos = np.array(list(celulas.keys()), dtype=np.int32).reshape(n, len(dimensoes))
+        somas = np.array([c[0] for c in celulas.values()], dtype=np.int64)
+        qtds = np.array([c[1] for c in celulas.values()], dtype=np.int64)
+        cubo = cls(dimensoes, {d: list(codigo_de[d]) for d in dimensoes}, codigos, somas, qtds)
+        cubo._codigo_de = codigo_de
+        return cubo
+
+    def __len__(self) -> int:
+        return len(self.valores_cents)
+
+    @property
+    def total(self) -> float:
+        return int(self.valores_cents.sum()) / 100
+
+    @property
+    def quantidade(self) -> int:
+        return int(self.quantidades.sum())
+
+    def _coluna(self, dim: str) -> int:
+        if dim not in self._pos:
+            raise ValueError(f"Dimensão desconhecida: {dim} (disponíveis: {', '.join(self.dimensoes)})")
+        return self._pos[dim]
+
+    def _codigos_rotulos(self, dim: str, valores: Filtro) -> List[int]:
+        self._coluna(dim)
+        if self._codigo_de is None:
+            self._codigo_de = {d: {r: i for i, r in enumerate(rs)} for d, rs in self.rotulos.items()}
+        mapa = self._codigo_de[dim]
+        if isinstance(valores, str):
+            valores = (valores,)
+        return [mapa[v] for v in valores if v in mapa]
+
+    def _indice(self, dim: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Células ordenadas pelo código da dimensão + início/fim de cada código (montado na primeira consulta)."""
+        idx = self._indices.get(dim)
+        if idx is None:
+            col = self.codigos[:, self._coluna(dim)]
+            contagem = np.bincount(col, minlength=len(self.rotulos[dim]))
+            fim = np.cumsum(contagem)
+            idx = self._indices[dim] = (np.argsort(col, kind="stable"), fim - contagem, fim)
+        return idx
+
+    def slice(self, **filtros: Filtro) -> "CuboEsparso":
+        """Sub-cubo com as dimensões filtradas (um rótulo ou uma lista de rótulos por dimensão)."""
+        if not filtros:
+            return self
+        codigos = {d: self._codigos_rotulos(d, v) for d, v in filtros.items()}
+        # parte da menor lista do índice invertido e confere as outras dimensões só nela
+        tamanhos: Dict[str, int] = {}
+        for d, cs in codigos.items():
+            _, inicio, fim = self._indice(d)
+            tamanhos[d] = int((fim[cs] - inicio[cs]).sum()) if cs else 0
+        base = min(codigos, key=tamanhos.__getitem__)
+        ordem, inicio, fim = self._indice(base)
+        partes = [ordem[inicio[c] : fim[c]] for c in codigos[base]]
+        celulas = np.sort(np.concatenate(partes)) if partes else np.zeros(0, dtype=np.int64)
+        for d, cs in codigos.items():
+            if d != base and len(celulas):
+                celulas = celulas[np.isin(self.codigos[celulas, self._pos[d]], cs)]
+        sub = CuboEsparso(self.dimensoes, self.rotulos, self.codigos[celulas], self.valores_cents[celulas], self.quantidades[celulas])
+        sub._codigo_de = self._codigo_de
+        return sub
+
+    def _somar(self, dims: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(códigos distintos das `dims`, soma em centavos, quantidade), do maior saldo para o menor."""
+        cols = [self._coluna(d) for d in dims]
+        if not len(self):
+            return np.zeros((0, len(cols)), dtype=np.int32), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        chaves, inv = np.unique(self.codigos[:, cols], axis=0, return_inverse=True)
+        inv = inv.reshape(-1)
+        somas = np.bincount(inv, weights=self.valores_cents, minlength=len(chaves)).round().astype(np.int64)
+        qtds = np.bincount(inv, weights=self.quantidades, minlength=len(chaves)).astype(np.int64)
+        # empate: ordem de primeira aparição (códigos crescentes)
+        ordem = np.lexsort((*[chaves[:, k] for k in range(len(cols) - 1, -1, -1)], -somas))
+        return chaves[ordem], somas[ordem], qtds[ordem]
+
+    def rollup(self, *dims: str) -> Dict[Any, float]:
+        """Saldo por rótulo (uma dimensão) ou por tupla de rótulos (várias), do maior para o menor."""
+        if not dims:
+            raise ValueError("Informe ao menos uma dimensão")
+        chaves, somas, _ = self._somar(dims)
+        rotulos = [self.rotulos[d] for d in dims]
+        out: Dict[Any, float] = {}
+        for ch, s in zip(chaves.tolist(), somas.tolist()):
+            k = tuple(r[c] for r, c in zip(rotulos, ch))
+            out[k[0] if len(k) == 1 else k] = s / 100
+        return out
+
+    def detalhar(self, dim: str, filho: str) -> Dict[str, Dict[str, float]]:
+        """`{rótulo de dim: {rótulo de filho: saldo}}`, os dois níveis do maior para o menor."""
+        out: Dict[str, Dict[str, float]] = {k: {} for k in self.rollup(dim)}
+        for (a, b), v in self.rollup(dim, filho).items():
+            out[a][b] = v
+        return out
+
+    def valores(self, dim: str) -> List[str]:
+        """Rótulos presentes no cubo (ou no recorte), na ordem de primeira aparição."""
+        return [self.rotulos[dim][c] for c in np.unique(self.codigos[:, self._coluna(dim)]).tolist()]
+
+    def to_json(self) -> Dict[str, Any]:
+        """Formato compacto para o dashboard: rótulos por dimensão + células com os códigos."""
+        return {
+            "dimensoes": list(self.dimensoes),
+            "rotulos": {d: self.rotulos[d] for d in self.dimensoes},
+            "colunas": [*self.dimensoes, "saldo", "quantidade"],
+            "celulas": [
+                [*cod, round(v / 100, 2), q]
+                for cod, v, q in zip(self.codigos.tolist(), self.valores_cents.tolist(), self.quantidades.tolist())
+            ],
+        }
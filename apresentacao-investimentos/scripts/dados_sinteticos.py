@@ -0,0 +1,417 @@
+"""
+Gerador de `movimentos.csv` e `contasPagar_cons.csv` sintéticos (mesmo layout da exportação do ERP).
+
+Serve para medir as análises além da amostra de `public/dados` (de 10 mil a 10 milhões de linhas):
+
+- `movimentos` / `contas`: quantidade de linhas de cada arquivo
+- `mix_categorias`: peso de cada categoria (padrão: proporções da amostra real)
+- `entidades`: quantos fornecedores/clientes distintos (frequência tipo Zipf: poucos muito recorrentes)
+- `pessoas`: quantos funcionários aparecem em salários/rescisões/FGTS
+- `ruido_nomes`: probabilidade de o nome da pessoa vir "sujo" no histórico (caixa, acentos,
+  espaços duplos, sobrenome faltando, letra trocada), como acontece nos lançamentos manuais
+
+O mesmo `semente` gera sempre os mesmos arquivos. A escrita é em streaming (memória constante).
+
+Uso:
+    python scripts/dados_sinteticos.py --movimentos 1000000 --contas 50000 --saida /tmp/sinteticos
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import itertools
+import random
+import unicodedata
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Proporções aproximadas da amostra `public/dados/movimentos.csv`
+MIX_CATEGORIAS_PADRAO: Dict[str, float] = {
+    "3 - Venda de Produtos": 156,
+    "36 - Despesas Financeiras": 125,
+    "41 - Compras de Materia Prima": 110,
+    "24 - Salarios": 75,
+    "88 - Salarios Rescisao": 53,
+    "73 - 13º Salario": 30,
+    "6 - Transferencia entre Contas": 30,
+    "38 - Adiantamento de Salario": 28,
+    "61 - Despesas Administrativas": 27,
+    "54 - Compras de Serviços": 20,
+    "69 - Fretes sobre Compras": 18,
+    "77 - Compras de Insumos": 14,
+    "87 - FGTS Rescisao": 12,
+    "96 - Compras de Importaçao": 11,
+    "81 - Despesas com Viagem": 11,
+    "4 - Venda de Serviços": 11,
+    "79 - Juros Recebidos / Aporte Capital Social": 9,
+    "89 - Informatica": 8,
+    "59 - Alimentaçao": 7,
+    "5 - Implantaçao de Saldo": 7,
+    "34 - Juros Bancarios": 7,
+    "97 - PLANO DE SAÚDE": 6,
+    "56 - Vale Transporte": 6,
+    "65 - Luz": 5,
+    "63 - Telefonia/Fixa/Movel/Internet": 5,
+    "48 - Vigilancia": 5,
+    "33 - Emprestimos/Parcelas": 5,
+    "31 - Seguro Funcionarios": 5,
+    "92 - Custos com RJ": 4,
+    "94 - Ações Trabalhistas": 4,
+    "91 - Devolucoes Fornecedores": 4,
+}
+
+CATEGORIAS_RECEITA = {3, 4, 79}
+CATEGORIAS_SALARIO = {24, 38, 73}
+CAT_SAL_RESCISAO = 88
+CAT_FGTS_RESCISAO = 87
+CAT_ACOES = 94
+CAT_TRANSFERENCIA = 6
+
+BANCOS = ["1 - UNICREDI", "6 - BRADESCO", "4 - ITAU", "7 - SANTANDER", "8 - CAIXA FISICO", "2 - INTER"]
+PESOS_BANCOS = [544, 174, 73, 43, 13, 5]
+DIAS_SEMANA = ["Segunda-Feira", "Terça-Feira", "Quarta-Feira", "Quinta-Feira", "Sexta-Feira", "Sábado", "Domingo"]
+
+PRENOMES = [
+    "JOÃO", "JOSÉ", "MARIA", "ANA", "PAULO", "PATRICIA", "EDSON", "LUIS", "THIAGO", "WAGNER", "VINICIUS",
+    "SUEMAR", "TATIANE", "WILSON", "VALTONIR", "RICARDO", "GABRIELA", "MÁRCIO", "FÁBIO", "ANDRÉIA",
+    "CLÁUDIA", "SÉRGIO", "LUCAS", "BRUNA", "RAFAEL", "JULIANA", "ANTÔNIO", "SIMONE", "ROGÉRIO", "LETÍCIA",
+]
+SOBRENOMES = [
+    "SILVA", "SOUZA", "OLIVEIRA", "COSTA", "PEREIRA", "ALVES", "FERNANDES", "CAMARGO", "FARIAS", "BRASIL",
+    "ZORZI", "VELASQUEZ", "PIANOWSKI", "BELÉM", "GONÇALVES", "ARAÚJO", "RIBEIRO", "MARTINS", "LIMA",
+    "CARVALHO", "ROCHA", "MOREIRA", "NASCIMENTO", "BARBOSA", "CONCEIÇÃO", "SCHMITT", "KOWALSKI", "MÜLLER",
+]
+CONECTORES = ["", "", "", "DA ", "DE ", "DOS "]
+RAIZES_EMPRESA = [
+    "OBR EQUIPAMENTOS", "ALCAST", "RUD RACK", "SCHLINDWEIN", "W9", "F PRINTER", "SUL AMERICA", "COPEL",
+    "METALFORTE", "AÇOS PARANÁ", "TRANSLOG", "SANEPAR", "VIVO", "NORTE SUL", "PRIME", "ELETRO VALE",
+    "USIMAQ", "TECNOFER", "ROLAMAX", "PARAFUSOS BRASIL",
+]
+TIPOS_EMPRESA = [
+    "INDUSTRIA E COMERCIO LTDA", "SERVICOS DE TECNOLOGIA LTDA", "DISTRIBUIDORA LTDA", "TRANSPORTES EIRELI",
+    "METALURGICA LTDA", "S/A", "COMERCIO DE FERRAGENS ME", "AUTOMAÇÃO INDUSTRIAL LTDA", "CONSULTORIA EPP",
+]
+
+
+@dataclass
+class ConfigSintetica:
+    movimentos: int = 100_000
+    contas: int = 10_000
+    entidades: int = 2_000
+    pessoas: int = 300
+    ruido_nomes: float = 0.3
+    meses: int = 12
+    inicio: date = date(2025, 1, 1)
+    semente: int = 42
+    mix_categorias: Dict[str, float] = field(default_factory=lambda: dict(MIX_CATEGORIAS_PADRAO))
+
+    def to_json(self) -> Dict[str, object]:
+        return {
+            "movimentos": self.movimentos,
+            "contas": self.contas,
+            "entidades": self.entidades,
+            "pessoas": self.pessoas,
+            "ruido_nomes": self.ruido_nomes,
+            "meses": self.meses,
+            "inicio": self.inicio.isoformat(),
+            "semente": self.semente,
+            "mix_categorias": self.mix_categorias,
+        }
+
+
+def fmt_br(v: float) -> str:
+    """1234.5 -> '1.234,50' (formato da exportação)."""
+    return f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def _fmt_id(i: int) -> str:
+    # o ERP exporta o código com separador de milhar ("1.088")
+    return f"{i:,}".replace(",", ".")
+
+
+def _sem_acentos(s: str) -> str:
+    return "".join(ch for ch in unicodedata.normalize("NFD", s) if unicodedata.category(ch) != "Mn")
+
+
+class _Sorteio:
+    """Sorteio ponderado por busca binária nos pesos acumulados (mais barato que `random.choices` por linha)."""
+
+    def __init__(self, rng: random.Random, itens: List, pesos: List[float]) -> None:
+        if not itens:
+            raise ValueError("Sorteio sem itens")
+        self.rng = rng
+        self.itens = itens
+        self.acumulado = list(itertools.accumulate(pesos))
+        self.total = self.acumulado[-1]
+
+    def __call__(self):
+        return self.itens[bisect.bisect_right(self.acumulado, self.rng.random() * self.total)]
+
+
+class GeradorSintetico:
+    def __init__(self, cfg: ConfigSintetica) -> None:
+        if not cfg.mix_categorias:
+            raise ValueError("mix_categorias vazio")
+        self.cfg = cfg
+        self.rng = random.Random(cfg.semente)
+        rng = self.rng
+
+        # pessoas físicas (funcionários): nome completo + código de cadastro
+        self.pessoas = [self._nome_pessoa() for _ in range(max(1, cfg.pessoas))]
+
+        # fornecedores/clientes: "codigo - RAZAO SOCIAL", com valor típico próprio
+        self.entidades: List[Tuple[str, float]] = []
+        for i in range(max(1, cfg.entidades)):
+            nome = f"{rng.choice(RAIZES_EMPRESA)} {rng.choice(TIPOS_EMPRESA)}"
+            if i >= len(RAIZES_EMPRESA):
+                nome = f"{rng.choice(RAIZES_EMPRESA)} {i} {rng.choice(TIPOS_EMPRESA)}"
+            self.entidades.append((f"{1000 + i} - {nome}", rng.lognormvariate(7.5, 1.2)))
+        self.sortear_entidade = _Sorteio(rng, self.entidades, [1.0 / (r + 1) for r in range(len(self.entidades))])
+        self.sortear_pessoa = _Sorteio(rng, self.pessoas, [1.0] * len(self.pessoas))
+        cats = list(cfg.mix_categorias)
+        self.sortear_categoria = _Sorteio(rng, cats, [float(cfg.mix_categorias[c]) for c in cats])
+        self.sortear_banco = _Sorteio(rng, BANCOS, PESOS_BANCOS)
+
+        fim = cfg.inicio
+        for _ in range(cfg.meses):
+            fim = (fim.replace(day=28) + timedelta(days=4)).replace(day=1)
+        self.dias = (fim - cfg.inicio).days
+
+    def _nome_pessoa(self) -> str:
+        rng = self.rng
+        partes = [rng.choice(PRENOMES)]
+        for _ in range(rng.randint(1, 3)):
+            partes.append(rng.choice(CONECTORES) + rng.choice(SOBRENOMES))
+        return " ".join(partes)
+
+    def _ruido(self, nome: str) -> str:
+        """Variações de digitação/exportação do mesmo nome."""
+        rng = self.rng
+        if rng.random() >= self.cfg.ruido_nomes:
+            return nome
+        op = rng.randrange(6)
+        if op == 0:
+            return nome.title()
+        if op == 1:
+            return _sem_acentos(nome)
+        if op == 2:
+            return nome.replace(" ", "  ", 1)
+        if op == 3 and nome.count(" ") >= 2:
+            return nome.rsplit(" ", 1)[0]
+        if op == 4 and len(nome) > 4:
+            i = rng.randrange(1, len(nome) - 2)
+            return nome[:i] + nome[i + 1] + nome[i] + nome[i + 2 :]
+        return nome.lower()
+
+    def _data(self) -> date:
+        return self.cfg.inicio + timedelta(days=self.rng.randrange(self.dias))
+
+    def _linha_movimento(self, i: int) -> str:
+        rng = self.rng
+        cat = self.sortear_categoria()
+        try:
+            cat_id = int(cat.split("-", 1)[0])
+        except ValueError:
+            cat_id = 0
+        d = self._data()
+        banco = self.sortear_banco()
+        tipo = "Pagar"
+        documento = str(rng.randint(1000, 999999))
+        parcela = "1"
+        fornecedor = ""
+        entrada = False
+
+        if cat_id in CATEGORIAS_RECEITA:
+            ent, base = self.sortear_entidade()
+            tipo, fornecedor, entrada, parcela = "Receber", ent, True, "101"
+            valor = base * rng.uniform(0.5, 2.0)
+            historico = f"BX COM NF DE VENDA {documento} DE {d:%d/%m/%Y}"
+        elif cat_id in CATEGORIAS_SALARIO:
+            pessoa = self.sortear_pessoa()
+            valor = rng.uniform(1800, 9000)
+            if rng.random() < 0.5:
+                fornecedor = f"{rng.randint(1, 999)} - {pessoa}"
+                historico = "13 SALARIO" if cat_id == 73 else "SALARIO"
+            else:
+                historico = f"{rng.choice(['Pagto', 'Salario', 'Salário'])} {self._ruido(pessoa)}"
+        elif cat_id == CAT_SAL_RESCISAO:
+            tipo, documento, parcela = "Movto.Financeiro", "DEB", ""
+            valor = rng.uniform(2500, 25000)
+            nome = self._ruido(self.sortear_pessoa())
+            if rng.random() < 0.6:
+                historico = f"DEBITO TRANSFERENCIA PIX ( Doc.: DEB PIX / {nome} )"
+            else:
+                historico = f"{rng.choice(['Rescisão', 'Rescisao'])} {nome}"
+        elif cat_id == CAT_FGTS_RESCISAO:
+            tipo, documento, parcela = "Movto.Financeiro", "FGTS", ""
+            if rng.random() < 0.3:
+                valor = rng.uniform(30000, 180000)
+                historico = rng.choice(["FGTS Rescisão", "FGTS Rescisao", "DEBITO PAGAMENTO PIX ( Doc.: PGTO PIX / CAIXA ECONOMICA FEDERAL )"])
+            else:
+                valor = rng.uniform(800, 15000)
+                historico = f"FGTS {self._ruido(self.sortear_pessoa())}"
+        elif cat_id == CAT_ACOES:
+            tipo, documento, parcela = "Movto.Financeiro", "ACORDO", ""
+            pessoa = self.sortear_pessoa()
+            valor = rng.uniform(5000, 120000)
+            fornecedor = f"{rng.randint(1000, 9999)} - {pessoa}"
+            historico = f"PAGAMENTO ACORDO TRABALHISTA {self._ruido(pessoa)}"
+        elif cat_id == CAT_TRANSFERENCIA:
+            tipo, documento, parcela = "Movto.Financeiro", "TRANSF", ""
+            valor = rng.uniform(1000, 200000)
+            entrada = rng.random() < 0.5
+            historico = f"TRANSFERENCIA ENTRE CONTAS {banco}"
+        else:
+            ent, base = self.sortear_entidade()
+            fornecedor = ent
+            valor = base * rng.uniform(0.8, 1.25)
+            if rng.random() < 0.02:
+                valor *= rng.uniform(4, 10)  # valores fora do padrão
+            historico = f"NF {documento}"
+
+        credito, debito = (fmt_br(valor), "0") if entrada else ("0", fmt_br(valor))
+        return ";".join(
+            (
+                _fmt_id(i),
+                f"{d:%d/%m/%Y}",
+                DIAS_SEMANA[d.weekday()],
+                tipo,
+                credito,
+                debito,
+                banco,
+                documento,
+                parcela,
+                cat,
+                historico,
+                fornecedor,
+            )
+        )
+
+    def _linha_conta(self, i: int) -> str:
+        rng = self.rng
+        cat = self.sortear_categoria()
+        ent, base = self.sortear_entidade()
+        emissao = self._data()
+        venc = emissao + timedelta(days=rng.choice((15, 28, 30, 45, 60)))
+        valor = base * rng.uniform(0.8, 1.25)
+        r = rng.random()
+        if r < 0.55:
+            status, saldo, baixa = "Pendente", valor, ""
+        elif r < 0.95:
+            status, saldo, baixa = "Liquidada", 0.0, f"{venc:%d/%m/%Y}"
+        elif r < 0.98:
+            status, saldo, baixa = "Cancelada", 0.0, ""
+        else:
+            status, saldo, baixa = "Residual", valor * rng.uniform(0.1, 0.5), ""
+        return ";".join(
+            (
+                _fmt_id(i),
+                str(rng.randint(1, 99999)),
+                rng.choice(("1", "01//01/01", "01//01")),
+                f"{emissao:%d/%m/%Y}",
+                f"{venc:%d/%m/%Y}",
+                ent,
+                fmt_br(valor),
+                fmt_br(saldo) if saldo else "0",
+                baixa or f"{venc:%d/%m/%Y}",
+                status,
+                self.sortear_banco(),
+                "Não",
+                cat,
+                "1 - MACLINEA MAQUINAS E EQUIPAMENTOS LTDA",
+                "",
+                rng.choice(("NF Entrada", "Manual")),
+            )
+        )
+
+    @staticmethod
+    def _escrever(path: Path, n: int, linha) -> int:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lote: List[str] = []
+        with path.open("w", encoding="utf-8", newline="") as f:
+            for i in range(n, 0, -1):  # a exportação vem do código mais recente para o mais antigo
+                lote.append(linha(i))
+                if len(lote) >= 10_000:
+                    f.write("\n".join(lote) + "\n")
+                    lote.clear()
+            if lote:
+                f.write("\n".join(lote) + "\n")
+        return n
+
+    def escrever_movimentos(self, path: Path) -> int:
+        return self._escrever(path, self.cfg.movimentos, self._linha_movimento)
+
+    def escrever_contas(self, path: Path) -> int:
+        return self._escrever(path, self.cfg.contas, self._linha_conta)
+
+
+def gerar(pasta: Path, cfg: ConfigSintetica) -> Tuple[Path, Path]:
+    """Gera `movimentos.csv` e `contasPagar_cons.csv` em `pasta`; devolve os dois caminhos."""
+    g = GeradorSintetico(cfg)
+    movimentos = pasta / "movimentos.csv"
+    contas = pasta / "contasPagar_cons.csv"
+    g.escrever_movimentos(movimentos)
+    g.escrever_contas(contas)
+    return movimentos, contas
+
+
+def ler_mix(pares: List[str]) -> Dict[str, float]:
+    """`["88 - Salarios Rescisao=20", ...]` sobre o mix padrão (peso 0 remove a categoria)."""
+    mix = dict(MIX_CATEGORIAS_PADRAO)
+    for par in pares:
+        cat, sep, peso = par.rpartition("=")
+        if not sep or not cat.strip():
+            raise SystemExit(f"--mix espera CATEGORIA=PESO, recebeu: {par}")
+        try:
+            p = float(peso)
+        except ValueError:
+            raise SystemExit(f"--mix: peso inválido em {par}")
+        if p <= 0:
+            mix.pop(cat.strip(), None)
+        else:
+            mix[cat.strip()] = p
+    return mix
+
+
+def main() -> None:
+    padrao = ConfigSintetica()
+    parser = argparse.ArgumentParser(description="Gera movimentos/contas a pagar sintéticos no layout do ERP")
+    parser.add_argument("--saida", type=Path, required=True, help="Pasta de saída")
+    parser.add_argument("--movimentos", type=int, default=padrao.movimentos, help="Linhas de movimentos")
+    parser.add_argument("--contas", type=int, default=padrao.contas, help="Linhas de contas a pagar")
+    parser.add_argument("--entidades", type=int, default=padrao.entidades, help="Fornecedores/clientes distintos")
+    parser.add_argument("--pessoas", type=int, default=padrao.pessoas, help="Funcionários distintos")
+    parser.add_argument("--ruido-nomes", type=float, default=padrao.ruido_nomes, help="Probabilidade de nome com ruído (0-1)")
+    parser.add_argument("--meses", type=int, default=padrao.meses, help="Meses cobertos a partir de --inicio")
+    parser.add_argument("--inicio", type=date.fromisoformat, default=padrao.inicio, help="Primeiro dia (AAAA-MM-DD)")
+    parser.add_argument("--semente", type=int, default=padrao.semente)
+    parser.add_argument(
+        "--mix",
+        action="append",
+        default=[],
+        metavar="CATEGORIA=PESO",
+        help='Ajusta o peso de uma categoria (ex.: "88 - Salarios Rescisao=40"); pode repetir',
+    )
+    args = parser.parse_args()
+
+    cfg = ConfigSintetica(
+        movimentos=args.movimentos,
+        contas=args.contas,
+        entidades=args.entidades,
+        pessoas=args.pessoas,
+        ruido_nomes=args.ruido_nomes,
+        meses=args.meses,
+        inicio=args.inicio,
+        semente=args.semente,
+        mix_categorias=ler_mix(args.mix),
+    )
+    movimentos, contas = gerar(args.saida, cfg)
+    print("OK: Movimentos:", movimentos, f"({cfg.movimentos} linhas)")
+    print("   - Contas a pagar:", contas, f"({cfg.contas} linhas)")
+
+
+if __name__ == "__main__":
+    main()
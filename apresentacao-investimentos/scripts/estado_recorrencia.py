@@ -0,0 +1,238 @@
+"""
+Estado persistido da recorrência por grupo (categoria, entidade).
+
+Guarda, por grupo, o que `classify_recorrencia_movimentos` precisa para classificar
+(contagem, total, meses, valor pago por dia, esboço de quantis para mediana/p90 e top 3), além das
+chaves dos movimentos já incorporados. Assim, ao chegar um novo mês (ou a exportação do dia),
+só os movimentos novos são somados e só os grupos tocados têm as estatísticas recalculadas.
+
+Persistência em JSON (mesmo padrão dos arquivos de progresso dos robôs).
+Movimentos já incorporados são identificados por uma chave de 64 bits (hash do id do ERP com data,
+banco e valor): um id reaproveitado pelo ERP em outro lançamento não é confundido com o antigo. As
+chaves ficam num array int64 ordenado (8 bytes por movimento, gravado em base64). Alterações em
+lançamentos antigos exigem reconstruir o estado (apagar o arquivo ou usar `--reconstruir-estado`).
+
+Valores por grupo ficam num `EsbocoQuantis` (exato até 1024 valores, t-digest acima) e o top 3
+num heap limitado. O que cresce com o histórico são os meses e o valor por dia de cada grupo (uma
+entrada por dia com pagamento) e as chaves dos movimentos. Estados de períodos ou arquivos
+diferentes podem ser combinados com `mesclar`. Estado de outra versão não é convertido: reconstrua.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from quantis import EsbocoQuantis, TopK
+
+VERSAO_ESTADO = 4
+TOP_POR_GRUPO = 3
+
+
+@dataclass
+class ItemTop:
+    """Movimento entre os maiores do grupo (o suficiente para outliers e inspeção)."""
+
+    id: str
+    data: str  # ISO (YYYY-MM-DD)
+    debito_cents: int
+    historico: str
+
+
+@dataclass
+class EstadoGrupo:
+    categoria: str
+    entidade: str
+    count: int = 0
+    total_cents: int = 0
+    meses: Set[str] = field(default_factory=set)
+    # dia ISO -> centavos pagos no dia (a série de datas da periodicidade)
+    dias: Dict[str, int] = field(default_factory=dict)
+    valores: EsbocoQuantis = field(default_factory=lambda: EsbocoQuantis(escala=100))  # em centavos
+    top: TopK[ItemTop] = field(default_factory=lambda: TopK(TOP_POR_GRUPO))
+    _stats: Optional[Dict[str, Any]] = field(default=None, repr=False, compare=False)
+
+    def acumular(
+        self,
+        count: int,
+        total_cents: int,
+        meses: Iterable[str],
+        dias: Mapping[str, int],
+        valores_cents: Iterable[int],
+        top: Iterable[ItemTop],
+    ) -> None:
+        self.count += count
+        self.total_cents += total_cents
+        self.meses.update(meses)
+        self._somar_dias(dias)
+        self.valores.adicionar_varios(valores_cents)
+        # em empate, quem entrou antes continua na frente
+        self.top.oferecer_varios(top, lambda x: x.debito_cents)
+        self._stats = None
+
+    def mesclar(self, outro: "EstadoGrupo") -> None:
+        self.count += outro.count
+        self.total_cents += outro.total_cents
+        self.meses.update(outro.meses)
+        self._somar_dias(outro.dias)
+        self.valores.mesclar(outro.valores)
+        self.top.mesclar(outro.top)
+        self._stats = None
+
+    def _somar_dias(self, dias: Mapping[str, int]) -> None:
+        for dia, cents in dias.items():
+            self.dias[dia] = self.dias.get(dia, 0) + cents
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Estatísticas no formato usado pelo relatório (recalculadas só quando o grupo muda)."""
+        if self._stats is None:
+            self._stats = {
+                "categoria": self.categoria,
+                "entidade": self.entidade,
+                "total": self.total_cents / 100,
+                "count": self.count,
+                "meses": sorted(self.meses),
+                "dias_distintos": len(self.dias),
+                "primeiro_dia": min(self.dias, default=None),
+                "ultimo_dia": max(self.dias, default=None),
+                "mediana": self.valores.quantil(0.5),
+                "p90": self.valores.quantil(0.9),
+                "top": [
+                    {"id": t.id, "data": t.data, "debito": t.debito_cents / 100, "historico": t.historico}
+                    for t in self.top.itens()
+                ],
+            }
+        return self._stats
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "categoria": self.categoria,
+            "entidade": self.entidade,
+            "count": self.count,
+            "total_cents": self.total_cents,
+            "meses": sorted(self.meses),
+            "dias": dict(sorted(self.dias.items())),
+            "valores": self.valores.to_json(),
+            "top": [t.__dict__ for t in self.top.itens()],
+        }
+
+    @classmethod
+    def from_json(cls, d: Dict[str, Any]) -> "EstadoGrupo":
+        g = cls(
+            categoria=d["categoria"],
+            entidade=d["entidade"],
+            count=int(d["count"]),
+            total_cents=int(d["total_cents"]),
+            meses=set(d["meses"]),
+            dias=d["dias"],
+            valores=EsbocoQuantis.from_json(d["valores"]),
+        )
+        g.top.oferecer_varios((ItemTop(**t) for t in d["top"]), lambda x: x.debito_cents)
+        return g
+
+
+def chaves_movimentos(ids: Sequence[str], datas: Sequence[str], bancos: Sequence[str], debitos_cents: Sequence[int]) -> np.ndarray:
+    """Chave int64 por movimento: hash de (id do ERP, data, banco, valor)."""
+    return np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(f"{i}|{d}|{b}|{v}".encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+            for i, d, b, v in zip(ids, datas, bancos, debitos_cents)
+        ),
+        dtype=np.int64,
+        count=len(ids),
+    )
+
+
+class EstadoRecorrencia:
+    """Grupos (categoria, entidade) em ordem de primeira ocorrência + chaves dos movimentos já incorporados."""
+
+    def __init__(self) -> None:
+        self.grupos: Dict[Tuple[str, str], EstadoGrupo] = {}
+        self.chaves = np.zeros(0, dtype=np.int64)  # ordenado, sem repetição
+        self.tocados: Set[Tuple[str, str]] = set()
+
+    def __len__(self) -> int:
+        return len(self.grupos)
+
+    @property
+    def movimentos(self) -> int:
+        """Quantos movimentos já foram incorporados."""
+        return len(self.chaves)
+
+    def novos(self, chaves: np.ndarray) -> np.ndarray:
+        """Máscara dos movimentos (chaves de `chaves_movimentos`) que ainda não foram incorporados."""
+        return ~np.isin(chaves, self.chaves)
+
+    def registrar(self, chaves: np.ndarray) -> None:
+        self.chaves = np.union1d(self.chaves, chaves.astype(np.int64))
+
+    def repetidos(self, outro: "EstadoRecorrencia") -> int:
+        """Movimentos presentes nos dois estados (ex.: exportações de períodos sobrepostos)."""
+        return len(np.intersect1d(self.chaves, outro.chaves, assume_unique=True))
+
+    def acumular(
+        self,
+        categoria: str,
+        entidade: str,
+        count: int,
+        total_cents: int,
+        meses: Iterable[str],
+        dias: Mapping[str, int],
+        valores_cents: Iterable[int],
+        top: Iterable[ItemTop],
+    ) -> None:
+        chave = (categoria, entidade)
+        g = self.grupos.get(chave)
+        if g is None:
+            g = self.grupos[chave] = EstadoGrupo(categoria=categoria, entidade=entidade)
+        g.acumular(count, total_cents, meses, dias, valores_cents, top)
+        self.tocados.add(chave)
+
+    def mesclar(self, outro: "EstadoRecorrencia") -> None:
+        """Incorpora outro estado (ex.: de outro arquivo/período); grupos novos entram no fim, na ordem de `outro`."""
+        for chave, g in outro.grupos.items():
+            atual = self.grupos.get(chave)
+            if atual is None:
+                atual = self.grupos[chave] = EstadoGrupo(categoria=g.categoria, entidade=g.entidade)
+            atual.mesclar(g)
+            self.tocados.add(chave)
+        self.registrar(outro.chaves)
+
+    def estatisticas(self) -> List[Dict[str, Any]]:
+        return [g.estatisticas() for g in self.grupos.values()]
+
+    def salvar(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "versao": VERSAO_ESTADO,
+            "chaves": base64.b64encode(self.chaves.astype("<i8").tobytes()).decode("ascii"),
+            "grupos": [g.to_json() for g in self.grupos.values()],
+        }
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(path)
+
+    @classmethod
+    def carregar(cls, path: Path) -> "EstadoRecorrencia":
+        """Carrega o estado salvo; se o arquivo não existir, começa vazio."""
+        estado = cls()
+        if not path.exists():
+            return estado
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        versao = payload.get("versao")
+        if versao != VERSAO_ESTADO:
+            raise RuntimeError(
+                f"Estado {path} na versão {versao} (esperada {VERSAO_ESTADO}): reconstrua o estado "
+                "(apague o arquivo ou use --reconstruir-estado)"
+            )
+        estado.chaves = np.frombuffer(base64.b64decode(payload["chaves"]), dtype="<i8").astype(np.int64)
+        for d in payload["grupos"]:
+            g = EstadoGrupo.from_json(d)
+            estado.grupos[(g.categoria, g.entidade)] = g
+        return estado
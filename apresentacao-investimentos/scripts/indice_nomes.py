@@ -0,0 +1,143 @@
+"""
+Índice de nomes para casar tokens soltos (ex.: "FGTS Rescisão Valdonir") com pessoas já conhecidas.
+
+Mesma regra do antigo `match_por_token` (difflib.SequenceMatcher token a token, melhor nome
+>= `limiar` e folga >= `margem` sobre o segundo), mas sem varrer toda a base a cada consulta:
+
+- cada nome é normalizado e quebrado em tokens uma única vez (tokens repetidos entre nomes são pontuados uma vez)
+- índice invertido de "gramas de ocorrência" de caracteres ((c, 1), (c, 2), ... para cada letra c):
+  a interseção desses gramas é exatamente o limite superior do `SequenceMatcher.quick_ratio()`
+- filtro de tamanho + filtro por prefixo (gramas mais raros primeiro): só tokens que podem atingir
+  `limiar - margem` viram candidatos e recebem o `ratio()` exato
+
+Tokens abaixo de `limiar - margem` nunca mudam a decisão (nem como melhor, nem como segundo),
+então o resultado é idêntico ao da varredura completa.
+"""
+
+from __future__ import annotations
+
+import difflib
+import math
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+Grama = Tuple[str, int]
+
+
+def _gramas(s: str) -> List[Grama]:
+    vistos: Counter = Counter()
+    out: List[Grama] = []
+    for ch in s:
+        vistos[ch] += 1
+        out.append((ch, vistos[ch]))
+    return out
+
+
+class IndiceNomes:
+    def __init__(
+        self,
+        nomes: Iterable[str],
+        normalizar: Callable[[str], str],
+        limiar: float = 0.86,
+        margem: float = 0.05,
+    ) -> None:
+        self.nomes: List[str] = list(nomes)
+        self.normalizar = normalizar
+        self.limiar = limiar
+        self.margem = margem
+        # abaixo disso um token não afeta a decisão (folga numérica para a subtração em float)
+        self._corte = limiar - margem - 1e-9
+
+        ids_token: Dict[str, int] = {}
+        self._tokens: List[str] = []
+        self._nomes_do_token: List[List[int]] = []
+        for ni, nome in enumerate(self.nomes):
+            for x in nome.split():
+                tk = normalizar(x)
+                if not tk:
+                    continue
+                ti = ids_token.get(tk)
+                if ti is None:
+                    ti = ids_token[tk] = len(self._tokens)
+                    self._tokens.append(tk)
+                    self._nomes_do_token.append([])
+                if not self._nomes_do_token[ti] or self._nomes_do_token[ti][-1] != ni:
+                    self._nomes_do_token[ti].append(ni)
+
+        self._bags: List[Counter] = [Counter(tk) for tk in self._tokens]
+        self._postings: Dict[Grama, List[int]] = {}
+        for ti, tk in enumerate(self._tokens):
+            for g in _gramas(tk):
+                self._postings.setdefault(g, []).append(ti)
+        self._memo: Dict[str, Tuple[Optional[str], float, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self.nomes)
+
+    def _candidatos(self, t: str) -> List[int]:
+        """Tokens cujo limite superior (quick_ratio) contra `t` pode chegar ao corte."""
+        c = self._corte
+        lq = len(t)
+        lt_min = math.ceil(lq * c / (2 - c) - 1e-9)
+        lt_max = math.floor(lq * (2 - c) / c + 1e-9)
+        # sobreposição mínima para qualquer token de tamanho >= lt_min
+        tau = max(1, math.ceil(c * (lq + lt_min) / 2 - 1e-9))
+        gramas = sorted(_gramas(t), key=lambda g: len(self._postings.get(g, ())))
+        prefixo = gramas[: max(0, lq - tau + 1)]
+
+        bag_t = Counter(t)
+        out: List[int] = []
+        vistos = set()
+        for g in prefixo:
+            for ti in self._postings.get(g, ()):
+                if ti in vistos:
+                    continue
+                vistos.add(ti)
+                tk = self._tokens[ti]
+                if not (lt_min <= len(tk) <= lt_max):
+                    continue
+                inter = sum((bag_t & self._bags[ti]).values())
+                if 2.0 * inter / (lq + len(tk)) >= c:
+                    out.append(ti)
+        return out
+
+    def pontuar(self, token: str) -> Tuple[Optional[str], float, float]:
+        """(melhor nome, score do melhor, score do segundo) — scores abaixo do corte podem vir como 0."""
+        return self._pontuar(self.normalizar(token))
+
+    def _pontuar(self, t: str) -> Tuple[Optional[str], float, float]:
+        if t in self._memo:
+            return self._memo[t]
+        score_por_nome: Dict[int, float] = {}
+        if t:
+            for ti in self._candidatos(t):
+                r = difflib.SequenceMatcher(None, t, self._tokens[ti]).ratio()
+                for ni in self._nomes_do_token[ti]:
+                    if r > score_por_nome.get(ni, 0.0):
+                        score_por_nome[ni] = r
+
+        # mesma varredura do match_por_token, restrita aos nomes candidatos (na ordem da base)
+        best: Optional[str] = None
+        best_score = 0.0
+        second = 0.0
+        for ni in sorted(score_por_nome):
+            score_nome = score_por_nome[ni]
+            if score_nome > best_score:
+                second = best_score
+                best_score = score_nome
+                best = self.nomes[ni]
+            elif score_nome > second:
+                second = score_nome
+        self._memo[t] = (best, best_score, second)
+        return self._memo[t]
+
+    def casar(self, token: str) -> Optional[str]:
+        """Nome da base que casa com `token`, se for bem próximo e não ambíguo."""
+        t = self.normalizar(token)
+        if not t or any(ch.isdigit() for ch in t):
+            return None
+        best, best_score, second = self._pontuar(t)
+        # thresholds: precisa ser bem próximo e não ambíguo
+        if best and best_score >= self.limiar and (best_score - second) >= self.margem:
+            return best
+        return None
@@ -0,0 +1,188 @@
+"""
+Instrumentação por etapa para os scripts de análise (`--profile`).
+
+    adicionar_argumentos(parser, saida_padrao)   # --profile, --profile-saida, --profile-cprofile
+    args = parser.parse_args()
+    perfil = perfil_dos_argumentos(args)
+    with perfil.etapa("ler_movimentos") as et:
+        movs = ler_movimentos(...)
+        et.linhas = len(movs)
+    ...
+    finalizar(perfil, args, "analise_recorrencia")   # JSON com as etapas + resumo no console
+
+Por etapa: tempo (perf_counter), pico de memória alocada pelo Python (tracemalloc, relativo ao
+início da etapa), linhas processadas (quando o chamador informa) e, opcionalmente, um dump do
+cProfile (`<pasta>/<nn>_<etapa>.prof`, só nas etapas de primeiro nível). Etapas podem ser aninhadas;
+o pico da etapa de fora inclui o das de dentro.
+
+Desligado (`ativo=False`), `etapa` só devolve um objeto vazio: o script roda igual, sem tracemalloc.
+O tracemalloc deixa o Python bem mais lento; os tempos do modo `--profile` servem para comparar
+etapas entre si (onde está o gargalo), não como medida absoluta — para isso há o benchmark.
+"""
+
+from __future__ import annotations
+
+import argparse
+import cProfile
+import json
+import platform
+import re
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+VERSAO_PERFIL = 1
+MB = 1024 * 1024
+
+
+@dataclass
+class EtapaPerfil:
+    nome: str
+    nivel: int = 0
+    segundos: float = 0.0
+    pico_bytes: int = 0
+    linhas: Optional[int] = None
+    cprofile: Optional[str] = None
+    # memória rastreada no início da etapa (base do pico)
+    _base: int = field(default=0, repr=False)
+
+    def to_json(self) -> Dict[str, Any]:
+        d = {k: v for k, v in asdict(self).items() if not k.startswith("_")}
+        d["segundos"] = round(self.segundos, 4)
+        d["linhas_por_s"] = round(self.linhas / self.segundos) if self.linhas and self.segundos > 0 else None
+        return d
+
+
+class Perfil:
+    def __init__(self, ativo: bool = True, memoria: bool = True, cprofile_dir: Optional[Path] = None) -> None:
+        self.ativo = ativo
+        self.memoria = memoria and ativo
+        self.cprofile_dir = cprofile_dir if ativo else None
+        self.etapas: List[EtapaPerfil] = []
+        self._pilha: List[EtapaPerfil] = []
+        self._inicio = time.perf_counter()
+        self._iniciado_em = datetime.now()
+        self._iniciou_tracemalloc = False
+
+    @contextmanager
+    def etapa(self, nome: str, linhas: Optional[int] = None) -> Iterator[EtapaPerfil]:
+        """Mede o bloco; `linhas` pode ser informado aqui ou atribuído depois (`et.linhas = ...`)."""
+        et = EtapaPerfil(nome=nome, nivel=len(self._pilha), linhas=linhas)
+        if not self.ativo:
+            yield et
+            return
+        if self.memoria:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._iniciou_tracemalloc = True
+            atual, pico = tracemalloc.get_traced_memory()
+            # o reset do pico abaixo apagaria o pico das etapas de fora: guarda antes
+            for pai in self._pilha:
+                pai.pico_bytes = max(pai.pico_bytes, pico - pai._base)
+            tracemalloc.reset_peak()
+            et._base = atual
+        prof = None
+        if self.cprofile_dir is not None and et.nivel == 0:
+            prof = cProfile.Profile()
+        self.etapas.append(et)
+        self._pilha.append(et)
+        t0 = time.perf_counter()
+        if prof is not None:
+            prof.enable()
+        try:
+            yield et
+        finally:
+            if prof is not None:
+                prof.disable()
+            et.segundos = time.perf_counter() - t0
+            self._pilha.pop()
+            if self.memoria:
+                _, pico = tracemalloc.get_traced_memory()
+                for e in (et, *self._pilha):
+                    e.pico_bytes = max(e.pico_bytes, pico - e._base)
+            if prof is not None:
+                assert self.cprofile_dir is not None
+                self.cprofile_dir.mkdir(parents=True, exist_ok=True)
+                nome_arq = re.sub(r"[^\w\-]+", "_", nome).strip("_") or "etapa"
+                destino = self.cprofile_dir / f"{len(self.etapas):02d}_{nome_arq}.prof"
+                prof.dump_stats(str(destino))
+                et.cprofile = str(destino)
+
+    def relatorio(self, script: str) -> Dict[str, Any]:
+        primeiro_nivel = [e for e in self.etapas if e.nivel == 0]
+        return {
+            "versao": VERSAO_PERFIL,
+            "script": script,
+            "data": self._iniciado_em.isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "plataforma": platform.platform(),
+            "memoria": self.memoria,
+            "total_s": round(time.perf_counter() - self._inicio, 4),
+            "etapas_s": round(sum(e.segundos for e in primeiro_nivel), 4),
+            "pico_bytes": max((e.pico_bytes for e in primeiro_nivel), default=0),
+            "etapas": [e.to_json() for e in self.etapas],
+        }
+
+    def salvar(self, path: Path, script: str) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.relatorio(script), ensure_ascii=False, indent=2), encoding="utf-8")
+        return path
+
+    def imprimir(self) -> None:
+        """Resumo das etapas no console (ASCII, como o resto da saída dos scripts)."""
+        total = sum(e.segundos for e in self.etapas if e.nivel == 0) or 1.0
+        largura = max((2 * e.nivel + len(e.nome) for e in self.etapas), default=0)
+        for e in self.etapas:
+            partes = [f"{e.segundos:8.3f}s", f"{100 * e.segundos / total:5.1f}%"]
+            if self.memoria:
+                partes.append(f"pico {e.pico_bytes / MB:8.1f} MB")
+            if e.linhas is not None:
+                partes.append(f"{e.linhas} linhas")
+            rotulo = f"{'  ' * e.nivel}{e.nome}"
+            print(f"   [perfil] {rotulo:<{largura}} " + " | ".join(partes))
+
+    def encerrar(self) -> None:
+        """Para o tracemalloc se foi este perfil que o iniciou."""
+        if self._iniciou_tracemalloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._iniciou_tracemalloc = False
+
+
+def adicionar_argumentos(parser: argparse.ArgumentParser, saida_padrao: Path) -> None:
+    """Opções `--profile*` comuns aos scripts."""
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Mede tempo, pico de memória e linhas de cada etapa e grava um relatório JSON",
+    )
+    parser.add_argument(
+        "--profile-saida",
+        type=Path,
+        default=saida_padrao,
+        help=f"JSON do relatório de etapas (padrão: {saida_padrao})",
+    )
+    parser.add_argument(
+        "--profile-cprofile",
+        type=Path,
+        default=None,
+        help="Pasta para os dumps do cProfile de cada etapa (implica --profile)",
+    )
+
+
+def perfil_dos_argumentos(args: argparse.Namespace) -> Perfil:
+    return Perfil(ativo=args.profile or args.profile_cprofile is not None, cprofile_dir=args.profile_cprofile)
+
+
+def finalizar(perfil: Perfil, args: argparse.Namespace, script: str) -> None:
+    """Grava o relatório e imprime o resumo (nada se o perfil está desligado)."""
+    if not perfil.ativo:
+        return
+    perfil.encerrar()
+    destino = perfil.salvar(args.profile_saida, script)
+    print("   - Perfil por etapa:", destino)
+    perfil.imprimir()
@@ -0,0 +1,163 @@
+"""
+Leitura em streaming dos CSVs exportados pelo ERP (separador ';').
+
+- Encoding detectado pelo primeiro bloco que tenha bytes não-ASCII (BOM, UTF-8, CP1252, Latin-1),
+  sem carregar o arquivo inteiro na memória. Exportações mistas (UTF-8 com um ou outro byte CP1252
+  mais adiante) não interrompem a leitura: o trecho inválido é lido como CP1252 e contado num aviso.
+- Linhas parseadas pelo `csv.reader` (máquina de estados do módulo csv): respeita aspas,
+  separadores e quebras de linha dentro de campos.
+- O arquivo é lido em blocos de tamanho fixo e as linhas são entregues em lotes,
+  então a memória fica constante mesmo em exportações de vários GB.
+"""
+
+from __future__ import annotations
+
+import codecs
+import csv
+import re
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional, Sequence
+
+ENCODINGS_PADRAO = ("utf-8-sig", "cp1252", "latin-1")
+TAMANHO_BLOCO = 1 << 20  # 1 MiB
+TAMANHO_LOTE = 50_000
+
+_NAO_ASCII = re.compile(rb"[\x80-\xff]")
+_FIM_LINHA = re.compile(r"\r\n|\r|\n")
+
+
+def detectar_encoding(
+    path: Path,
+    encodings: Sequence[str] = ENCODINGS_PADRAO,
+    tamanho_bloco: int = TAMANHO_BLOCO,
+) -> str:
+    """
+    Escolhe o primeiro encoding de `encodings` que decodifica o trecho a partir do primeiro byte não-ASCII.
+
+    Blocos só com ASCII são válidos em qualquer um dos encodings, então seguimos lendo
+    (um bloco por vez) até achar o primeiro byte >= 0x80. Arquivo todo ASCII -> primeiro encoding.
+    """
+    with path.open("rb") as f:
+        bloco = f.read(tamanho_bloco)
+        if bloco.startswith(codecs.BOM_UTF8):
+            return "utf-8-sig"
+        while bloco:
+            achou = _NAO_ASCII.search(bloco)
+            if achou:
+                # Garante alguns bytes após o início do caractere para validar sequências multibyte
+                trecho = bloco[achou.start() :] + f.read(8)
+                last_err: Optional[Exception] = None
+                for enc in encodings:
+                    try:
+                        codecs.getincrementaldecoder(enc)().decode(trecho, final=False)
+                        return enc
+                    except UnicodeDecodeError as e:
+                        last_err = e
+                raise RuntimeError(f"Falha ao ler {path} com encodings {list(encodings)}: {last_err}")
+            bloco = f.read(tamanho_bloco)
+    return encodings[0]
+
+
+def _decodificar_alternativo(dados: bytes) -> str:
+    """Trecho fora do encoding do arquivo: CP1252, com Latin-1 nos bytes que o CP1252 não define."""
+    return "".join(
+        c if c != "\ufffd" else bytes([b]).decode("latin-1")
+        for c, b in zip(dados.decode("cp1252", errors="replace"), dados)
+    )
+
+
+def _textos(raw: BinaryIO, enc: str, tamanho_bloco: int, trechos_invalidos: List[int]) -> Iterator[str]:
+    """
+    Texto do arquivo em pedaços, decodificado com `enc`. Um trecho inválido em `enc` (ex.: byte CP1252
+    num arquivo UTF-8) vira texto por `_decodificar_alternativo`, é contado em `trechos_invalidos[0]`
+    e a decodificação continua logo depois dele.
+    """
+    dec = codecs.getincrementaldecoder(enc)()
+    while True:
+        bloco = raw.read(tamanho_bloco)
+        final = not bloco
+        while True:
+            try:
+                texto = dec.decode(bloco, final=final)
+                break
+            except UnicodeDecodeError as e:
+                # `e.object` inclui os bytes que o decodificador guardava do bloco anterior
+                yield e.object[: e.start].decode(enc)
+                yield _decodificar_alternativo(e.object[e.start : e.end])
+                trechos_invalidos[0] += 1
+                dec = codecs.getincrementaldecoder(enc)()
+                bloco = e.object[e.end :]
+        if texto:
+            yield texto
+        if final:
+            return
+
+
+def _linhas_texto(textos: Iterator[str]) -> Iterator[str]:
+    """
+    Quebra os pedaços em linhas com o fim de linha incluído, como `newline=""`: "\r\n", "\r" e "\n"
+    encerram a linha. Um "\r" no fim do pedaço espera o próximo (pode ser a metade de um "\r\n");
+    a linha incompleta fica em partes e só é juntada quando termina.
+    """
+    pendente: List[str] = []
+    for texto in textos:
+        if not texto:
+            continue
+        ini = 0
+        if pendente and pendente[-1].endswith("\r"):
+            if texto.startswith("\n"):
+                pendente.append("\n")
+                ini = 1
+            yield "".join(pendente)
+            pendente = []
+        for fim in _FIM_LINHA.finditer(texto, ini):
+            if fim.end() == len(texto) and fim.group() == "\r":
+                break
+            pendente.append(texto[ini : fim.end()])
+            yield "".join(pendente)
+            pendente = []
+            ini = fim.end()
+        if ini < len(texto):
+            pendente.append(texto[ini:])
+    if pendente:
+        yield "".join(pendente)
+
+
+def ler_linhas_csv(
+    path: Path,
+    delimiter: str = ";",
+    encoding: Optional[str] = None,
+    tamanho_bloco: int = TAMANHO_BLOCO,
+) -> Iterator[List[str]]:
+    """
+    Gera as linhas do CSV (lista de campos), ignorando linhas vazias. Trechos que não decodificam
+    no encoding escolhido são lidos como CP1252 e a contagem sai num aviso ao fim da leitura.
+    """
+    enc = encoding or detectar_encoding(path, tamanho_bloco=tamanho_bloco)
+    trechos_invalidos = [0]
+    with path.open("rb", buffering=tamanho_bloco) as raw:
+        reader = csv.reader(_linhas_texto(_textos(raw, enc, tamanho_bloco, trechos_invalidos)), delimiter=delimiter, quotechar='"')
+        for parts in reader:
+            if not any(p.strip() for p in parts):
+                continue
+            yield parts
+    if trechos_invalidos[0]:
+        print(f"   - AVISO: {path.name}: {trechos_invalidos[0]} trecho(s) fora de {enc} lidos como cp1252")
+
+
+def ler_lotes_csv(
+    path: Path,
+    delimiter: str = ";",
+    encoding: Optional[str] = None,
+    tamanho_lote: int = TAMANHO_LOTE,
+    tamanho_bloco: int = TAMANHO_BLOCO,
+) -> Iterator[List[List[str]]]:
+    """Mesmo que `ler_linhas_csv`, mas entregando listas de até `tamanho_lote` linhas."""
+    lote: List[List[str]] = []
+    for parts in ler_linhas_csv(path, delimiter=delimiter, encoding=encoding, tamanho_bloco=tamanho_bloco):
+        lote.append(parts)
+        if len(lote) >= tamanho_lote:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
@@ -0,0 +1,118 @@
+"""
+Normalização de textos compartilhada pelas análises (recorrência, redução de custos, extrato Bradesco).
+
+Os mesmos textos (fornecedores, históricos, categorias, contas do DRE) se repetem milhares de vezes,
+então cada forma normalizada é calculada uma vez e guardada num cache LRU limitado:
+
+- `colapsar_espacos`: trim + espaços colapsados (o antigo `normalize_text`)
+- `sem_acentos` / `sem_acentos_compat`: remoção de acentos (NFD / NFKD)
+- `ascii_upper`: sem acentos, espaços colapsados e maiúsculas (chave de nomes de pessoas)
+- `chave_busca`: sem acentos (NFKD), minúsculas e espaços colapsados (o `_norm` da redução de custos)
+
+Outras funções puras de texto podem usar o mesmo mecanismo com `@memoizar()`; todos os caches
+registrados aparecem em `estatisticas_cache()` / `resumo_cache()` (consultas, acertos, tamanho).
+"""
+
+from __future__ import annotations
+
+import functools
+import re
+import unicodedata
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+TAMANHO_CACHE = 1 << 16
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_CACHES: Dict[str, Any] = {}
+_ESPACOS = re.compile(r"\s+")
+
+
+def memoizar(nome: Optional[str] = None, tamanho: int = TAMANHO_CACHE) -> Callable[[F], F]:
+    """`functools.lru_cache` limitado + registro para as estatísticas de acerto."""
+
+    def deco(fn: F) -> F:
+        f = functools.lru_cache(maxsize=tamanho)(fn)
+        _CACHES[nome or fn.__qualname__] = f
+        return f  # type: ignore[return-value]
+
+    return deco
+
+
+def estatisticas_cache() -> Dict[str, Dict[str, float]]:
+    out: Dict[str, Dict[str, float]] = {}
+    for nome, f in _CACHES.items():
+        info = f.cache_info()
+        consultas = info.hits + info.misses
+        if not consultas:
+            continue
+        out[nome] = {
+            "consultas": consultas,
+            "acertos": info.hits,
+            "taxa_acerto": info.hits / consultas,
+            "tamanho": info.currsize,
+        }
+    return out
+
+
+def resumo_cache() -> str:
+    """Uma linha com o total de consultas e a taxa de acerto dos caches usados."""
+    stats = estatisticas_cache()
+    consultas = sum(s["consultas"] for s in stats.values())
+    if not consultas:
+        return "sem consultas"
+    acertos = sum(s["acertos"] for s in stats.values())
+    return f"{consultas} consultas, {acertos / consultas:.1%} acertos em {len(stats)} caches"
+
+
+def limpar_caches() -> None:
+    for f in _CACHES.values():
+        f.cache_clear()
+
+
+def _sem_acentos(s: str) -> str:
+    s = unicodedata.normalize("NFD", s)
+    return "".join(ch for ch in s if unicodedata.category(ch) != "Mn")
+
+
+def _sem_acentos_compat(s: str) -> str:
+    s = unicodedata.normalize("NFKD", s)
+    return "".join(ch for ch in s if not unicodedata.combining(ch))
+
+
+@memoizar("colapsar_espacos")
+def colapsar_espacos(s: Optional[str]) -> str:
+    if s is None:
+        return ""
+    return " ".join(str(s).split())
+
+
+@memoizar("sem_acentos")
+def sem_acentos(s: str) -> str:
+    return _sem_acentos(s)
+
+
+@memoizar("sem_acentos_compat")
+def sem_acentos_compat(s: str) -> str:
+    return _sem_acentos_compat(s)
+
+
+@memoizar("ascii_upper")
+def ascii_upper(s: Optional[str]) -> str:
+    s = (s or "").strip()
+    if not s:
+        return ""
+    return " ".join(_sem_acentos(s).split()).upper()
+
+
+@memoizar("chave_busca")
+def _chave_busca(s: str) -> str:
+    s = _sem_acentos_compat(s).lower()
+    return _ESPACOS.sub(" ", s).strip()
+
+
+def chave_busca(txt: object) -> str:
+    """Normaliza texto (lower, sem acentos, espaços colapsados)."""
+    if txt is None:
+        return ""
+    return _chave_busca(str(txt))
@@ -0,0 +1,241 @@
+"""
+Outliers robustos nas saídas: cada débito contra o seu grupo (categoria, entidade) e contra a categoria.
+
+A regra antiga olhava só o top 3 de cada grupo ("≥ 3× a mediana e ≥ R$ 20 mil"). Aqui todo débito
+recebe um escore robusto sobre o logaritmo do valor (pagamentos variam por fator, não por soma: a
+regra antiga também era "× a mediana")
+
+    escore = (ln valor - ln mediana) / escala,   escala = 1,4826 × MAD
+
+(MAD = mediana dos desvios absolutos; o fator deixa a escala comparável a um desvio-padrão), calculado
+para o grupo e para a categoria numa operação agrupada: ordena por (grupo, valor), pega as medianas
+pelas posições e repete a ordenação com os desvios para o MAD. Nada de loop por grupo.
+
+- a escala tem piso (ln(`razao_minima`) / `limiar`): grupos de valor fixo (aluguel, contrato) têm MAD
+  zero, e qualquer centavo a mais viraria outlier infinito. Com o piso, num grupo sem dispersão o
+  pagamento precisa de `razao_minima` × a mediana para chegar ao limiar — 3×, o mesmo corte da regra
+  antiga; grupos dispersos continuam julgados pelo MAD
+- grupos com poucos pagamentos (< `amostra_minima`) são julgados pela categoria
+- com o estado de recorrência (`--estado`), a base do grupo é o histórico acumulado: mediana e
+  escala pelo intervalo interquartil do esboço de quantis (IQR / 1,349, equivalente ao MAD normalizado;
+  quantis não mudam com o logaritmo). A base é tirada com `bases_historicas` antes de o lote atual
+  entrar no estado, para o escore ficar fora da amostra (movimentos de uma execução anterior que
+  voltam no arquivo já fazem parte do histórico)
+
+Sem a tabela de movimentos (relatórios em lote, que só têm o estado mesclado), `outliers_do_estado`
+aplica o mesmo escore aos maiores pagamentos guardados de cada grupo.
+"""
+
+from __future__ import annotations
+
+import csv
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from estado_recorrencia import EstadoGrupo, EstadoRecorrencia
+
+if TYPE_CHECKING:
+    from analise_recorrencia import MovimentoTable
+
+# MAD -> desvio-padrão (distribuição normal) e IQR -> desvio-padrão
+FATOR_MAD = 1.4826
+FATOR_IQR = 1.349
+
+
+@dataclass
+class ConfigOutliers:
+    # escore robusto mínimo (3,5 é o corte usual do escore-z modificado)
+    limiar: float = 3.5
+    # mesmo corte de relevância da heurística anterior: R$ 20 mil
+    valor_minimo_cents: int = 2_000_000
+    amostra_minima: int = 5
+    # piso da escala: num grupo sem dispersão, `razao_minima` × a mediana dá escore = `limiar`
+    razao_minima: float = 3.0
+
+    @property
+    def escala_minima(self) -> float:
+        return float(np.log(self.razao_minima)) / self.limiar
+
+
+@dataclass
+class BaseRobusta:
+    """Mediana, escala (em ln) e tamanho da amostra por grupo (arrays indexados pelo id do grupo)."""
+
+    mediana: np.ndarray
+    escala: np.ndarray
+    n: np.ndarray
+
+    def escore(self, grupo: np.ndarray, log_valores: np.ndarray) -> np.ndarray:
+        return (log_valores - self.mediana[grupo]) / self.escala[grupo]
+
+
+def _medianas_ordenadas(grupo: np.ndarray, valores: np.ndarray, n_grupos: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Mediana de cada grupo (mesma interpolação de `quantis.quantil`) e contagens."""
+    ordem = np.lexsort((valores, grupo))
+    v = valores[ordem]
+    cont = np.bincount(grupo, minlength=n_grupos)
+    inicio = np.concatenate([[0], np.cumsum(cont)[:-1]])
+    tem = cont > 0
+    lo = np.where(tem, inicio + (cont - 1) // 2, 0)
+    hi = np.where(tem, inicio + cont // 2, 0)
+    med = np.where(tem, (v[lo] + v[hi]) / 2, 0.0) if len(v) else np.zeros(n_grupos)
+    return med, cont
+
+
+def base_robusta(grupo: np.ndarray, log_valores: np.ndarray, n_grupos: int, cfg: ConfigOutliers) -> BaseRobusta:
+    """Mediana e MAD normalizado de todos os grupos de uma vez (`grupo` em 0..n_grupos-1)."""
+    med, cont = _medianas_ordenadas(grupo, log_valores, n_grupos)
+    mad, _ = _medianas_ordenadas(grupo, np.abs(log_valores - med[grupo]), n_grupos)
+    escala = np.maximum(FATOR_MAD * mad, cfg.escala_minima)
+    return BaseRobusta(mediana=med, escala=escala, n=cont)
+
+
+def _base_historica(g: EstadoGrupo, cfg: ConfigOutliers) -> Optional[Tuple[float, float, int]]:
+    """(ln mediana, escala, n) a partir do esboço de quantis do grupo; None se a amostra é pequena."""
+    q25, q50, q75 = (g.valores.quantil(q) * 100 for q in (0.25, 0.5, 0.75))
+    if g.count < cfg.amostra_minima or q25 <= 0:
+        return None
+    iqr = np.log(q75) - np.log(q25)
+    return float(np.log(q50)), max(iqr / FATOR_IQR, cfg.escala_minima), g.count
+
+
+def bases_historicas(estado: EstadoRecorrencia, cfg: Optional[ConfigOutliers] = None) -> Dict[Tuple[str, str], Tuple[float, float, int]]:
+    """(categoria, entidade) -> (ln mediana, escala, n) do histórico; chamar antes de incorporar o lote atual."""
+    cfg = cfg if cfg is not None else ConfigOutliers()
+    out: Dict[Tuple[str, str], Tuple[float, float, int]] = {}
+    for chave, g in estado.grupos.items():
+        hist = _base_historica(g, cfg)
+        if hist is not None:
+            out[chave] = hist
+    return out
+
+
+def _explicacao(valor: float, mediana: float, escore: float, n: int, base: str) -> str:
+    razao = valor / mediana if mediana > 0 else float("inf")
+    return f"{razao:.1f}x a mediana {base} ({n} pagamentos); escore {escore:.1f}"
+
+
+def detectar_outliers(
+    t: "MovimentoTable",
+    linhas: np.ndarray,
+    historico: Optional[Dict[Tuple[str, str], Tuple[float, float, int]]] = None,
+    cfg: Optional[ConfigOutliers] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Débitos fora do padrão entre as `linhas` (saídas operacionais), do maior excesso sobre a mediana
+    de referência para o menor. Com `historico` (`bases_historicas` do estado antes do lote), a base de
+    cada grupo (categoria, entidade) é a histórica.
+    """
+    cfg = cfg if cfg is not None else ConfigOutliers()
+    if len(linhas) == 0:
+        return []
+    deb = t.debito[linhas].astype(np.float64)
+    log_deb = np.log(np.maximum(deb, 1.0))
+    chave = (t.categoria_nome[linhas].astype(np.int64) << 32) | t.entidade[linhas].astype(np.int64)
+    grupos, g = np.unique(chave, return_inverse=True)
+    g = g.reshape(-1)
+    categorias, c = np.unique(t.categoria_nome[linhas], return_inverse=True)
+    c = c.reshape(-1)
+    base_g = base_robusta(g, log_deb, len(grupos), cfg)
+    base_c = base_robusta(c, log_deb, len(categorias), cfg)
+    origem_g = np.full(len(grupos), "do fornecedor", dtype=object)
+
+    if historico:
+        for k, ch in enumerate(grupos.tolist()):
+            hist = historico.get((t.textos[ch >> 32], t.textos[ch & 0xFFFFFFFF]))
+            if hist is not None:
+                base_g.mediana[k], base_g.escala[k], base_g.n[k] = hist
+                origem_g[k] = "histórica do fornecedor"
+
+    escore_g = base_g.escore(g, log_deb)
+    escore_c = base_c.escore(c, log_deb)
+    usa_grupo = base_g.n[g] >= cfg.amostra_minima
+    usa_cat = ~usa_grupo & (base_c.n[c] >= cfg.amostra_minima)
+    escore = np.where(usa_grupo, escore_g, np.where(usa_cat, escore_c, -np.inf))
+    mediana = np.exp(np.where(usa_grupo, base_g.mediana[g], base_c.mediana[c]))
+    sel = np.flatnonzero((escore >= cfg.limiar) & (deb >= cfg.valor_minimo_cents))
+    excesso = deb[sel] - mediana[sel]
+    sel = sel[np.lexsort((linhas[sel], -excesso))]
+
+    out: List[Dict[str, Any]] = []
+    for p in sel.tolist():
+        i = int(linhas[p])
+        gk, ck = int(g[p]), int(c[p])
+        med_g, med_c = float(np.exp(base_g.mediana[gk])), float(np.exp(base_c.mediana[ck]))
+        if usa_grupo[p]:
+            explicacao = _explicacao(deb[p], med_g, escore_g[p], int(base_g.n[gk]), origem_g[gk])
+        else:
+            explicacao = _explicacao(deb[p], med_c, escore_c[p], int(base_c.n[ck]), "da categoria")
+        out.append(
+            {
+                "id": str(t.ids[i]),
+                "categoria": t.texto(t.categoria_nome, i),
+                "entidade": t.texto(t.entidade, i),
+                "valor": deb[p] / 100,
+                "data": t.data[i].astype("datetime64[D]").item().strftime("%d/%m/%Y"),
+                "descricao": t.texto(t.historico, i),
+                "escore": round(float(escore[p]), 2),
+                "escore_grupo": round(float(escore_g[p]), 2),
+                "mediana_grupo": round(med_g) / 100,
+                "n_grupo": int(base_g.n[gk]),
+                "escore_categoria": round(float(escore_c[p]), 2),
+                "mediana_categoria": round(med_c) / 100,
+                "n_categoria": int(base_c.n[ck]),
+                "base": "grupo" if usa_grupo[p] else "categoria",
+                "explicacao": explicacao,
+            }
+        )
+    return out
+
+
+def outliers_do_estado(estado: EstadoRecorrencia, cfg: Optional[ConfigOutliers] = None) -> List[Dict[str, Any]]:
+    """
+    Mesmo escore, quando só há o estado (agregadores mesclados): os maiores pagamentos guardados de
+    cada grupo contra a mediana/IQR do grupo. Sem comparação com a categoria.
+    """
+    cfg = cfg if cfg is not None else ConfigOutliers()
+    out: List[Dict[str, Any]] = []
+    for g in estado.grupos.values():
+        hist = _base_historica(g, cfg)
+        if hist is None:
+            continue
+        log_med, escala, n = hist
+        med = float(np.exp(log_med))
+        for item in g.top.itens():
+            esc = (np.log(item.debito_cents) - log_med) / escala
+            if esc < cfg.limiar or item.debito_cents < cfg.valor_minimo_cents:
+                continue
+            out.append(
+                {
+                    "id": item.id,
+                    "categoria": g.categoria,
+                    "entidade": g.entidade,
+                    "valor": item.debito_cents / 100,
+                    "data": np.datetime64(item.data, "D").item().strftime("%d/%m/%Y"),
+                    "descricao": item.historico,
+                    "escore": round(float(esc), 2),
+                    "escore_grupo": round(float(esc), 2),
+                    "mediana_grupo": round(med) / 100,
+                    "n_grupo": n,
+                    "base": "grupo",
+                    "explicacao": _explicacao(item.debito_cents, med, esc, n, "do fornecedor"),
+                }
+            )
+    out.sort(key=lambda o: o["valor"] - o["mediana_grupo"], reverse=True)
+    return out
+
+
+def escrever_csv_outliers(outliers: List[Dict[str, Any]], out_path: Path) -> None:
+    """Tabela ranqueada (maior excesso sobre a mediana primeiro)."""
+    colunas = [
+        "id", "data", "categoria", "entidade", "valor", "escore", "base",
+        "mediana_grupo", "n_grupo", "mediana_categoria", "n_categoria", "explicacao", "descricao",
+    ]
+    with out_path.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f, delimiter=";")
+        w.writerow(["posicao", *colunas])
+        for n, o in enumerate(outliers, start=1):
+            w.writerow([n, *[o.get(k, "") for k in colunas]])
@@ -0,0 +1,281 @@
+"""
+Pacotes JSON pré-agregados para o dashboard.
+
+Em vez de baixar `movimentos_classificados.csv` / `pessoas_rescisao_fgts.csv` e reagregar tudo no
+navegador, o dashboard lê poucos KB já prontos para plotar:
+
+- `totais`: créditos/débitos por mês × categoria × banco × classe de fluxo
+- `recorrencia`: custo operacional por mês × banco × classe de recorrência (+ quantidade de grupos por classe)
+- `entidades`: maiores grupos (categoria, entidade) de custo operacional, com abertura por banco
+- `pessoas`: tabela de pessoas (rescisões/FGTS/ações) com os bancos dos pagamentos
+- `contas_aberto`: o cubo de saldos em aberto das contas a pagar (`cubo_contas`), para recortar no navegador
+
+Cada pacote é gravado como `<nome>.<hash do conteúdo>.json` e listado em `manifest.json`: o dashboard
+busca o manifesto sem cache e os pacotes com cache normal — nome novo só quando o conteúdo muda.
+
+Valores em reais; tabelas em formato colunar (`colunas` + `linhas`) para ficarem compactas.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    # só para tipos: o script principal importa este módulo (evita import circular)
+    from analise_recorrencia import ClassificacaoMovimentos, MovimentoTable
+    from cubo_contas import CuboEsparso
+
+VERSAO_PACOTES = 1
+TOP_ENTIDADES = 100
+TOP_ENTIDADES_NAO_RECORRENTES = 50
+NOME_MANIFESTO = "manifest.json"
+
+
+def _tabela(colunas: Sequence[str], linhas: List[List[Any]]) -> Dict[str, Any]:
+    return {"colunas": list(colunas), "linhas": linhas}
+
+
+def _reais(cents: float) -> float:
+    return round(float(cents) / 100, 2)
+
+
+def _agrupar(*colunas: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Grupo de cada linha pela combinação das colunas (códigos não negativos < 2**32) e a primeira linha
+    de cada grupo. As colunas entram uma a uma numa chave int64 (grupo anterior, código).
+    """
+    grupo = np.zeros(len(colunas[0]), dtype=np.int64)
+    primeira = np.zeros(1, dtype=np.int64)
+    for col in colunas:
+        chave = (grupo << 32) | col.astype(np.int64)
+        _, primeira, inv = np.unique(chave, return_index=True, return_inverse=True)
+        grupo = inv.reshape(-1).astype(np.int64)
+    return grupo, primeira
+
+
+def _indice_meses(t: "MovimentoTable") -> Tuple[List[str], np.ndarray]:
+    meses, inv = np.unique(t.mes, return_inverse=True)
+    return [str(m) for m in meses], inv.reshape(-1)
+
+
+def pacote_totais(t: "MovimentoTable", c: "ClassificacaoMovimentos") -> Dict[str, Any]:
+    meses, mes_idx = _indice_meses(t)
+    grupo, primeira = _agrupar(mes_idx, t.categoria_raw, t.banco, c.fluxo)
+    n = len(primeira)
+    credito = np.bincount(grupo, weights=t.credito, minlength=n)
+    debito = np.bincount(grupo, weights=t.debito, minlength=n)
+    qtd = np.bincount(grupo, minlength=n)
+    linhas = [
+        [
+            meses[mes_idx[i]],
+            int(t.categoria_id[i]),
+            t.texto(t.categoria_nome, i),
+            t.texto(t.banco, i),
+            c.CLASSES_FLUXO[c.fluxo[i]],
+            _reais(credito[g]),
+            _reais(debito[g]),
+            int(qtd[g]),
+        ]
+        for g, i in enumerate(primeira.tolist())
+    ]
+    linhas.sort(key=lambda r: (r[0], r[1], r[2], r[3], r[4]))
+    return {
+        "meses": meses,
+        "totais": _tabela(["mes", "categoria_id", "categoria", "banco", "classe_fluxo", "credito", "debito", "quantidade"], linhas),
+    }
+
+
+def pacote_recorrencia(t: "MovimentoTable", c: "ClassificacaoMovimentos", mov_ins: Dict[str, Any]) -> Dict[str, Any]:
+    rec, extra = c.recorrencia, c.extraordinario
+    custo = np.flatnonzero(c.fluxo == c.CUSTO_OPERACIONAL)
+    meses, mes_idx = _indice_meses(t)
+    linhas: List[List[Any]] = []
+    if len(custo):
+        grupo, primeira = _agrupar(mes_idx[custo], t.banco[custo], rec[custo], extra[custo])
+        n = len(primeira)
+        primeira = custo[primeira]
+        debito = np.bincount(grupo, weights=t.debito[custo], minlength=n)
+        qtd = np.bincount(grupo, minlength=n)
+        linhas = [
+            [meses[mes_idx[i]], t.texto(t.banco, i), c.CLASSES_RECORRENCIA[rec[i]], bool(extra[i]), _reais(debito[g]), int(qtd[g])]
+            for g, i in enumerate(primeira.tolist())
+        ]
+        linhas.sort(key=lambda r: (r[0], r[1], r[2], r[3]))
+    grupos = {
+        "recorrente_forte": len(mov_ins.get("recorrentes_fortes", [])),
+        "recorrente_frequente": len(mov_ins.get("recorrentes_frequentes", [])),
+        "nao_recorrente": len(mov_ins.get("nao_recorrentes", [])),
+    }
+    return {
+        "grupos": grupos,
+        "por_mes": _tabela(["mes", "banco", "classe_recorrencia", "extraordinario", "debito", "quantidade"], linhas),
+    }
+
+
+def pacote_entidades(t: "MovimentoTable", c: "ClassificacaoMovimentos") -> Dict[str, Any]:
+    rec, extra = c.recorrencia, c.extraordinario
+    custo = np.flatnonzero(c.fluxo == c.CUSTO_OPERACIONAL)
+    meses, mes_idx = _indice_meses(t)
+    if not len(custo):
+        return {"recorrentes": [], "nao_recorrentes": []}
+
+    grupo, primeira = _agrupar(t.categoria_nome[custo], t.entidade[custo])
+    n = len(primeira)
+    primeira = custo[primeira]
+    total = np.bincount(grupo, weights=t.debito[custo], minlength=n)
+    qtd = np.bincount(grupo, minlength=n)
+    algum_extra = np.bincount(grupo, weights=extra[custo], minlength=n) > 0
+
+    # abertura por banco: (grupo, banco) -> total, quantidade, meses
+    sub, sub_primeira = _agrupar(grupo, t.banco[custo])
+    n_sub = len(sub_primeira)
+    sub_grupo = grupo[sub_primeira]
+    sub_primeira = custo[sub_primeira]
+    sub_total = np.bincount(sub, weights=t.debito[custo], minlength=n_sub)
+    sub_qtd = np.bincount(sub, minlength=n_sub)
+    sub_meses: Dict[int, Set[int]] = {}
+    for chave in np.unique((sub << 32) | mes_idx[custo].astype(np.int64)).tolist():
+        sub_meses.setdefault(chave >> 32, set()).add(chave & 0xFFFFFFFF)
+    por_grupo: Dict[int, List[int]] = {}
+    for s, g in enumerate(sub_grupo.tolist()):
+        por_grupo.setdefault(g, []).append(s)
+
+    def item(g: int) -> Dict[str, Any]:
+        i = int(primeira[g])
+        bancos = sorted(por_grupo.get(g, []), key=lambda s: -sub_total[s])
+        meses_g = sorted({m for s in bancos for m in sub_meses.get(s, ())})
+        return {
+            "categoria": t.texto(t.categoria_nome, i),
+            "entidade": t.texto(t.entidade, i),
+            "classe": c.CLASSES_RECORRENCIA[rec[i]],
+            "extraordinario": bool(algum_extra[g]),
+            "total": _reais(total[g]),
+            "quantidade": int(qtd[g]),
+            "meses": [meses[m] for m in meses_g],
+            "por_banco": [
+                {
+                    "banco": t.texto(t.banco, int(sub_primeira[s])),
+                    "total": _reais(sub_total[s]),
+                    "quantidade": int(sub_qtd[s]),
+                    "meses": [meses[m] for m in sorted(sub_meses.get(s, ()))],
+                }
+                for s in bancos
+            ],
+        }
+
+    classe_grupo = rec[primeira]
+    recorrente = np.isin(
+        classe_grupo,
+        [c.CLASSES_RECORRENCIA.index("recorrente_forte"), c.CLASSES_RECORRENCIA.index("recorrente_frequente")],
+    )
+    # maiores totais primeiro; empates na ordem de primeira ocorrência
+    ordem = np.lexsort((primeira, -total))
+    rec_ord = [int(g) for g in ordem if recorrente[g]][:TOP_ENTIDADES]
+    nao_ord = [int(g) for g in ordem if not recorrente[g]][:TOP_ENTIDADES_NAO_RECORRENTES]
+    return {"recorrentes": [item(g) for g in rec_ord], "nao_recorrentes": [item(g) for g in nao_ord]}
+
+
+def pacote_pessoas(t: "MovimentoTable", pes_ins: Dict[str, Any]) -> Dict[str, Any]:
+    # bancos dos pagamentos de cada pessoa (o CSV de pessoas não tem banco; o dashboard filtra por ele)
+    pessoas = pes_ins.get("pessoas", [])
+    ids_pessoas = {i for r in pessoas for k in ("salarios_rescisao_ids", "fgts_rescisao_ids", "acoes_trabalhistas_ids") for i in r.get(k, [])}
+    banco_por_id: Dict[str, str] = {}
+    if ids_pessoas:
+        for i in np.flatnonzero(np.isin(t.ids, list(ids_pessoas))).tolist():
+            banco_por_id.setdefault(str(t.ids[i]), t.texto(t.banco, i))
+
+    colunas = [
+        "pessoa",
+        "salarios_rescisao_total",
+        "salarios_rescisao_count",
+        "salarios_rescisao_datas",
+        "fgts_rescisao_total",
+        "fgts_rescisao_count",
+        "fgts_rescisao_datas",
+        "acoes_trabalhistas_total",
+        "acoes_trabalhistas_count",
+        "acoes_trabalhistas_datas",
+        "total_geral",
+        "bancos",
+    ]
+    linhas = []
+    for r in pessoas:
+        ids = [*r.get("salarios_rescisao_ids", []), *r.get("fgts_rescisao_ids", []), *r.get("acoes_trabalhistas_ids", [])]
+        bancos = sorted({banco_por_id[i] for i in ids if i in banco_por_id})
+        linhas.append(
+            [
+                r["pessoa"],
+                round(r["salarios_rescisao_total"], 2),
+                r["salarios_rescisao_count"],
+                r["salarios_rescisao_datas"],
+                round(r["fgts_rescisao_total"], 2),
+                r["fgts_rescisao_count"],
+                r["fgts_rescisao_datas"],
+                round(r["acoes_trabalhistas_total"], 2),
+                r["acoes_trabalhistas_count"],
+                r["acoes_trabalhistas_datas"],
+                round(r["total_geral"], 2),
+                bancos,
+            ]
+        )
+    return {
+        "pessoas": _tabela(colunas, linhas),
+        "fgts_rescisao_sem_pessoa_total": round(pes_ins.get("fgts_rescisao_sem_pessoa_total", 0.0), 2),
+    }
+
+
+def gerar_pacotes(
+    movs: "MovimentoTable",
+    mov_ins: Dict[str, Any],
+    pes_ins: Dict[str, Any],
+    classes: "ClassificacaoMovimentos",
+    cubo_aberto: Optional["CuboEsparso"] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """`classes` é o retorno de `classificar_movimentos(movs, mov_ins)`; `cubo_aberto`, o de `classify_recorrencia_contas`."""
+    pacotes = {
+        "totais": pacote_totais(movs, classes),
+        "recorrencia": pacote_recorrencia(movs, classes, mov_ins),
+        "entidades": pacote_entidades(movs, classes),
+        "pessoas": pacote_pessoas(movs, pes_ins),
+    }
+    if cubo_aberto is not None:
+        pacotes["contas_aberto"] = cubo_aberto.to_json()
+    return pacotes
+
+
+def _escrever_atomico(path: Path, dados: bytes) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(dados)
+    tmp.replace(path)
+
+
+def escrever_pacotes(pacotes: Dict[str, Dict[str, Any]], pasta: Path) -> Path:
+    """
+    Grava cada pacote com o hash do conteúdo no nome e depois o manifesto (por último: quem lê o
+    manifesto sempre encontra os arquivos). Versões antigas dos mesmos pacotes são removidas.
+    """
+    pasta.mkdir(parents=True, exist_ok=True)
+    manifesto: Dict[str, Any] = {"versao": VERSAO_PACOTES, "pacotes": {}}
+    for nome, conteudo in pacotes.items():
+        dados = json.dumps(conteudo, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        h = hashlib.blake2b(dados, digest_size=16).hexdigest()
+        arquivo = f"{nome}.{h[:12]}.json"
+        if not (pasta / arquivo).exists():
+            _escrever_atomico(pasta / arquivo, dados)
+        manifesto["pacotes"][nome] = {"arquivo": arquivo, "bytes": len(dados), "hash": h}
+
+    manifesto_path = pasta / NOME_MANIFESTO
+    _escrever_atomico(manifesto_path, json.dumps(manifesto, ensure_ascii=False, indent=2).encode("utf-8"))
+
+    atuais = {p["arquivo"] for p in manifesto["pacotes"].values()}
+    for nome in pacotes:
+        for antigo in pasta.glob(f"{nome}.*.json"):
+            if antigo.name not in atuais:
+                antigo.unlink()
+    return manifesto_path
@@ -0,0 +1,109 @@
+"""
+Detecção de palavras-chave por família (extraordinário, PJ, genéricos) com um autômato Aho-Corasick.
+
+Todas as palavras de todas as famílias viram um único autômato: cada texto é percorrido uma vez,
+caractere a caractere, e o custo não cresce com a quantidade de palavras-chave.
+
+- famílias "por trecho" casam em qualquer posição (como `k in texto`)
+- famílias em `palavra_inteira` só casam com o token inteiro, delimitado por espaços ou
+  pelo início/fim do texto (como `k in texto.split()`)
+- `ignorar_caixa=True` compara em minúsculas (padrões e texto)
+
+`familias(texto)` é memoizado por texto (os mesmos fornecedores/categorias se repetem muito) com
+`normalizacao.memoizar`, então aparece nas estatísticas de cache sob o `nome` do autômato.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+from normalizacao import memoizar
+
+
+class AutomatoPalavras:
+    """Autômato compilado uma vez (no import do módulo que o usa) e consultado por texto."""
+
+    def __init__(
+        self,
+        familias: Dict[str, Iterable[str]],
+        palavra_inteira: Iterable[str] = (),
+        ignorar_caixa: bool = False,
+        nome: str = "palavras_chave",
+    ) -> None:
+        self.ignorar_caixa = ignorar_caixa
+        self.palavra_inteira = frozenset(palavra_inteira)
+        desconhecidas = self.palavra_inteira - set(familias)
+        if desconhecidas:
+            raise ValueError(f"Famílias desconhecidas em palavra_inteira: {sorted(desconhecidas)}")
+
+        # trie: transições, link de falha e saídas (família, tamanho do padrão)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._falha: List[int] = [0]
+        self._saidas: List[List[Tuple[str, int]]] = [[]]
+        for familia, padroes in familias.items():
+            for p in padroes:
+                if ignorar_caixa:
+                    p = p.lower()
+                if p:
+                    self._inserir(p, familia)
+        self._compilar()
+        self.familias = memoizar(nome)(self._familias)
+
+    def _inserir(self, padrao: str, familia: str) -> None:
+        no = 0
+        for ch in padrao:
+            prox = self._goto[no].get(ch)
+            if prox is None:
+                prox = len(self._goto)
+                self._goto[no][ch] = prox
+                self._goto.append({})
+                self._falha.append(0)
+                self._saidas.append([])
+            no = prox
+        if (familia, len(padrao)) not in self._saidas[no]:
+            self._saidas[no].append((familia, len(padrao)))
+
+    def _compilar(self) -> None:
+        # BFS: o link de falha de um nó é o maior sufixo próprio que também é prefixo de algum padrão
+        fila = deque(self._goto[0].values())
+        while fila:
+            no = fila.popleft()
+            for ch, filho in self._goto[no].items():
+                fila.append(filho)
+                f = self._falha[no]
+                while f and ch not in self._goto[f]:
+                    f = self._falha[f]
+                alvo = self._goto[f].get(ch, 0)
+                self._falha[filho] = alvo if alvo != filho else 0
+                # saídas herdadas do sufixo: um único passo na busca já traz todas
+                self._saidas[filho] = self._saidas[filho] + self._saidas[self._falha[filho]]
+
+    def ocorrencias(self, texto: str) -> List[Tuple[str, int, int]]:
+        """(família, início, fim) de cada casamento, respeitando `palavra_inteira`."""
+        if self.ignorar_caixa:
+            texto = texto.lower()
+        out: List[Tuple[str, int, int]] = []
+        goto, falha, saidas = self._goto, self._falha, self._saidas
+        n = len(texto)
+        no = 0
+        for i, ch in enumerate(texto):
+            while no and ch not in goto[no]:
+                no = falha[no]
+            no = goto[no].get(ch, 0)
+            for familia, tam in saidas[no]:
+                inicio = i - tam + 1
+                if familia in self.palavra_inteira:
+                    if inicio > 0 and not texto[inicio - 1].isspace():
+                        continue
+                    if i + 1 < n and not texto[i + 1].isspace():
+                        continue
+                out.append((familia, inicio, i + 1))
+        return out
+
+    def _familias(self, texto: str) -> FrozenSet[str]:
+        """Famílias com pelo menos um casamento em `texto`."""
+        return frozenset(f for f, _, _ in self.ocorrencias(texto or ""))
+
+    def contem(self, texto: str, familia: str) -> bool:
+        return familia in self.familias(texto)
@@ -0,0 +1,227 @@
+"""
+Periodicidade dos grupos (categoria, entidade): cadência, próxima data/valor e pagamentos não encontrados.
+
+A regra de recorrência do relatório conta meses e ocorrências; aqui olhamos a série de datas de
+cada grupo (o estado guarda o valor pago por dia):
+
+1. datas a até `juntar_dias` umas das outras viram um evento (folha paga em dois dias, boleto
+   dividido) com a soma do valor
+2. intervalos entre eventos consecutivos vão para um histograma por faixas de cadência
+   (semanal 5–9 dias, quinzenal 12–17, mensal 26–35, resto = irregular)
+3. a faixa com mais intervalos vence se cobrir ao menos `confianca_minima` deles; o período é a
+   mediana dos intervalos dentro da faixa. Só classifica com ao menos `eventos_minimos` eventos,
+   `intervalos_na_faixa` intervalos na faixa vencedora e um histórico (primeiro ao último evento) de
+   ao menos `periodos_minimos` períodos da faixa; com menos que isso (ex.: poucas semanas de
+   extrato) o grupo fica sem cadência
+4. próximo evento: último + período (mensal: mesmo dia do mês seguinte); valor: mediana dos
+   últimos `eventos_valor` eventos
+5. na data de referência, ciclos sem pagamento além da tolerância = pagamento esperado não
+   encontrado; mais de `max_ciclos_perdidos` ciclos = relação encerrada, não alerta
+
+Todos os grupos de uma vez: uma ordenação por (grupo, dia) e `bincount`s, sem loop por grupo, então
+o custo acompanha o número de dias do histórico, não o de grupos × dias.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from estado_recorrencia import EstadoRecorrencia
+
+# (nome, período nominal em dias, menor e maior intervalo da faixa)
+CADENCIAS: Tuple[Tuple[str, float, int, int], ...] = (
+    ("semanal", 7.0, 5, 9),
+    ("quinzenal", 14.0, 12, 17),
+    ("mensal", 30.44, 26, 35),
+)
+IRREGULAR = len(CADENCIAS)
+NOMES_CADENCIA = tuple(c[0] for c in CADENCIAS) + ("irregular",)
+MENSAL = NOMES_CADENCIA.index("mensal")
+
+
+@dataclass
+class ConfigPeriodicidade:
+    juntar_dias: int = 3
+    # evidência mínima para classificar: eventos e períodos cobertos do primeiro ao último evento
+    eventos_minimos: int = 4
+    intervalos_na_faixa: int = 3
+    periodos_minimos: float = 3.0
+    confianca_minima: float = 0.6
+    eventos_valor: int = 6
+    # fração do período tolerada além da data prevista antes de contar o ciclo como perdido
+    tolerancia: float = 0.5
+    max_ciclos_perdidos: int = 3
+
+
+@dataclass
+class SeriesPeriodicas:
+    """Resultado por grupo (arrays indexados pelo id do grupo); dias em datetime64[D]."""
+
+    cadencia: np.ndarray  # índice em NOMES_CADENCIA; -1 = histórico insuficiente
+    confianca: np.ndarray
+    periodo: np.ndarray
+    eventos: np.ndarray
+    ultimo: np.ndarray
+    proximo: np.ndarray
+    valor_esperado: np.ndarray  # centavos
+    ciclos_perdidos: np.ndarray
+
+
+def _mediana_por_grupo(grupo: np.ndarray, valores: np.ndarray, n_grupos: int, padrao: np.ndarray) -> np.ndarray:
+    """Mediana de `valores` por grupo; `padrao` onde o grupo não tem valores."""
+    cont = np.bincount(grupo, minlength=n_grupos)
+    if not len(valores):
+        return padrao.astype(np.float64)
+    v = valores[np.lexsort((valores, grupo))]
+    inicio = np.r_[0, np.cumsum(cont)[:-1]]
+    tem = cont > 0
+    lo = np.where(tem, inicio + (cont - 1) // 2, 0)
+    hi = np.where(tem, inicio + cont // 2, 0)
+    return np.where(tem, (v[lo] + v[hi]) / 2, padrao)
+
+
+def analisar_series(
+    grupo: np.ndarray,
+    dia: np.ndarray,
+    valor: np.ndarray,
+    n_grupos: int,
+    referencia: np.datetime64,
+    cfg: Optional[ConfigPeriodicidade] = None,
+) -> SeriesPeriodicas:
+    """`grupo` (0..n_grupos-1), `dia` (datetime64[D]) e `valor` (centavos) por data paga, em qualquer ordem."""
+    cfg = cfg if cfg is not None else ConfigPeriodicidade()
+    n = n_grupos
+    d = dia.astype("datetime64[D]").astype(np.int64)
+    ordem = np.lexsort((d, grupo))
+    g, d, v = grupo[ordem], d[ordem], valor[ordem].astype(np.float64)
+
+    # 1) eventos: nova data do grupo a mais de `juntar_dias` da anterior
+    novo = np.ones(len(d), dtype=bool)
+    novo[1:] = (g[1:] != g[:-1]) | (d[1:] - d[:-1] > cfg.juntar_dias)
+    ev = np.cumsum(novo) - 1
+    ev_g, ev_d = g[novo], d[novo]
+    ev_v = np.bincount(ev, weights=v, minlength=len(ev_g))
+    eventos = np.bincount(ev_g, minlength=n)
+
+    # 2) histograma dos intervalos por faixa de cadência
+    mesmo = ev_g[1:] == ev_g[:-1]
+    intervalo = (ev_d[1:] - ev_d[:-1])[mesmo]
+    int_g = ev_g[1:][mesmo]
+    faixa = np.full(len(intervalo), IRREGULAR, dtype=np.int64)
+    for k, (_, _, lo, hi) in enumerate(CADENCIAS):
+        faixa[(intervalo >= lo) & (intervalo <= hi)] = k
+    hist = np.bincount(int_g * (IRREGULAR + 1) + faixa, minlength=n * (IRREGULAR + 1)).reshape(n, IRREGULAR + 1)
+
+    # 3) cadência vencedora e período
+    n_int = hist.sum(axis=1)
+    melhor = np.argmax(hist[:, :IRREGULAR], axis=1)
+    votos = hist[np.arange(n), melhor]
+    confianca = votos / np.maximum(n_int, 1)
+    candidato = (votos >= 2) & (confianca >= cfg.confianca_minima)
+    # histórico coberto (primeiro ao último evento) contra o menor intervalo da faixa vencedora
+    fim = np.cumsum(eventos) - 1
+    tem = eventos > 0
+    if len(ev_d):
+        extensao = np.where(tem, ev_d[np.maximum(fim, 0)] - ev_d[np.maximum(fim - eventos + 1, 0)], 0)
+    else:
+        extensao = np.zeros(n, dtype=np.int64)
+    menor_intervalo = np.array([c[2] for c in CADENCIAS])[melhor]
+    suficiente = (eventos >= cfg.eventos_minimos) & (extensao >= cfg.periodos_minimos * menor_intervalo)
+    regular = candidato & suficiente & (votos >= cfg.intervalos_na_faixa)
+    # faixa que parece regular mas sem evidência suficiente não vira "irregular": fica sem cadência
+    cadencia = np.where(
+        (eventos < cfg.eventos_minimos) | (candidato & ~regular),
+        -1,
+        np.where(regular, melhor, IRREGULAR),
+    )
+    nominal = np.array([c[1] for c in CADENCIAS] + [np.nan])[np.where(cadencia >= 0, cadencia, IRREGULAR)]
+    na_faixa = faixa == melhor[int_g]
+    periodo = _mediana_por_grupo(int_g[na_faixa], intervalo[na_faixa].astype(np.float64), n, nominal)
+    periodo = np.where(regular & (cadencia >= 0), periodo, nominal)
+
+    # 4) próximo evento e valor esperado
+    ultimo = np.where(tem, ev_d[np.maximum(fim, 0)] if len(ev_d) else 0, 0)
+    ultimo_dt = ultimo.astype("datetime64[D]")
+    mes_seg = ultimo_dt.astype("datetime64[M]") + 1
+    dia_mes = ultimo_dt - ultimo_dt.astype("datetime64[M]").astype("datetime64[D]")
+    fim_mes_seg = (mes_seg + 1).astype("datetime64[D]") - 1
+    prox_mensal = np.minimum(mes_seg.astype("datetime64[D]") + dia_mes, fim_mes_seg).astype(np.int64)
+    passo = np.round(np.nan_to_num(periodo)).astype(np.int64)
+    proximo = np.where(cadencia == MENSAL, prox_mensal, ultimo + passo)
+    do_fim = fim[ev_g] - np.arange(len(ev_g))
+    recentes = do_fim < cfg.eventos_valor
+    valor_esperado = _mediana_por_grupo(ev_g[recentes], ev_v[recentes], n, np.zeros(n))
+
+    # 5) ciclos perdidos até a referência
+    ref = np.datetime64(referencia, "D").astype(np.int64)
+    with np.errstate(invalid="ignore"):
+        ciclos = np.floor((ref - ultimo) / periodo - cfg.tolerancia)
+    ciclos_perdidos = np.where(regular & (cadencia >= 0), np.maximum(np.nan_to_num(ciclos), 0), 0).astype(np.int64)
+
+    return SeriesPeriodicas(
+        cadencia=cadencia,
+        confianca=confianca,
+        periodo=periodo,
+        eventos=eventos,
+        ultimo=ultimo.astype("datetime64[D]"),
+        proximo=proximo.astype("datetime64[D]"),
+        valor_esperado=valor_esperado,
+        ciclos_perdidos=ciclos_perdidos,
+    )
+
+
+def _fmt(d: np.datetime64) -> str:
+    return d.item().strftime("%d/%m/%Y")
+
+
+def periodicidade_do_estado(
+    estado: EstadoRecorrencia,
+    referencia: Union[np.datetime64, date],
+    cfg: Optional[ConfigPeriodicidade] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Uma entrada por grupo com histórico suficiente (na ordem dos grupos no estado), com a cadência,
+    o próximo pagamento esperado e a situação na `referencia` ("em dia", "atrasado", "encerrado").
+    """
+    cfg = cfg if cfg is not None else ConfigPeriodicidade()
+    grupos = list(estado.grupos.values())
+    if not grupos:
+        return []
+    tamanhos = np.array([len(g.dias) for g in grupos], dtype=np.int64)
+    grupo = np.repeat(np.arange(len(grupos)), tamanhos)
+    dias = np.array([d for g in grupos for d in g.dias], dtype="datetime64[D]")
+    valores = np.fromiter((v for g in grupos for v in g.dias.values()), dtype=np.int64, count=int(tamanhos.sum()))
+    s = analisar_series(grupo, dias, valores, len(grupos), np.datetime64(referencia, "D"), cfg)
+
+    out: List[Dict[str, Any]] = []
+    for k in np.flatnonzero(s.cadencia >= 0).tolist():
+        g = grupos[k]
+        cad = int(s.cadencia[k])
+        perdidos = int(s.ciclos_perdidos[k])
+        if perdidos > cfg.max_ciclos_perdidos:
+            situacao = "encerrado"
+        elif perdidos > 0:
+            situacao = "atrasado"
+        else:
+            situacao = "em dia"
+        out.append(
+            {
+                "categoria": g.categoria,
+                "entidade": g.entidade,
+                "cadencia": NOMES_CADENCIA[cad],
+                "confianca": round(float(s.confianca[k]), 2),
+                "periodo_dias": round(float(s.periodo[k]), 1) if cad != IRREGULAR else None,
+                "eventos": int(s.eventos[k]),
+                "total": g.total_cents / 100,
+                "ultimo": _fmt(s.ultimo[k]),
+                "proximo": _fmt(s.proximo[k]) if cad != IRREGULAR else None,
+                "valor_esperado": float(s.valor_esperado[k]) / 100,
+                "ciclos_perdidos": perdidos,
+                "situacao": situacao if cad != IRREGULAR else None,
+            }
+        )
+    return out
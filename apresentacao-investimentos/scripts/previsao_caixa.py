@@ -0,0 +1,536 @@
+"""
+Previsão de caixa diária por banco com simulação de Monte-Carlo.
+
+O relatório só tinha a "projeção de aberto" do próximo mês (um número). Aqui a grade é
+cenário × banco × dia, a partir de:
+
+1. saldo inicial por banco: o informado (`saldos_iniciais`, `--saldos-iniciais`) ou, sem ele, entradas −
+   saídas acumuladas nos movimentos quando o banco tem implantação de saldo no período (a abertura da
+   conta está nos dados, então o acumulado é o saldo do sistema). Banco sem âncora começa em 0 (a faixa
+   dele é a variação) e P(saldo < 0) não é publicada
+2. títulos em aberto do contas a pagar, no vencimento (vencidos entram no primeiro dia)
+3. títulos pendentes do contas a receber, no vencimento; o arquivo não tem banco, então cada cenário
+   sorteia o banco pela participação de cada um nas entradas operacionais do histórico
+4. recorrentes dos movimentos (fortes e frequentes) projetados mês a mês no dia típico do grupo e no
+   banco onde ele mais paga; o valor do mês é a média mensal observada com a dispersão tirada de
+   p90/mediana (lognormal com σ = ln(p90/mediana) / 1,2816, média preservada). O que já está agendado
+   no contas a pagar para o mesmo (categoria, entidade) e mês é descontado, para não contar duas vezes —
+   a entidade do título segue a mesma regra da recorrência (`ContaPagar.entidade`) e quantos grupos
+   casaram com títulos agendados vai para os parâmetros; categorias sazonais (13º) ficam de fora
+5. vendas novas: o ritmo diário histórico das categorias de venda, mês a mês, menos o que já está
+   faturado no contas a receber com vencimento no mês, espalhado pelos dias e pelos bancos pela
+   participação nas entradas (`projetar_vendas=False` deixa só o que já é título)
+
+Incertezas sorteadas por cenário: atraso de pagamento (probabilidade e média calibradas pelas baixas
+do contas a pagar quando há histórico suficiente), atraso e inadimplência dos recebíveis, banco do
+recebível, valor dos recorrentes e das vendas do mês. Tudo em arrays (cenários × eventos); os fluxos entram na grade com
+um único `bincount` e o saldo é a soma acumulada por dia. Milhares de cenários rodam em segundos.
+
+Uso avulso:
+    python scripts/previsao_caixa.py --cenarios 5000 --horizonte 120 --saldos-iniciais saldos.json
+
+`saldos.json`: {"4 - ITAU": 12345.67, "2 - INTER": 0} (saldo de cada banco no início da grade)
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from normalizacao import chave_busca
+
+if TYPE_CHECKING:
+    from analise_recorrencia import ContaPagar, ContaReceber, MovimentoTable
+
+PERCENTIS = (5, 25, 50, 75, 95)
+# quantil 0,9 da normal padrão (p90 = mediana × e^(1,2816 σ) numa lognormal)
+Z_P90 = 1.2816
+SITUACOES_ENCERRADAS = ("cancelad", "liquidad", "recebid", "baixad")
+# mesmas exclusões do custo operacional em `analise_recorrencia` (implantação de saldo, transferência interna)
+CATEGORIAS_NAO_OPERACIONAIS = (5, 6)
+CATEGORIA_IMPLANTACAO = 5
+# Venda de Produtos, Venda de Serviços
+CATEGORIAS_VENDAS = (3, 4)
+
+
+@dataclass
+class ConfigPrevisao:
+    cenarios: int = 2000
+    horizonte_dias: int = 90
+    # primeiro dia da grade; padrão: dia seguinte ao último movimento
+    inicio: Optional[date] = None
+    semente: int = 42
+    # saldo real de cada banco no início da grade (banco -> R$); tem precedência sobre a implantação
+    saldos_iniciais: Optional[Dict[str, float]] = None
+    # sem saldo informado, ancora o banco na última implantação de saldo dos movimentos
+    ancorar_implantacao: bool = True
+    # atraso nos pagamentos (substituído pelo histórico de baixas quando há `amostra_minima_atrasos`)
+    prob_atraso_pagar: float = 0.1
+    atraso_medio_pagar_dias: float = 5.0
+    # recebíveis: atraso e inadimplência (sem histórico de baixas no arquivo)
+    prob_atraso_receber: float = 0.35
+    atraso_medio_receber_dias: float = 12.0
+    prob_inadimplencia: float = 0.02
+    amostra_minima_atrasos: int = 30
+    # limite do σ dos recorrentes (p90/mediana muito alto vira ruído puro)
+    sigma_maximo: float = 1.5
+    # prefixos (normalizados) de categorias sazonais que não se repetem todo mês
+    categorias_sazonais: Tuple[str, ...] = ("13",)
+    projetar_vendas: bool = True
+    # dispersão mensal das vendas (σ da lognormal)
+    sigma_vendas: float = 0.25
+    # sorteios (cenários × eventos) por lote: limita a memória dos sorteios a O(lote), não O(S × títulos)
+    sorteios_por_lote: int = 1_000_000
+
+
+@dataclass
+class PrevisaoCaixa:
+    """Faixas de saldo (percentis × banco × dia) e resumo dos cenários; valores em reais."""
+
+    datas: List[date]
+    bancos: List[str]
+    percentis: Tuple[int, ...]
+    saldo_inicial: np.ndarray
+    faixas_banco: np.ndarray
+    faixas_total: np.ndarray
+    # None quando algum banco não tem saldo inicial ancorado (o total não é saldo de verdade)
+    prob_negativo: Optional[np.ndarray]
+    minimo_total: np.ndarray
+    cenarios: int
+    componentes: Dict[str, float] = field(default_factory=dict)
+    parametros: Dict[str, Any] = field(default_factory=dict)
+    avisos: List[str] = field(default_factory=list)
+
+    def faixa(self, p: int, banco: Optional[str] = None) -> np.ndarray:
+        k = self.percentis.index(p)
+        return self.faixas_total[k] if banco is None else self.faixas_banco[k, self.bancos.index(banco)]
+
+    def to_json(self) -> Dict[str, Any]:
+        def _faixas(m: np.ndarray) -> Dict[str, List[float]]:
+            return {f"p{p}": np.round(m[k], 2).tolist() for k, p in enumerate(self.percentis)}
+
+        return {
+            "datas": [d.isoformat() for d in self.datas],
+            "cenarios": self.cenarios,
+            "saldo_inicial": {b: round(float(v), 2) for b, v in zip(self.bancos, self.saldo_inicial)},
+            "total": {
+                **_faixas(self.faixas_total),
+                "prob_negativo": None if self.prob_negativo is None else np.round(self.prob_negativo, 4).tolist(),
+            },
+            "bancos": {b: _faixas(self.faixas_banco[:, j]) for j, b in enumerate(self.bancos)},
+            "minimo_total": {f"p{p}": round(float(v), 2) for p, v in zip(self.percentis, self.minimo_total)},
+            "componentes": {k: round(v, 2) for k, v in self.componentes.items()},
+            "parametros": self.parametros,
+            "avisos": self.avisos,
+        }
+
+
+def _encerrada(status: str) -> bool:
+    s = chave_busca(status)
+    return any(s.startswith(x) for x in SITUACOES_ENCERRADAS)
+
+
+def _dias_desde(inicio: date, datas: Sequence[Optional[datetime]]) -> np.ndarray:
+    d = np.array([x.date() if x else inicio for x in datas], dtype="datetime64[D]")
+    return (d - np.datetime64(inicio, "D")).astype(np.int64)
+
+
+def _atrasos(rng: np.random.Generator, forma: Tuple[int, int], prob: float, media: float) -> np.ndarray:
+    """Atraso em dias: com probabilidade `prob`, 1 + exponencial de média `media` − 1 (arredondado)."""
+    if prob <= 0 or media <= 0:
+        return np.zeros(forma, dtype=np.int64)
+    atrasa = rng.random(forma) < prob
+    dias = 1 + np.floor(rng.exponential(max(media - 1, 1e-9), forma)).astype(np.int64)
+    return np.where(atrasa, dias, 0)
+
+
+def calibrar_atrasos_pagar(contas: Sequence["ContaPagar"], cfg: ConfigPrevisao) -> Tuple[float, float, str]:
+    """(probabilidade, atraso médio dos atrasados, origem) a partir das baixas vs vencimento."""
+    atrasos = [
+        (c.data_baixa - c.vencimento).days
+        for c in contas
+        if c.data_baixa and c.vencimento and not chave_busca(c.status).startswith("cancelad")
+    ]
+    if len(atrasos) < cfg.amostra_minima_atrasos:
+        return cfg.prob_atraso_pagar, cfg.atraso_medio_pagar_dias, "configuração"
+    a = np.array(atrasos, dtype=np.float64)
+    atrasados = a[a > 0]
+    media = float(atrasados.mean()) if len(atrasados) else 0.0
+    return len(atrasados) / len(a), media, f"histórico de baixas ({len(a)} títulos)"
+
+
+def _participacao_entradas(t: "MovimentoTable", bancos: List[str]) -> np.ndarray:
+    """Fração das entradas operacionais (sem transferências/implantação) recebida em cada banco."""
+    linhas = np.flatnonzero((t.credito > 0) & ~np.isin(t.categoria_id, CATEGORIAS_NAO_OPERACIONAIS))
+    pesos = np.zeros(len(bancos))
+    idx = {b: j for j, b in enumerate(bancos)}
+    if len(linhas):
+        codigos, inv = np.unique(t.banco[linhas], return_inverse=True)
+        somas = np.bincount(inv.reshape(-1), weights=t.credito[linhas])
+        for c, v in zip(codigos.tolist(), somas.tolist()):
+            pesos[idx[t.textos[c]]] += v
+    if pesos.sum() <= 0:
+        pesos[:] = 1
+    return pesos / pesos.sum()
+
+
+def carregar_saldos_iniciais(path: Path) -> Dict[str, float]:
+    """JSON {banco: saldo em R$} com o saldo de cada banco no início da grade."""
+    dados = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(dados, dict):
+        raise ValueError(f"{path}: esperado um objeto JSON {{banco: saldo}}")
+    out: Dict[str, float] = {}
+    for banco, v in dados.items():
+        if isinstance(v, bool) or not isinstance(v, (int, float)):
+            raise ValueError(f"{path}: saldo do banco {banco!r} não é número: {v!r}")
+        out[str(banco)] = float(v)
+    return out
+
+
+def _implantacao_por_banco(t: "MovimentoTable", inv_b: np.ndarray, n_bancos: int) -> np.ndarray:
+    """
+    Dia (desde 1970) da implantação de saldo que abre cada banco: só conta quando o primeiro dia de
+    movimento do banco tem apenas implantações. Implantação no meio do extrato, ou no mesmo dia de
+    outros lançamentos, é ajuste ou teste, não a abertura da conta. -1 = banco sem âncora.
+    """
+    dias = t.data.astype("datetime64[D]").astype(np.int64)
+    primeiro = np.full(n_bancos, np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(primeiro, inv_b, dias)
+    no_primeiro = dias == primeiro[inv_b]
+    impl = t.categoria_id == CATEGORIA_IMPLANTACAO
+    so_implantacao = np.bincount(inv_b[no_primeiro & ~impl], minlength=n_bancos) == 0
+    tem_implantacao = np.bincount(inv_b[no_primeiro & impl], minlength=n_bancos) > 0
+    return np.where(so_implantacao & tem_implantacao, primeiro, -1)
+
+
+def _perfil_grupos(t: "MovimentoTable") -> Dict[Tuple[str, str], Tuple[str, int]]:
+    """(categoria, entidade) normalizados -> (banco onde mais paga, dia do mês mediano) das saídas operacionais."""
+    oper = np.flatnonzero((t.debito > 0) & ~np.isin(t.categoria_id, CATEGORIAS_NAO_OPERACIONAIS))
+    if not len(oper):
+        return {}
+    chave = (t.categoria_nome[oper].astype(np.int64) << 32) | t.entidade[oper].astype(np.int64)
+    grupos, g = np.unique(chave, return_inverse=True)
+    g = g.reshape(-1)
+    n = len(grupos)
+    # banco modal: contagem por (grupo, banco), maior contagem de cada grupo (empate: menor código)
+    pares, inv, cont = np.unique((g.astype(np.int64) << 32) | t.banco[oper], return_inverse=True, return_counts=True)
+    ordem = np.lexsort((pares & 0xFFFFFFFF, -cont, pares >> 32))
+    pg = (pares >> 32)[ordem]
+    primeiro = np.r_[True, pg[1:] != pg[:-1]]
+    banco_g = np.empty(n, dtype=np.int64)
+    banco_g[pg[primeiro]] = (pares & 0xFFFFFFFF)[ordem][primeiro]
+    # dia do mês mediano (mediana inferior)
+    dia = (t.data[oper] - t.data[oper].astype("datetime64[M]")).astype(np.int64) + 1
+    ordem = np.lexsort((dia, g))
+    cont_g = np.bincount(g, minlength=n)
+    inicio = np.r_[0, np.cumsum(cont_g)[:-1]]
+    dia_g = dia[ordem][inicio + (cont_g - 1) // 2]
+    out: Dict[Tuple[str, str], Tuple[str, int]] = {}
+    for ch, b, d in zip(grupos.tolist(), banco_g.tolist(), dia_g.tolist()):
+        chave_txt = (chave_busca(t.textos[ch >> 32]), chave_busca(t.textos[ch & 0xFFFFFFFF]))
+        out[chave_txt] = (t.textos[b], int(d))
+    return out
+
+
+def _meses(inicio: date, fim: date) -> List[date]:
+    """Primeiro dia de cada mês que toca [inicio, fim]."""
+    out = []
+    m = date(inicio.year, inicio.month, 1)
+    while m <= fim:
+        out.append(m)
+        m = date(m.year + (m.month == 12), m.month % 12 + 1, 1)
+    return out
+
+
+def _dia_no_mes(mes: date, dia: int) -> date:
+    prox = date(mes.year + (mes.month == 12), mes.month % 12 + 1, 1)
+    return mes + timedelta(days=min(dia, (prox - mes).days) - 1)
+
+
+def simular_caixa(
+    t: "MovimentoTable",
+    contas: Sequence["ContaPagar"],
+    receber: Sequence["ContaReceber"],
+    recorrentes: Sequence[Dict[str, Any]],
+    cfg: Optional[ConfigPrevisao] = None,
+) -> PrevisaoCaixa:
+    """
+    Roda os cenários e devolve as faixas de saldo. `recorrentes`: estatísticas dos grupos recorrentes
+    (`recorrentes_fortes` + `recorrentes_frequentes` de `classify_recorrencia_movimentos`).
+    """
+    cfg = cfg if cfg is not None else ConfigPrevisao()
+    if len(t) == 0:
+        raise RuntimeError("Sem movimentos: não há como estimar saldo inicial nem recorrência")
+    fim_hist = t.data.max().astype("datetime64[D]").item()
+    inicio = cfg.inicio or fim_hist + timedelta(days=1)
+    S, H = cfg.cenarios, cfg.horizonte_dias
+    rng = np.random.default_rng(cfg.semente)
+    periodo_dias = max((fim_hist - t.data.min().astype("datetime64[D]").item()).days + 1, 1)
+    # Com --estado os totais dos grupos cobrem todo o histórico acumulado, não só o arquivo atual
+    dias_hist = [date.fromisoformat(d) for s in recorrentes for d in (s.get("primeiro_dia"), s.get("ultimo_dia")) if d]
+    periodo_hist = max(periodo_dias, (max(dias_hist) - min(dias_hist)).days + 1) if dias_hist else periodo_dias
+
+    # Bancos: os dos movimentos + os citados nos títulos (sem banco -> o de maior saída)
+    codigos_b, inv_b = np.unique(t.banco, return_inverse=True)
+    inv_b = inv_b.reshape(-1)
+    saida_b = np.bincount(inv_b, weights=t.debito, minlength=len(codigos_b))
+    bancos = [t.textos[c] for c in codigos_b.tolist()]
+    banco_padrao = bancos[int(np.argmax(saida_b))]
+    por_chave = {chave_busca(b): b for b in bancos}
+    informados: Dict[str, float] = {}
+    for nome, v in (cfg.saldos_iniciais or {}).items():
+        informados[por_chave.get(chave_busca(nome), nome)] = v
+    extras = sorted({c.banco for c in contas if c.banco and c.banco not in bancos} | (set(informados) - set(bancos)))
+    bancos += extras
+    idx_banco = {b: j for j, b in enumerate(bancos)}
+    B = len(bancos)
+
+    # Saldo inicial: informado > acumulado desde a implantação que abre o banco > sem âncora (0; a faixa é a variação)
+    dia_ancora = _implantacao_por_banco(t, inv_b, len(codigos_b))
+    dias_mov = t.data.astype("datetime64[D]").astype(np.int64)
+    desde_ancora = (dia_ancora[inv_b] >= 0) & (dias_mov >= dia_ancora[inv_b])
+    liquido = np.bincount(inv_b, weights=np.where(desde_ancora, t.credito - t.debito, 0), minlength=len(codigos_b))
+    saldo_inicial = np.zeros(B)
+    origem_saldo: Dict[str, str] = {}
+    for j, b in enumerate(bancos):
+        if b in informados:
+            saldo_inicial[j] = informados[b]
+            origem_saldo[b] = "informado"
+        elif cfg.ancorar_implantacao and j < len(codigos_b) and dia_ancora[j] >= 0:
+            saldo_inicial[j] = liquido[j] / 100
+            origem_saldo[b] = "implantação em " + np.datetime64(int(dia_ancora[j]), "D").item().strftime("%d/%m/%Y")
+        else:
+            origem_saldo[b] = "sem âncora"
+    sem_ancora = [b for b in bancos if origem_saldo[b] == "sem âncora"]
+    avisos: List[str] = []
+    if sem_ancora:
+        avisos.append(
+            f"Saldo inicial sem âncora em {', '.join(sem_ancora)}: esses bancos começam em 0 (a faixa é a variação) "
+            "e P(saldo < 0) não é publicada; informe os saldos reais (--saldos-iniciais)"
+        )
+
+    # Eventos: valor em centavos (com sinal), dia na grade, banco
+    # 1) Contas a pagar em aberto
+    abertas = [c for c in contas if c.saldo_aberto > 0 and c.vencimento and not _encerrada(c.status)]
+    valor_p = -np.round(np.array([c.saldo_aberto for c in abertas], dtype=np.float64) * 100)
+    dia_p0 = np.maximum(_dias_desde(inicio, [c.vencimento for c in abertas]), 0)
+    banco_p = np.array([idx_banco[c.banco or banco_padrao] for c in abertas], dtype=np.int64)
+    prob_pagar, media_pagar, origem_atraso = calibrar_atrasos_pagar(contas, cfg)
+
+    # 2) Contas a receber pendentes (banco sorteado por cenário pela participação acumulada)
+    pendentes = [r for r in receber if r.vencimento and not _encerrada(r.status)]
+    valor_r0 = np.round(np.array([r.valor for r in pendentes], dtype=np.float64) * 100)
+    dia_r0 = np.maximum(_dias_desde(inicio, [r.vencimento for r in pendentes]), 0)
+    participacao_acum = np.cumsum(_participacao_entradas(t, bancos))
+
+    # 3) Recorrentes: (grupo × mês) no dia típico; agendado no contas a pagar é descontado
+    perfil = _perfil_grupos(t)
+    fim_grade = inicio + timedelta(days=H - 1)
+    meses = _meses(inicio, fim_grade)
+    agendado: Dict[Tuple[str, str, str], float] = {}
+    for c in abertas:
+        ch = (chave_busca(c.categoria_nome), chave_busca(c.entidade), c.mes_vencimento)
+        agendado[ch] = agendado.get(ch, 0.0) + c.saldo_aberto * 100
+    chaves_agendadas = {ch[:2] for ch in agendado}
+    rec_media, rec_sigma, rec_dia, rec_banco, rec_agendado = [], [], [], [], []
+    grupos_rec = grupos_com_agendado = 0
+    for s in recorrentes:
+        ch = (chave_busca(s["categoria"]), chave_busca(s["entidade"]))
+        if ch not in perfil or s["total"] <= 0 or ch[0].startswith(cfg.categorias_sazonais):
+            continue
+        grupos_rec += 1
+        grupos_com_agendado += ch in chaves_agendadas
+        banco, dia = perfil[ch]
+        razao = s["p90"] / s["mediana"] if s["mediana"] > 0 else 1.0
+        sigma = min(np.log(max(razao, 1.0)) / Z_P90, cfg.sigma_maximo)
+        mensal = s["total"] * 100 * 30.44 / periodo_hist
+        for m in meses:
+            d = (_dia_no_mes(m, dia) - inicio).days
+            if 0 <= d < H:
+                rec_media.append(mensal)
+                rec_sigma.append(sigma)
+                rec_dia.append(d)
+                rec_banco.append(idx_banco[banco])
+                rec_agendado.append(agendado.get((*ch, m.strftime("%Y-%m")), 0.0))
+    media_r = np.array(rec_media, dtype=np.float64)
+    sigma_r = np.array(rec_sigma, dtype=np.float64)
+    agendado_r = np.array(rec_agendado, dtype=np.float64)
+    dia_c = np.array(rec_dia, dtype=np.int64)
+    banco_c = np.array(rec_banco, dtype=np.int64)
+
+    # ---- Sorteios em lotes de cenários; cada lote vai para a grade num bincount ----
+    # (a coluna H recebe o que cai depois do horizonte)
+    n_p, n_r, n_c = len(valor_p), len(valor_r0), len(media_r)
+    lote = max(1, cfg.sorteios_por_lote // max(n_p + n_r + n_c, 1))
+    largura = H + 1
+
+    def _pos(cen: np.ndarray, banco: np.ndarray, dia: np.ndarray) -> np.ndarray:
+        return ((cen * B + banco) * largura + np.minimum(dia, H)).ravel()
+
+    fluxo = np.empty((S, B, H), dtype=np.float64)
+    soma_c = np.zeros(n_c)
+    soma_agendado_c = np.zeros(n_c)
+    for ini in range(0, S, lote):
+        s_l = min(lote, S - ini)
+        dia_p = dia_p0[None, :] + _atrasos(rng, (s_l, n_p), prob_pagar, media_pagar)
+        dia_r = dia_r0[None, :] + _atrasos(rng, (s_l, n_r), cfg.prob_atraso_receber, cfg.atraso_medio_receber_dias)
+        valor_r = np.where(rng.random((s_l, n_r)) < cfg.prob_inadimplencia, 0.0, valor_r0[None, :])
+        banco_r = np.minimum(np.searchsorted(participacao_acum, rng.random((s_l, n_r)), side="right"), B - 1)
+        fator = np.exp(sigma_r[None, :] * rng.standard_normal((s_l, n_c)) - sigma_r[None, :] ** 2 / 2)
+        bruto_c = media_r[None, :] * fator
+        valor_c = -np.maximum(bruto_c - agendado_r[None, :], 0.0)
+        soma_c += valor_c.sum(axis=0)
+        soma_agendado_c += np.minimum(bruto_c, agendado_r[None, :]).sum(axis=0)
+
+        cen = np.arange(s_l, dtype=np.int64)[:, None]
+        posicoes = np.concatenate([
+            _pos(cen, np.broadcast_to(banco_p, (s_l, n_p)), dia_p),
+            _pos(cen, banco_r, dia_r),
+            _pos(cen, np.broadcast_to(banco_c, (s_l, n_c)), np.broadcast_to(dia_c, (s_l, n_c))),
+        ])
+        pesos = np.concatenate([np.broadcast_to(valor_p, (s_l, n_p)).ravel(), valor_r.ravel(), valor_c.ravel()])
+        grade = np.bincount(posicoes, weights=pesos, minlength=s_l * B * largura)
+        fluxo[ini : ini + s_l] = grade.reshape(s_l, B, largura)[:, :, :H]
+
+    # 4) Vendas novas: por mês, ritmo histórico × fator sorteado − já faturado; uniforme nos dias do mês
+    vendas_esperado = 0.0
+    vendas = (t.credito > 0) & np.isin(t.categoria_id, CATEGORIAS_VENDAS)
+    if cfg.projetar_vendas and vendas.any():
+        por_dia = float(t.credito[vendas].sum()) / periodo_dias
+        faturado: Dict[str, float] = {}
+        for r, v in zip(pendentes, valor_r0.tolist()):
+            mk = r.vencimento.strftime("%Y-%m")
+            faturado[mk] = faturado.get(mk, 0.0) + v
+        dias_mes = np.array([(_dia_no_mes(m, 31) - m).days + 1 for m in meses], dtype=np.float64)
+        faturado_m = np.array([faturado.get(m.strftime("%Y-%m"), 0.0) for m in meses])
+        fator_v = np.exp(cfg.sigma_vendas * rng.standard_normal((S, len(meses))) - cfg.sigma_vendas**2 / 2)
+        liquido_m = np.maximum(por_dia * dias_mes[None, :] * fator_v - faturado_m[None, :], 0.0) / dias_mes[None, :]
+        datas_grade = np.arange(H) + np.datetime64(inicio, "D")
+        mes_do_dia = np.searchsorted(np.array(meses, dtype="datetime64[D]"), datas_grade, side="right") - 1
+        vendas_dia = liquido_m[:, mes_do_dia]
+        fluxo += vendas_dia[:, None, :] * np.diff(participacao_acum, prepend=0.0)[None, :, None]
+        vendas_esperado = float(vendas_dia.mean(axis=0).sum() / 100)
+    saldo = saldo_inicial[None, :, None] + np.cumsum(fluxo, axis=2) / 100
+    total = saldo.sum(axis=1)
+
+    faixas_banco = np.percentile(saldo, PERCENTIS, axis=0)
+    faixas_total = np.percentile(total, PERCENTIS, axis=0)
+    return PrevisaoCaixa(
+        datas=[inicio + timedelta(days=k) for k in range(H)],
+        bancos=bancos,
+        percentis=PERCENTIS,
+        saldo_inicial=saldo_inicial,
+        faixas_banco=faixas_banco,
+        faixas_total=faixas_total,
+        prob_negativo=None if sem_ancora else (total < 0).mean(axis=0),
+        minimo_total=np.percentile(total.min(axis=1), PERCENTIS),
+        cenarios=S,
+        avisos=avisos,
+        componentes={
+            "saldo_inicial": float(saldo_inicial.sum()),
+            "pagar_agendado": float(-valor_p[dia_p0 < H].sum() / 100),
+            "receber_pendente": float(valor_r0[dia_r0 < H].sum() / 100),
+            "recorrentes_esperado": float(-soma_c.sum() / S / 100),
+            # parte dos recorrentes que já estava agendada no contas a pagar (descontada)
+            "recorrentes_agendado": float(soma_agendado_c.sum() / S / 100),
+            "vendas_esperado": vendas_esperado,
+        },
+        parametros={
+            "inicio": inicio.isoformat(),
+            "horizonte_dias": H,
+            "semente": cfg.semente,
+            "saldo_inicial_origem": origem_saldo,
+            "titulos_pagar": n_p,
+            "titulos_receber": n_r,
+            "eventos_recorrentes": n_c,
+            "grupos_recorrentes": grupos_rec,
+            "grupos_recorrentes_com_agendado": grupos_com_agendado,
+            "prob_atraso_pagar": round(prob_pagar, 4),
+            "atraso_medio_pagar_dias": round(media_pagar, 2),
+            "origem_atraso_pagar": origem_atraso,
+            "prob_atraso_receber": cfg.prob_atraso_receber,
+            "atraso_medio_receber_dias": cfg.atraso_medio_receber_dias,
+            "prob_inadimplencia": cfg.prob_inadimplencia,
+            "projetar_vendas": cfg.projetar_vendas,
+        },
+    )
+
+
+def escrever_csv_previsao(prev: PrevisaoCaixa, out_path: Path) -> None:
+    """Uma linha por (data, banco) e as linhas do total, com os percentis e P(saldo < 0) do total."""
+    with out_path.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f, delimiter=";")
+        w.writerow(["data", "banco", *[f"p{p}" for p in prev.percentis], "prob_negativo"])
+        for k, d in enumerate(prev.datas):
+            dia = d.isoformat()
+            prob = "" if prev.prob_negativo is None else round(float(prev.prob_negativo[k]), 4)
+            w.writerow([dia, "Total", *[round(float(v), 2) for v in prev.faixas_total[:, k]], prob])
+            for j, b in enumerate(prev.bancos):
+                w.writerow([dia, b, *[round(float(v), 2) for v in prev.faixas_banco[:, j, k]], ""])
+
+
+def main() -> None:
+    import time
+
+    from analise_recorrencia import (
+        CONTAS_PAGAR_CSV,
+        CONTAS_RECEBER_CSV,
+        MOVIMENTOS_CSV,
+        ROOT,
+        classify_recorrencia_movimentos,
+        ler_contas_pagar,
+        ler_contas_receber,
+        ler_movimentos,
+    )
+
+    padrao = ConfigPrevisao()
+    parser = argparse.ArgumentParser(description="Previsão de caixa por banco (Monte-Carlo)")
+    parser.add_argument("--movimentos", type=Path, default=MOVIMENTOS_CSV)
+    parser.add_argument("--contas-pagar", type=Path, default=CONTAS_PAGAR_CSV)
+    parser.add_argument("--contas-receber", type=Path, default=CONTAS_RECEBER_CSV)
+    parser.add_argument("--cenarios", type=int, default=padrao.cenarios)
+    parser.add_argument("--horizonte", type=int, default=padrao.horizonte_dias, help="Dias a projetar")
+    parser.add_argument("--inicio", type=lambda s: datetime.strptime(s, "%Y-%m-%d").date(), default=None, help="AAAA-MM-DD")
+    parser.add_argument("--semente", type=int, default=padrao.semente)
+    parser.add_argument("--saldos-iniciais", type=Path, default=None, help="JSON {banco: saldo em R$} no início da grade")
+    parser.add_argument("--saida", type=Path, default=ROOT / "public" / "dados" / "previsao_caixa.json")
+    parser.add_argument("--csv", type=Path, default=None, help="Também grava as faixas em CSV")
+    args = parser.parse_args()
+
+    movs = ler_movimentos(args.movimentos)
+    contas = ler_contas_pagar(args.contas_pagar)
+    receber = ler_contas_receber(args.contas_receber) if args.contas_receber.exists() else []
+    mov_ins = classify_recorrencia_movimentos(movs)
+    cfg = ConfigPrevisao(
+        cenarios=args.cenarios,
+        horizonte_dias=args.horizonte,
+        inicio=args.inicio,
+        semente=args.semente,
+        saldos_iniciais=carregar_saldos_iniciais(args.saldos_iniciais) if args.saldos_iniciais else None,
+    )
+    t0 = time.perf_counter()
+    prev = simular_caixa(movs, contas, receber, mov_ins["recorrentes_fortes"] + mov_ins["recorrentes_frequentes"], cfg)
+    dt = time.perf_counter() - t0
+    args.saida.parent.mkdir(parents=True, exist_ok=True)
+    args.saida.write_text(json.dumps(prev.to_json(), ensure_ascii=False), encoding="utf-8")
+    if args.csv:
+        escrever_csv_previsao(prev, args.csv)
+    print(f"OK: {prev.cenarios} cenarios x {len(prev.bancos)} bancos x {len(prev.datas)} dias em {dt:.2f}s -> {args.saida}")
+    print(f"   - Saldo total no fim (p5 / p50 / p95): {prev.faixas_total[0, -1]:.2f} / {prev.faixas_total[2, -1]:.2f} / {prev.faixas_total[4, -1]:.2f}")
+    if prev.prob_negativo is not None:
+        print(f"   - P(saldo total negativo no fim): {prev.prob_negativo[-1]:.1%}")
+    p = prev.parametros
+    print(f"   - Recorrentes com titulo agendado: {p['grupos_recorrentes_com_agendado']} de {p['grupos_recorrentes']} grupos")
+    for aviso in prev.avisos:
+        print("   - AVISO:", aviso)
+
+
+if __name__ == "__main__":
+    main()
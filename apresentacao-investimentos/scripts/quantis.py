@@ -0,0 +1,275 @@
+"""
+Esboços (sketches) para estatísticas por grupo em uma passada, com memória limitada por grupo.
+
+- `quantil`: interpolação linear sobre uma lista ordenada (a regra usada nos relatórios)
+- `EsbocoQuantis`: exato enquanto o grupo é pequeno (mesmo resultado de `quantil`); ao passar de
+  `limite_exato` valores vira um t-digest com memória O(compressão)
+- `TDigest`: t-digest "merging" (função de escala k1), mesclável entre arquivos/períodos
+- `TopK`: heap limitado para os k maiores; em empate, quem entrou antes fica na frente
+
+Todos são mescláveis (`mesclar`) e serializáveis em JSON (`to_json`/`from_json`).
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import math
+from typing import Any, Callable, Dict, Generic, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+LIMITE_EXATO = 1024
+COMPRESSAO_PADRAO = 100.0
+
+T = TypeVar("T")
+
+
+def quantil(sorted_vals: Sequence[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    if q <= 0:
+        return sorted_vals[0]
+    if q >= 1:
+        return sorted_vals[-1]
+    pos = (len(sorted_vals) - 1) * q
+    lo = int(math.floor(pos))
+    hi = int(math.ceil(pos))
+    if lo == hi:
+        return sorted_vals[lo]
+    frac = pos - lo
+    return sorted_vals[lo] * (1 - frac) + sorted_vals[hi] * frac
+
+
+class TDigest:
+    """
+    t-digest com buffer: valores entram no buffer e, quando ele enche, tudo é reordenado e
+    fundido em centróides respeitando o limite da função de escala k1 (mais resolução nas caudas).
+    """
+
+    def __init__(self, compressao: float = COMPRESSAO_PADRAO) -> None:
+        self.compressao = compressao
+        self.centroides: List[Tuple[float, float]] = []  # (média, peso), ordenados pela média
+        self._buffer: List[Tuple[float, float]] = []
+        self.n = 0.0
+        self.minimo = math.inf
+        self.maximo = -math.inf
+
+    def __len__(self) -> int:
+        return int(self.n)
+
+    def adicionar(self, x: float, peso: float = 1.0) -> None:
+        self._buffer.append((float(x), peso))
+        self.n += peso
+        if x < self.minimo:
+            self.minimo = float(x)
+        if x > self.maximo:
+            self.maximo = float(x)
+        if len(self._buffer) >= 5 * self.compressao:
+            self._comprimir()
+
+    def adicionar_varios(self, valores: Iterable[float]) -> None:
+        novos = [(float(x), 1.0) for x in valores]
+        if not novos:
+            return
+        self._buffer.extend(novos)
+        self.n += len(novos)
+        self.minimo = min(self.minimo, min(novos)[0])
+        self.maximo = max(self.maximo, max(novos)[0])
+        if len(self._buffer) >= 5 * self.compressao:
+            self._comprimir()
+
+    def _k(self, q: float) -> float:
+        return self.compressao / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _k_inv(self, k: float) -> float:
+        return (math.sin(min(k * 2 * math.pi / self.compressao, math.pi / 2)) + 1) / 2
+
+    def _comprimir(self) -> None:
+        if not self._buffer:
+            return
+        itens = sorted(self.centroides + self._buffer)
+        self._buffer = []
+        total = sum(w for _, w in itens)
+        out: List[Tuple[float, float]] = []
+        acumulado = 0.0
+        media, peso = itens[0]
+        limite = self._k_inv(self._k(0.0) + 1) * total
+        for x, w in itens[1:]:
+            if acumulado + peso + w <= limite:
+                peso += w
+                media += (x - media) * w / peso
+            else:
+                out.append((media, peso))
+                acumulado += peso
+                limite = self._k_inv(self._k(acumulado / total) + 1) * total
+                media, peso = x, w
+        out.append((media, peso))
+        self.centroides = out
+
+    def quantil(self, q: float) -> float:
+        self._comprimir()
+        cs = self.centroides
+        if not cs:
+            return 0.0
+        if q <= 0:
+            return self.minimo
+        if q >= 1:
+            return self.maximo
+        alvo = q * self.n
+        # cada centróide representa seu peso centrado na média; interpolamos entre centros
+        # (e entre mínimo/máximo e o primeiro/último centro nas pontas)
+        acumulado = 0.0
+        anterior_pos, anterior_val = 0.0, self.minimo
+        for media, peso in cs:
+            centro = acumulado + peso / 2
+            if alvo < centro:
+                if centro == anterior_pos:
+                    return media
+                frac = (alvo - anterior_pos) / (centro - anterior_pos)
+                return anterior_val + (media - anterior_val) * frac
+            anterior_pos, anterior_val = centro, media
+            acumulado += peso
+        if self.n == anterior_pos:
+            return self.maximo
+        frac = (alvo - anterior_pos) / (self.n - anterior_pos)
+        return anterior_val + (self.maximo - anterior_val) * frac
+
+    def mesclar(self, outro: "TDigest") -> None:
+        outro._comprimir()
+        self._buffer.extend(outro.centroides)
+        self.n += outro.n
+        self.minimo = min(self.minimo, outro.minimo)
+        self.maximo = max(self.maximo, outro.maximo)
+        self._comprimir()
+
+    def to_json(self) -> Dict[str, Any]:
+        self._comprimir()
+        return {
+            "compressao": self.compressao,
+            "centroides": [[m, w] for m, w in self.centroides],
+            "min": self.minimo,
+            "max": self.maximo,
+        }
+
+    @classmethod
+    def from_json(cls, d: Dict[str, Any]) -> "TDigest":
+        td = cls(compressao=float(d["compressao"]))
+        td.centroides = [(float(m), float(w)) for m, w in d["centroides"]]
+        td.n = sum(w for _, w in td.centroides)
+        td.minimo = float(d["min"])
+        td.maximo = float(d["max"])
+        return td
+
+
+class EsbocoQuantis:
+    """
+    Quantis de um grupo: lista ordenada exata até `limite_exato` valores, t-digest depois disso.
+    `escala` converte o valor guardado (ex.: centavos) no valor reportado (ex.: reais).
+    """
+
+    def __init__(self, limite_exato: int = LIMITE_EXATO, escala: float = 1.0, compressao: float = COMPRESSAO_PADRAO) -> None:
+        self.limite_exato = limite_exato
+        self.escala = escala
+        self.compressao = compressao
+        self._exatos: Optional[List[float]] = []
+        self._digest: Optional[TDigest] = None
+
+    def __len__(self) -> int:
+        if self._digest is not None:
+            return len(self._digest)
+        return len(self._exatos or ())
+
+    @property
+    def exato(self) -> bool:
+        return self._digest is None
+
+    def adicionar_varios(self, valores: Iterable[float]) -> None:
+        novos = sorted(valores)
+        if self._digest is None:
+            assert self._exatos is not None
+            if len(self._exatos) + len(novos) <= self.limite_exato:
+                if not self._exatos:
+                    self._exatos = novos
+                elif len(novos) <= 8:
+                    for v in novos:
+                        bisect.insort(self._exatos, v)
+                else:
+                    self._exatos = sorted(self._exatos + novos)
+                return
+            self._virar_digest()
+        assert self._digest is not None
+        self._digest.adicionar_varios(novos)
+
+    def adicionar(self, valor: float) -> None:
+        self.adicionar_varios((valor,))
+
+    def _virar_digest(self) -> None:
+        self._digest = TDigest(self.compressao)
+        self._digest.adicionar_varios(self._exatos or ())
+        self._exatos = None
+
+    def quantil(self, q: float) -> float:
+        if self._digest is None:
+            return quantil([v / self.escala for v in self._exatos or ()], q)
+        return self._digest.quantil(q) / self.escala
+
+    def mesclar(self, outro: "EsbocoQuantis") -> None:
+        if outro._digest is None:
+            self.adicionar_varios(outro._exatos or ())
+            return
+        if self._digest is None:
+            self._virar_digest()
+        assert self._digest is not None
+        self._digest.mesclar(outro._digest)
+
+    def to_json(self) -> Dict[str, Any]:
+        d: Dict[str, Any] = {"limite_exato": self.limite_exato, "escala": self.escala}
+        if self._digest is None:
+            d["exatos"] = list(self._exatos or ())
+        else:
+            d["digest"] = self._digest.to_json()
+        return d
+
+    @classmethod
+    def from_json(cls, d: Dict[str, Any]) -> "EsbocoQuantis":
+        e = cls(limite_exato=int(d["limite_exato"]), escala=float(d["escala"]))
+        if "digest" in d:
+            e._digest = TDigest.from_json(d["digest"])
+            e.compressao = e._digest.compressao
+            e._exatos = None
+        else:
+            e._exatos = list(d["exatos"])
+        return e
+
+
+class TopK(Generic[T]):
+    """Os `k` itens de maior valor; empates mantêm a ordem de chegada (como um sort estável)."""
+
+    def __init__(self, k: int) -> None:
+        self.k = k
+        self._heap: List[Tuple[float, int, T]] = []  # min-heap por (valor, -ordem de chegada)
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def oferecer(self, valor: float, item: T) -> None:
+        entrada = (valor, -self._seq, item)
+        self._seq += 1
+        if self.k <= 0:
+            return
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entrada)
+        elif entrada[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entrada)
+
+    def oferecer_varios(self, itens: Iterable[T], valor: Callable[[T], float]) -> None:
+        for it in itens:
+            self.oferecer(valor(it), it)
+
+    def itens(self) -> List[T]:
+        """Do maior para o menor valor."""
+        return [it for _, _, it in sorted(self._heap, key=lambda e: (-e[0], -e[1]))]
+
+    def mesclar(self, outro: "TopK[T]") -> None:
+        for v, _, it in sorted(outro._heap, key=lambda e: (-e[0], -e[1])):
+            self.oferecer(v, it)
@@ -0,0 +1,403 @@
+"""
+Detector de quase-duplicidades entre pagamentos (todos os bancos).
+
+As duplicidades do relatório só pegam colisões exatas (dia, categoria, entidade, valor). Lançamentos
+em dobro reais costumam variar um pouco: um dia de diferença, bancos diferentes, centavos de juros,
+o fornecedor escrito de outro jeito. Aqui:
+
+1. hashing por faixa de valor: a faixa é logarítmica (largura = `tolerancia_valor`), então dois
+   valores compatíveis caem na mesma faixa ou em faixas vizinhas; cada linha entra também uma cópia
+   na faixa seguinte, e comparar só dentro da faixa já cobre as vizinhas
+2. sort-and-sweep: dentro de (sentido, faixa) as linhas são ordenadas por data e cada uma é comparada
+   com as seguintes enquanto couberem na janela de datas (até `max_vizinhos` por linha; o que passa
+   disso não é comparado e é contado em `vizinhos_descartados`)
+3. cada par candidato recebe uma confiança (valor, distância em dias, similaridade do favorecido,
+   categoria/documento iguais); pares acima do mínimo viram arestas e os componentes viram grupos
+
+Só entram débitos operacionais: créditos, transferências internas (6) e implantação de saldo (5)
+repetem valores entre contas por natureza e não são lançamentos em dobro.
+
+Ordenação O(n log n) + varredura O(n * max_vizinhos), tudo em arrays; só a similaridade de textos
+(uma vez por par de textos distintos, e só nos pares que ainda podem atingir a confiança mínima)
+roda em Python.
+
+Uso avulso:
+    python scripts/quase_duplicidades.py public/dados/movimentos.csv --janela-dias 3 --tolerancia 0.01
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import difflib
+import math
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from normalizacao import chave_busca
+
+if TYPE_CHECKING:
+    from analise_recorrencia import MovimentoTable
+
+# implantação de saldo e transferência interna: fora da busca (mesmo corte da conciliação)
+CATEGORIAS_NAO_OPERACIONAIS = (5, 6)
+
+
+@dataclass
+class ConfigQuaseDuplicidade:
+    janela_dias: int = 3
+    # diferença relativa aceita entre os valores (0.01 = 1%) e mínimo absoluto (centavos)
+    tolerancia_valor: float = 0.01
+    tolerancia_min_cents: int = 100
+    # similaridade mínima do favorecido (0-1); abaixo disso o par é descartado
+    limiar_entidade: float = 0.8
+    # mesmo corte das duplicidades exatas: R$ 1.000
+    valor_minimo_cents: int = 100_000
+    confianca_minima: float = 0.6
+    max_vizinhos: int = 32
+
+
+# pesos da confiança de um par (somam 1); documento igual soma um bônus
+PESO_VALOR = 0.3
+PESO_DATA = 0.2
+PESO_ENTIDADE = 0.35
+PESO_CATEGORIA = 0.15
+BONUS_DOCUMENTO = 0.1
+
+
+class SimilaridadeEntidades:
+    """
+    Similaridade (0-1) entre os textos que identificam o favorecido de cada movimento (fornecedor +
+    histórico: no 13º e nos PIX o nome da pessoa só aparece no histórico).
+
+    Palavras presentes em muitos textos da base ("LTDA", "PIX", "DEBITO", o nome da própria empresa)
+    e números (datas, parcelas) são ignorados; as demais pesam pela raridade (IDF), então um nome
+    diferente pesa mais que um "CREDITO" em comum. A similaridade é a fração do peso do texto menor
+    encontrada no maior, com tolerância a grafias (`difflib`): nome curto contido no longo dá 1,
+    "MARIA PINTO SILVA" x "PEDRO PINTO SILVA" fica abaixo do limiar.
+
+    Palavras viram ids; a comparação aproximada de duas palavras roda uma vez por par de palavras
+    (mapa por palavra), não uma vez por par de textos.
+    """
+
+    FREQUENCIA_COMUM = 0.05
+    MIN_TEXTOS_COMUM = 20
+    # razão mínima do difflib para duas palavras contarem como a mesma (erros de digitação)
+    RAZAO_PALAVRA = 0.85
+
+    def __init__(self, textos: List[str]) -> None:
+        tokens = [frozenset(w for w in re.findall(r"[a-z]+", chave_busca(x)) if len(w) > 1) for x in textos]
+        df: Dict[str, int] = {}
+        for tk in tokens:
+            for w in tk:
+                df[w] = df.get(w, 0) + 1
+        corte = max(self.MIN_TEXTOS_COMUM, self.FREQUENCIA_COMUM * len(textos))
+        comuns = {w for w, c in df.items() if c > corte}
+        ids = {w: k for k, w in enumerate(df)}
+        self._palavras = list(df)
+        self._tokens = [frozenset(ids[w] for w in (tk - comuns or tk)) for tk in tokens]
+        self._peso = [math.log((1 + len(textos)) / (1 + c)) + 1.0 for c in df.values()]
+        self._parecidas: Dict[int, Dict[int, bool]] = {}
+        self._cache: Dict[Tuple[int, int], float] = {}
+
+    def _casa(self, w: int, outros: frozenset) -> bool:
+        if w in outros:
+            return True
+        mapa = self._parecidas.setdefault(w, {})
+        for x in outros:
+            casa = mapa.get(x)
+            if casa is None:
+                # limites baratos do difflib antes do `ratio` (como em `get_close_matches`)
+                sm = difflib.SequenceMatcher(None, self._palavras[w], self._palavras[x])
+                r = self.RAZAO_PALAVRA
+                casa = mapa[x] = sm.real_quick_ratio() >= r and sm.quick_ratio() >= r and sm.ratio() >= r
+            if casa:
+                return True
+        return False
+
+    def __call__(self, a: int, b: int) -> float:
+        """`a`, `b`: posições na lista de textos do construtor."""
+        if a == b:
+            return 1.0
+        if a > b:
+            a, b = b, a
+        sim = self._cache.get((a, b))
+        if sim is None:
+            ta, tb = self._tokens[a], self._tokens[b]
+            peso = self._peso
+            pa, pb = sum(peso[w] for w in ta), sum(peso[w] for w in tb)
+            if pa > pb:
+                ta, tb, pa = tb, ta, pb
+            sim = sum(peso[w] for w in ta if self._casa(w, tb)) / pa if pa else 0.0
+            self._cache[(a, b)] = sim
+        return sim
+
+
+class _Componentes:
+    """Union-find para juntar pares em grupos."""
+
+    def __init__(self) -> None:
+        self.pai: Dict[int, int] = {}
+
+    def raiz(self, x: int) -> int:
+        pai = self.pai
+        pai.setdefault(x, x)
+        while pai[x] != x:
+            pai[x] = pai[pai[x]]
+            x = pai[x]
+        return x
+
+    def unir(self, a: int, b: int) -> None:
+        ra, rb = self.raiz(a), self.raiz(b)
+        if ra != rb:
+            self.pai[max(ra, rb)] = min(ra, rb)
+
+
+def pares_candidatos(
+    sentido: np.ndarray,
+    valores: np.ndarray,
+    dias: np.ndarray,
+    cfg: ConfigQuaseDuplicidade,
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Pares (i, j), i < j, de posições com o mesmo sentido, valor dentro da tolerância e datas
+    dentro da janela. `valores` em centavos (> 0) e `dias` em dias inteiros. O terceiro valor é
+    quantas comparações ficaram de fora por passar de `max_vizinhos` vizinhos na janela.
+    """
+    n = len(valores)
+    if n < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), 0
+    largura = math.log1p(max(cfg.tolerancia_valor, 1e-9))
+    faixa = np.floor(np.log(valores.astype(np.float64)) / largura).astype(np.int64)
+
+    # cada linha entra na sua faixa e numa cópia na faixa seguinte; dois pares de cópias repetiriam
+    # o par das originais, então cada par sai uma vez só
+    pos = np.concatenate([np.arange(n), np.arange(n)])
+    chave_faixa = np.concatenate([faixa, faixa + 1])
+    copia = np.repeat(np.array([False, True]), n)
+    sent = np.concatenate([sentido, sentido]).astype(np.int64)
+    d = np.concatenate([dias, dias]).astype(np.int64)
+    ordem = np.lexsort((pos, d, chave_faixa, sent))
+    pos, chave_faixa, copia, sent, d = pos[ordem], chave_faixa[ordem], copia[ordem], sent[ordem], d[ordem]
+
+    # vizinhos na janela além de `max_vizinhos`: chave única (bloco de sentido/faixa, dia) e busca binária
+    bloco = np.cumsum(np.r_[False, (sent[1:] != sent[:-1]) | (chave_faixa[1:] != chave_faixa[:-1])])
+    dia0 = d - d.min()
+    chave = bloco * (int(dia0.max()) + cfg.janela_dias + 1) + dia0
+    na_janela = np.searchsorted(chave, chave + cfg.janela_dias, side="right") - np.arange(len(chave)) - 1
+    descartados = int(np.maximum(na_janela - cfg.max_vizinhos, 0).sum())
+
+    ii: List[np.ndarray] = []
+    jj: List[np.ndarray] = []
+    for k in range(1, cfg.max_vizinhos + 1):
+        if k >= len(pos):
+            break
+        ok = (
+            (sent[k:] == sent[:-k])
+            & (chave_faixa[k:] == chave_faixa[:-k])
+            & (d[k:] - d[:-k] <= cfg.janela_dias)
+            & (pos[k:] != pos[:-k])
+        )
+        if not ok.any():
+            # ordenado por data dentro da faixa: se nenhum vizinho a distância k cabe, nenhum mais distante cabe
+            break
+        ok &= ~(copia[k:] & copia[:-k])
+        a, b = pos[:-k][ok], pos[k:][ok]
+        ii.append(np.minimum(a, b))
+        jj.append(np.maximum(a, b))
+    if not ii:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), descartados
+    i, j = np.concatenate(ii), np.concatenate(jj)
+
+    # confirmação exata da tolerância de valor (as faixas são só o hash)
+    vi, vj = valores[i], valores[j]
+    limite = np.maximum(np.maximum(vi, vj) * cfg.tolerancia_valor, cfg.tolerancia_min_cents)
+    ok = np.abs(vi - vj) <= limite
+    return i[ok], j[ok], descartados
+
+
+def detectar_quase_duplicidades(
+    t: "MovimentoTable", cfg: Optional[ConfigQuaseDuplicidade] = None
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Grupos de pagamentos (débitos operacionais) que parecem o mesmo lançamento repetido, do mais
+    relevante (confiança × valor em excesso) para o menos, e um resumo da busca: movimentos
+    comparados, pares candidatos e comparações descartadas pelo limite de `max_vizinhos`.
+    """
+    cfg = cfg if cfg is not None else ConfigQuaseDuplicidade()
+    valor = t.debito.astype(np.int64)
+    linhas = np.flatnonzero(
+        (valor >= max(cfg.valor_minimo_cents, 1)) & ~np.isin(t.categoria_id, CATEGORIAS_NAO_OPERACIONAIS)
+    )
+    resumo = {"movimentos": int(len(linhas)), "pares_candidatos": 0, "vizinhos_descartados": 0}
+    if len(linhas) < 2:
+        return [], resumo
+    sentido = np.ones(len(linhas), dtype=np.int8)
+    dias = t.data[linhas].astype("datetime64[D]").astype(np.int64)
+    vals = valor[linhas]
+    pi, pj, resumo["vizinhos_descartados"] = pares_candidatos(sentido, vals, dias, cfg)
+    resumo["pares_candidatos"] = int(len(pi))
+    if not len(pi):
+        return [], resumo
+
+    # confiança sem o favorecido; pares que nem com similaridade 1 chegam à mínima saem antes dos textos
+    li, lj = linhas[pi], linhas[pj]
+    vi, vj = vals[pi], vals[pj]
+    limite = np.maximum(np.maximum(vi, vj) * cfg.tolerancia_valor, cfg.tolerancia_min_cents)
+    score_valor = 1.0 - np.abs(vi - vj) / limite
+    score_data = 1.0 - np.abs(dias[pi] - dias[pj]) / (cfg.janela_dias + 1)
+    mesma_cat = (t.categoria_nome[li] == t.categoria_nome[lj]).astype(np.float64)
+    doc_i, doc_j = t.documento[li], t.documento[lj]
+    mesmo_doc = (doc_i == doc_j) & np.array([bool(t.textos[c].strip()) for c in doc_i.tolist()], dtype=bool)
+
+    def _confianca(sim: Any) -> np.ndarray:
+        return np.minimum(
+            1.0,
+            PESO_VALOR * score_valor
+            + PESO_DATA * score_data
+            + PESO_ENTIDADE * sim
+            + PESO_CATEGORIA * mesma_cat
+            + BONUS_DOCUMENTO * mesmo_doc,
+        )
+
+    ok = _confianca(1.0) >= cfg.confianca_minima
+    pi, pj, li, lj = pi[ok], pj[ok], li[ok], lj[ok]
+    score_valor, score_data, mesma_cat, mesmo_doc = score_valor[ok], score_data[ok], mesma_cat[ok], mesmo_doc[ok]
+    if not len(pi):
+        return [], resumo
+
+    # favorecido: fornecedor + histórico; similaridade uma vez por par de textos distintos
+    pares_txt, ident = np.unique((t.fornecedor[linhas].astype(np.int64) << 32) | t.historico[linhas].astype(np.int64), return_inverse=True)
+    ident = ident.reshape(-1)
+    similaridade = SimilaridadeEntidades([f"{t.textos[c >> 32]} {t.textos[c & 0xFFFFFFFF]}" for c in pares_txt.tolist()])
+    ent_i, ent_j = ident[pi].astype(np.int64), ident[pj].astype(np.int64)
+    pares_ent, inv = np.unique((ent_i << 32) | ent_j, return_inverse=True)
+    sim_par = np.array([similaridade(p >> 32, p & 0xFFFFFFFF) for p in pares_ent.tolist()], dtype=np.float64)
+    sim = sim_par[inv.reshape(-1)]
+    confianca = _confianca(sim)
+    ok = (sim >= cfg.limiar_entidade) & (confianca >= cfg.confianca_minima)
+    li, lj, confianca = li[ok], lj[ok], confianca[ok]
+    if not len(li):
+        return [], resumo
+
+    # um grupo inteiro cabe na janela de datas e na tolerância de valor: sem isso, lançamentos
+    # parecidos em dias seguidos (tarifa diária, boletos de valores próximos) encadeariam num grupo só
+    dia_mov = t.data.astype("datetime64[D]").astype(np.int64)
+    ordem = np.lexsort((-confianca, np.minimum(dia_mov[li], dia_mov[lj])))
+    li, lj, confianca = li[ordem], lj[ordem], confianca[ordem]
+    comp = _Componentes()
+    limites: Dict[int, Tuple[int, int, int, int]] = {}
+    unidos = np.zeros(len(li), dtype=bool)
+    for k, (a, b) in enumerate(zip(li.tolist(), lj.tolist())):
+        ra, rb = comp.raiz(a), comp.raiz(b)
+        if ra != rb:
+            la = limites.get(ra) or (int(dia_mov[a]), int(dia_mov[a]), int(valor[a]), int(valor[a]))
+            lb = limites.get(rb) or (int(dia_mov[b]), int(dia_mov[b]), int(valor[b]), int(valor[b]))
+            novo = (min(la[0], lb[0]), max(la[1], lb[1]), min(la[2], lb[2]), max(la[3], lb[3]))
+            if novo[1] - novo[0] > cfg.janela_dias:
+                continue
+            if novo[3] - novo[2] > max(novo[3] * cfg.tolerancia_valor, cfg.tolerancia_min_cents):
+                continue
+            comp.unir(ra, rb)
+            limites[comp.raiz(ra)] = novo
+        unidos[k] = True
+    li, lj, confianca = li[unidos], lj[unidos], confianca[unidos]
+    grupos: Dict[int, List[int]] = {}
+    for x in np.unique(np.concatenate([li, lj])).tolist():
+        grupos.setdefault(comp.raiz(x), []).append(x)
+    soma_conf: Dict[int, float] = {}
+    qtd_conf: Dict[int, int] = {}
+    for a, c in zip(li.tolist(), confianca.tolist()):
+        r = comp.raiz(a)
+        soma_conf[r] = soma_conf.get(r, 0.0) + c
+        qtd_conf[r] = qtd_conf.get(r, 0) + 1
+
+    out: List[Dict[str, Any]] = []
+    for r, membros in grupos.items():
+        membros.sort(key=lambda i: (t.data[i], i))
+        valores = [int(valor[i]) for i in membros]
+        conf = soma_conf[r] / qtd_conf[r]
+        out.append(
+            {
+                "ids": [str(t.ids[i]) for i in membros],
+                "datas": [str(t.data[i]) for i in membros],
+                "bancos": [t.texto(t.banco, i) for i in membros],
+                "categorias": [t.texto(t.categoria_nome, i) for i in membros],
+                "entidades": [t.texto(t.entidade, i) for i in membros],
+                "fornecedores": [t.texto(t.fornecedor, i) for i in membros],
+                "descricoes": [t.texto(t.historico, i) for i in membros],
+                "valores": [v / 100 for v in valores],
+                "sentido": "saida",
+                "qtd": len(membros),
+                # o que passa de um lançamento (se for mesmo duplicidade)
+                "excesso": (sum(valores) - max(valores)) / 100,
+                "confianca": round(conf, 3),
+            }
+        )
+    out.sort(key=lambda g: (-g["confianca"] * g["excesso"], g["ids"][0]))
+    return out, resumo
+
+
+def escrever_csv_quase_duplicidades(grupos: List[Dict[str, Any]], out_path: Path) -> None:
+    """Uma linha por movimento, com o número do grupo e a confiança do grupo."""
+    with out_path.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f, delimiter=";")
+        w.writerow(["grupo", "confianca", "id", "data", "banco", "categoria", "entidade", "descricao", "valor", "sentido"])
+        for n, g in enumerate(grupos, start=1):
+            for k in range(g["qtd"]):
+                w.writerow(
+                    [
+                        n,
+                        f"{g['confianca']:.3f}",
+                        g["ids"][k],
+                        g["datas"][k],
+                        g["bancos"][k],
+                        g["categorias"][k],
+                        g["entidades"][k],
+                        g["descricoes"][k],
+                        f"{g['valores'][k]:.2f}",
+                        g["sentido"],
+                    ]
+                )
+
+
+def main() -> None:
+    from analise_recorrencia import ler_movimentos, money
+
+    padrao = ConfigQuaseDuplicidade()
+    parser = argparse.ArgumentParser(description="Quase-duplicidades entre movimentos (janela de datas + tolerância de valor)")
+    parser.add_argument("movimentos", type=Path, help="CSV de movimentos (layout do extrato consolidado)")
+    parser.add_argument("--janela-dias", type=int, default=padrao.janela_dias)
+    parser.add_argument("--tolerancia", type=float, default=padrao.tolerancia_valor, help="Diferença relativa de valor (0.01 = 1%%)")
+    parser.add_argument("--limiar-entidade", type=float, default=padrao.limiar_entidade, help="Similaridade mínima das entidades (0-1)")
+    parser.add_argument("--valor-minimo", type=float, default=padrao.valor_minimo_cents / 100, help="Valor mínimo em reais")
+    parser.add_argument("--confianca-minima", type=float, default=padrao.confianca_minima)
+    parser.add_argument("--saida", type=Path, default=None, help="CSV com os grupos encontrados")
+    args = parser.parse_args()
+
+    if not args.movimentos.exists():
+        raise SystemExit(f"Arquivo não encontrado: {args.movimentos}")
+    cfg = ConfigQuaseDuplicidade(
+        janela_dias=args.janela_dias,
+        tolerancia_valor=args.tolerancia,
+        limiar_entidade=args.limiar_entidade,
+        valor_minimo_cents=int(round(args.valor_minimo * 100)),
+        confianca_minima=args.confianca_minima,
+    )
+    grupos, resumo = detectar_quase_duplicidades(ler_movimentos(args.movimentos), cfg)
+    print(f"OK: {len(grupos)} grupos de quase-duplicidades ({resumo['movimentos']} pagamentos comparados)")
+    if resumo["vizinhos_descartados"]:
+        print(f"   - AVISO: {resumo['vizinhos_descartados']} comparações acima de max_vizinhos={cfg.max_vizinhos} ficaram de fora")
+    for g in grupos[:10]:
+        print(f"   - {g['datas'][0]} {(g['fornecedores'][0] or g['entidades'][0])[:40]}: {money(g['valores'][0])} x {g['qtd']} (confianca {g['confianca']:.2f})")
+    if args.saida:
+        escrever_csv_quase_duplicidades(grupos, args.saida)
+        print("   - CSV:", args.saida)
+
+
+if __name__ == "__main__":
+    main()
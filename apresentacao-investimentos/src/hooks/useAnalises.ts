@@ -2,6 +2,15 @@ import { useEffect, useMemo, useState } from 'react';
 import Papa from 'papaparse';
 import { isBancoPermitido } from '../utils/bancoFilter';
 import { useBancoScope } from '../filters/BancoScopeProvider';
+import type { BancoScope } from '../filters/BancoScopeProvider';
+import {
+  carregarManifesto,
+  carregarPacote,
+  type PacoteCuboAberto,
+  type PacoteEntidades,
+  type PacotePessoas,
+  type PacoteTotais,
+} from '../utils/pacotesDashboard';
 
 export interface MovimentoClassificadoRow {
   id: string;
@@ -52,9 +61,19 @@ function loadCSV<T>(url: string): Promise<T[]> {
   });
 }
 
+export interface PacotesAnalises {
+  totais: PacoteTotais;
+  entidades: PacoteEntidades;
+  pessoas: PacotePessoas;
+  // Saldos em aberto das contas a pagar (recortar com `fatiarCubo` / `somarCubo`); ausente em pacotes antigos
+  contasAberto?: PacoteCuboAberto;
+}
+
 export interface AnalisesData {
   movimentos: MovimentoClassificadoRow[];
   pessoas: PessoaRescisaoRow[];
+  // Quando os pacotes pré-agregados existem, `movimentos` fica vazio e os totais vêm daqui
+  pacotes?: PacotesAnalises;
 }
 
 export interface AnalisesComputed {
@@ -87,6 +106,101 @@ export interface AnalisesComputed {
   }>;
 }
 
+function pessoasDoPacote(p: PacotePessoas): PessoaRescisaoRow[] {
+  return p.pessoas.linhas.map((r) => ({
+    pessoa: r[0],
+    salarios_rescisao_total: r[1].toFixed(2),
+    salarios_rescisao_count: String(r[2]),
+    salarios_rescisao_datas: r[3].join(','),
+    fgts_rescisao_total: r[4].toFixed(2),
+    fgts_rescisao_count: String(r[5]),
+    fgts_rescisao_datas: r[6].join(','),
+    acoes_trabalhistas_total: r[7].toFixed(2),
+    acoes_trabalhistas_count: String(r[8]),
+    acoes_trabalhistas_datas: r[9].join(','),
+    total_geral: r[10].toFixed(2),
+  }));
+}
+
+async function carregarPacotes(): Promise<AnalisesData | null> {
+  const manifesto = await carregarManifesto();
+  if (!manifesto) return null;
+  const [totais, entidades, pessoas, contasAberto] = await Promise.all([
+    carregarPacote<PacoteTotais>(manifesto, 'totais'),
+    carregarPacote<PacoteEntidades>(manifesto, 'entidades'),
+    carregarPacote<PacotePessoas>(manifesto, 'pessoas'),
+    manifesto.pacotes.contas_aberto ? carregarPacote<PacoteCuboAberto>(manifesto, 'contas_aberto') : Promise.resolve(undefined),
+  ]);
+  return { movimentos: [], pessoas: pessoasDoPacote(pessoas), pacotes: { totais, entidades, pessoas, contasAberto } };
+}
+
+// Mesmos indicadores do cálculo sobre o CSV, a partir dos pacotes (já agregados por banco)
+function computarDePacotes(p: PacotesAnalises, scope: BancoScope): AnalisesComputed {
+  const permitido = (banco: string) => scope !== 'core' || isBancoPermitido(banco);
+
+  let entradasTotal = 0;
+  let saidasTotal = 0;
+  let saidasOperacionais = 0;
+  let transferenciasDebito = 0;
+  let transferenciasCredito = 0;
+  let implantacaoSaldo = 0;
+
+  for (const [, , , banco, classeFluxo, credito, debito] of p.totais.totais.linhas) {
+    if (!permitido(banco)) continue;
+    entradasTotal += credito;
+    if (classeFluxo === 'transferencia_interna') transferenciasCredito += credito;
+    saidasTotal += debito;
+    if (classeFluxo === 'custo_operacional') saidasOperacionais += debito;
+    if (classeFluxo === 'transferencia_interna') transferenciasDebito += debito;
+    if (classeFluxo === 'implantacao_saldo') implantacaoSaldo += debito;
+  }
+
+  const pessoasEmComum = p.pessoas.pessoas.linhas
+    .filter((r) => scope !== 'core' || r[11].some((b) => isBancoPermitido(b)))
+    .map((r) => ({
+      pessoa: r[0],
+      salariosRescisao: r[1],
+      fgtsRescisao: r[4],
+      acoes: r[7],
+      total: r[10],
+      parcelasSal: r[2],
+      parcelasFgts: r[5],
+    }))
+    .filter((x) => x.salariosRescisao > 0 && x.fgtsRescisao > 0)
+    .sort((a, b) => (b.salariosRescisao + b.fgtsRescisao) - (a.salariosRescisao + a.fgtsRescisao));
+
+  const topRecorrentes = p.entidades.recorrentes
+    .map((g) => {
+      const bancos = g.por_banco.filter((b) => permitido(b.banco));
+      return {
+        categoria: g.categoria,
+        entidade: g.entidade,
+        total: bancos.reduce((acc, b) => acc + b.total, 0),
+        count: bancos.reduce((acc, b) => acc + b.quantidade, 0),
+        classe: g.classe,
+        extraordinario: g.extraordinario,
+        meses: Array.from(new Set(bancos.flatMap((b) => b.meses))).sort(),
+      };
+    })
+    .filter((g) => g.count > 0)
+    .sort((a, b) => b.total - a.total)
+    .slice(0, 20);
+
+  return {
+    entradasTotal,
+    saidasTotal,
+    saidasOperacionais,
+    transferenciasDebito,
+    transferenciasCredito,
+    implantacaoSaldo,
+    saldoPeriodo: entradasTotal - saidasTotal,
+    saldoOperacionalAprox: entradasTotal - saidasOperacionais,
+    pessoasEmComumCount: pessoasEmComum.length,
+    pessoasEmComum,
+    topRecorrentes,
+  };
+}
+
 export function useAnalises(): {
   data: AnalisesData | null;
   computed: AnalisesComputed | null;
@@ -106,6 +220,11 @@ export function useAnalises(): {
       setLoading(true);
       setError(null);
       try {
+        const pacotes = await carregarPacotes();
+        if (pacotes) {
+          if (!cancelled) setData(pacotes);
+          return;
+        }
         const [movimentos, pessoas] = await Promise.all([
           loadCSV<MovimentoClassificadoRow>('/dados/movimentos_classificados.csv'),
           loadCSV<PessoaRescisaoRow>('/dados/pessoas_rescisao_fgts.csv'),
@@ -125,6 +244,7 @@ export function useAnalises(): {
 
   const computed = useMemo<AnalisesComputed | null>(() => {
     if (!data) return null;
+    if (data.pacotes) return computarDePacotes(data.pacotes, scope);
 
     const movs = scope === 'core'
       ? data.movimentos.filter((m) => isBancoPermitido(m.banco))
@@ -0,0 +1,115 @@
+import { withBase } from './assetUrl';
+
+// Pacotes pré-agregados gerados por scripts/pacotes_dashboard.py (via analise_recorrencia.py).
+// O manifesto é buscado sem cache; os pacotes têm o hash do conteúdo no nome e usam o cache normal do navegador.
+
+const PASTA_PACOTES = 'dados/pacotes';
+const VERSAO_PACOTES = 1;
+
+export interface ManifestoPacotes {
+  versao: number;
+  pacotes: Record<string, { arquivo: string; bytes: number; hash: string }>;
+}
+
+export interface TabelaPacote<T extends unknown[]> {
+  colunas: string[];
+  linhas: T[];
+}
+
+// mes, categoria_id, categoria, banco, classe_fluxo, credito, debito, quantidade
+export type LinhaTotais = [string, number, string, string, string, number, number, number];
+
+export interface PacoteTotais {
+  meses: string[];
+  totais: TabelaPacote<LinhaTotais>;
+}
+
+export interface EntidadePorBanco {
+  banco: string;
+  total: number;
+  quantidade: number;
+  meses: string[];
+}
+
+export interface EntidadePacote {
+  categoria: string;
+  entidade: string;
+  classe: string;
+  extraordinario: boolean;
+  total: number;
+  quantidade: number;
+  meses: string[];
+  por_banco: EntidadePorBanco[];
+}
+
+export interface PacoteEntidades {
+  recorrentes: EntidadePacote[];
+  nao_recorrentes: EntidadePacote[];
+}
+
+// pessoa, salarios_rescisao_total, salarios_rescisao_count, salarios_rescisao_datas, fgts_rescisao_total,
+// fgts_rescisao_count, fgts_rescisao_datas, acoes_trabalhistas_total, acoes_trabalhistas_count,
+// acoes_trabalhistas_datas, total_geral, bancos
+export type LinhaPessoa = [string, number, number, string[], number, number, string[], number, number, string[], number, string[]];
+
+export interface PacotePessoas {
+  pessoas: TabelaPacote<LinhaPessoa>;
+  fgts_rescisao_sem_pessoa_total: number;
+}
+
+// Cubo esparso dos saldos em aberto (scripts/cubo_contas.py): células com os códigos de cada dimensão
+// (índices em `rotulos[dimensao]`), saldo em reais e quantidade de títulos
+export type DimensaoCubo = 'mes' | 'categoria' | 'entidade' | 'banco' | 'status';
+
+export interface PacoteCuboAberto {
+  dimensoes: DimensaoCubo[];
+  rotulos: Record<DimensaoCubo, string[]>;
+  colunas: string[];
+  celulas: number[][];
+}
+
+/** Células do cubo que passam nos filtros (um rótulo ou uma lista por dimensão). */
+export function fatiarCubo(
+  cubo: PacoteCuboAberto,
+  filtros: Partial<Record<DimensaoCubo, string | string[]>>,
+): number[][] {
+  const testes = Object.entries(filtros).map(([dim, valor]) => {
+    const col = cubo.dimensoes.indexOf(dim as DimensaoCubo);
+    const aceitos = new Set((Array.isArray(valor) ? valor : [valor]).map((r) => cubo.rotulos[dim as DimensaoCubo].indexOf(r)));
+    return (c: number[]) => aceitos.has(c[col]);
+  });
+  return cubo.celulas.filter((c) => testes.every((t) => t(c)));
+}
+
+/** Saldo por rótulo da dimensão, do maior para o menor (sobre o cubo todo ou sobre um recorte de `fatiarCubo`). */
+export function somarCubo(cubo: PacoteCuboAberto, dimensao: DimensaoCubo, celulas = cubo.celulas): [string, number][] {
+  const col = cubo.dimensoes.indexOf(dimensao);
+  const colSaldo = cubo.dimensoes.length;
+  const somas = new Map<number, number>();
+  for (const c of celulas) somas.set(c[col], (somas.get(c[col]) ?? 0) + c[colSaldo]);
+  return [...somas.entries()]
+    .sort((a, b) => b[1] - a[1] || a[0] - b[0])
+    .map(([cod, v]) => [cubo.rotulos[dimensao][cod], Math.round(v * 100) / 100]);
+}
+
+/** Manifesto dos pacotes, ou null se ainda não foram gerados (o chamador usa os CSVs). */
+export async function carregarManifesto(): Promise<ManifestoPacotes | null> {
+  try {
+    const res = await fetch(withBase(`${PASTA_PACOTES}/manifest.json`), { cache: 'no-cache' });
+    if (!res.ok) return null;
+    // O servidor de desenvolvimento devolve o index.html para arquivos inexistentes: JSON inválido = sem pacotes
+    const json = (await res.json()) as ManifestoPacotes;
+    if (!json || json.versao !== VERSAO_PACOTES || !json.pacotes) return null;
+    return json;
+  } catch {
+    return null;
+  }
+}
+
+export async function carregarPacote<T>(manifesto: ManifestoPacotes, nome: string): Promise<T> {
+  const item = manifesto.pacotes[nome];
+  if (!item) throw new Error(`Pacote ausente no manifesto: ${nome}`);
+  const res = await fetch(withBase(`${PASTA_PACOTES}/${item.arquivo}`));
+  if (!res.ok) throw new Error(`Falha ao carregar ${item.arquivo}: ${res.status}`);
+  return (await res.json()) as T;
+}